@@ -12,6 +12,7 @@ from app.core.auth import get_current_user
 from app.services.bitcoin30m_mainnet import bitcoin_30m_mainnet_scanner
 from app.services.auto_trading_mainnet30m_executor import AutoTradingMainnet30mExecutor
 from app.db.models import TradingOrder
+from app.services.market_data_service import market_data_service
 from datetime import datetime, timedelta
 
 # Configurar logging
@@ -176,10 +177,9 @@ async def force_buy_bitcoin_30m_mainnet(
         price = bitcoin_30m_mainnet_scanner.last_scan_price
         if not price:
             # Fallback rápido al endpoint público de Binance
-            import requests
-            resp = requests.get("https://api.binance.com/api/v3/ticker/price", params={"symbol": "BTCUSDT"}, timeout=8)
-            resp.raise_for_status()
-            price = float(resp.json()["price"])
+            price = await market_data_service.get_price('BTCUSDT')
+            if not price:
+                raise HTTPException(status_code=503, detail="No se pudo obtener precio de Binance")
 
         # Señal simulada coherente con el ejecutor
         fake_signal = {
@@ -338,17 +338,10 @@ async def get_bitcoin_current_price_mainnet(
 ):
     """Obtiene el precio actual de Bitcoin para Mainnet"""
     try:
-        import requests
-        
-        # Obtener precio desde Binance
-        url = "https://api.binance.com/api/v3/ticker/price"
-        params = {'symbol': 'BTCUSDT'}
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        price = float(data['price'])
+        # Obtener precio desde el servicio compartido de mercado
+        price = await market_data_service.get_price('BTCUSDT')
+        if price is None:
+            raise Exception("No se pudo obtener precio de Binance")
         
         return {
             "success": True,
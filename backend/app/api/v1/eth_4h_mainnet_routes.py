@@ -12,6 +12,7 @@ from app.core.auth import get_current_user
 from app.services.eth_scanner_service import eth_scanner
 from app.services.auto_trading_eth4h_executor import AutoTradingEth4hExecutor
 from app.db.models import TradingOrder
+from app.services.market_data_service import market_data_service
 from datetime import datetime, timedelta
 
 # Configurar logging
@@ -178,10 +179,9 @@ async def force_buy_eth_4h_mainnet(
         price = eth_scanner.last_scan_price
         if not price:
             # Fallback rápido al endpoint público de Binance
-            import requests
-            resp = requests.get("https://api.binance.com/api/v3/ticker/price", params={"symbol": "ETHUSDT"}, timeout=8)
-            resp.raise_for_status()
-            price = float(resp.json()["price"])
+            price = await market_data_service.get_price('ETHUSDT')
+            if not price:
+                raise HTTPException(status_code=503, detail="No se pudo obtener precio de Binance")
 
         # Señal simulada coherente con el ejecutor
         fake_signal = {
@@ -340,17 +340,10 @@ async def get_eth_4h_current_price_mainnet(
 ):
     """Obtiene el precio actual de ETH para Mainnet"""
     try:
-        import requests
-        
-        # Obtener precio desde Binance
-        url = "https://api.binance.com/api/v3/ticker/price"
-        params = {'symbol': 'ETHUSDT'}
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        price = float(data['price'])
+        # Obtener precio desde el servicio compartido de mercado
+        price = await market_data_service.get_price('ETHUSDT')
+        if price is None:
+            raise Exception("No se pudo obtener precio de Binance")
         
         return {
             "success": True,
@@ -52,7 +52,7 @@ async def get_mainnet_history(
         # Filtrar solo órdenes del sistema si se solicita
         if system_only:
             orders_query = orders_query.filter(
-                TradingOrder.reason.in_(['U_PATTERN', 'MANUAL_TRADE', 'EXTERNAL_SELL'])
+                TradingOrder.reason.in_(['U_PATTERN', 'U_PATTERN_30M', 'U_PATTERN_30M_EXTERNAL_SELL', 'MANUAL_TRADE', 'EXTERNAL_SELL'])
             )
         
         orders_query = orders_query.order_by(TradingOrder.created_at.desc())
@@ -95,7 +95,7 @@ async def get_mainnet_history(
                         pnl = net_pnl
             
             # Determinar si es una orden del sistema o externa
-            is_system_order = order.reason in ['U_PATTERN', 'MANUAL_TRADE', 'EXTERNAL_SELL']
+            is_system_order = order.reason in ['U_PATTERN', 'U_PATTERN_30M', 'U_PATTERN_30M_EXTERNAL_SELL', 'MANUAL_TRADE', 'EXTERNAL_SELL']
             
             formatted_orders.append({
                 "id": order.id,
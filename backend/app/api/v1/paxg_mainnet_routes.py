@@ -12,6 +12,7 @@ from app.core.auth import get_current_user
 from app.services.paxg_scanner_service import paxg_scanner
 from app.services.auto_trading_executor import auto_trading_executor
 from app.db.models import TradingOrder
+from app.services.market_data_service import market_data_service
 from datetime import datetime, timedelta
 
 # Configurar logging
@@ -167,17 +168,10 @@ async def get_current_paxg_price(
             }
         
         # Si no hay precio del scanner, obtener de Binance directamente
-        import requests
-        
-        # Obtener precio desde Binance
-        url = "https://api.binance.com/api/v3/ticker/price"
-        params = {'symbol': 'PAXGUSDT'}
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        price = float(data['price'])
+        # Obtener precio desde el servicio compartido de mercado
+        price = await market_data_service.get_price('PAXGUSDT')
+        if price is None:
+            raise Exception("No se pudo obtener precio de Binance")
         
         return {
             "success": True,
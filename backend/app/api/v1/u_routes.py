@@ -1,10 +1,12 @@
 # backend/app/api/v1/u_routes.py
 
 from fastapi import APIRouter, Depends
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.db import crud_estados_u
 from app.schemas.u_schema import SignalOut
+from app.services.u_pattern_batch_service import u_pattern_batch_service
 
 router = APIRouter()
 
@@ -32,3 +34,16 @@ def get_u_signals(db: Session = Depends(get_db)):
     except Exception as e:
         print(f"Error obteniendo señales: {e}")
         return []
+
+
+@router.get("/signals/scan")
+async def scan_u_patterns():
+    """
+    Evalúa el patrón U de todas las series registradas (BTC/ETH/BNB 4h, BTC 30m) en una pasada.
+    Usa los parámetros por defecto de cada serie; los scanners detectan por su cuenta.
+    """
+    signals = await u_pattern_batch_service.scan()
+    return {
+        'signals': {key: jsonable_encoder(items) for key, items in signals.items()},
+        'status': u_pattern_batch_service.get_status(),
+    }
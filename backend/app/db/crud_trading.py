@@ -2,10 +2,12 @@
 
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, desc
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 import hashlib
+import hmac
 import os
+import time
 from cryptography.fernet import Fernet
 
 from app.db.models import TradingApiKey, TradingOrder, User
@@ -34,6 +36,58 @@ def mask_api_key(api_key: str) -> str:
         return api_key
     return api_key[:8] + '*' * (len(api_key) - 8)
 
+# --------------------------
+# Caché de credenciales para firmar
+# --------------------------
+
+# Segundos que un firmante sigue en memoria sin volver a leer la API key de la DB
+API_SIGNER_TTL_SECONDS = 300.0
+
+class ApiSigner:
+    """
+    Credenciales desencriptadas de una API key listas para firmar peticiones.
+    El secret solo vive dentro del HMAC ya inicializado: no es un atributo y
+    no aparece en repr(), logs ni tracebacks.
+    """
+    __slots__ = ('api_key_id', 'api_key', '_hmac', 'expires_at')
+
+    def __init__(self, api_key_id: int, api_key: str, secret_key: str, ttl: float = API_SIGNER_TTL_SECONDS):
+        self.api_key_id = api_key_id
+        self.api_key = api_key
+        self._hmac = hmac.new(secret_key.encode(), digestmod=hashlib.sha256)
+        self.expires_at = time.monotonic() + ttl
+
+    def sign(self, payload: str) -> str:
+        """Firma HMAC-SHA256 (hex) del query string"""
+        mac = self._hmac.copy()
+        mac.update(payload.encode())
+        return mac.hexdigest()
+
+    def __repr__(self) -> str:
+        return f"ApiSigner(api_key_id={self.api_key_id}, api_key={mask_api_key(self.api_key)})"
+
+_api_signers: Dict[int, ApiSigner] = {}
+
+def get_api_signer(db: Session, api_key_id: int) -> Optional[ApiSigner]:
+    """
+    Firmante de una API key desde la caché del proceso; solo consulta la DB y
+    desencripta si no está o ha caducado
+    """
+    signer = _api_signers.get(api_key_id)
+    if signer is not None and signer.expires_at > time.monotonic():
+        return signer
+    credentials = get_decrypted_api_credentials(db, api_key_id)
+    if not credentials:
+        _api_signers.pop(api_key_id, None)
+        return None
+    signer = ApiSigner(api_key_id, *credentials)
+    _api_signers[api_key_id] = signer
+    return signer
+
+def invalidate_api_signer(api_key_id: int):
+    """Descarta el firmante en caché (la API key cambió, se borró o Binance la rechazó)"""
+    _api_signers.pop(api_key_id, None)
+
 # --------------------------
 # CRUD Trading API Keys
 # --------------------------
@@ -136,6 +190,7 @@ def update_trading_api_key(db: Session, api_key_id: int, user_id: int, updates:
         setattr(db_api_key, field, value)
     
     db.commit()
+    invalidate_api_signer(api_key_id)
     db.refresh(db_api_key)
     return db_api_key
 
@@ -147,6 +202,7 @@ def delete_trading_api_key(db: Session, api_key_id: int, user_id: int) -> bool:
     
     db.delete(db_api_key)
     db.commit()
+    invalidate_api_signer(api_key_id)
     return True
 
 def update_connection_status(db: Session, api_key_id: int, status: str, error: Optional[str] = None):
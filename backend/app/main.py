@@ -9,7 +9,7 @@ import os
 from dotenv import load_dotenv
 from app.db import models
 from app.db.database import engine
-from app.api.v1 import u_routes, auth_routes, ordenes_routes, alertas_routes, users_routes, bitcoin_bot_routes, telegram_routes, eth_bot_routes, bnb_bot_routes, profile_routes, health_routes, trading_routes, debug_routes, bitcoin30m_scanner_routes, bitcoin30m_mainnet_routes, bnb_mainnet_routes, eth_mainnet_routes, btc_4h_mainnet_routes, paxg_mainnet_routes, mainnet_history_routes, bnb_4h_mainnet_routes, eth_4h_mainnet_routes, paxg_4h_mainnet_routes, migrate_routes
+from app.api.v1 import u_routes, auth_routes, ordenes_routes, alertas_routes, users_routes, bitcoin_bot_routes, telegram_routes, eth_bot_routes, bnb_bot_routes, profile_routes, health_routes, trading_routes, debug_routes, bitcoin30m_scanner_routes, bitcoin30m_mainnet_routes, bnb_mainnet_routes, eth_mainnet_routes, btc_4h_mainnet_routes, paxg_mainnet_routes, mainnet_history_routes, bnb_4h_mainnet_routes, eth_4h_mainnet_routes, paxg_4h_mainnet_routes, migrate_routes, test_tools_simple
 from app.services.health_monitor_service import health_monitor
 
 # Cargar variables de entorno
@@ -46,6 +46,14 @@ async def lifespan(app: FastAPI):
             logger.info("✅ Alert Sender iniciado automáticamente")
         except Exception as e:
             logger.error(f"❌ Error iniciando Alert Sender: {e}")
+        
+        # Iniciar libro de posiciones (TP/SL al tick con el mark price de Futures)
+        try:
+            from app.services.position_book import position_book
+            await position_book.start()
+            logger.info("✅ Position book iniciado automáticamente")
+        except Exception as e:
+            logger.error(f"❌ Error iniciando Position book: {e}")
             
     except Exception as e:
         logger.error(f"❌ Error en startup automático: {e}")
@@ -65,6 +73,18 @@ async def lifespan(app: FastAPI):
             logger.info("✅ Alert Sender detenido correctamente")
         except Exception as e:
             logger.error(f"❌ Error deteniendo Alert Sender: {e}")
+        
+        # Detener stream de velas y de mark price y cerrar cliente HTTP compartido de datos de mercado
+        from app.services.kline_event_source import kline_event_source
+        from app.services.position_book import position_book
+        await position_book.stop()
+        from app.services.market_data_service import market_data_service
+        await kline_event_source.stop()
+        await market_data_service.close()
+        
+        # Cancelar backtests en cola y cerrar su pool de procesos
+        from app.services.backtest_job_service import backtest_job_service
+        await backtest_job_service.shutdown()
             
     except Exception as e:
         logger.error(f"❌ Error en shutdown: {e}")
@@ -137,3 +157,4 @@ app.include_router(mainnet_history_routes.router, tags=["mainnet-history"])  # M
 app.include_router(health_routes.router, tags=["health"])        # Health Monitor endpoints
 app.include_router(debug_routes.router, tags=["debug"])                   # Debug endpoints
 app.include_router(migrate_routes.router, tags=["migrate"])                   # Migration endpoints
+app.include_router(test_tools_simple.router)    # Ya tiene prefix="/test-tools" (backtests)
@@ -15,6 +15,7 @@ from app.db import crud_trading
 from app.db.models import TradingApiKey, TradingOrder
 from app.schemas.trading_schema import TradingOrderCreate
 from app.services import trading_events
+from app.services.market_data_service import market_data_service
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -972,25 +973,12 @@ class AutoTradingExecutor:
             raise
     
     async def _get_current_price(self, symbol: str) -> float:
-        """Obtiene el precio actual del símbolo"""
-        try:
-            # Intentar Futures API primero
-            response = requests.get(f"https://fapi.binance.com/fapi/v1/ticker/price", params={"symbol": symbol}, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                return float(data['price'])
-        except:
-            pass
-        
-        # Fallback a Spot API
-        try:
-            response = requests.get(f"https://api.binance.com/api/v3/ticker/price", params={"symbol": symbol}, timeout=5)
-            response.raise_for_status()
-            data = response.json()
-            return float(data['price'])
-        except Exception as e:
-            logger.error(f"Error obteniendo precio de {symbol}: {e}")
+        """Obtiene el precio actual del símbolo (Futures con fallback a Spot vía servicio compartido)"""
+        price = await market_data_service.get_price(symbol, market='futures')
+        if not price:
+            logger.error(f"Error obteniendo precio de {symbol}")
             raise Exception(f"No se pudo obtener precio de {symbol}")
+        return price
     
     def _get_step_size_for_symbol(self, symbol: str) -> float:
         """Retorna el step size (LOT_SIZE) según el símbolo"""
@@ -0,0 +1,218 @@
+# backend/app/services/backtest_job_service.py
+
+"""
+Trabajos de backtest en un pool de procesos acotado, fuera del event loop.
+
+El `run_backtest_async` original guardaba un único `backtest_status` global y
+corría el bucle de ventanas en el event loop con `await asyncio.sleep(0.1)`:
+un solo backtest a la vez y scanners / sell monitor / API bloqueados
+mientras tanto. Aquí:
+  - cada trabajo tiene un id y pertenece a un usuario (límite de trabajos
+    activos por usuario, MAX_ACTIVE_PER_USER)
+  - se ejecuta en un ProcessPoolExecutor (contexto spawn, BACKTEST_JOB_WORKERS
+    procesos); los que no caben esperan en cola
+  - el proceso reporta avance y deja el resultado en archivos del directorio
+    de trabajos (trading_core.backtest_job); la API solo los lee
+  - los metadatos y resultados quedan en disco (BACKTEST_JOBS_DIR, por
+    defecto data/backtest_jobs) y se recargan al reiniciar
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from trading_core.backtest_engine import STRATEGY_PRESETS, StrategyParams
+from trading_core.backtest_job import JobCancelled, JobSpec, job_path, read_json, run_job, write_json
+from trading_core.ohlcv_store import to_ms
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'data', 'backtest_jobs'))
+MAX_ACTIVE_PER_USER = 3
+ACTIVE_STATES = ('queued', 'running')
+
+
+class BacktestJobService:
+    """Cola de backtests por usuario sobre un pool de procesos"""
+
+    def __init__(self):
+        self.jobs_dir = os.environ.get('BACKTEST_JOBS_DIR') or DEFAULT_JOBS_DIR
+        self.max_workers = int(os.environ.get('BACKTEST_JOB_WORKERS', 2))
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._load_persisted()
+
+    # ------------------------------------------------------------------
+    # Estado
+
+    def _load_persisted(self):
+        """Metadatos de trabajos anteriores; los que quedaron a medias pasan a 'interrupted'"""
+        if not os.path.isdir(self.jobs_dir):
+            return
+        for filename in os.listdir(self.jobs_dir):
+            if not filename.endswith('.json') or filename.count('.') != 1:
+                continue
+            meta = read_json(os.path.join(self.jobs_dir, filename))
+            if not meta or 'job_id' not in meta:
+                continue
+            if meta.get('status') in ACTIVE_STATES:
+                meta['status'] = 'interrupted'
+                meta['error'] = 'El servidor se reinició durante el backtest'
+            self.jobs[meta['job_id']] = meta
+
+    def _save(self, job: Dict[str, Any]):
+        write_json(job_path(self.jobs_dir, job['job_id'], 'meta'), job)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: el proceso hijo no hereda el event loop ni los hilos de la API
+            self._pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def active_jobs(self, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        return [job for job in self.jobs.values()
+                if job['status'] in ACTIVE_STATES and (user_id is None or job['user_id'] == user_id)]
+
+    # ------------------------------------------------------------------
+    # API
+
+    def submit(self, user_id: int, symbol: str, years_back: int = 1, interval: str = '4h',
+               preset: str = 'bitcoin_2023', overrides: Optional[Dict[str, Any]] = None,
+               initial_capital: float = 1000.0) -> Dict[str, Any]:
+        """Encola un backtest; ValueError si los parámetros no son válidos o se supera el límite"""
+        if len(self.active_jobs(user_id)) >= MAX_ACTIVE_PER_USER:
+            raise ValueError(f"Máximo {MAX_ACTIVE_PER_USER} backtests activos por usuario")
+        if preset not in STRATEGY_PRESETS:
+            raise ValueError(f"Preset desconocido: {preset}")
+        overrides = overrides or {}
+        unknown = set(overrides) - set(StrategyParams._fields)
+        if unknown:
+            raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(unknown))}")
+
+        end = datetime.now()
+        start = end - timedelta(days=years_back * 365)
+        spec = JobSpec(symbol.upper(), interval, to_ms(start), to_ms(end),
+                       STRATEGY_PRESETS[preset].params._replace(**overrides), initial_capital, years_back)
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            'job_id': job_id,
+            'user_id': user_id,
+            'symbol': spec.symbol,
+            'interval': interval,
+            'years_back': years_back,
+            'preset': preset,
+            'overrides': overrides,
+            'status': 'queued',
+            'created_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            'error': None,
+            'summary': None,
+        }
+        self.jobs[job_id] = job
+        self._save(job)
+
+        future = self._get_pool().submit(run_job, job_id, self.jobs_dir, spec, os.environ.get('OHLCV_STORE_DIR'))
+        self._futures[job_id] = future
+        asyncio.get_running_loop().create_task(self._watch(job_id, asyncio.wrap_future(future)))
+        logger.info(f"🧪 Backtest {job_id} encolado: {spec.symbol} {interval} {years_back} año(s) (usuario {user_id})")
+        return self.get(job_id)
+
+    async def _watch(self, job_id: str, future: asyncio.Future):
+        job = self.jobs[job_id]
+        try:
+            job['summary'] = await future
+            job['status'] = 'completed'
+        except (asyncio.CancelledError, JobCancelled):
+            job['status'] = 'cancelled'
+        except Exception as e:
+            job['status'] = 'failed'
+            job['error'] = str(e)
+            logger.error(f"❌ Backtest {job_id} falló: {e}")
+        finally:
+            job['finished_at'] = datetime.now().isoformat()
+            self._futures.pop(job_id, None)
+            self._save(job)
+            try:
+                os.remove(job_path(self.jobs_dir, job_id, 'cancel'))
+            except OSError:
+                pass
+        logger.info(f"🧪 Backtest {job_id}: {job['status']}")
+
+    def get(self, job_id: str, user_id: Optional[int] = None, with_result: bool = False) -> Optional[Dict[str, Any]]:
+        """Metadatos + avance (y resultado si se pide); None si no existe o es de otro usuario"""
+        job = self.jobs.get(job_id)
+        if job is None or (user_id is not None and job['user_id'] != user_id):
+            return None
+        view = dict(job)
+        progress = read_json(job_path(self.jobs_dir, job_id, 'progress')) or {}
+        if job['status'] == 'queued' and progress:
+            job['status'] = view['status'] = 'running'
+            job['started_at'] = view['started_at'] = progress.get('started_at')
+        view['progress'] = 100 if job['status'] == 'completed' else progress.get('progress', 0)
+        view['phase'] = progress.get('phase', job['status'])
+        view['message'] = progress.get('message', '')
+        if with_result and job['status'] == 'completed':
+            view['result'] = read_json(job_path(self.jobs_dir, job_id, 'result'))
+        return view
+
+    def list_jobs(self, user_id: int) -> List[Dict[str, Any]]:
+        jobs = [self.get(job_id) for job_id, job in self.jobs.items() if job['user_id'] == user_id]
+        return sorted(jobs, key=lambda job: job['created_at'], reverse=True)
+
+    def cancel(self, job_id: str, user_id: int) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None or job['user_id'] != user_id or job['status'] not in ACTIVE_STATES:
+            return False
+        future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            return True  # aún en cola
+        # En ejecución: el proceso ve el archivo en la próxima comprobación de avance
+        write_json(job_path(self.jobs_dir, job_id, 'cancel'), {'at': datetime.now().isoformat()})
+        return True
+
+    def delete_finished(self, user_id: int) -> int:
+        """Borra metadatos y resultados de los trabajos terminados del usuario"""
+        removed = 0
+        for job_id, job in list(self.jobs.items()):
+            if job['user_id'] != user_id or job['status'] in ACTIVE_STATES:
+                continue
+            for kind in ('meta', 'progress', 'result', 'cancel'):
+                try:
+                    os.remove(job_path(self.jobs_dir, job_id, kind))
+                except OSError:
+                    pass
+            del self.jobs[job_id]
+            removed += 1
+        return removed
+
+    async def stream(self, job_id: str, user_id: int, interval: float = 0.5) -> AsyncIterator[Dict[str, Any]]:
+        """Estados sucesivos del trabajo (solo cuando cambian) hasta que termina"""
+        last = None
+        while True:
+            view = self.get(job_id, user_id)
+            if view is None:
+                return
+            snapshot = (view['status'], view['progress'], view['message'])
+            if snapshot != last:
+                last = snapshot
+                yield view
+            if view['status'] not in ACTIVE_STATES:
+                return
+            await asyncio.sleep(interval)
+
+    async def shutdown(self):
+        """Cancela la cola y cierra el pool (los trabajos en curso quedan 'interrupted' al reiniciar)"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Instancia global del servicio
+backtest_job_service = BacktestJobService()
@@ -6,13 +6,15 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 import pandas as pd
-import numpy as np
 import requests
 import time
 from sqlalchemy.orm import Session
 
 from app.db.database import get_db
 from app.db.models import TradingApiKey, TradingOrder
+from app.services.market_data_service import market_data_service
+from trading_core.u_pattern_stream import UPatternStream
+from app.services.kline_event_source import kline_event_source
 from app.services.auto_trading_mainnet30m_executor import AutoTradingMainnet30mExecutor
 
 logger = logging.getLogger(__name__)
@@ -69,6 +71,10 @@ class Bitcoin30mMainnetScanner:
         }
         
         self.executor = AutoTradingMainnet30mExecutor()
+        
+        # Velas de análisis y detector incremental del patrón U
+        self.data_limit = 300
+        self._u_stream: Optional[UPatternStream] = None
     
     async def _check_current_state(self) -> str:
         """
@@ -195,11 +201,9 @@ class Bitcoin30mMainnetScanner:
             try:
                 while self.is_running and not self._stop_event.is_set():
                     await self._scan_cycle()
-                    # Espera cancelable
-                    try:
-                        await asyncio.wait_for(self._stop_event.wait(), timeout=self.config['scan_interval'])
-                    except asyncio.TimeoutError:
-                        pass
+                    # Espera cancelable hasta el cierre de la próxima vela de 30m (WebSocket)
+                    timeout = self.config['scan_interval'] if self.current_state == "MONITORING_SELL" else None
+                    await kline_event_source.wait_for_close('BTCUSDT', '30m', timeout=timeout, stop_event=self._stop_event)
             except Exception as e:
                 logger.error(f"Error en scanner Bitcoin 30m Mainnet: {e}")
                 self.add_log(f"❌ Error en scanner: {e}")
@@ -327,61 +331,47 @@ class Bitcoin30mMainnetScanner:
             self.add_log(f"❌ Error monitoreando ventas: {e}")
     
     async def _get_historical_data_30min(self) -> Optional[pd.DataFrame]:
-        """Obtiene datos históricos de 30 minutos para análisis"""
+        """Obtiene datos históricos de 30 minutos para análisis (vía servicio compartido de mercado)"""
         try:
-            # Obtener más historia para análisis en vivo (p. ej., ~6 días = 300 velas)
-            # Binance permite hasta 1000; usamos 300 para un buen equilibrio
-            limit = 300
-            
-            url = "https://api.binance.com/api/v3/klines"
-            params = {
-                'symbol': 'BTCUSDT',
-                'interval': '30m',
-                'limit': limit
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            klines = response.json()
-            if not klines:
+            # Una sola descarga por serie y vela aunque la pidan varios consumidores
+            df = await market_data_service.get_klines('BTCUSDT', '30m', self.data_limit)
+            if df is None or df.empty:
                 return None
             
-            # Convertir a DataFrame
-            df = pd.DataFrame(klines, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_volume', 'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'
-            ])
-            
-            # Convertir tipos
-            for col in ['open', 'high', 'low', 'close', 'volume']:
-                df[col] = pd.to_numeric(df[col])
-            
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
-            
             return df
             
         except Exception as e:
             logger.error(f"Error obteniendo datos históricos Mainnet: {e}")
             return None
     
+    def _get_u_stream(self) -> UPatternStream:
+        """Detector incremental de BTC 30m con los detection_params actuales"""
+        params = self.detection_params
+        base_factor, max_factor = params['base_rupture_factor'], params['max_rupture_factor']
+        rupture = (base_factor, 0.01, 0.02, 0.2, 0.3, max_factor)
+        stream = self._u_stream
+        if (stream is None or stream.params['window_low'] != params['window_low']
+                or stream.params['min_depth_pct'] != params['min_depth_pct']
+                or stream.params['rupture'] != rupture):
+            # Ventana = todas las velas del buffer (como el batch sobre el df completo)
+            stream = UPatternStream('30min', window_size=self.data_limit, min_candles=0,
+                                    window_low=params['window_low'], min_depth_pct=params['min_depth_pct'],
+                                    rupture=rupture, extra_fields={'environment': 'mainnet'})
+            self._u_stream = stream
+        return stream
+    
     def _detect_u_patterns_30min(self, df: pd.DataFrame) -> List[Dict]:
         """
         Detecta patrones U usando la lógica optimizada del backtest
+        (detector incremental: solo procesa las velas nuevas del buffer)
         """
-        signals = []
+        stream = self._get_u_stream()
+        signals = stream.sync(df)
         
-        # Detectar mínimos significativos
-        significant_lows = self._detect_lows_30min(
-            df, 
-            window=self.detection_params['window_low'], 
-            min_depth_pct=self.detection_params['min_depth_pct']
-        )
         # Log de diagnóstico: conteo de mínimos detectados
         try:
             self.add_log(
-                f"🔎 Diagnóstico: mínimos significativos detectados: {len(significant_lows)}",
+                f"🔎 Diagnóstico: mínimos significativos detectados: {stream.lows_in_window}",
                 "INFO",
                 {
                     "window_low": self.detection_params['window_low'],
@@ -392,181 +382,48 @@ class Bitcoin30mMainnetScanner:
         except Exception:
             pass
         
-        if not significant_lows:
-            return signals
+        # Log de diagnóstico por mínimo evaluado
+        for evaluation in stream.last_evaluations:
+            try:
+                self.add_log(
+                    f"🧪 Evaluación de mínimo idx={evaluation['min_idx']}",
+                    "INFO",
+                    {
+                        "min_timestamp": str(evaluation['min_timestamp']),
+                        "pre_slope": float(evaluation['pre_slope']),
+                        "recent_slope": float(evaluation['recent_slope']),
+                        "low_depth": float(evaluation['low_depth']),
+                        "atr": float(evaluation['atr']),
+                        "dynamic_factor": float(evaluation['dynamic_factor']),
+                        "nivel_ruptura": float(evaluation['nivel_ruptura']),
+                        "current_price": float(evaluation['current_price']),
+                        "pattern_width": int(evaluation['pattern_width']),
+                        "conditions_passed": evaluation['conditions_passed'],
+                        "failed_conditions": evaluation['failed_conditions']
+                    },
+                    current_price=float(evaluation['current_price'])
+                )
+            except Exception:
+                pass
         
-        # Analizar los últimos 2 mínimos (más frecuente)
-        for low in significant_lows[-2:]:
-            min_idx = low['index']
-            
-            # ATR y factor dinámico
-            atr = self._calculate_atr_simple(df)
-            current_price = df.iloc[-1]['close']
-            
-            # Factor más conservador para 30min
-            dynamic_factor = self._calculate_rupture_factor_30min(atr, current_price)
-            nivel_ruptura = low['high'] * dynamic_factor
-            
-            # Condiciones optimizadas para 30min
-            if len(df) - min_idx > 2 and len(df) - min_idx < 24:  # Entre 1h y 12h
-                recent_slope = self._calculate_slope(df.iloc[-3:]['close'].values)
-                pre_slope = self._calculate_slope(df.iloc[max(0, min_idx-3):min_idx]['close'].values)
-                
-                # Condiciones ajustadas para timeframe corto
-                conditions = [
-                    pre_slope < -0.08,  # Pendiente bajista
-                    current_price > nivel_ruptura * 0.98,  # Cerca del nivel de ruptura
-                    recent_slope > -0.02,  # Momentum positivo
-                    low['depth'] >= 0.015,  # Al menos 1.5% de profundidad
-                    self._check_momentum_filter_30min(df, min_idx)
-                ]
-                condition_names = [
-                    "pre_slope < -0.08",
-                    "current_price > nivel_ruptura * 0.98",
-                    "recent_slope > -0.02",
-                    "depth >= 0.015",
-                    "momentum_filter"
-                ]
-                
-                # Log de diagnóstico por mínimo evaluado
-                try:
-                    failed = [name for ok, name in zip(conditions, condition_names) if not ok]
-                    self.add_log(
-                        f"🧪 Evaluación de mínimo idx={min_idx}",
-                        "INFO",
-                        {
-                            "min_timestamp": str(df.index[min_idx]),
-                            "pre_slope": float(pre_slope),
-                            "recent_slope": float(recent_slope),
-                            "low_depth": float(low['depth']),
-                            "atr": float(atr),
-                            "dynamic_factor": float(dynamic_factor),
-                            "nivel_ruptura": float(nivel_ruptura),
-                            "current_price": float(current_price),
-                            "pattern_width": int(len(df) - min_idx),
-                            "conditions_passed": all(conditions),
-                            "failed_conditions": failed
-                        },
-                        current_price=float(current_price)
-                    )
-                except Exception:
-                    pass
-
-                if all(conditions):
-                    signal = {
-                        'timestamp': df.index[-1],
-                        'entry_price': nivel_ruptura,
-                        'signal_strength': abs(pre_slope),
-                        'min_price': low['low'],
-                        'pattern_width': len(df) - min_idx,
-                        'atr': atr,
-                        'dynamic_factor': dynamic_factor,
-                        'depth': low['depth'],
-                        'current_price': current_price,
-                        'environment': 'mainnet'
-                    }
-                    # Log de aceptación de señal
-                    try:
-                        self.add_log(
-                            f"✅ Señal U aceptada - entry: ${signal['entry_price']:.2f} (precio ${current_price:.2f})",
-                            "ALERT",
-                            {
-                                "signal_strength": float(signal['signal_strength']),
-                                "depth_pct": float(signal['depth'] * 100),
-                                "pattern_width": int(signal['pattern_width'])
-                            },
-                            current_price=float(current_price)
-                        )
-                    except Exception:
-                        pass
-                    signals.append(signal)
-                    break  # Solo una señal por ventana
+        for signal in signals:
+            # Log de aceptación de señal
+            try:
+                self.add_log(
+                    f"✅ Señal U aceptada - entry: ${signal['entry_price']:.2f} (precio ${signal['current_price']:.2f})",
+                    "ALERT",
+                    {
+                        "signal_strength": float(signal['signal_strength']),
+                        "depth_pct": float(signal['depth'] * 100),
+                        "pattern_width": int(signal['pattern_width'])
+                    },
+                    current_price=float(signal['current_price'])
+                )
+            except Exception:
+                pass
         
         return signals
     
-    def _detect_lows_30min(self, df: pd.DataFrame, window: int = 3, min_depth_pct: float = 0.015) -> List[Dict]:
-        """Detecta mínimos optimizados para intervalos de 30min"""
-        lows = []
-        
-        for i in range(window, len(df) - window):
-            current_low = df.iloc[i]['low']
-            
-            window_slice = df.iloc[i-window:i+window+1]
-            if current_low == window_slice['low'].min():
-                local_high = window_slice['high'].max()
-                depth = (local_high - current_low) / local_high
-                
-                if depth >= min_depth_pct and i < len(df) - 2:
-                    # Verificar volumen para confirmar el mínimo
-                    volume_avg = df.iloc[i-window:i+window+1]['volume'].mean()
-                    current_volume = df.iloc[i]['volume']
-                    
-                    if current_volume > volume_avg * 0.7 or depth >= 0.025:
-                        lows.append({
-                            'index': i,
-                            'timestamp': df.index[i],
-                            'low': current_low,
-                            'high': df.iloc[i]['high'],
-                            'close': df.iloc[i]['close'],
-                            'volume': df.iloc[i]['volume'],
-                            'depth': depth
-                        })
-        
-        return lows
-    
-    def _calculate_rupture_factor_30min(self, atr: float, price: float) -> float:
-        """Factor de ruptura optimizado para 30min (más conservador)"""
-        atr_pct = atr / price
-        
-        # Más conservador para timeframe corto
-        if atr_pct < 0.01:
-            factor = self.detection_params['base_rupture_factor']
-        elif atr_pct < 0.02:
-            factor = self.detection_params['base_rupture_factor'] + (atr_pct * 0.2)
-        else:
-            factor = min(
-                self.detection_params['base_rupture_factor'] + (atr_pct * 0.3), 
-                self.detection_params['max_rupture_factor']
-            )
-        
-        return max(factor, self.detection_params['base_rupture_factor'])
-    
-    def _check_momentum_filter_30min(self, df: pd.DataFrame, min_idx: int) -> bool:
-        """Filtro de momentum para timeframe de 30min"""
-        if min_idx < 10:
-            return True  # No hay suficientes datos para evaluar
-        
-        # Verificar tendencia de los últimos 10 períodos (5 horas)
-        recent_10 = df.iloc[-10:]['close'].values
-        trend_slope = self._calculate_slope(recent_10)
-        
-        # Permitir trades si la tendencia no es muy bajista
-        return trend_slope > -0.05
-    
-    def _calculate_atr_simple(self, df: pd.DataFrame, period: int = 7) -> float:
-        """Calcula ATR simplificado para 30min"""
-        tr_values = []
-        for i in range(1, len(df)):
-            high = df.iloc[i]['high']
-            low = df.iloc[i]['low']
-            prev_close = df.iloc[i-1]['close']
-            
-            tr = max(
-                high - low,
-                abs(high - prev_close),
-                abs(low - prev_close)
-            )
-            tr_values.append(tr)
-        
-        return np.mean(tr_values[-period:]) if tr_values else df.iloc[-1]['high'] - df.iloc[-1]['low']
-    
-    def _calculate_slope(self, values: np.ndarray) -> float:
-        """Calcula pendiente"""
-        if len(values) < 2:
-            return 0
-        x = np.arange(len(values))
-        return np.polyfit(x, values, 1)[0]
-    
     async def _process_signal(self, signal: Dict):
         """Procesa una señal de compra detectada"""
         try:
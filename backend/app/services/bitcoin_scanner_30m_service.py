@@ -2,7 +2,6 @@
 
 import asyncio
 import logging
-import requests
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -18,6 +17,10 @@ from app.db.database import SessionLocal
 from app.db import crud_users, crud_alertas
 from app.schemas.alerta_schema import AlertaCreate
 from app.telegram.telegram_bot import telegram_bot
+from app.services.market_data_service import market_data_service
+from trading_core.u_pattern_kernel import detect_lows_df
+from trading_core.indicators import WindowIndicators
+from app.services.kline_event_source import kline_event_source
 from app.services.auto_trading_executor import auto_trading_executor
 
 # Configurar logging
@@ -128,8 +131,8 @@ class BitcoinScanner30mService:
                 # Realizar escaneo
                 await self._perform_scan()
                 
-                # Esperar hasta el próximo escaneo
-                await asyncio.sleep(self.config['scan_interval'])
+                # Esperar al cierre de la próxima vela de 30m (WebSocket)
+                await kline_event_source.wait_for_close(self.config['symbol'], self.config['timeframe'])
                 
             except asyncio.CancelledError:
                 logger.info("🛑 Scanner 30m cancelado")
@@ -200,36 +203,13 @@ class BitcoinScanner30mService:
             logger.error(f"❌ Error en escaneo 30m: {e}")
     
     async def _get_binance_data(self) -> Optional[pd.DataFrame]:
-        """Obtiene datos históricos de Binance para 30m"""
+        """Obtiene datos históricos de Binance para 30m (vía servicio compartido de mercado)"""
         try:
-            # Obtener últimas 1000 velas de 30m
-            url = "https://api.binance.com/api/v3/klines"
-            params = {
-                'symbol': self.config['symbol'],
-                'interval': self.config['timeframe'], 
-                'limit': self.config['data_limit']  # 1000 velas
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            klines = response.json()
-            if not klines:
+            # Una sola descarga por serie y vela aunque la pidan varios consumidores
+            df = await market_data_service.get_klines(self.config['symbol'], self.config['timeframe'], self.config['data_limit'])
+            if df is None or df.empty:
                 return None
             
-            # Convertir a DataFrame
-            df = pd.DataFrame(klines, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_volume', 'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'
-            ])
-            
-            # Convertir tipos
-            for col in ['open', 'high', 'low', 'close', 'volume']:
-                df[col] = pd.to_numeric(df[col])
-            
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
-            
             logger.info(f"📊 Datos 30m obtenidos: {len(df)} velas, último precio: ${df['close'].iloc[-1]:,.2f}")
             return df
             
@@ -250,7 +230,7 @@ class BitcoinScanner30mService:
             return signals
             
         # Usar los últimos datos para análisis
-        analysis_df = df.iloc[-window_size:].copy()
+        analysis_df = df.iloc[-window_size:]  # vista sin copia del buffer de velas
         
         # Detectar mínimos significativos con parámetros del backtest 30m
         significant_lows = self._detect_lows_30m(analysis_df, window=3, min_depth_pct=self.config['min_pattern_depth'])
@@ -258,12 +238,15 @@ class BitcoinScanner30mService:
         if not significant_lows:
             return signals
             
+        # Indicadores de la ventana (ATR y pendientes se calculan una vez por escaneo)
+        indicators = WindowIndicators(analysis_df)
+        
         # Analizar múltiples mínimos (igual que backtest 30m)
         for low in significant_lows[-2:]:  # Últimos 2 mínimos (más frecuente)
             min_idx = low['index']
             
             # ATR y factor dinámico (igual que backtest 30m)
-            atr = self._calculate_atr_simple(analysis_df)
+            atr = indicators.atr(7)
             current_price = analysis_df.iloc[-1]['close']
             
             # Factor para 30m
@@ -272,8 +255,8 @@ class BitcoinScanner30mService:
             
             # Condiciones EXACTAS del backtest 30m
             if len(analysis_df) - min_idx > 2 and len(analysis_df) - min_idx < 24:  # Entre 1h y 12h
-                recent_slope = self._calculate_slope(analysis_df.iloc[-3:]['close'].values)
-                pre_slope = self._calculate_slope(analysis_df.iloc[max(0, min_idx-3):min_idx]['close'].values)
+                recent_slope = indicators.slope_last(3)
+                pre_slope = indicators.slope_before(min_idx, 3)
                 
                 # Condiciones EXACTAS del backtest 30m
                 conditions = [
@@ -281,7 +264,7 @@ class BitcoinScanner30mService:
                     current_price > nivel_ruptura * 0.98,  # Cerca del nivel de ruptura
                     recent_slope > -0.02,  # Momentum positivo
                     low['depth'] >= self.config['min_pattern_depth'],  # Al menos 1.5% de profundidad
-                    self._check_momentum_filter_30m(analysis_df, min_idx)
+                    self._check_momentum_filter_30m(indicators, min_idx)
                 ]
                 
                 if all(conditions):
@@ -311,33 +294,8 @@ class BitcoinScanner30mService:
     
     def _detect_lows_30m(self, df: pd.DataFrame, window=3, min_depth_pct=0.015) -> List[Dict]:
         """Detecta mínimos optimizados para intervalos de 30min"""
-        lows = []
-        
-        for i in range(window, len(df) - window):
-            current_low = df.iloc[i]['low']
-            
-            window_slice = df.iloc[i-window:i+window+1]
-            if current_low == window_slice['low'].min():
-                local_high = window_slice['high'].max()
-                depth = (local_high - current_low) / local_high
-                
-                if depth >= min_depth_pct and i < len(df) - 2:
-                    # Verificar volumen para confirmar el mínimo
-                    volume_avg = df.iloc[i-window:i+window+1]['volume'].mean()
-                    current_volume = df.iloc[i]['volume']
-                    
-                    if current_volume > volume_avg * 0.7 or depth >= 0.025:
-                        lows.append({
-                            'index': i,
-                            'timestamp': df.index[i],
-                            'low': current_low,
-                            'high': df.iloc[i]['high'],
-                            'close': df.iloc[i]['close'],
-                            'volume': df.iloc[i]['volume'],
-                            'depth': depth
-                        })
-        
-        return lows
+        # Kernel NumPy compartido (ventanas centradas vectorizadas)
+        return detect_lows_df(df, window, min_depth_pct, variant='30min')
     
     def _calculate_rupture_factor_30m(self, atr: float, price: float, base_factor=1.008) -> float:
         """Factor de ruptura optimizado para 30min (más conservador)"""
@@ -353,41 +311,10 @@ class BitcoinScanner30mService:
         
         return max(factor, 1.008)  # Mínimo 0.8%
     
-    def _check_momentum_filter_30m(self, df, min_idx):
+    def _check_momentum_filter_30m(self, indicators, min_idx):
         """Filtro de momentum para timeframe de 30min"""
-        if min_idx < 10:
-            return True  # No hay suficientes datos para evaluar
-        
-        # Verificar tendencia de los últimos 10 períodos (5 horas)
-        recent_10 = df.iloc[-10:]['close'].values
-        trend_slope = self._calculate_slope(recent_10)
-        
-        # Permitir trades si la tendencia no es muy bajista
-        return trend_slope > -0.05
-    
-    def _calculate_atr_simple(self, df: pd.DataFrame, period=7) -> float:
-        """Calcula ATR simplificado para 30min"""
-        tr_values = []
-        for i in range(1, len(df)):
-            high = df.iloc[i]['high']
-            low = df.iloc[i]['low']
-            prev_close = df.iloc[i-1]['close']
-            
-            tr = max(
-                high - low,
-                abs(high - prev_close),
-                abs(low - prev_close)
-            )
-            tr_values.append(tr)
-        
-        return np.mean(tr_values[-period:]) if tr_values else df.iloc[-1]['high'] - df.iloc[-1]['low']
-    
-    def _calculate_slope(self, values) -> float:
-        """Calcula pendiente de una serie de valores"""
-        if len(values) < 2:
-            return 0
-        x = np.arange(len(values))
-        return np.polyfit(x, values, 1)[0]
+        # Tendencia de los últimos 10 períodos (5 horas); sin datos suficientes se acepta
+        return indicators.momentum_ok(min_idx, length=10, min_slope=-0.05)
     
     async def _process_signal(self, signal: Dict, df: pd.DataFrame):
         """Procesa una señal detectada y envía alertas"""
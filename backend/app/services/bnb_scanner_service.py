@@ -4,7 +4,6 @@ import asyncio
 import logging
 import requests
 import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, Optional, List, Any
 from sqlalchemy.orm import Session
@@ -18,6 +17,9 @@ from app.db.database import SessionLocal
 from app.db import crud_users, crud_alertas
 from app.schemas.alerta_schema import AlertaCreate
 from app.telegram.telegram_bot import telegram_bot
+from app.services.market_data_service import market_data_service
+from trading_core.u_pattern_stream import UPatternStream
+from app.services.kline_event_source import kline_event_source
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -72,6 +74,9 @@ class BnbScannerService:
         self._stop_event: _asyncio.Event = _asyncio.Event()
         self._task: Optional[_asyncio.Task] = None
         
+        # Detector incremental del patrón U (se reconstruye si cambia la config)
+        self._u_stream: Optional[UPatternStream] = None
+        
     async def _check_current_state(self) -> str:
         """
         Determina el estado actual del bot basado en posiciones abiertas
@@ -289,8 +294,10 @@ class BnbScannerService:
                 # Realizar escaneo
                 await self._scan_cycle()
                 
-                # Esperar hasta el próximo escaneo
-                await asyncio.sleep(self.config['scan_interval'])
+                # Esperar al cierre de la próxima vela (WebSocket). Con posición abierta se
+                # mantiene además la cadencia de scan_interval para vigilar TP/SL
+                timeout = self.config['scan_interval'] if self.current_state == "MONITORING_SELL" else None
+                await kline_event_source.wait_for_close(self.config['symbol'], self.config['timeframe'], timeout=timeout)
                 
             except asyncio.CancelledError:
                 logger.info("🛑 BNB Scanner cancelado")
@@ -425,67 +432,34 @@ class BnbScannerService:
             logger.error(f"❌ Error en escaneo BNB: {e}")
     
     async def _get_binance_data(self) -> Optional[pd.DataFrame]:
-        """Obtiene datos históricos de Binance para BNB con reintentos"""
-        max_retries = 3
-        for retry in range(max_retries):
-            try:
-                # Obtener últimas 1000 velas de 4h (igual que backtest BNB 2022)
-                url = "https://api.binance.com/api/v3/klines"
-                params = {
-                    'symbol': self.config['symbol'],
-                    'interval': self.config['timeframe'], 
-                    'limit': self.config['data_limit']  # 1000 velas
-                }
-                
-                response = requests.get(url, params=params, timeout=30)
-                response.raise_for_status()
-                
-                klines = response.json()
-                if not klines:
-                    raise ValueError("No se recibieron datos de Binance")
-                
-                # Convertir a DataFrame
-                df = pd.DataFrame(klines, columns=[
-                    'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                    'close_time', 'quote_volume', 'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'
-                ])
-                
-                # Convertir tipos con validación
-                for col in ['open', 'high', 'low', 'close', 'volume']:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-                
-                # Validar que no hay NaN
-                if df[['open', 'high', 'low', 'close']].isnull().any().any():
-                    raise ValueError("Datos inválidos recibidos de Binance")
-                
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                df.set_index('timestamp', inplace=True)
-                
-                logger.info(f"📊 BNB Datos obtenidos: {len(df)} velas, último precio: ${df['close'].iloc[-1]:,.2f}")
-                return df
-                
-            except requests.exceptions.Timeout:
-                logger.warning(f"⏱️ BNB Timeout en intento {retry + 1}/{max_retries}")
-                if retry < max_retries - 1:
-                    await asyncio.sleep(2 ** retry)  # Backoff exponencial
-                    continue
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"🌐 BNB Error de red en intento {retry + 1}/{max_retries}: {e}")
-                if retry < max_retries - 1:
-                    await asyncio.sleep(2 ** retry)
-                    continue
-            except Exception as e:
-                logger.error(f"❌ Error crítico obteniendo datos BNB: {e}")
-                if retry < max_retries - 1:
-                    await asyncio.sleep(2 ** retry)
-                    continue
-                    
-        logger.error(f"❌ BNB Falló después de {max_retries} intentos")
-        return None
+        """Obtiene datos históricos de Binance para BNB (vía servicio compartido de mercado)"""
+        try:
+            # Una sola descarga por serie y vela aunque la pidan varios consumidores
+            df = await market_data_service.get_klines(self.config['symbol'], self.config['timeframe'], self.config['data_limit'])
+            if df is None or df.empty:
+                return None
+            
+            logger.info(f"📊 BNB Datos obtenidos: {len(df)} velas, último precio: ${df['close'].iloc[-1]:,.2f}")
+            return df
+            
+        except Exception as e:
+            logger.error(f"❌ Error crítico obteniendo datos BNB: {e}")
+            return None
+    
+    def _get_u_stream(self, window_size: int) -> UPatternStream:
+        """Detector incremental de la serie BNB 4h con los parámetros actuales"""
+        depth = self.config['min_pattern_depth']
+        stream = self._u_stream
+        if stream is None or stream.window_size != window_size or stream.params['min_depth_pct'] != depth:
+            stream = UPatternStream('2023', window_size, n_lows=3, min_depth_pct=depth,
+                                    extra_fields={'symbol': self.config['symbol']})
+            self._u_stream = stream
+        return stream
     
     def _detect_u_patterns_2022(self, df: pd.DataFrame) -> List[Dict]:
         """
-        Detecta patrones U usando la lógica EXACTA del backtest BNB 2022 exitoso
+        Detecta patrones U usando la lógica EXACTA del backtest BNB 2022
+        (detector incremental: solo procesa las velas nuevas del buffer)
         """
         signals = []
         
@@ -501,149 +475,20 @@ class BnbScannerService:
             logger.warning(f"BNB: Ventana muy pequeña: {window_size}")
             return signals
             
-        # Usar los últimos datos para análisis (simulando ventana final del backtest)
-        analysis_df = df.iloc[-window_size:].copy()
-        
-        # Detectar mínimos significativos optimizados para BNB
-        significant_lows = self._detect_lows_2022(analysis_df, window=6, min_depth_pct=self.config['min_pattern_depth'])
+        signals = self._get_u_stream(window_size).sync(df)
         
-        if not significant_lows:
-            return signals
-            
-        # Analizar múltiples mínimos (igual que backtest BNB 2022)
-        for low in significant_lows[-3:]:  # Últimos 3 mínimos
-            min_idx = low['index']
-            
-            # ATR y factor dinámico (igual que backtest BNB 2022)
-            atr = self._calculate_atr_simple(analysis_df)
-            current_price = analysis_df.iloc[-1]['close']
-            
-            # Factor optimizado para BNB conservador
-            dynamic_factor = self._calculate_rupture_factor_bear(atr, current_price)
-            nivel_ruptura = low['high'] * dynamic_factor
-            
-            # Condiciones optimizadas para BNB conservador (EXACTAS del backtest BNB 2022)
-            if len(analysis_df) - min_idx > 4 and len(analysis_df) - min_idx < 45:
-                recent_slope = self._calculate_slope(analysis_df.iloc[-6:]['close'].values)
-                pre_slope = self._calculate_slope(analysis_df.iloc[max(0, min_idx-6):min_idx]['close'].values)
-                
-                # Condiciones más estrictas para BNB conservador - EXACTAS del backtest 2022
-                conditions = [
-                    pre_slope < -0.12,  # Más restrictivo para BNB
-                    current_price > nivel_ruptura * 0.97,  # Más conservador (97% vs 95%)
-                    recent_slope > -0.03,  # Momentum más positivo requerido
-                    low['depth'] >= 0.025,  # Al menos 2.5% de profundidad
-                    # Filtro adicional: evitar trades en tendencias bajistas prolongadas
-                    self._check_momentum_filter(analysis_df, min_idx)
-                ]
-                
-                if all(conditions):
-                    signals.append({
-                        'timestamp': analysis_df.index[-1],
-                        'symbol': self.config['symbol'],
-                        'entry_price': nivel_ruptura,
-                        'signal_strength': abs(pre_slope),
-                        'min_price': low['low'],
-                        'pattern_width': len(analysis_df) - min_idx,
-                        'atr': atr,
-                        'dynamic_factor': dynamic_factor,
-                        'depth': low['depth'],
-                        'rupture_level': nivel_ruptura
-                    })
-                    
-                    logger.info(f"🎯 BNB PATRÓN U DETECTADO - ALGORITMO BACKTEST 2022:")
-                    logger.info(f"   💰 Precio actual: ${current_price:,.2f}")
-                    logger.info(f"   🚀 Nivel ruptura: ${nivel_ruptura:,.2f} (+{((nivel_ruptura/current_price-1)*100):.2f}%)")
-                    logger.info(f"   📊 Fuerza señal: {abs(pre_slope):.3f}")
-                    logger.info(f"   📉 Profundidad: {low['depth']*100:.1f}%")
-                    logger.info(f"   📏 Ancho patrón: {len(analysis_df) - min_idx} períodos")
-                    
-                    break  # Solo una señal por ventana
+        for signal in signals:
+            current_price = df['close'].iloc[-1]
+            nivel_ruptura = signal['rupture_level']
+            logger.info(f"🎯 BNB PATRÓN U DETECTADO - ALGORITMO BACKTEST 2022:")
+            logger.info(f"   💰 Precio actual: ${current_price:,.2f}")
+            logger.info(f"   🚀 Nivel ruptura: ${nivel_ruptura:,.2f} (+{((nivel_ruptura/current_price-1)*100):.2f}%)")
+            logger.info(f"   📊 Fuerza señal: {signal['signal_strength']:.3f}")
+            logger.info(f"   📉 Profundidad: {signal['depth']*100:.1f}%")
+            logger.info(f"   📏 Ancho patrón: {signal['pattern_width']} períodos")
                     
         return signals
     
-    def _detect_lows_2022(self, df: pd.DataFrame, window=6, min_depth_pct=0.025) -> List[Dict]:
-        """Detecta mínimos EXACTOS del backtest BNB 2022"""
-        lows = []
-        
-        for i in range(window, len(df) - window):
-            current_low = df.iloc[i]['low']
-            
-            window_slice = df.iloc[i-window:i+window+1]
-            if current_low == window_slice['low'].min():
-                local_high = window_slice['high'].max()
-                depth = (local_high - current_low) / local_high
-                
-                # Filtro adicional: verificar que no sea un mínimo muy reciente
-                if depth >= min_depth_pct and i < len(df) - 5:
-                    # Verificar volumen para confirmar el mínimo
-                    volume_avg = df.iloc[i-window:i+window+1]['volume'].mean()
-                    current_volume = df.iloc[i]['volume']
-                    
-                    # Solo incluir si hay volumen suficiente o es un mínimo significativo
-                    if current_volume > volume_avg * 0.8 or depth >= 0.04:
-                        lows.append({
-                            'index': i,
-                            'timestamp': df.index[i],
-                            'low': current_low,
-                            'high': df.iloc[i]['high'],
-                            'close': df.iloc[i]['close'],
-                            'volume': df.iloc[i]['volume'],
-                            'depth': depth
-                        })
-        
-        return lows
-    
-    def _check_momentum_filter(self, df, min_idx):
-        """Filtro de momentum EXACTO del backtest BNB 2022"""
-        if min_idx < 20:
-            return True  
-        
-        # Verificar tendencia de los últimos 20 períodos
-        recent_20 = df.iloc[-20:]['close'].values
-        trend_slope = self._calculate_slope(recent_20)
-        
-        # Solo permitir trades si pendiente > -0.1 (igual que backtest 2022)
-        return trend_slope > -0.1
-    
-    def _calculate_rupture_factor_bear(self, atr: float, price: float, base_factor=1.015) -> float:
-        """Factor de ruptura EXACTO del backtest BNB 2022 (conservador)"""
-        atr_pct = atr / price
-        
-        # Parámetros exactos del backtest BNB 2022 conservador
-        if atr_pct < 0.015:
-            factor = base_factor
-        elif atr_pct < 0.03:
-            factor = base_factor + (atr_pct * 0.3)  
-        else:
-            factor = min(base_factor + (atr_pct * 0.5), 1.05)  # Máximo 5% para BNB
-        
-        return max(factor, 1.015)  # Mínimo 1.5%
-    
-    def _calculate_atr_simple(self, df: pd.DataFrame, period=14) -> float:
-        """Calcula ATR simplificado"""
-        tr_values = []
-        for i in range(1, len(df)):
-            high = df.iloc[i]['high']
-            low = df.iloc[i]['low']
-            prev_close = df.iloc[i-1]['close']
-            
-            tr = max(
-                high - low,
-                abs(high - prev_close),
-                abs(low - prev_close)
-            )
-            tr_values.append(tr)
-        
-        return np.mean(tr_values[-period:]) if tr_values else df.iloc[-1]['high'] - df.iloc[-1]['low']
-    
-    def _calculate_slope(self, values) -> float:
-        """Calcula pendiente de una serie de valores"""
-        if len(values) < 2:
-            return 0
-        x = np.arange(len(values))
-        return np.polyfit(x, values, 1)[0]
-    
     async def _process_signal(self, signal: Dict, df: pd.DataFrame):
         """Procesa una señal detectada y envía alertas"""
         try:
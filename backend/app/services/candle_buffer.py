@@ -0,0 +1,130 @@
+# backend/app/services/candle_buffer.py
+
+"""
+Buffer circular de velas por serie (symbol, interval) respaldado por arrays NumPy.
+
+Se siembra una sola vez con la descarga completa y luego se completa con las
+velas nuevas (fetch incremental con startTime). Las ventanas que entrega son
+vistas de solo lectura sobre el almacenamiento, sin copiar datos.
+
+El almacenamiento es lineal con el doble de capacidad: las velas se agregan al
+final y, cuando se llena, la cola útil se mueve a un array nuevo. Así cualquier
+ventana es siempre contigua (vista NumPy) y las vistas entregadas antes de la
+compactación siguen siendo válidas.
+
+La vela en formación se sobrescribe en su sitio. Si ya se entregaron vistas
+que la incluyen, antes de escribir se copia el almacenamiento (copy-on-write):
+una ventana entregada nunca cambia bajo quien la está usando.
+"""
+
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class CandleWindow(NamedTuple):
+    """Vista de solo lectura sobre las últimas N velas de una serie"""
+    open_time: np.ndarray  # int64, ms
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.open_time)
+
+
+class CandleRingBuffer:
+    """Buffer de velas OHLCV de una serie, indexado por open_time"""
+
+    def __init__(self, symbol: str, interval: str, capacity: int):
+        self.symbol = symbol
+        self.interval = interval
+        self.capacity = capacity
+        self._times = np.zeros(capacity * 2, dtype=np.int64)
+        # Matriz (filas, 5) en orden C: una ventana de filas es una vista contigua
+        self._values = np.zeros((capacity * 2, len(OHLCV_COLUMNS)), dtype=np.float64)
+        self._start = 0
+        self._end = 0
+        # Hay vistas entregadas sobre el almacenamiento actual
+        self._shared = False
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def last_open_time(self) -> Optional[int]:
+        if self._end == self._start:
+            return None
+        return int(self._times[self._end - 1])
+
+    def clear(self):
+        self._start = 0
+        self._end = 0
+
+    def _compact(self):
+        """Mueve las últimas `capacity` velas al inicio de un almacenamiento nuevo"""
+        keep = min(len(self), self.capacity)
+        times = np.zeros_like(self._times)
+        values = np.zeros_like(self._values)
+        times[:keep] = self._times[self._end - keep:self._end]
+        values[:keep] = self._values[self._end - keep:self._end]
+        self._times, self._values = times, values
+        self._start, self._end = 0, keep
+        self._shared = False
+
+    def extend(self, klines: List[list]) -> int:
+        """
+        Agrega velas crudas de /klines (ordenadas por open_time).
+        La vela con el mismo open_time que la última se sobrescribe (vela en formación);
+        las anteriores ya almacenadas se ignoran. Devuelve cuántas velas nuevas se agregaron.
+        """
+        added = 0
+        for k in klines:
+            open_time = int(k[0])
+            row = (float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]))
+            last = self.last_open_time
+            if last is not None and open_time < last:
+                continue
+            if last is not None and open_time == last:
+                if self._shared:
+                    self._times = self._times.copy()
+                    self._values = self._values.copy()
+                    self._shared = False
+                self._values[self._end - 1] = row
+                continue
+            if self._end == len(self._times):
+                self._compact()
+            self._times[self._end] = open_time
+            self._values[self._end] = row
+            self._end += 1
+            added += 1
+        if len(self) > self.capacity:
+            self._start = self._end - self.capacity
+        return added
+
+    def window(self, n: Optional[int] = None) -> CandleWindow:
+        """Últimas `n` velas como vistas NumPy de solo lectura (sin copia)"""
+        n = len(self) if n is None else min(n, len(self))
+        times = self._times[self._end - n:self._end]
+        values = self._values[self._end - n:self._end]
+        times.flags.writeable = False
+        values.flags.writeable = False
+        self._shared = True
+        return CandleWindow(times, values[:, 0], values[:, 1], values[:, 2], values[:, 3], values[:, 4])
+
+    def to_dataframe(self, n: Optional[int] = None) -> pd.DataFrame:
+        """
+        Últimas `n` velas como DataFrame indexado por timestamp (formato de los scanners).
+        Las columnas OHLCV comparten memoria con el buffer (bloque único, sin copia).
+        """
+        n = len(self) if n is None else min(n, len(self))
+        values = self._values[self._end - n:self._end]
+        values.flags.writeable = False
+        self._shared = True
+        index = pd.DatetimeIndex(pd.to_datetime(self._times[self._end - n:self._end], unit='ms'), name='timestamp')
+        return pd.DataFrame(values, index=index, columns=OHLCV_COLUMNS, copy=False)
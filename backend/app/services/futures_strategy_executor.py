@@ -0,0 +1,1191 @@
+# backend/app/services/futures_strategy_executor.py
+
+"""
+Motor común de los ejecutores de Futures Mainnet (LONG, margen ISOLATED).
+
+Los ejecutores por estrategia (BTC 4h, BTC 30m, ETH 4h, BNB 4h, PAXG 4h)
+eran copias de ~1.400 líneas que solo cambiaban el símbolo, la columna que
+habilita y asigna USDT en TradingApiKey, TP/SL/max hold y el scanner donde
+se publican los logs. Aquí hay una sola implementación parametrizada por un
+descriptor (FuturesStrategy) y los módulos auto_trading_*_executor quedan
+como subclases de una línea que fijan su descriptor.
+
+Toda la infraestructura se comparte entre estrategias:
+  - HTTP firmado (HMAC-SHA256) contra fapi.binance.com: `_signed_request`
+    (`_request` lo ejecuta en un hilo desde los métodos async)
+  - leverage/margin por (API key, símbolo): `_ensure_leverage_and_margin`
+    solo hace los POST si la configuración cambia
+  - credenciales: firmantes HMAC en caché por API key (`_get_signer`,
+    crud_trading.get_api_signer)
+  - precio: market_data_service (futures con fallback a spot)
+  - filtros de símbolo: exchangeInfo de futures (app.utils.binance_futures_info)
+Cualquier optimización de esas piezas (caché, concurrencia, batching) se hace
+una sola vez para las cinco estrategias.
+
+La cantidad vendible sale de la posición LONG del símbolo en la cuenta de
+futures (campo `positions` de /fapi/v2/account), limitada a la cantidad de
+la orden de compra.
+
+Una señal compra en todas las cuentas habilitadas a la vez (fan-out): se
+preparan todas (balance, leverage/margin, orden PENDING) y después las
+órdenes salen en paralelo, así el último fill no espera a la latencia
+acumulada de las cuentas anteriores.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timedelta
+from importlib import import_module
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlencode
+
+import requests
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal
+from app.db.models import TradingApiKey, TradingOrder
+from app.db.crud_trading import (
+    ApiSigner, create_trading_order, get_api_signer, invalidate_api_signer, update_trading_order_status,
+)
+from app.schemas.trading_schema import TradingOrderCreate
+from app.services import trading_events
+from app.services.market_data_service import market_data_service
+from app.utils.binance_futures_info import parse_symbol_filters
+
+logger = logging.getLogger(__name__)
+
+FAPI_BASE = "https://fapi.binance.com"
+RECV_WINDOW = 5000
+HTTP_TIMEOUT = 15
+DEFAULT_LEVERAGE = 3
+MARGIN_TYPE = 'ISOLATED'
+# Rechazos de orden por leverage/margin distinto del esperado (-2027: posición máxima
+# para el leverage actual, -2028: leverage por debajo del permitido)
+CONFIG_MISMATCH_CODES = {-2027, -2028}
+# Órdenes/peticiones en vuelo a la vez en el fan-out de una señal
+MAX_CONCURRENT_ORDERS = 8
+
+# (api_key_id, símbolo) -> (leverage, margin type) configurados en Binance. Compartida por
+# todas las instancias de ejecutores (scanners y rutas crean las suyas)
+_leverage_config: Dict[Tuple[int, str], Tuple[int, str]] = {}
+# (símbolo, api_key_id) -> lock: el ciclo del scanner, el position book y la
+# reconciliación no cierran a la vez posiciones del mismo símbolo y cuenta (BTC 4h y
+# BTC 30m comparten BTCUSDT: el reconcile de uno vería la venta en curso del otro)
+_position_locks: Dict[Tuple[str, int], asyncio.Lock] = {}
+
+
+class FuturesStrategy(NamedTuple):
+    """Descriptor de una estrategia de Futures Mainnet"""
+    name: str                  # clave en FUTURES_STRATEGIES (misma que portfolio_backtest)
+    label: str                 # texto para logs y notificaciones ("ETH 4h")
+    log_tag: str               # prefijo de logs ("Eth4h" -> [Eth4h] / [Eth4hExecutor])
+    crypto_symbol: str         # "ETH_4h"
+    symbol: str
+    base_asset: str
+    timeframe: str
+    enabled_field: str         # columna de TradingApiKey que habilita la estrategia
+    allocated_field: str       # columna con la exposición USDT por trade
+    take_profit: float         # fracción (0.08 = 8%)
+    stop_loss: float
+    max_hold: timedelta
+    scanner_module: str        # scanner donde se publican los logs de posición
+    scanner_attr: str
+    scanner_log_method: str
+    # Valores por defecto si exchangeInfo no está disponible
+    step_size: float
+    min_qty: float
+    min_notional: float = 5.0
+    cooldown: timedelta = timedelta(minutes=5)
+    order_reason: str = 'U_PATTERN'
+    # Si se define, solo las compras con este reason son posiciones de la estrategia
+    # (BTC 4h y BTC 30m comparten BTCUSDT en la misma cuenta)
+    position_reason: Optional[str] = None
+    # Reasons de compras anteriores que siguen siendo posiciones de la estrategia
+    legacy_reasons: Tuple[str, ...] = ()
+    leverage: Optional[int] = None  # None: default_leverage de la API key
+
+
+FUTURES_STRATEGIES: Dict[str, FuturesStrategy] = {
+    'btc_4h': FuturesStrategy(
+        'btc_4h', 'Bitcoin 4h', 'Bitcoin4h', 'BTC_4h', 'BTCUSDT', 'BTC', '4h',
+        'btc_4h_mainnet_enabled', 'btc_4h_mainnet_allocated_usdt',
+        take_profit=0.08, stop_loss=0.03, max_hold=timedelta(days=13),
+        scanner_module='app.services.bitcoin_scanner_service', scanner_attr='bitcoin_scanner',
+        scanner_log_method='_add_log', step_size=0.001, min_qty=0.001,
+        order_reason='U_PATTERN_4H', position_reason='U_PATTERN_4H', leverage=3),
+    'btc_30m': FuturesStrategy(
+        'btc_30m', 'Bitcoin 30m', 'Mainnet30m', 'BTC_30m', 'BTCUSDT', 'BTC', '30m',
+        'btc_30m_mainnet_enabled', 'btc_30m_mainnet_allocated_usdt',
+        take_profit=0.04, stop_loss=0.015, max_hold=timedelta(hours=25),
+        scanner_module='app.services.bitcoin30m_mainnet', scanner_attr='bitcoin_30m_mainnet_scanner',
+        scanner_log_method='add_log', step_size=0.001, min_qty=0.001,
+        # Antes de U_PATTERN_30M las compras de BTC 30m se guardaban como U_PATTERN
+        order_reason='U_PATTERN_30M', position_reason='U_PATTERN_30M', legacy_reasons=('U_PATTERN',)),
+    'eth_4h': FuturesStrategy(
+        'eth_4h', 'ETH 4h', 'Eth4h', 'ETH_4h', 'ETHUSDT', 'ETH', '4h',
+        'eth_4h_mainnet_enabled', 'eth_4h_mainnet_allocated_usdt',
+        take_profit=0.08, stop_loss=0.03, max_hold=timedelta(days=13),
+        scanner_module='app.services.eth_scanner_service', scanner_attr='eth_scanner',
+        scanner_log_method='_add_log', step_size=0.001, min_qty=0.001),
+    'bnb_4h': FuturesStrategy(
+        'bnb_4h', 'BNB 4h', 'Bnb4h', 'BNB_4h', 'BNBUSDT', 'BNB', '4h',
+        'bnb_4h_mainnet_enabled', 'bnb_4h_mainnet_allocated_usdt',
+        take_profit=0.08, stop_loss=0.03, max_hold=timedelta(days=13),
+        scanner_module='app.services.bnb_scanner_service', scanner_attr='bnb_scanner',
+        scanner_log_method='_add_log', step_size=0.01, min_qty=0.01),
+    'paxg_4h': FuturesStrategy(
+        'paxg_4h', 'PAXG 4h', 'Paxg4h', 'PAXG_4h', 'PAXGUSDT', 'PAXG', '4h',
+        'paxg_4h_mainnet_enabled', 'paxg_4h_mainnet_allocated_usdt',
+        take_profit=0.08, stop_loss=0.03, max_hold=timedelta(days=13),
+        scanner_module='app.services.paxg_scanner_service', scanner_attr='paxg_scanner',
+        scanner_log_method='_add_log', step_size=0.001, min_qty=0.001),
+}
+
+
+class BuyTicket(NamedTuple):
+    """Compra de una API key lista para enviar (orden PENDING ya creada en DB)"""
+    api_key: TradingApiKey
+    order: TradingOrder
+    params: Dict
+    exposure_usdt: float
+    required_margin: float
+    leverage: int
+
+
+def format_hold(max_hold: timedelta) -> str:
+    """'13 días' / '25h' para los logs de MAX_HOLD_TIME"""
+    hours = max_hold.total_seconds() / 3600
+    if hours >= 24 and hours % 24 == 0:
+        return f"{int(hours // 24)} días"
+    return f"{hours:g}h"
+
+
+def exit_reason(strategy: FuturesStrategy, profit_pct: float, held: timedelta) -> Optional[str]:
+    """
+    Motivo de cierre de una posición o None si debe seguir abierta.
+
+    Args:
+        profit_pct: PnL de la posición como fracción de lo invertido
+        held: Tiempo desde la compra
+    """
+    if profit_pct >= strategy.take_profit:
+        return 'TAKE_PROFIT'
+    if profit_pct <= -strategy.stop_loss:
+        return 'STOP_LOSS'
+    if held > strategy.max_hold:
+        return 'MAX_HOLD_TIME'
+    return None
+
+
+def floor_to_step(quantity: float, step_size: float) -> float:
+    """Trunca la cantidad al múltiplo de stepSize (LOT_SIZE de Binance)"""
+    if step_size <= 0:
+        return 0.0
+    steps = math.floor(round(quantity / step_size, 9))
+    decimals = max(0, -int(math.floor(math.log10(step_size))))
+    return round(steps * step_size, decimals)
+
+
+def format_quantity(quantity: float) -> str:
+    return f"{quantity:.8f}".rstrip('0').rstrip('.')
+
+
+def fill_summary(result: Dict, fallback_price: float) -> Tuple[float, Optional[float], Optional[str], int]:
+    """
+    Precio medio, comisión total y asset de comisión de una respuesta de orden.
+
+    Returns:
+        (precio ejecutado, comisión o None, asset de comisión o None, número de fills)
+    """
+    fills = result.get('fills') or []
+    total_qty = sum(float(fill.get('qty', 0)) for fill in fills)
+    if total_qty > 0:
+        price = sum(float(fill.get('qty', 0)) * float(fill.get('price', 0)) for fill in fills) / total_qty
+    else:
+        price = float(result.get('avgPrice') or 0) or fallback_price
+    commission = sum(float(fill.get('commission', 0)) for fill in fills)
+    asset = next((fill.get('commissionAsset') for fill in fills if fill.get('commissionAsset')), None)
+    return price, (commission if commission > 0 else None), asset, len(fills)
+
+
+class FuturesStrategyExecutor:
+    """
+    Ejecutor de trading automático de una estrategia en Futures Mainnet
+    Maneja órdenes de compra/venta con dinero real
+    """
+
+    def __init__(self, strategy: FuturesStrategy):
+        self.strategy = strategy
+        self.environment = "mainnet"
+        self.crypto_symbol = strategy.crypto_symbol
+        self.tag = f"[{strategy.log_tag}Executor]"
+
+    # ------------------------------------------------------------------
+    # Infraestructura compartida (credenciales, HTTP firmado, precio, filtros)
+
+    def _get_signer(self, api_key_id: int) -> Optional[ApiSigner]:
+        """Firmante de la API key (caché del proceso; la DB solo se consulta al caducar)"""
+        db = SessionLocal()
+        try:
+            return get_api_signer(db, api_key_id)
+        finally:
+            db.close()
+
+    def _signed_request(self, api_key_id: int, method: str, path: str,
+                        params: Optional[Dict] = None, base: str = FAPI_BASE):
+        """
+        Petición firmada a Binance (timestamp + recvWindow + signature HMAC-SHA256).
+
+        Returns:
+            Respuesta de requests o None si la API key no tiene credenciales
+        """
+        signer = self._get_signer(api_key_id)
+        if not signer:
+            logger.error(f"❌ {self.tag} No se pudieron obtener credenciales para API key {api_key_id}")
+            return None
+        query = urlencode({**(params or {}), 'timestamp': int(time.time() * 1000), 'recvWindow': RECV_WINDOW})
+        signature = signer.sign(query)
+        headers = {'X-MBX-APIKEY': signer.api_key}
+        if method == 'GET':
+            resp = requests.get(f"{base}{path}?{query}&signature={signature}", headers=headers, timeout=HTTP_TIMEOUT)
+        else:
+            resp = requests.post(f"{base}{path}", headers=headers, data=f"{query}&signature={signature}",
+                                 timeout=HTTP_TIMEOUT)
+        if resp.status_code == 401:
+            # API key rechazada (revocada o cambiada fuera de la app): se vuelve a leer de la DB
+            invalidate_api_signer(api_key_id)
+        return resp
+
+    async def _request(self, api_key: TradingApiKey, method: str, path: str, params: Optional[Dict] = None):
+        """
+        _signed_request en un hilo: las peticiones de varias cuentas no bloquean el event loop.
+        El id se lee aquí: el objeto ORM pertenece a la sesión del event loop y no debe
+        tocarse desde el hilo (tras un commit sus atributos se recargan)
+        """
+        return await asyncio.to_thread(self._signed_request, api_key.id, method, path, params)
+
+    async def _get_current_price(self, symbol: Optional[str] = None) -> Optional[float]:
+        """
+        Obtiene el precio actual del símbolo desde Futures API (con fallback a Spot)
+        usando el servicio compartido de mercado
+        """
+        symbol = symbol or self.strategy.symbol
+        try:
+            price = await market_data_service.get_price(symbol, market='futures')
+            if not price or price <= 0:
+                logger.error(f"❌ {self.tag} No se pudo obtener precio de {symbol} desde ninguna API")
+                return None
+            return price
+        except Exception as e:
+            logger.error(f"❌ {self.tag} Error obteniendo precio de {symbol}: {e}")
+            return None
+
+    def _get_symbol_filters(self, symbol: Optional[str] = None) -> Dict[str, float]:
+        """stepSize, minQty y minNotional de futures (valores del descriptor si falla exchangeInfo)"""
+        symbol = symbol or self.strategy.symbol
+        filters = {'stepSize': self.strategy.step_size, 'minQty': self.strategy.min_qty,
+                   'minNotional': self.strategy.min_notional}
+        try:
+            info = parse_symbol_filters(symbol) or {}
+        except Exception as e:
+            logger.warning(f"⚠️ {self.tag} exchangeInfo no disponible para {symbol}, usando valores por defecto: {e}")
+            return filters
+        for name, field in (('stepSize', 'stepSize'), ('minQty', 'minQty'), ('minNotional', 'notional')):
+            if info.get(field) is not None:
+                filters[name] = float(info[field])
+        return filters
+
+    def _leverage_for(self, api_key: TradingApiKey) -> int:
+        return self.strategy.leverage or getattr(api_key, 'default_leverage', DEFAULT_LEVERAGE) or DEFAULT_LEVERAGE
+
+    def _scanner_log(self, message: str, level: str = "INFO", current_price: Optional[float] = None):
+        """Publica el log en el scanner de la estrategia para que aparezca en el frontend"""
+        try:
+            scanner = getattr(import_module(self.strategy.scanner_module), self.strategy.scanner_attr)
+            # Por nombre: los scanners 4h definen _add_log(level, message) y el de 30m add_log(message, level)
+            getattr(scanner, self.strategy.scanner_log_method)(message=message, level=level,
+                                                                current_price=current_price)
+        except Exception as e:
+            logger.warning(f"⚠️ {self.tag} No se pudo publicar log en el scanner: {e}")
+
+    # ------------------------------------------------------------------
+    # Posiciones en la DB
+
+    def _open_buys_query(self, db: Session, api_key_id: int):
+        """Compras FILLED de la estrategia que aún no se cerraron"""
+        query = db.query(TradingOrder).filter(
+            TradingOrder.api_key_id == api_key_id,
+            TradingOrder.symbol == self.strategy.symbol,
+            TradingOrder.side == 'BUY',
+            TradingOrder.status == 'FILLED'
+        )
+        if self.strategy.position_reason:
+            reasons = (self.strategy.position_reason,) + self.strategy.legacy_reasons
+            query = query.filter(TradingOrder.reason.in_(reasons))
+        return query
+
+    def _has_later_sell(self, db: Session, api_key_id: int, buy_order: TradingOrder) -> bool:
+        return db.query(TradingOrder).filter(
+            TradingOrder.api_key_id == api_key_id,
+            TradingOrder.symbol == self.strategy.symbol,
+            TradingOrder.side == 'SELL',
+            TradingOrder.status == 'FILLED',
+            TradingOrder.created_at > buy_order.created_at
+        ).first() is not None
+
+    def _get_open_position(self, db: Session, api_key_id: int) -> Optional[TradingOrder]:
+        """
+        Verifica si hay una posición abierta (orden de compra sin venta correspondiente)
+        """
+        try:
+            buy_order = self._open_buys_query(db, api_key_id).order_by(TradingOrder.created_at.desc()).first()
+            if buy_order and not self._has_later_sell(db, api_key_id, buy_order):
+                return buy_order
+            return None
+        except Exception as e:
+            logger.error(f"Error verificando posición abierta: {e}")
+            return None
+
+    def _group_open_positions(self, db: Session, api_key_id: int) -> List[List[TradingOrder]]:
+        """
+        Posiciones abiertas de la API key: cada una es la lista de órdenes BUY de un
+        mismo orderId de Binance (varias si la compra se guardó en partes)
+        """
+        groups: Dict[str, List[TradingOrder]] = {}
+        positions = []
+        for order in self._open_buys_query(db, api_key_id).order_by(TradingOrder.created_at).all():
+            if order.binance_order_id:
+                if order.binance_order_id not in groups:
+                    groups[order.binance_order_id] = []
+                    positions.append(groups[order.binance_order_id])
+                groups[order.binance_order_id].append(order)
+            else:
+                positions.append([order])
+
+        split = [orders for orders in positions if len(orders) > 1]
+        for orders in split:
+            total_qty = sum(float(order.executed_quantity or order.quantity or 0) for order in orders)
+            logger.info(f"📊 Order ID {orders[0].binance_order_id}: {len(orders)} partes, "
+                        f"total {total_qty:.8f} {self.strategy.base_asset}")
+        return positions
+
+    # ------------------------------------------------------------------
+    # Compras
+
+    async def execute_buy_order(self, signal: Dict, user_id: Optional[int] = None):
+        """
+        Ejecuta orden de compra basada en señal del scanner en todas las API keys
+        habilitadas (fan-out)
+
+        1. Preparar: validaciones en DB, balance y (si alcanza el margen)
+           leverage/margin de todas las cuentas en paralelo; una sola consulta
+           de precio y filtros
+        2. Enviar: las órdenes de todas las cuentas a la vez (como máximo
+           MAX_CONCURRENT_ORDERS en vuelo), midiendo la latencia de cada fill
+        3. Registrar: fills en la DB, notificaciones y eventos
+
+        El error de una cuenta no afecta a las demás. Devuelve el resultado de la
+        primera cuenta que compró (o de la primera cuenta) con el detalle de todas
+        en 'accounts' y la dispersión entre el primer y el último fill.
+        """
+        strategy = self.strategy
+        db = SessionLocal()
+        try:
+            # Obtener API keys de mainnet habilitadas para la estrategia
+            query = db.query(TradingApiKey).filter(
+                TradingApiKey.is_testnet == False,
+                getattr(TradingApiKey, strategy.enabled_field) == True,
+                TradingApiKey.is_active == True
+            )
+            if user_id is not None:
+                query = query.filter(TradingApiKey.user_id == user_id)
+            api_keys = query.all()
+
+            if not api_keys:
+                logger.warning(f"No hay API keys de Mainnet habilitadas para {strategy.label}")
+                return {'success': False, 'error': 'No hay API keys habilitadas'}
+
+            price = await self._get_current_price()
+            if not price:
+                return {'success': False, 'error': f'No se pudo obtener precio de {strategy.symbol}'}
+            filters = self._get_symbol_filters()
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_ORDERS)
+
+            # Fase 1: preparar todas las cuentas
+            prepared = await asyncio.gather(*(self._prepare_buy(db, api_key, signal, price, filters, semaphore)
+                                              for api_key in api_keys), return_exceptions=True)
+            tickets = []
+            results: Dict[int, Dict] = {}
+            for api_key, outcome in zip(api_keys, prepared):
+                if isinstance(outcome, BuyTicket):
+                    tickets.append(outcome)
+                else:
+                    if isinstance(outcome, BaseException):
+                        logger.error(f"Error preparando compra para API key {api_key.id}: {outcome}")
+                        outcome = {'success': False, 'error': str(outcome)}
+                    results[api_key.id] = {**outcome, 'api_key_id': api_key.id}
+
+            # Fase 2: enviar las órdenes en paralelo
+            fanout_start = time.perf_counter()
+            responses = await asyncio.gather(*(self._submit_buy(ticket, semaphore, fanout_start)
+                                               for ticket in tickets), return_exceptions=True)
+
+            # Fase 3: registrar fills
+            for ticket, response in zip(tickets, responses):
+                try:
+                    if isinstance(response, BaseException):
+                        response = ({'success': False, 'error': str(response), 'code': 'EXCEPTION'}, None)
+                    results[ticket.api_key.id] = await self._record_buy(db, ticket, signal, *response)
+                except Exception as e:
+                    logger.exception(f"❌ {self.tag} Error registrando compra para API key {ticket.api_key.id}: {e}")
+                    results[ticket.api_key.id] = {'success': False, 'error': str(e), 'api_key_id': ticket.api_key.id}
+
+            accounts = [results[api_key.id] for api_key in api_keys]
+            latencies = [account['fill_latency_ms'] for account in accounts if account.get('fill_latency_ms') is not None]
+            fill_spread_ms = max(latencies) - min(latencies) if latencies else None
+            if latencies:
+                logger.info(f"⚡ {self.tag} Fan-out {len(tickets)}/{len(api_keys)} cuentas: primer fill "
+                            f"{min(latencies):.0f} ms, último {max(latencies):.0f} ms (dispersión {fill_spread_ms:.0f} ms)")
+
+            first = next((account for account in accounts if account.get('success')), accounts[0])
+            return {**first, 'accounts': accounts, 'fill_spread_ms': fill_spread_ms}
+
+        except Exception as e:
+            logger.error(f"Error en execute_buy_order {strategy.label}: {e}")
+            return {'success': False, 'error': str(e)}
+        finally:
+            db.close()
+
+    async def _prepare_buy(self, db: Session, api_key: TradingApiKey, signal: Dict, price: float,
+                           filters: Dict[str, float], semaphore: asyncio.Semaphore):
+        """
+        Deja lista la compra de una API key - SOLO si no tiene posición abierta.
+        El USDT asignado es la exposición: $300 con 3x usan $100 de margen
+
+        Returns:
+            BuyTicket con la orden PENDING creada o dict con el motivo por el que no se compra
+        """
+        strategy = self.strategy
+        allocated_usdt = getattr(api_key, strategy.allocated_field) or 0
+        if allocated_usdt <= 0:
+            logger.warning(f"❌ API key {api_key.id} no tiene USDT asignado para {strategy.label} Mainnet")
+            return {'success': False, 'error': 'No hay USDT asignado'}
+
+        # VERIFICAR SI YA TIENE UNA POSICIÓN ABIERTA
+        open_position = self._get_open_position(db, api_key.id)
+        if open_position:
+            logger.info(f"⏭️ API key {api_key.id} ya tiene una posición abierta (ID: {open_position.id}) - Saltando nueva compra")
+            return {'success': False, 'msg': 'position_open'}
+
+        leverage = self._leverage_for(api_key)
+        exposure_usdt = float(allocated_usdt)
+        required_margin = exposure_usdt / float(leverage)
+        quantity = floor_to_step(exposure_usdt / price, filters['stepSize'])
+        if quantity <= 0 or quantity < filters['minQty'] or quantity * price < filters['minNotional']:
+            logger.error(f"❌ {self.tag} Cantidad {quantity} (${quantity * price:.2f}) por debajo del mínimo "
+                         f"(minQty={filters['minQty']}, minNotional=${filters['minNotional']:.2f})")
+            return {'success': False, 'msg': 'Cantidad por debajo del mínimo', 'code': 'QTY_BELOW_MIN'}
+
+        # Balance y, solo si alcanza el margen, leverage/margin (en paralelo con las demás cuentas)
+        async with semaphore:
+            balance = await self._get_balance(api_key)
+            if not balance:
+                logger.error(f"❌ No se pudo obtener balance para API key {api_key.id}")
+                return {'success': False, 'error': 'No se pudo obtener balance'}
+            available_margin = balance.get('USDT', 0.0)
+            if available_margin < required_margin:
+                logger.warning(f"⚠️ Balance insuficiente para API key {api_key.id}: disponible=${available_margin:.2f}, requerido=${required_margin:.2f} USDT de margen para exposición ${exposure_usdt:.2f} con {leverage}x")
+                return {'success': False, 'error': f'Balance insuficiente. Necesitas ${required_margin:.2f} USDT de margen (exposición ${exposure_usdt:.2f} con {leverage}x)'}
+            configured = await self._ensure_leverage_and_margin(api_key, strategy.symbol, leverage)
+        if not configured:
+            logger.error(f"❌ {self.tag} No se pudo configurar leverage/margin para API key {api_key.id}, se omite la compra")
+            return {'success': False, 'msg': 'Failed to configure leverage/margin', 'code': 'CONFIG_ERROR'}
+        if balance.get('BNB', 0.0) > 0.1:
+            logger.info(f"✅ {self.tag} API key {api_key.id} tiene {balance['BNB']:.3f} BNB - Comisiones optimizadas")
+        logger.info(f"🎯 {self.tag} API key {api_key.id}: exposición ${exposure_usdt:.2f} USDT | Leverage {leverage}x | "
+                    f"Margen ${required_margin:.2f} USDT | qty={quantity} @ ${price:.2f} (señal ${signal['entry_price']:.2f})")
+
+        # Crear orden en DB (PENDING)
+        order = create_trading_order(
+            db,
+            TradingOrderCreate(
+                api_key_id=api_key.id,
+                alerta_id=None,
+                symbol=strategy.symbol,
+                side='BUY',
+                order_type='MARKET',
+                quantity=0.0,  # se definirá por ejecución
+                price=None,
+                take_profit_price=None,
+                stop_loss_price=None,
+                reason=strategy.order_reason
+            ),
+            user_id=api_key.user_id
+        )
+        params = {'symbol': strategy.symbol, 'side': 'BUY', 'type': 'MARKET', 'positionSide': 'LONG',
+                  'quantity': format_quantity(quantity)}
+        return BuyTicket(api_key, order, params, exposure_usdt, required_margin, leverage)
+
+    async def _submit_buy(self, ticket: 'BuyTicket', semaphore: asyncio.Semaphore,
+                          fanout_start: float) -> Tuple[Dict, float]:
+        """Envía la orden preparada; devuelve (respuesta, ms desde el inicio del fan-out)"""
+        async with semaphore:
+            data = await self._submit_order(ticket.api_key, ticket.params)
+        return data, (time.perf_counter() - fanout_start) * 1000
+
+    async def _record_buy(self, db: Session, ticket: 'BuyTicket', signal: Dict, binance_result: Dict,
+                          fill_latency_ms: Optional[float]) -> Dict:
+        """Guarda el resultado de la orden de una cuenta y publica el fill"""
+        strategy = self.strategy
+        api_key, new_order = ticket.api_key, ticket.order
+        if not binance_result.get('success'):
+            error_code = binance_result.get('code', 'N/A')
+            error_msg = binance_result.get('msg') or binance_result.get('error') or 'Error desconocido'
+            update_trading_order_status(db, order_id=new_order.id, status=binance_result.get('status', 'REJECTED'),
+                                        reason=f"[{error_code}] {error_msg}")
+            logger.error(f"❌ {self.tag} Error ejecutando orden en Binance para API key {api_key.id}: {binance_result}")
+            return {
+                'success': False,
+                'api_key_id': api_key.id,
+                'error': f'Error ejecutando orden en Binance: [{error_code}] {error_msg}',
+                'error_code': error_code,
+                'fill_latency_ms': fill_latency_ms
+            }
+
+        order_id = str(binance_result.get('orderId')) if binance_result.get('orderId') else None
+        executed_qty = float(binance_result.get('executedQty', 0.0) or 0.0)
+        exec_price, commission, commission_asset, fills_count = fill_summary(binance_result, signal['entry_price'])
+        if fills_count > 1:
+            logger.info(f"📊 Orden ejecutada en {fills_count} partes: {executed_qty:.8f} {strategy.base_asset} @ precio promedio ${exec_price:.2f}")
+
+        update_trading_order_status(
+            db,
+            order_id=new_order.id,
+            status=binance_result.get('status', 'FILLED'),
+            binance_order_id=order_id,
+            executed_price=exec_price,
+            executed_quantity=executed_qty,
+            commission=commission,
+            commission_asset=commission_asset,
+            reason=strategy.order_reason,
+            leverage=ticket.leverage,
+            margin_type=MARGIN_TYPE,
+            initial_margin=ticket.required_margin
+        )
+        self._sync_position_book(api_key.id)
+        await self._send_buy_notification(api_key, {
+            'quantity': executed_qty,
+            'price': exec_price,
+            'total_usdt': ticket.exposure_usdt,
+            'signal_data': {
+                'signal_strength': signal.get('signal_strength', 0),
+                'pattern_depth': signal.get('depth', 0),
+                'atr': signal.get('atr', 0),
+                'dynamic_factor': signal.get('dynamic_factor', 1.0)
+            }
+        }, binance_result)
+        logger.info(f"✅ BUY FILLED db_id={new_order.id} binance_id={order_id} qty={executed_qty:.8f} @ {exec_price:.2f} "
+                    f"(fill en {fill_latency_ms:.0f} ms)")
+        # Publicar evento BUY_FILLED
+        try:
+            trading_events.publish_order_filled_buy(
+                order=db.query(TradingOrder).filter(TradingOrder.id == new_order.id).first(),
+                symbol=strategy.symbol,
+                quantity=executed_qty,
+                price=exec_price,
+                total_usdt=ticket.exposure_usdt,
+                source='executor',
+                extra={'binance_order_id': order_id, 'fill_latency_ms': round(fill_latency_ms, 1)}
+            )
+        except Exception as pub_err:
+            logger.error(f"⚠️ Error publicando evento BUY_FILLED: {pub_err}")
+
+        return {
+            'success': True,
+            'api_key_id': api_key.id,
+            'order_id': new_order.id,
+            'binance_order_id': order_id,
+            'quantity': executed_qty,
+            'price': exec_price,
+            'total_usdt': ticket.exposure_usdt,
+            'fill_latency_ms': fill_latency_ms
+        }
+
+    # ------------------------------------------------------------------
+    # Cuenta y órdenes en Binance Futures
+
+    async def _get_balance(self, api_key: TradingApiKey) -> Optional[Dict]:
+        """
+        Balance de Futures: USDT disponible, balance total, BNB de la wallet y la
+        cantidad de la posición LONG del símbolo de la estrategia (base_asset)
+        """
+        try:
+            resp = await self._request(api_key, 'GET', '/fapi/v2/account')
+            if resp is None:
+                return None
+            resp.raise_for_status()
+            data = resp.json()
+            position_qty = sum(
+                float(position.get('positionAmt', 0) or 0)
+                for position in data.get('positions', [])
+                if position.get('symbol') == self.strategy.symbol
+                and position.get('positionSide', 'LONG') in ('LONG', 'BOTH')
+            )
+            bnb = next((float(asset.get('walletBalance', 0) or 0) for asset in data.get('assets', [])
+                        if asset.get('asset') == 'BNB'), 0.0)
+            return {
+                'USDT': float(data.get('availableBalance', 0.0)),  # Balance disponible para margen
+                'TOTAL': float(data.get('totalWalletBalance', 0.0)),  # Incluye margen de posiciones abiertas
+                self.strategy.base_asset: max(position_qty, 0.0),
+                'BNB': bnb
+            }
+        except Exception as e:
+            logger.error(f"Error obteniendo balance de Futures: {e}")
+            return None
+
+    async def _seed_leverage_config(self, api_key: TradingApiKey, symbol: str) -> Optional[Tuple[int, str]]:
+        """Lee leverage y margin type actuales del símbolo en /fapi/v2/positionRisk y los guarda en la caché"""
+        try:
+            resp = await self._request(api_key, 'GET', '/fapi/v2/positionRisk', {'symbol': symbol})
+            if resp is None or resp.status_code != 200:
+                return None
+            for row in resp.json():
+                if row.get('symbol') == symbol and row.get('positionSide', 'LONG') in ('LONG', 'BOTH'):
+                    config = (int(row.get('leverage', 0) or 0), str(row.get('marginType', '')).upper())
+                    _leverage_config[(api_key.id, symbol)] = config
+                    return config
+        except Exception as e:
+            logger.warning(f"⚠️ {self.tag} No se pudo leer positionRisk de {symbol}: {e}")
+        return None
+
+    async def _ensure_leverage_and_margin(self, api_key: TradingApiKey, symbol: str, leverage: int = None) -> bool:
+        """
+        Garantiza leverage y ISOLATED margin antes de una orden sin repetir los POST
+        si la cuenta ya los tiene (caché por (API key, símbolo), sembrada desde positionRisk)
+        """
+        leverage = leverage or self._leverage_for(api_key)
+        desired = (leverage, MARGIN_TYPE)
+        key = (api_key.id, symbol)
+        if key not in _leverage_config:
+            await self._seed_leverage_config(api_key, symbol)
+        if _leverage_config.get(key) == desired:
+            return True
+        return await self._configure_leverage_and_margin(api_key, symbol, leverage)
+
+    async def _configure_leverage_and_margin(self, api_key: TradingApiKey, symbol: str, leverage: int = None) -> bool:
+        """
+        Configura leverage y ISOLATED margin antes de abrir posición
+
+        Args:
+            leverage: Leverage a configurar (si no se proporciona, el de la estrategia o la API key)
+        """
+        leverage = leverage or self._leverage_for(api_key)
+        _leverage_config.pop((api_key.id, symbol), None)
+        margin_ok = False
+        try:
+            resp_margin = await self._request(api_key, 'POST', '/fapi/v1/marginType',
+                                              {'symbol': symbol, 'marginType': MARGIN_TYPE})
+            if resp_margin is None:
+                return False
+            if resp_margin.status_code == 200:
+                margin_ok = True
+                logger.info(f"✅ {self.tag} Margin type ISOLATED configurado para {symbol}")
+            elif 'no need to change' in resp_margin.text.lower():
+                margin_ok = True
+                logger.info(f"ℹ️ {self.tag} Margin type ya está configurado como ISOLATED para {symbol}")
+            else:
+                logger.warning(f"⚠️ {self.tag} No se pudo configurar margin type: {resp_margin.text}")
+        except Exception as e:
+            logger.warning(f"⚠️ {self.tag} Error configurando margin type (puede que ya esté configurado): {e}")
+
+        try:
+            resp_leverage = await self._request(api_key, 'POST', '/fapi/v1/leverage',
+                                                {'symbol': symbol, 'leverage': leverage})
+            if resp_leverage is None:
+                return False
+            if resp_leverage.status_code != 200:
+                logger.error(f"❌ {self.tag} No se pudo configurar leverage {leverage}x: "
+                             f"{resp_leverage.status_code} - {resp_leverage.text}")
+                return False
+            logger.info(f"✅ {self.tag} Leverage {leverage}x configurado para {symbol}")
+            # Solo se recuerda una configuración confirmada por Binance en las dos llamadas
+            if margin_ok:
+                _leverage_config[(api_key.id, symbol)] = (leverage, MARGIN_TYPE)
+            return True
+        except Exception as e:
+            logger.error(f"❌ {self.tag} Error configurando leverage {leverage}x: {e}")
+            return False
+
+    async def _submit_order(self, api_key: TradingApiKey, params: Dict) -> Dict:
+        """POST /fapi/v1/order con los parámetros ya validados; normaliza 'success', 'code' y 'msg'"""
+        try:
+            resp = await self._request(api_key, 'POST', '/fapi/v1/order', params)
+            if resp is None:
+                return {'success': False, 'msg': 'NO_CREDENTIALS'}
+            try:
+                data = resp.json()
+            except Exception:
+                data = {'status_code': resp.status_code, 'text': resp.text}
+
+            logger.info(f"📥 {self.tag} POST /order {params['symbol']} {params['side']} {params['type']} LONG "
+                        f"qty={params.get('quantity')} resp={resp.status_code} body={data}")
+            data['success'] = resp.status_code == 200
+            if not data['success']:
+                data['code'] = data.get('code', 'N/A')
+                data['msg'] = data.get('msg', 'Unknown error')
+                if data['code'] in CONFIG_MISMATCH_CODES:
+                    # La cuenta no tiene el leverage/margin que creíamos: se reconfigura en la próxima orden
+                    _leverage_config.pop((api_key.id, params['symbol']), None)
+            return data
+        except Exception as e:
+            logger.exception(f"❌ {self.tag} Error ejecutando orden en Binance Futures: {e}")
+            return {'success': False, 'error': str(e), 'code': 'EXCEPTION', 'error_type': type(e).__name__}
+
+    async def _execute_binance_order(self, api_key: TradingApiKey, order_data: Dict) -> Dict:
+        """
+        Ejecuta orden MARKET en Binance Futures sobre la posición LONG.
+
+        `quoteOrderQty` (exposición en USDT) se convierte a cantidad con el precio
+        actual y el stepSize del símbolo; `quantity` se envía tal cual.
+        """
+        try:
+            symbol = order_data['symbol']
+            leverage = order_data.get('leverage') or self._leverage_for(api_key)
+            if not await self._ensure_leverage_and_margin(api_key, symbol, leverage):
+                logger.error(f"❌ {self.tag} No se pudo configurar leverage/margin, abortando orden")
+                return {'success': False, 'msg': 'Failed to configure leverage/margin', 'code': 'CONFIG_ERROR'}
+
+            params = {
+                'symbol': symbol,
+                'side': order_data['side'],
+                'type': order_data['type'],
+                'positionSide': 'LONG',  # Solo posiciones LONG (comprar para subir)
+            }
+            if 'quoteOrderQty' in order_data:
+                exposure_usdt = float(order_data['quoteOrderQty'])
+                price = await self._get_current_price(symbol)
+                if not price:
+                    return {'success': False, 'msg': f'Precio inválido: {price}', 'code': 'INVALID_PRICE'}
+                filters = self._get_symbol_filters(symbol)
+                quantity = floor_to_step(exposure_usdt / price, filters['stepSize'])
+                notional_value = quantity * price
+                logger.info(f"   📈 Precio: ${price:.2f} | qty={quantity:.8f} (stepSize={filters['stepSize']}) | notional=${notional_value:.2f}")
+                if quantity <= 0 or quantity < filters['minQty']:
+                    logger.error(f"❌ {self.tag} Quantity inválida tras truncado: {quantity} (minQty={filters['minQty']})")
+                    return {'success': False, 'msg': 'Cantidad por debajo del mínimo', 'code': 'QTY_BELOW_MIN'}
+                if notional_value < filters['minNotional']:
+                    logger.error(f"❌ {self.tag} Notional ${notional_value:.2f} < mínimo ${filters['minNotional']:.2f}")
+                    return {'success': False, 'msg': 'Notional por debajo del mínimo', 'code': 'NOTIONAL_BELOW_MIN'}
+                params['quantity'] = format_quantity(quantity)
+            else:
+                params['quantity'] = format_quantity(float(order_data['quantity']))
+            return await self._submit_order(api_key, params)
+
+        except Exception as e:
+            logger.exception(f"❌ {self.tag} Error ejecutando orden en Binance Futures: {e}")
+            return {'success': False, 'error': str(e), 'code': 'EXCEPTION', 'error_type': type(e).__name__}
+
+    async def _send_buy_notification(self, api_key: TradingApiKey, order_data: Dict, binance_result: Dict):
+        """
+        Envía notificación de compra por Telegram
+        """
+        try:
+            message = f"""
+💰 **COMPRA {self.strategy.label.upper()} MAINNET EJECUTADA**
+
+📊 **Detalles de la operación:**
+• Cantidad: {order_data['quantity']:.6f} {self.strategy.base_asset}
+• Precio: ${order_data['price']:.2f}
+• Total: ${order_data['total_usdt']:.2f} USDT
+• Orden ID: {binance_result.get('orderId', 'N/A')}
+
+🎯 **Señal del scanner:**
+• Fuerza: {order_data['signal_data']['signal_strength']:.3f}
+• Profundidad: {order_data['signal_data']['pattern_depth']*100:.2f}%
+• ATR: {order_data['signal_data']['atr']:.2f}
+
+⚠️ **AMBIENTE MAINNET - DINERO REAL**
+            """
+
+            # await send_telegram_message(api_key.user_id, message)
+            logger.info(f"📱 Notificación Telegram Mainnet: {message}")
+
+        except Exception as e:
+            logger.error(f"Error enviando notificación Mainnet: {e}")
+
+    # ------------------------------------------------------------------
+    # Ventas
+
+    async def check_and_execute_sell_orders(self):
+        """
+        Verifica y ejecuta órdenes de venta pendientes
+        """
+        strategy = self.strategy
+        db = SessionLocal()
+        try:
+            # Paso 0: reconciliar con Binance antes de decidir ventas, para no operar sobre estado desfasado
+            await self._reconcile_with_binance(db)
+
+            api_keys = db.query(TradingApiKey).filter(
+                getattr(TradingApiKey, strategy.enabled_field) == True,
+                TradingApiKey.is_active == True
+            ).all()
+
+            total_positions = 0
+            for api_key in api_keys:
+                async with self._position_lock(api_key.id):
+                    for orders in self._group_open_positions(db, api_key.id):
+                        try:
+                            await self._check_sell_conditions(db, api_key, orders)
+                            total_positions += 1
+                        except Exception as e:
+                            logger.error(f"Error verificando posición {orders[0].id}: {e}")
+
+            if total_positions > 0:
+                logger.info(f"🔍 [{strategy.log_tag}] Monitoreando {total_positions} posición(es) activa(s) para venta")
+            else:
+                logger.info(f"🔍 [{strategy.log_tag}] No hay posiciones activas para monitorear")
+
+        except Exception as e:
+            logger.error(f"Error en check_and_execute_sell_orders: {e}")
+        finally:
+            db.close()
+
+    async def check_position(self, api_key_id: int, current_price: float):
+        """
+        Evalúa TP / SL / max hold de las posiciones de una API key con un precio ya
+        conocido (mark price del position book) y las cierra si corresponde
+        """
+        db = SessionLocal()
+        try:
+            api_key = db.query(TradingApiKey).filter(TradingApiKey.id == api_key_id).first()
+            if not api_key:
+                return
+            async with self._position_lock(api_key_id):
+                for orders in self._group_open_positions(db, api_key_id):
+                    await self._check_sell_conditions(db, api_key, orders, current_price)
+        finally:
+            db.close()
+
+    def _position_lock(self, api_key_id: int) -> asyncio.Lock:
+        key = (self.strategy.symbol, api_key_id)
+        if key not in _position_locks:
+            _position_locks[key] = asyncio.Lock()
+        return _position_locks[key]
+
+    def _sync_position_book(self, api_key_id: int):
+        """Mantiene al día el libro de posiciones en memoria tras un fill"""
+        from app.services.position_book import position_book
+        position_book.refresh(self.strategy.name, api_key_id)
+
+    @staticmethod
+    def _position_label(orders: List[TradingOrder]) -> str:
+        if len(orders) > 1:
+            return f"Grupo {orders[0].binance_order_id} ({len(orders)} partes)"
+        return f"Posición ID {orders[0].id}"
+
+    async def _check_sell_conditions(self, db: Session, api_key: TradingApiKey, orders: List[TradingOrder],
+                                     current_price: Optional[float] = None):
+        """
+        Verifica TP / SL / max hold de una posición (una orden BUY o las partes de un mismo orderId)
+
+        Args:
+            current_price: Precio a usar (si no se proporciona, el actual del servicio de mercado)
+        """
+        strategy = self.strategy
+        tag = f"[{strategy.log_tag}]"
+        reference_order = orders[0]
+        label = self._position_label(orders)
+        try:
+            # COOLDOWN: Prevenir venta instantánea después de la compra
+            held = datetime.now() - reference_order.created_at
+            if held < strategy.cooldown:
+                remaining_minutes = (strategy.cooldown - held).total_seconds() / 60
+                logger.info(f"⏳ Cooldown activo para {label}: {remaining_minutes:.1f} min restantes")
+                return
+
+            current_price = current_price or await self._get_current_price()
+            if not current_price:
+                logger.warning(f"⚠️ {tag} No se pudo obtener precio para verificar {label}")
+                return
+
+            total_quantity = sum(float(order.executed_quantity or order.quantity or 0) for order in orders)
+            total_invested = sum(float(order.executed_quantity or order.quantity or 0) *
+                                 float(order.executed_price or order.price or 0) for order in orders)
+            if total_quantity <= 0 or total_invested <= 0:
+                logger.error(f"❌ {tag} No se puede obtener precio/cantidad de entrada para {label}")
+                return
+
+            # PnL sobre la cantidad de la compra (no sobre todo el balance de la cuenta)
+            current_value = total_quantity * current_price
+            pnl_usdt = current_value - total_invested
+            profit_pct = pnl_usdt / total_invested
+
+            position_log = (f"💰 {label}: Invertido ${total_invested:.2f} | Valor actual ${current_value:.2f} | "
+                            f"PnL ${pnl_usdt:+.2f} ({profit_pct*100:+.2f}%) | "
+                            f"TP: {strategy.take_profit*100}% | SL: {strategy.stop_loss*100}%")
+            logger.info(f"{tag} {position_log}")
+            self._scanner_log(position_log, "INFO", current_price=current_price)
+
+            reason = exit_reason(strategy, profit_pct, held)
+            if reason == 'TAKE_PROFIT':
+                reason_log, level = f"🎯 TAKE PROFIT activado para {label}: {profit_pct*100:+.2f}%", "SUCCESS"
+            elif reason == 'STOP_LOSS':
+                reason_log, level = f"🛑 STOP LOSS activado para {label}: {profit_pct*100:+.2f}%", "WARNING"
+            elif reason == 'MAX_HOLD_TIME':
+                reason_log, level = f"⏰ MAX HOLD TIME activado para {label} ({format_hold(strategy.max_hold)})", "WARNING"
+            else:
+                return
+            logger.info(f"{tag} {reason_log}")
+            self._scanner_log(reason_log, level, current_price=current_price)
+            await self._execute_sell_order(db, api_key, orders, current_price, reason)
+
+        except Exception as e:
+            logger.error(f"Error en _check_sell_conditions: {e}")
+
+    async def _execute_sell_order(self, db: Session, api_key: TradingApiKey, orders: List[TradingOrder],
+                                  sell_price: float, reason: str):
+        """
+        Cierra la posición (todas sus órdenes BUY) con una venta MARKET de la cantidad
+        comprada, limitada a la posición LONG real en Binance
+        """
+        strategy = self.strategy
+        tag = f"[{strategy.log_tag}]"
+        reference_order = orders[0]
+        asset = strategy.base_asset
+        try:
+            balance = await self._get_balance(api_key)
+            if not balance:
+                logger.error(f"❌ No se pudo obtener balance para API key {api_key.id}")
+                return
+
+            total_quantity = sum(float(order.executed_quantity or order.quantity or 0) for order in orders)
+            filters = self._get_symbol_filters()
+            sell_quantity = floor_to_step(min(balance.get(asset, 0.0), total_quantity), filters['stepSize'])
+            order_value = sell_quantity * sell_price
+
+            if sell_quantity < filters['minQty']:
+                error_log = f"❌ Posición {asset} insuficiente para vender: {sell_quantity:.8f} {asset} (mínimo: {filters['minQty']:.8f} {asset})"
+                logger.error(f"{tag} {error_log}")
+                self._scanner_log(error_log, "ERROR", current_price=sell_price)
+                return
+            if order_value < filters['minNotional']:
+                error_log = f"❌ Valor de orden muy bajo: ${order_value:.2f} (mínimo: ${filters['minNotional']:.2f})"
+                logger.error(f"{tag} {error_log}")
+                self._scanner_log(error_log, "ERROR", current_price=sell_price)
+                return
+
+            if reference_order.commission:
+                commission_log = f"📊 Comisión de compra pagada en {reference_order.commission_asset}: {reference_order.commission:.8f}"
+                logger.info(f"{tag} {commission_log}")
+                self._scanner_log(commission_log, "INFO", current_price=sell_price)
+            logger.info(f"💰 {tag} Preparando venta: {sell_quantity:.8f} {asset} @ ${sell_price:,.2f} (${order_value:.2f}) - {reason}")
+
+            sell_order_data = {
+                'symbol': strategy.symbol,
+                'side': 'SELL',
+                'type': 'MARKET',
+                'quantity': sell_quantity,
+                'price': sell_price,
+                'total_usdt': order_value
+            }
+            binance_result = await self._execute_binance_order(api_key, sell_order_data)
+            if not binance_result.get('success'):
+                error_msg = binance_result.get('msg') or binance_result.get('error') or 'Error desconocido'
+                error_log = f"❌ Error ejecutando venta en Binance: [{binance_result.get('code', 'N/A')}] {error_msg}"
+                logger.error(f"{tag} {error_log}")
+                self._scanner_log(error_log, "ERROR", current_price=sell_price)
+                return
+
+            executed_qty = float(binance_result.get('executedQty', 0.0) or 0.0) or sell_quantity
+            exec_price, sell_commission, sell_commission_asset, _ = fill_summary(binance_result, sell_price)
+            sell_reason = f'GROUP_SELL_{reason}' if len(orders) > 1 else reason
+
+            sell_order = create_trading_order(db, TradingOrderCreate(
+                api_key_id=api_key.id,
+                symbol=strategy.symbol,
+                side='SELL',
+                order_type='market',
+                quantity=executed_qty,
+                price=sell_price,
+                reason=sell_reason
+            ), api_key.user_id)
+            sell_order.executed_price = exec_price
+            sell_order.executed_quantity = executed_qty
+            sell_order.commission = sell_commission
+            sell_order.commission_asset = sell_commission_asset
+            sell_order.status = 'FILLED'
+            sell_order.binance_order_id = str(binance_result.get('orderId', ''))
+
+            # PnL final: la comisión de venta en USDT se descuenta del valor vendido
+            total_invested = sum(float(order.executed_quantity or order.quantity or 0) *
+                                 float(order.executed_price or order.price or 0) for order in orders)
+            sale_value = executed_qty * exec_price
+            if sell_commission and sell_commission_asset == 'USDT':
+                sale_value -= sell_commission
+            pnl_final_usdt = sale_value - total_invested
+            pnl_final_pct = (pnl_final_usdt / total_invested) * 100 if total_invested > 0 else 0
+            sell_order.pnl_usdt = pnl_final_usdt
+            sell_order.pnl_percentage = pnl_final_pct
+
+            for order in orders:
+                order.status = 'completed'
+            db.commit()
+            self._sync_position_book(api_key.id)
+
+            if sell_commission:
+                commission_log = f"📊 Comisión de venta pagada en {sell_commission_asset}: {sell_commission:.8f}"
+                logger.info(f"{tag} {commission_log}")
+                self._scanner_log(commission_log, "INFO", current_price=sell_price)
+
+            sell_order_data['order_id'] = sell_order.binance_order_id
+            await self._send_sell_notification(api_key, reference_order, sell_order_data, pnl_final_pct / 100,
+                                               reason, pnl_final_usdt)
+            try:
+                extra = {'reason': reason, 'buy_order_id': reference_order.id}
+                if len(orders) > 1:
+                    extra.update({'group_order_id': reference_order.binance_order_id, 'group_size': len(orders)})
+                trading_events.publish_order_filled_sell(
+                    order=sell_order,
+                    user_id=api_key.user_id,
+                    api_key_id=api_key.id,
+                    symbol=strategy.symbol,
+                    quantity=executed_qty,
+                    price=exec_price,
+                    pnl_usdt=pnl_final_usdt,
+                    pnl_percentage=pnl_final_pct,
+                    source='executor',
+                    extra=extra
+                )
+            except Exception as pub_err:
+                logger.error(f"⚠️ Error publicando evento SELL_FILLED: {pub_err}")
+
+            success_log = f"✅ Venta ejecutada: {executed_qty:.8f} {asset} @ ${exec_price:,.2f} | PnL: ${pnl_final_usdt:+.2f} ({pnl_final_pct:+.2f}%) - {reason}"
+            logger.info(f"{tag} {success_log}")
+            self._scanner_log(success_log, "SUCCESS", current_price=sell_price)
+
+        except Exception as e:
+            logger.error(f"Error ejecutando venta: {e}")
+
+    async def _reconcile_with_binance(self, db: Session):
+        """
+        Sincroniza ventas ejecutadas en Binance que no existen en la DB local: si en
+        /fapi/v1/userTrades hay un SELL posterior a una compra abierta, se crea la
+        orden SELL (reason EXTERNAL_SELL) y se cierra la compra.
+        """
+        strategy = self.strategy
+        try:
+            api_keys = db.query(TradingApiKey).filter(
+                TradingApiKey.is_testnet == False,
+                TradingApiKey.is_active == True,
+                getattr(TradingApiKey, strategy.enabled_field) == True
+            ).all()
+
+            for api_key in api_keys:
+                # Mismo lock que las ventas del executor: una compra que se está cerrando
+                # no se reconcilia como venta externa con su propio fill
+                async with self._position_lock(api_key.id):
+                    try:
+                        open_buys = [buy for buy in self._open_buys_query(db, api_key.id).all()
+                                     if not self._has_later_sell(db, api_key.id, buy)]
+                        if not open_buys:
+                            continue
+
+                        resp = await self._request(api_key, 'GET', '/fapi/v1/userTrades',
+                                                   {'symbol': strategy.symbol, 'limit': 200})
+                        if resp is None:
+                            continue
+                        if resp.status_code != 200:
+                            logger.warning(f"[Reconcile] Binance userTrades {resp.status_code}: {resp.text}")
+                            continue
+                        sell_trades = [trade for trade in (resp.json() or [])
+                                       if trade.get('buyer') is False and trade.get('symbol') == strategy.symbol]
+
+                        for buy in open_buys:
+                            buy_time_ms = int(buy.created_at.timestamp() * 1000) if buy.created_at else 0
+                            matching_sell_trade = next((trade for trade in sell_trades
+                                                        if int(trade.get('time', 0)) > buy_time_ms), None)
+                            if not matching_sell_trade:
+                                continue
+
+                            sell_qty = float(matching_sell_trade.get('qty', 0.0))
+                            sell_price = float(matching_sell_trade.get('price', 0.0))
+                            new_sell = create_trading_order(db, TradingOrderCreate(
+                                api_key_id=api_key.id,
+                                symbol=strategy.symbol,
+                                side='SELL',
+                                order_type='market',
+                                quantity=sell_qty,
+                                price=sell_price
+                            ), api_key.user_id)
+                            new_sell.status = 'FILLED'
+                            new_sell.binance_order_id = str(matching_sell_trade.get('orderId', ''))
+                            new_sell.executed_price = sell_price
+                            new_sell.executed_quantity = sell_qty
+                            new_sell.reason = (f"{strategy.position_reason}_EXTERNAL_SELL"
+                                               if strategy.position_reason else 'EXTERNAL_SELL')
+                            # Cerrar BUY local - usar estado consistente con Binance
+                            buy.status = 'COMPLETED'
+                            db.commit()
+                            self._sync_position_book(api_key.id)
+
+                            logger.info(f"[Reconcile] SELL externo sincronizado: buy_id={buy.id} sell_id={new_sell.id} qty={sell_qty} @ {sell_price}")
+                            try:
+                                trading_events.publish_order_filled_sell(
+                                    order=new_sell,
+                                    symbol=strategy.symbol,
+                                    quantity=sell_qty,
+                                    price=sell_price,
+                                    pnl_usdt=None,
+                                    pnl_percentage=None,
+                                    source='reconciliation',
+                                    extra={'external': True, 'buy_order_id': buy.id}
+                                )
+                            except Exception as pub_err:
+                                logger.error(f"⚠️ Error publicando evento SELL_FILLED (reconcile): {pub_err}")
+                            self._scanner_log(
+                                f"🔄 Sincronizado SELL externo desde Binance: {sell_qty:.8f} {strategy.base_asset} @ ${sell_price:,.2f}",
+                                "INFO",
+                                current_price=sell_price
+                            )
+
+                    except Exception as inner:
+                        logger.error(f"[Reconcile] Error con API key {api_key.id}: {inner}")
+
+        except Exception as e:
+            logger.error(f"[Reconcile] Error general: {e}")
+
+    async def _send_sell_notification(self, api_key: TradingApiKey, buy_order: TradingOrder, sell_order_data: Dict,
+                                      profit_pct: float, reason: str, pnl_usdt: float = None):
+        """
+        Envía notificación de venta por Telegram
+        """
+        try:
+            emoji = "💰" if profit_pct > 0 else "📉"
+            pnl_display = f"${pnl_usdt:+.2f} ({profit_pct*100:+.2f}%)" if pnl_usdt is not None else f"{profit_pct*100:+.2f}%"
+
+            message = f"""
+{emoji} **VENTA {self.strategy.label.upper()} MAINNET EJECUTADA**
+
+📊 **Resultado de la operación:**
+• Ganancia/Pérdida: {pnl_display}
+• Precio de venta: ${sell_order_data['price']:.2f}
+• Cantidad: {sell_order_data['quantity']:.6f} {self.strategy.base_asset}
+• Total: ${sell_order_data['total_usdt']:.2f} USDT
+• Razón: {reason}
+
+🎯 **Resumen:**
+• Precio entrada: ${buy_order.executed_price or buy_order.price:.2f}
+• Precio salida: ${sell_order_data['price']:.2f}
+• Orden ID: {sell_order_data.get('order_id', 'N/A')}
+
+⚠️ **AMBIENTE MAINNET - DINERO REAL**
+            """
+
+            # await send_telegram_message(api_key.user_id, message)
+            logger.info(f"📱 Notificación Telegram Mainnet: {message}")
+
+        except Exception as e:
+            logger.error(f"Error enviando notificación de venta Mainnet: {e}")
@@ -0,0 +1,231 @@
+# backend/app/services/kline_event_source.py
+
+"""
+Fuente de eventos de cierre de vela para los scanners.
+
+Se apoya en BinanceWebSocket.subscribe_klines (src/binance_ws.py): cada vez que
+una vela de una serie (symbol, interval) llega con is_closed=True se incorpora al
+buffer del servicio de mercado y se despierta a los scanners que esperan esa serie.
+
+Si el WebSocket se cae o deja de enviar datos, un watchdog reconecta y rellena
+por REST las velas que se hayan cerrado durante el corte. Mientras tanto los
+scanners siguen despertando por timeout alineado al cierre teórico de la vela.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Set, Tuple
+import sys
+import os
+
+# Add src path for trading modules
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'src'))
+
+from app.services.market_data_service import market_data_service, INTERVAL_MS
+
+logger = logging.getLogger(__name__)
+
+
+class KlineEventSource:
+    """Despacha eventos de cierre de vela (WebSocket + backfill REST) a los scanners"""
+
+    def __init__(self):
+        self.config = {
+            'stale_after_seconds': 90,      # Sin mensajes en este tiempo => reconectar
+            'watchdog_interval': 30,
+            'close_grace_seconds': 20,      # Margen tras el cierre teórico si no llega el evento
+            'reconnect_backoff_max': 300,
+        }
+        self._ws = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._series: Set[Tuple[str, str]] = set()
+        self._events: Dict[Tuple[str, str], asyncio.Event] = {}
+        # Último open_time de vela cerrada notificado por serie
+        self._last_closed: Dict[Tuple[str, str], int] = {}
+        self._watchdog_task: Optional[asyncio.Task] = None
+        self._reconnect_attempts = 0
+        self.stats = {'closes': 0, 'reconnects': 0, 'backfills': 0}
+
+    # ------------------------------------------------------------------
+    # API para scanners
+    # ------------------------------------------------------------------
+    async def wait_for_close(self, symbol: str, interval: str, timeout: Optional[float] = None,
+                             stop_event: Optional[asyncio.Event] = None) -> bool:
+        """
+        Espera el cierre de la próxima vela de la serie.
+
+        Args:
+            timeout: Segundos máximos de espera. Por defecto, hasta el cierre teórico
+                     de la vela actual más un margen (respaldo si el WebSocket no avisa).
+            stop_event: Evento opcional que interrumpe la espera (parada del scanner)
+
+        Returns:
+            True si se recibió el cierre, False si terminó por timeout o parada
+        """
+        key = (symbol, interval)
+        self._ensure_subscribed(key)
+
+        if timeout is None:
+            interval_ms = INTERVAL_MS.get(interval, 3_600_000)
+            now_ms = int(time.time() * 1000)
+            next_close_ms = (now_ms // interval_ms + 1) * interval_ms
+            timeout = (next_close_ms - now_ms) / 1000 + self.config['close_grace_seconds']
+
+        event = self._events[key]
+        waiters = [asyncio.ensure_future(event.wait())]
+        if stop_event is not None:
+            waiters.append(asyncio.ensure_future(stop_event.wait()))
+        try:
+            done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for w in waiters:
+                w.cancel()
+        return waiters[0] in done
+
+    # ------------------------------------------------------------------
+    # Suscripción y WebSocket
+    # ------------------------------------------------------------------
+    def _ensure_subscribed(self, key: Tuple[str, str]):
+        if key not in self._events:
+            self._events[key] = asyncio.Event()
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        if self._watchdog_task is None or self._watchdog_task.done():
+            self._watchdog_task = asyncio.create_task(self._watchdog())
+        if key in self._series:
+            return
+        self._series.add(key)
+        if self._ws is not None and self._ws.is_connected:
+            self._subscribe_series(key)
+
+    def _subscribe_series(self, key: Tuple[str, str]):
+        symbol, interval = key
+        try:
+            self._ws.subscribe_klines(symbol, interval, callback=self._on_kline_threadsafe)
+        except Exception as e:
+            logger.error(f"❌ Error suscribiendo velas {symbol} {interval}: {e}")
+
+    def _connect(self) -> bool:
+        from binance_ws import BinanceWebSocket
+
+        self._disconnect()
+        try:
+            # Los scanners operan con datos de mainnet
+            self._ws = BinanceWebSocket(use_testnet=False)
+            self._ws.start()
+        except Exception as e:
+            logger.error(f"❌ No se pudo conectar el WebSocket de velas: {e}")
+            self._ws = None
+            return False
+        for key in list(self._series):
+            self._subscribe_series(key)
+        logger.info(f"🔌 WebSocket de velas conectado ({len(self._series)} series)")
+        return True
+
+    def _disconnect(self):
+        if self._ws is not None:
+            try:
+                self._ws.stop()
+            except Exception:
+                pass
+        self._ws = None
+
+    def _on_kline_threadsafe(self, kline_data: Dict):
+        """Callback del hilo del WebSocket: reenvía la vela al event loop"""
+        if not kline_data.get('is_closed') or self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._on_closed_kline, kline_data)
+
+    def _on_closed_kline(self, kline_data: Dict):
+        key = (kline_data['symbol'], kline_data['interval'])
+        if key not in self._series:
+            return
+        market_data_service.apply_closed_kline(key[0], key[1], kline_data)
+        self._fire(key, kline_data['timestamp'])
+
+    def _fire(self, key: Tuple[str, str], open_time: int):
+        """Notifica el cierre de la vela `open_time` una sola vez"""
+        if open_time <= self._last_closed.get(key, 0):
+            return
+        self._last_closed[key] = open_time
+        self.stats['closes'] += 1
+        logger.info(f"🕯️ Vela cerrada {key[0]} {key[1]} - despertando scanners")
+        event = self._events[key]
+        event.set()
+        # Los próximos waiters esperan la siguiente vela
+        self._events[key] = asyncio.Event()
+
+    # ------------------------------------------------------------------
+    # Watchdog: reconexión y backfill REST
+    # ------------------------------------------------------------------
+    async def _watchdog(self):
+        while self._series:
+            try:
+                ws = self._ws
+                stale = (
+                    ws is None or not ws.is_connected or
+                    ws.last_message_time is None or
+                    time.time() - ws.last_message_time > self.config['stale_after_seconds']
+                )
+                if stale:
+                    if ws is not None:
+                        logger.warning("⚠️ WebSocket de velas caído o sin datos, reconectando...")
+                    # El cliente del conector es bloqueante: conectar fuera del event loop
+                    connected = await asyncio.get_running_loop().run_in_executor(None, self._connect)
+                    if connected:
+                        self._reconnect_attempts = 0
+                        self.stats['reconnects'] += 1
+                        await self._backfill()
+                    else:
+                        self._reconnect_attempts += 1
+                        backoff = min(2 ** self._reconnect_attempts, self.config['reconnect_backoff_max'])
+                        await asyncio.sleep(backoff)
+                        continue
+                await asyncio.sleep(self.config['watchdog_interval'])
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Error en watchdog de velas: {e}")
+                await asyncio.sleep(self.config['watchdog_interval'])
+
+    async def _backfill(self):
+        """Completa por REST las velas cerradas mientras no había WebSocket"""
+        for key in list(self._series):
+            symbol, interval = key
+            interval_ms = INTERVAL_MS.get(interval)
+            if not interval_ms:
+                continue
+            market_data_service.invalidate(symbol, interval)
+            window = await market_data_service.get_window(symbol, interval, 2)
+            if window is None or len(window) < 2:
+                continue
+            # La última vela es la que está en formación; la anterior es la última cerrada
+            last_closed = int(window.open_time[-2])
+            previous = self._last_closed.get(key)
+            if previous is None:
+                # Primera conexión: no hay cierres pendientes que notificar
+                self._last_closed[key] = last_closed
+            elif last_closed > previous:
+                self.stats['backfills'] += 1
+                logger.info(f"🔁 Backfill REST {symbol} {interval}: {(last_closed - previous) // interval_ms} vela(s) cerrada(s) durante el corte")
+                self._fire(key, last_closed)
+
+    async def stop(self):
+        """Detiene el WebSocket y el watchdog (shutdown de la app)"""
+        if self._watchdog_task is not None:
+            self._watchdog_task.cancel()
+            self._watchdog_task = None
+        self._disconnect()
+        self._series.clear()
+
+    def get_status(self) -> Dict:
+        return {
+            'connected': bool(self._ws and self._ws.is_connected),
+            'series': [f"{s} {i}" for s, i in sorted(self._series)],
+            **self.stats,
+        }
+
+
+# Instancia global de la fuente de eventos
+kline_event_source = KlineEventSource()
@@ -0,0 +1,322 @@
+# backend/app/services/market_data_service.py
+
+"""
+Servicio compartido de datos de mercado (Binance REST asíncrono).
+
+Todos los scanners, ejecutores y rutas (/current-price) piden velas y precios
+a este servicio en lugar de llamar a Binance con requests.get bloqueante.
+Cada serie (symbol, interval) se descarga una sola vez por ventana de refresco
+aunque la consuman varios scanners, y las peticiones concurrentes sobre la
+misma serie esperan a la descarga en curso en vez de lanzar otra.
+
+Las velas cerradas se guardan también en el almacén local
+(trading_core.ohlcv_store): al arrancar, una serie se siembra desde disco y
+solo se descargan las velas posteriores a la última guardada.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from app.services.candle_buffer import CandleRingBuffer, CandleWindow
+from trading_core.ohlcv_store import INTERVAL_MS, OHLCVStore
+
+logger = logging.getLogger(__name__)
+
+
+class MarketDataService:
+    """Fuente única de velas y precios de Binance para todo el backend"""
+
+    def __init__(self):
+        self.config = {
+            'spot_base_url': 'https://api.binance.com',
+            'futures_base_url': 'https://fapi.binance.com',
+            'timeout': 10,
+            'max_retries': 3,
+            # La vela en formación cambia: se refresca como máximo cada N segundos
+            'klines_refresh_seconds': 15,
+            'price_ttl_seconds': 2,
+            # Guardar velas cerradas en el almacén local y sembrar desde él
+            'use_ohlcv_store': True,
+        }
+        self._client: Optional[httpx.AsyncClient] = None
+        # (symbol, interval) -> buffer de velas y momento del último refresco
+        self._buffers: Dict[Tuple[str, str], CandleRingBuffer] = {}
+        self._refreshed_at: Dict[Tuple[str, str], float] = {}
+        # (market, symbol) -> (precio, monotonic)
+        self._price_cache: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._locks: Dict[Tuple, asyncio.Lock] = {}
+        self._store: Optional[OHLCVStore] = None
+        self.stats = {'requests': 0, 'cache_hits': 0, 'errors': 0, 'seeds': 0, 'store_seeds': 0,
+                      'delta_candles': 0}
+
+    # ------------------------------------------------------------------
+    # Cliente HTTP
+    # ------------------------------------------------------------------
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.config['timeout'],
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+            )
+        return self._client
+
+    async def close(self):
+        """Cierra el cliente HTTP (llamado en el shutdown de la app)"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    def _get_lock(self, key: Tuple) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[key] = lock
+        return lock
+
+    async def _get_json(self, url: str, params: Dict):
+        """GET con reintentos y backoff exponencial"""
+        max_retries = self.config['max_retries']
+        for retry in range(max_retries):
+            try:
+                self.stats['requests'] += 1
+                response = await self._get_client().get(url, params=params)
+                response.raise_for_status()
+                return response.json()
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                logger.warning(f"🌐 Error de red en {url} (intento {retry + 1}/{max_retries}): {e}")
+            except httpx.HTTPStatusError as e:
+                logger.warning(f"⚠️ Binance respondió {e.response.status_code} en {url}: {e.response.text[:200]}")
+                # Errores 4xx distintos de rate limit no se reintentan
+                if e.response.status_code < 500 and e.response.status_code not in (418, 429):
+                    break
+            if retry < max_retries - 1:
+                await asyncio.sleep(2 ** retry)
+        self.stats['errors'] += 1
+        return None
+
+    # ------------------------------------------------------------------
+    # Velas
+    # ------------------------------------------------------------------
+    def _is_fresh(self, key: Tuple[str, str], limit: int) -> bool:
+        buffer = self._buffers.get(key)
+        if buffer is None or len(buffer) == 0 or buffer.capacity < limit:
+            return False
+        age = time.monotonic() - self._refreshed_at.get(key, 0.0)
+        if age > self.config['klines_refresh_seconds']:
+            return False
+        # Si cerró una vela desde la última descarga, hay que refrescar
+        interval_ms = INTERVAL_MS.get(key[1])
+        if interval_ms:
+            now_ms = int(time.time() * 1000)
+            if now_ms // interval_ms * interval_ms != buffer.last_open_time:
+                return False
+        return True
+
+    async def _fetch_klines(self, symbol: str, interval: str, limit: int, start_time: Optional[int] = None) -> Optional[list]:
+        params = {'symbol': symbol, 'interval': interval, 'limit': limit}
+        if start_time is not None:
+            params['startTime'] = start_time
+        return await self._get_json(f"{self.config['spot_base_url']}/api/v3/klines", params)
+
+    async def _refresh_series(self, key: Tuple[str, str], limit: int) -> Optional[CandleRingBuffer]:
+        """Siembra el buffer la primera vez y luego solo descarga las velas nuevas"""
+        symbol, interval = key
+        buffer = self._buffers.get(key)
+        interval_ms = INTERVAL_MS.get(interval)
+
+        needs_seed = buffer is None or len(buffer) == 0 or buffer.capacity < limit or not interval_ms
+        if not needs_seed:
+            # Si faltan más velas de las que caben en el buffer, es más barato resembrar
+            now_open = int(time.time() * 1000) // interval_ms * interval_ms
+            missing = (now_open - buffer.last_open_time) // interval_ms
+            needs_seed = missing >= buffer.capacity
+
+        try:
+            if needs_seed:
+                capacity = min(max(limit, buffer.capacity if buffer else 0), 1000)
+                stored = self._seed_from_store(symbol, interval, capacity)
+                if stored is not None:
+                    buffer = stored
+                    needs_seed = False
+            if needs_seed:
+                klines = await self._fetch_klines(symbol, interval, capacity)
+                if not klines:
+                    return None
+                buffer = CandleRingBuffer(symbol, interval, capacity)
+                buffer.extend(klines)
+                self.stats['seeds'] += 1
+                logger.info(f"🧱 Buffer {symbol} {interval} sembrado con {len(buffer)} velas")
+            else:
+                # startTime = vela en formación: se reescribe y se agregan las cerradas desde entonces
+                klines = await self._fetch_klines(symbol, interval, 1000, start_time=buffer.last_open_time)
+                if not klines:
+                    return None
+                buffer.extend(klines)
+                self.stats['delta_candles'] += len(klines)
+            self._persist(symbol, interval, klines)
+        except (ValueError, TypeError, IndexError) as e:
+            logger.error(f"❌ Datos inválidos recibidos de Binance para {symbol} {interval}: {e}")
+            return None
+
+        if np.isnan(buffer.window(limit).close).any():
+            logger.error(f"❌ Datos inválidos recibidos de Binance para {symbol} {interval}")
+            return None
+
+        self._buffers[key] = buffer
+        self._refreshed_at[key] = time.monotonic()
+        return buffer
+
+    # ------------------------------------------------------------------
+    # Almacén local
+    # ------------------------------------------------------------------
+    def _get_store(self) -> Optional[OHLCVStore]:
+        if not self.config['use_ohlcv_store']:
+            return None
+        if self._store is None:
+            self._store = OHLCVStore()
+        return self._store
+
+    def _seed_from_store(self, symbol: str, interval: str, capacity: int) -> Optional[CandleRingBuffer]:
+        """
+        Buffer con las últimas velas cerradas del almacén, si son contiguas y una
+        sola descarga incremental alcanza para llegar a la vela en formación.
+        """
+        store = self._get_store()
+        interval_ms = INTERVAL_MS.get(interval)
+        if store is None or not interval_ms:
+            return None
+        try:
+            last = store.last_open_time(symbol, interval)
+            if last is None:
+                return None
+            now_open = int(time.time() * 1000) // interval_ms * interval_ms
+            missing = (now_open - last) // interval_ms
+            if missing >= capacity:
+                return None
+            # La descarga incremental agrega `missing` velas (hasta la vela en formación)
+            candles = store.read(symbol, interval, start=now_open - (capacity - 1) * interval_ms)
+        except OSError as e:
+            logger.warning(f"⚠️ No se pudo leer el almacén local de {symbol} {interval}: {e}")
+            return None
+        if len(candles) < capacity - missing or np.any(np.diff(candles.open_time) != interval_ms):
+            return None
+        buffer = CandleRingBuffer(symbol, interval, capacity)
+        buffer.extend(np.column_stack(candles).tolist())
+        self.stats['store_seeds'] += 1
+        logger.info(f"💾 Buffer {symbol} {interval} sembrado desde el almacén local ({len(buffer)} velas)")
+        return buffer
+
+    def _persist(self, symbol: str, interval: str, klines: list):
+        """Guarda en el almacén local las velas cerradas recibidas"""
+        store = self._get_store()
+        if store is None or interval not in INTERVAL_MS:
+            return
+        try:
+            store.append(symbol, interval, klines)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ No se pudieron guardar velas de {symbol} {interval}: {e}")
+
+    async def _get_series(self, symbol: str, interval: str, limit: int) -> Optional[CandleRingBuffer]:
+        key = (symbol, interval)
+        if self._is_fresh(key, limit):
+            self.stats['cache_hits'] += 1
+            return self._buffers[key]
+
+        async with self._get_lock(key):
+            # Otro consumidor pudo haber actualizado la serie mientras esperábamos
+            if self._is_fresh(key, limit):
+                self.stats['cache_hits'] += 1
+                return self._buffers[key]
+            return await self._refresh_series(key, limit)
+
+    async def get_window(self, symbol: str, interval: str, limit: int = 120) -> Optional[CandleWindow]:
+        """Últimas `limit` velas como vistas NumPy de solo lectura (sin copia)"""
+        buffer = await self._get_series(symbol, interval, limit)
+        if buffer is None:
+            return None
+        return buffer.window(limit)
+
+    async def get_klines(self, symbol: str, interval: str, limit: int = 120) -> Optional[pd.DataFrame]:
+        """
+        Devuelve las últimas `limit` velas de la serie como DataFrame indexado por timestamp
+        (mismo formato que los antiguos _get_binance_data). Incluye la vela en formación.
+        Las columnas OHLCV son de solo lectura y comparten memoria con el buffer.
+        """
+        buffer = await self._get_series(symbol, interval, limit)
+        if buffer is None:
+            return None
+        return buffer.to_dataframe(limit)
+
+    def apply_closed_kline(self, symbol: str, interval: str, kline: Dict) -> bool:
+        """
+        Incorpora al buffer una vela cerrada recibida por WebSocket.
+        Si no es contigua a la última almacenada (hueco), invalida la serie para que
+        el próximo consumidor la complete por REST. Devuelve True si se aplicó.
+        """
+        key = (symbol, interval)
+        buffer = self._buffers.get(key)
+        interval_ms = INTERVAL_MS.get(interval)
+        if buffer is None or len(buffer) == 0 or not interval_ms:
+            return False
+        open_time = int(kline['timestamp'])
+        if open_time > buffer.last_open_time + interval_ms:
+            logger.warning(f"⚠️ Hueco en {symbol} {interval}: se completará por REST")
+            self.invalidate(symbol, interval)
+            return False
+        row = [open_time, kline['open'], kline['high'], kline['low'], kline['close'], kline['volume']]
+        buffer.extend([row])
+        self._persist(symbol, interval, [row])
+        return True
+
+    def invalidate(self, symbol: str, interval: str):
+        """Fuerza un refresco REST en la próxima lectura de la serie"""
+        self._refreshed_at.pop((symbol, interval), None)
+
+    # ------------------------------------------------------------------
+    # Precios
+    # ------------------------------------------------------------------
+    async def get_price(self, symbol: str, market: str = 'spot') -> Optional[float]:
+        """Precio actual (market='spot' o 'futures'); futures cae a spot si falla"""
+        key = (market, symbol)
+        cached = self._price_cache.get(key)
+        if cached and time.monotonic() - cached[1] < self.config['price_ttl_seconds']:
+            self.stats['cache_hits'] += 1
+            return cached[0]
+
+        async with self._get_lock(('price',) + key):
+            cached = self._price_cache.get(key)
+            if cached and time.monotonic() - cached[1] < self.config['price_ttl_seconds']:
+                self.stats['cache_hits'] += 1
+                return cached[0]
+
+            if market == 'futures':
+                url = f"{self.config['futures_base_url']}/fapi/v1/ticker/price"
+            else:
+                url = f"{self.config['spot_base_url']}/api/v3/ticker/price"
+
+            data = await self._get_json(url, {'symbol': symbol})
+            if not data or 'price' not in data:
+                if market == 'futures':
+                    logger.warning(f"⚠️ Sin precio futures para {symbol}, usando spot")
+                    return await self.get_price(symbol, 'spot')
+                return None
+
+            price = float(data['price'])
+            self._price_cache[key] = (price, time.monotonic())
+            return price
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            'series_cached': {f"{s} {i}": len(b) for (s, i), b in self._buffers.items()},
+        }
+
+
+# Instancia global del servicio
+market_data_service = MarketDataService()
@@ -0,0 +1,326 @@
+# backend/app/services/paper_exchange.py
+
+"""
+Binance Futures simulado en memoria para el modo replay.
+
+Los executors hablan con Binance con `requests.get/post` firmados (HMAC) sobre
+fapi.binance.com. PaperExchange expone la misma interfaz (`get`, `post`,
+`delete` con url, params/data y headers) y el harness de replay lo coloca en
+lugar del módulo `requests` de los executors, así el código de producción corre
+sin cambios contra una cuenta local:
+
+  - /fapi/v2/account, /fapi/v2/balance, /fapi/v2/positionRisk
+  - /fapi/v1/marginType, /fapi/v1/leverage
+  - /fapi/v1/order (MARKET, posición LONG, respuesta tipo RESULT: FILLED + avgPrice)
+  - /fapi/v1/userTrades, /fapi/v1/exchangeInfo, /fapi/v1/ticker/price
+  - /api/v3/myTrades (spot: siempre vacío, la cuenta solo opera futuros)
+
+Las órdenes se llenan al precio del reloj virtual (`price_source`), con
+comisión `fee_rate` sobre el nocional y margen = nocional / leverage. Las
+firmas no se validan. Un endpoint no soportado responde 400 (código -1) y
+queda contado en `unsupported`.
+"""
+
+import json
+import logging
+from collections import Counter
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Filtros de BTCUSDT en Binance Futures; el resto de símbolos usa los mismos salvo override
+DEFAULT_SYMBOL_FILTERS = {
+    'tickSize': '0.10',
+    'stepSize': '0.001',
+    'minQty': '0.001',
+    'notional': '100',
+}
+
+
+class PaperResponse:
+    """Lo que los executors usan de requests.Response"""
+
+    def __init__(self, url: str, status_code: int, payload: Any):
+        self.url = url
+        self.status_code = status_code
+        self._payload = payload
+        self.text = json.dumps(payload)
+        self.elapsed = timedelta(0)
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def json(self) -> Any:
+        return self._payload
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} para {self.url}", response=self)
+
+
+class PaperExchange:
+    """Cuenta de futuros local (margen aislado, solo LONG) con la interfaz de `requests`"""
+
+    def __init__(self, price_source: Callable[[str], Optional[float]], clock_ms: Callable[[], int],
+                 balance: float = 1000.0, fee_rate: float = 0.0004,
+                 symbol_filters: Optional[Dict[str, Dict[str, str]]] = None):
+        self.price_source = price_source
+        self.clock_ms = clock_ms
+        self.wallet = balance
+        self.fee_rate = fee_rate
+        self.symbol_filters = symbol_filters or {}
+        # symbol -> {'qty', 'entry_price', 'margin', 'leverage'}
+        self.positions: Dict[str, Dict[str, float]] = {}
+        self.leverage: Dict[str, int] = {}
+        self.margin_type: Dict[str, str] = {}
+        self.fills: List[Dict[str, Any]] = []
+        self.unsupported: Counter = Counter()
+        self._next_id = 1
+
+    # ------------------------------------------------------------------
+    # Interfaz de requests
+
+    def get(self, url: str, params: Optional[Dict] = None, **kwargs) -> PaperResponse:
+        return self._dispatch('GET', url, params, kwargs.get('data'))
+
+    def post(self, url: str, data: Any = None, params: Optional[Dict] = None, **kwargs) -> PaperResponse:
+        return self._dispatch('POST', url, params, data)
+
+    def delete(self, url: str, params: Optional[Dict] = None, **kwargs) -> PaperResponse:
+        return self._dispatch('DELETE', url, params, kwargs.get('data'))
+
+    def _dispatch(self, method: str, url: str, params: Optional[Dict], data: Any) -> PaperResponse:
+        parts = urlsplit(url)
+        query = dict(parse_qsl(parts.query))
+        query.update(params or {})
+        if isinstance(data, (str, bytes)):
+            query.update(parse_qsl(data.decode() if isinstance(data, bytes) else data))
+        elif isinstance(data, dict):
+            query.update(data)
+        handler = self._routes().get((method, parts.path))
+        if handler is None:
+            self.unsupported[f"{method} {parts.path}"] += 1
+            if self.unsupported[f"{method} {parts.path}"] == 1:
+                logger.warning(f"⚠️ PaperExchange: endpoint no soportado {method} {parts.path}")
+            return PaperResponse(url, 400, {'code': -1, 'msg': f"Paper: endpoint no soportado {parts.path}"})
+        status, payload = handler(query)
+        return PaperResponse(url, status, payload)
+
+    def _routes(self) -> Dict:
+        return {
+            ('GET', '/fapi/v2/account'): self._account,
+            ('GET', '/fapi/v2/balance'): self._balance,
+            ('GET', '/fapi/v2/positionRisk'): self._position_risk,
+            ('POST', '/fapi/v1/marginType'): self._set_margin_type,
+            ('POST', '/fapi/v1/leverage'): self._set_leverage,
+            ('POST', '/fapi/v1/order'): self._order,
+            ('GET', '/fapi/v1/userTrades'): self._user_trades,
+            ('GET', '/fapi/v1/exchangeInfo'): self._exchange_info,
+            ('GET', '/fapi/v1/ticker/price'): self._ticker,
+            ('GET', '/api/v3/ticker/price'): self._ticker,
+            ('GET', '/api/v3/myTrades'): lambda query: (200, []),
+        }
+
+    # ------------------------------------------------------------------
+    # Cuenta
+
+    @property
+    def margin_used(self) -> float:
+        return sum(position['margin'] for position in self.positions.values())
+
+    def unrealized_pnl(self) -> float:
+        total = 0.0
+        for symbol, position in self.positions.items():
+            price = self.price_source(symbol)
+            if price:
+                total += (price - position['entry_price']) * position['qty']
+        return total
+
+    def equity(self) -> float:
+        return self.wallet + self.unrealized_pnl()
+
+    def _account(self, query: Dict):
+        unrealized = self.unrealized_pnl()
+        return 200, {
+            'totalWalletBalance': f"{self.wallet:.8f}",
+            'totalUnrealizedProfit': f"{unrealized:.8f}",
+            'totalMarginBalance': f"{self.wallet + unrealized:.8f}",
+            'totalPositionInitialMargin': f"{self.margin_used:.8f}",
+            'availableBalance': f"{self.wallet - self.margin_used:.8f}",
+            'maxWithdrawAmount': f"{self.wallet - self.margin_used:.8f}",
+            'assets': [{'asset': 'USDT', 'walletBalance': f"{self.wallet:.8f}",
+                        'availableBalance': f"{self.wallet - self.margin_used:.8f}"}],
+            'positions': self._position_risk(query)[1],
+        }
+
+    def _balance(self, query: Dict):
+        return 200, [{'asset': 'USDT', 'balance': f"{self.wallet:.8f}",
+                      'availableBalance': f"{self.wallet - self.margin_used:.8f}"}]
+
+    def _position_risk(self, query: Dict):
+        # Como Binance: también los símbolos configurados sin posición abierta
+        rows = []
+        for symbol in sorted(set(self.positions) | set(self.leverage) | set(self.margin_type)):
+            if query.get('symbol') not in (None, symbol):
+                continue
+            position = self.positions.get(symbol)
+            qty = position['qty'] if position else 0.0
+            entry_price = position['entry_price'] if position else 0.0
+            price = self.price_source(symbol) or entry_price
+            rows.append({
+                'symbol': symbol,
+                'positionSide': 'LONG',
+                'positionAmt': f"{qty:.8f}",
+                'entryPrice': f"{entry_price:.8f}",
+                'markPrice': f"{price:.8f}",
+                'unRealizedProfit': f"{(price - entry_price) * qty:.8f}",
+                'isolatedMargin': f"{position['margin'] if position else 0.0:.8f}",
+                'leverage': str(int(position['leverage'] if position else self.leverage.get(symbol, 1))),
+                'marginType': self.margin_type.get(symbol, 'isolated').lower(),
+            })
+        return 200, rows
+
+    def _set_margin_type(self, query: Dict):
+        symbol = query.get('symbol')
+        margin_type = query.get('marginType', 'ISOLATED')
+        if self.margin_type.get(symbol) == margin_type:
+            return 400, {'code': -4046, 'msg': 'No need to change margin type.'}
+        self.margin_type[symbol] = margin_type
+        return 200, {'code': 200, 'msg': 'success'}
+
+    def _set_leverage(self, query: Dict):
+        symbol = query.get('symbol')
+        self.leverage[symbol] = int(query.get('leverage', 1))
+        return 200, {'symbol': symbol, 'leverage': self.leverage[symbol], 'maxNotionalValue': '1000000'}
+
+    # ------------------------------------------------------------------
+    # Órdenes
+
+    def _order(self, query: Dict):
+        symbol = query.get('symbol')
+        side = query.get('side')
+        if query.get('type', 'MARKET') != 'MARKET':
+            return 400, {'code': -1116, 'msg': 'Paper: solo órdenes MARKET'}
+        try:
+            qty = float(query['quantity'])
+        except (KeyError, ValueError):
+            return 400, {'code': -1102, 'msg': "Mandatory parameter 'quantity' was not sent, was empty/null, or malformed."}
+        price = self.price_source(symbol)
+        if not price or qty <= 0:
+            return 400, {'code': -1013, 'msg': 'Invalid quantity or price.'}
+
+        notional = qty * price
+        fee = notional * self.fee_rate
+        position = self.positions.get(symbol)
+        if side == 'BUY':
+            leverage = self.leverage.get(symbol, 1)
+            margin = notional / leverage
+            if self.wallet - self.margin_used < margin + fee:
+                return 400, {'code': -2019, 'msg': 'Margin is insufficient.'}
+            if position is None:
+                position = self.positions[symbol] = {'qty': 0.0, 'entry_price': price, 'margin': 0.0,
+                                                     'leverage': leverage}
+            total = position['qty'] + qty
+            position['entry_price'] = (position['entry_price'] * position['qty'] + notional) / total
+            position['qty'] = total
+            position['margin'] += margin
+            realized = 0.0
+        elif side == 'SELL':
+            if position is None or qty > position['qty'] + 1e-12:
+                return 400, {'code': -2022, 'msg': 'ReduceOnly Order is rejected.'}
+            realized = (price - position['entry_price']) * qty
+            position['margin'] *= 1 - qty / position['qty']
+            position['qty'] -= qty
+            if position['qty'] <= 1e-12:
+                del self.positions[symbol]
+        else:
+            return 400, {'code': -1117, 'msg': 'Invalid side.'}
+        self.wallet += realized - fee
+
+        order_id = self._next_id
+        self._next_id += 1
+        now_ms = self.clock_ms()
+        self.fills.append({
+            'id': order_id,
+            'orderId': order_id,
+            'symbol': symbol,
+            'side': side,
+            'price': price,
+            'qty': qty,
+            'quoteQty': notional,
+            'realizedPnl': realized,
+            'commission': fee,
+            'commissionAsset': 'USDT',
+            'time': now_ms,
+            'wallet': self.wallet,
+        })
+        return 200, {
+            'orderId': order_id,
+            'symbol': symbol,
+            'status': 'FILLED',
+            'clientOrderId': f"paper_{order_id}",
+            'price': '0',
+            'avgPrice': f"{price:.8f}",
+            'origQty': query['quantity'],
+            'executedQty': query['quantity'],
+            'cumQuote': f"{notional:.8f}",
+            'side': side,
+            'positionSide': query.get('positionSide', 'BOTH'),
+            'type': 'MARKET',
+            'updateTime': now_ms,
+        }
+
+    def _user_trades(self, query: Dict):
+        symbol = query.get('symbol')
+        trades = [{
+            'symbol': fill['symbol'],
+            'id': fill['id'],
+            'orderId': fill['orderId'],
+            'side': fill['side'],
+            'buyer': fill['side'] == 'BUY',
+            'price': f"{fill['price']:.8f}",
+            'qty': f"{fill['qty']:.8f}",
+            'quoteQty': f"{fill['quoteQty']:.8f}",
+            'realizedPnl': f"{fill['realizedPnl']:.8f}",
+            'commission': f"{fill['commission']:.8f}",
+            'commissionAsset': fill['commissionAsset'],
+            'positionSide': 'LONG',
+            'time': fill['time'],
+        } for fill in self.fills if symbol in (None, fill['symbol'])]
+        return 200, trades[-int(query.get('limit', 500)):]
+
+    # ------------------------------------------------------------------
+    # Mercado
+
+    def _exchange_info(self, query: Dict):
+        symbols = sorted({fill['symbol'] for fill in self.fills} | set(self.symbol_filters) | {'BTCUSDT'})
+        info = []
+        for symbol in symbols:
+            filters = {**DEFAULT_SYMBOL_FILTERS, **self.symbol_filters.get(symbol, {})}
+            info.append({
+                'symbol': symbol,
+                'status': 'TRADING',
+                'marginAsset': 'USDT',
+                'pricePrecision': 2,
+                'quantityPrecision': 3,
+                'baseAssetPrecision': 8,
+                'quotePrecision': 8,
+                'filters': [
+                    {'filterType': 'PRICE_FILTER', 'tickSize': filters['tickSize']},
+                    {'filterType': 'LOT_SIZE', 'stepSize': filters['stepSize'], 'minQty': filters['minQty']},
+                    {'filterType': 'MARKET_LOT_SIZE', 'stepSize': filters['stepSize'], 'minQty': filters['minQty']},
+                    {'filterType': 'MIN_NOTIONAL', 'notional': filters['notional']},
+                ],
+            })
+        return 200, {'symbols': info}
+
+    def _ticker(self, query: Dict):
+        price = self.price_source(query.get('symbol'))
+        if not price:
+            return 400, {'code': -1121, 'msg': 'Invalid symbol.'}
+        return 200, {'symbol': query.get('symbol'), 'price': f"{price:.8f}"}
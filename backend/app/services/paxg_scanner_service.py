@@ -18,6 +18,9 @@ from app.db.database import SessionLocal
 from app.db import crud_users, crud_alertas
 from app.schemas.alerta_schema import AlertaCreate
 from app.telegram.telegram_bot import telegram_bot
+from app.services.market_data_service import market_data_service
+from trading_core.indicators import atr_last
+from app.services.kline_event_source import kline_event_source
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -291,8 +294,10 @@ class PaxgScannerService:
             try:
                 await self._scan_cycle()
                 
-                # Esperar el intervalo configurado
-                await asyncio.sleep(self.config['scan_interval'])
+                # Esperar al cierre de la próxima vela (WebSocket). Con posición abierta se
+                # mantiene además la cadencia de scan_interval para vigilar TP/SL
+                timeout = self.config['scan_interval'] if self.current_state == "MONITORING_SELL" else None
+                await kline_event_source.wait_for_close(self.config['symbol'], self.config['timeframe'], timeout=timeout)
                 
             except asyncio.CancelledError:
                 logger.info("⏹️ Scanner PAXG cancelado")
@@ -460,63 +465,19 @@ class PaxgScannerService:
             self._add_log("ERROR", f"Error monitoreando ventas: {e}")
     
     async def _get_binance_data(self) -> Optional[pd.DataFrame]:
-        """Obtiene datos históricos de Binance para PAXG con reintentos"""
-        max_retries = 3
-        for retry in range(max_retries):
-            try:
-                # Obtener últimas 1000 velas de 4h (igual que backtest 2023)
-                url = "https://api.binance.com/api/v3/klines"
-                params = {
-                    'symbol': self.config['symbol'],
-                    'interval': self.config['timeframe'], 
-                    'limit': self.config['data_limit']  # 1000 velas
-                }
-                
-                response = requests.get(url, params=params, timeout=30)
-                response.raise_for_status()
-                
-                klines = response.json()
-                if not klines:
-                    raise ValueError("No se recibieron datos de Binance")
-                
-                # Convertir a DataFrame
-                df = pd.DataFrame(klines, columns=[
-                    'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                    'close_time', 'quote_volume', 'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'
-                ])
-                
-                # Convertir tipos con validación
-                for col in ['open', 'high', 'low', 'close', 'volume']:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-                
-                # Validar que no hay NaN
-                if df[['open', 'high', 'low', 'close']].isnull().any().any():
-                    raise ValueError("Datos inválidos recibidos de Binance")
-                
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                df.set_index('timestamp', inplace=True)
-                
-                logger.info(f"📊 PAXG Datos obtenidos: {len(df)} velas, último precio: ${df['close'].iloc[-1]:,.2f}")
-                return df
-                
-            except requests.exceptions.Timeout:
-                logger.warning(f"⏱️ PAXG Timeout en intento {retry + 1}/{max_retries}")
-                if retry < max_retries - 1:
-                    await asyncio.sleep(2 ** retry)  # Backoff exponencial
-                    continue
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"🌐 PAXG Error de red en intento {retry + 1}/{max_retries}: {e}")
-                if retry < max_retries - 1:
-                    await asyncio.sleep(2 ** retry)
-                    continue
-            except Exception as e:
-                logger.error(f"❌ PAXG Error en intento {retry + 1}/{max_retries}: {e}")
-                if retry < max_retries - 1:
-                    await asyncio.sleep(2 ** retry)
-                    continue
-        
-        logger.error("❌ PAXG No se pudieron obtener datos después de todos los intentos")
-        return None
+        """Obtiene datos históricos de Binance para PAXG (vía servicio compartido de mercado)"""
+        try:
+            # Una sola descarga por serie y vela aunque la pidan varios consumidores
+            df = await market_data_service.get_klines(self.config['symbol'], self.config['timeframe'], self.config['data_limit'])
+            if df is None or df.empty:
+                return None
+            
+            logger.info(f"📊 PAXG Datos obtenidos: {len(df)} velas, último precio: ${df['close'].iloc[-1]:,.2f}")
+            return df
+            
+        except Exception as e:
+            logger.error(f"❌ PAXG Error obteniendo datos: {e}")
+            return None
     
     def _detect_u_patterns(self, df: pd.DataFrame) -> List[Dict]:
         """Detecta patrones U en los datos (misma lógica que backtest 2023)"""
@@ -634,18 +595,16 @@ class PaxgScannerService:
     def _calculate_atr(self, df: pd.DataFrame, period: int = 14) -> float:
         """Calcula el Average True Range (misma lógica que backtest 2023)"""
         try:
-            high = df['high']
-            low = df['low']
-            close = df['close'].shift(1)
-            
-            tr1 = high - low
-            tr2 = abs(high - close)
-            tr3 = abs(low - close)
-            
-            true_range = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-            atr = true_range.rolling(window=period).mean().iloc[-1]
-            
-            return float(atr) if not pd.isna(atr) else 0.0
+            if len(df) <= period:
+                return 0.0
+            
+            # Indicador vectorizado compartido (media de los últimos `period` true range)
+            return float(atr_last(
+                df['high'].to_numpy(dtype=np.float64),
+                df['low'].to_numpy(dtype=np.float64),
+                df['close'].to_numpy(dtype=np.float64),
+                period
+            ))
             
         except Exception as e:
             logger.error(f"❌ Error calculando ATR PAXG: {e}")
@@ -0,0 +1,227 @@
+# backend/app/services/position_book.py
+
+"""
+Libro de posiciones en memoria para cerrar TP / SL / max hold al tick.
+
+Los scanners solo revisan las ventas en su ciclo (cada hora en 4h, cada 30
+minutos en 30m): una posición con 3x puede atravesar de sobra el stop del 3%
+entre dos revisiones. Aquí:
+
+  - al arrancar se cargan de TradingOrder las posiciones abiertas de todas las
+    estrategias de Futures (mismo agrupado que el executor)
+  - los executors llaman a `refresh` tras cada fill (compra, venta o venta
+    externa reconciliada), así el libro no vuelve a consultar la DB por tick
+  - un WebSocket de Binance Futures (<symbol>@markPrice@1s) entrega el mark
+    price y cada tick se evalúa en memoria con `exit_reason`, la misma regla
+    que usa el executor
+  - cuando una posición cruza un umbral se dispara la venta con ese precio
+    (FuturesStrategyExecutor.check_position), sin esperar al scanner
+
+El ciclo del scanner sigue revisando las ventas: si el WebSocket se cae, el
+libro reconecta con backoff y mientras tanto las posiciones se cierran como
+antes.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import websockets
+
+from app.db.database import SessionLocal
+from app.db.models import TradingApiKey
+from app.services.futures_strategy_executor import FUTURES_STRATEGIES, FuturesStrategyExecutor, exit_reason
+
+logger = logging.getLogger(__name__)
+
+
+class BookPosition(NamedTuple):
+    """Posición abierta (una compra o las partes de un mismo orderId)"""
+    strategy: str
+    api_key_id: int
+    quantity: float
+    invested: float
+    opened_at: datetime
+
+    @property
+    def entry_price(self) -> float:
+        return self.invested / self.quantity
+
+
+class PositionBook:
+    """Posiciones abiertas por símbolo evaluadas contra el mark price de Binance Futures"""
+
+    def __init__(self):
+        self.config = {
+            'stream_url': 'wss://fstream.binance.com/stream',
+            'stale_after_seconds': 30,      # Sin mensajes en este tiempo => reconectar
+            'reconnect_backoff_max': 60,
+            'retry_after_seconds': 10,      # Espera antes de reintentar una venta que no cerró la posición
+        }
+        self._executors = {name: FuturesStrategyExecutor(strategy) for name, strategy in FUTURES_STRATEGIES.items()}
+        # símbolo -> (estrategia, api_key_id) -> posiciones
+        self._positions: Dict[str, Dict[Tuple[str, int], List[BookPosition]]] = {
+            strategy.symbol: {} for strategy in FUTURES_STRATEGIES.values()
+        }
+        self._closing: Set[Tuple[str, int]] = set()
+        self._retry_at: Dict[Tuple[str, int], float] = {}
+        self._mark_prices: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        # Ventas en curso: el event loop solo guarda referencias débiles a las tareas
+        self._close_tasks: Set[asyncio.Task] = set()
+        self.running = False
+        self.stats = {'ticks': 0, 'triggers': 0, 'reconnects': 0}
+
+    # ------------------------------------------------------------------
+    # Carga y sincronización con la DB
+    # ------------------------------------------------------------------
+    def load(self):
+        """Carga todas las posiciones abiertas de las estrategias de Futures"""
+        db = SessionLocal()
+        try:
+            for name, strategy in FUTURES_STRATEGIES.items():
+                api_key_ids = [api_key_id for (api_key_id,) in db.query(TradingApiKey.id).filter(
+                    getattr(TradingApiKey, strategy.enabled_field) == True,
+                    TradingApiKey.is_active == True
+                ).all()]
+                for api_key_id in api_key_ids:
+                    self._load_account(db, name, api_key_id)
+        finally:
+            db.close()
+        total = sum(len(positions) for book in self._positions.values() for positions in book.values())
+        logger.info(f"📒 Position book: {total} posición(es) abierta(s) cargadas")
+
+    def refresh(self, strategy_name: str, api_key_id: int):
+        """Relee de la DB las posiciones de una estrategia y API key (tras un fill)"""
+        if not self.running:
+            return
+        db = SessionLocal()
+        try:
+            self._load_account(db, strategy_name, api_key_id)
+        except Exception as e:
+            logger.error(f"❌ Error refrescando position book ({strategy_name}, API key {api_key_id}): {e}")
+        finally:
+            db.close()
+
+    def _load_account(self, db, strategy_name: str, api_key_id: int):
+        executor = self._executors[strategy_name]
+        positions = []
+        for orders in executor._group_open_positions(db, api_key_id):
+            quantity = sum(float(order.executed_quantity or order.quantity or 0) for order in orders)
+            invested = sum(float(order.executed_quantity or order.quantity or 0) *
+                           float(order.executed_price or order.price or 0) for order in orders)
+            if quantity > 0 and invested > 0:
+                positions.append(BookPosition(strategy_name, api_key_id, quantity, invested, orders[0].created_at))
+        book = self._positions[executor.strategy.symbol]
+        if positions:
+            book[(strategy_name, api_key_id)] = positions
+        else:
+            book.pop((strategy_name, api_key_id), None)
+
+    # ------------------------------------------------------------------
+    # Evaluación por tick
+    # ------------------------------------------------------------------
+    def on_mark_price(self, symbol: str, price: float):
+        """Evalúa en memoria las posiciones del símbolo y dispara las ventas que correspondan"""
+        self._mark_prices[symbol] = price
+        self.stats['ticks'] += 1
+        book = self._positions.get(symbol)
+        if not book:
+            return
+        now = datetime.now()
+        for key, positions in list(book.items()):
+            if key in self._closing or self._retry_at.get(key, 0) > time.monotonic():
+                continue
+            strategy = self._executors[key[0]].strategy
+            for position in positions:
+                held = now - position.opened_at
+                if held < strategy.cooldown:
+                    continue
+                reason = exit_reason(strategy, price / position.entry_price - 1, held)
+                if reason:
+                    logger.info(f"⚡ Position book: {reason} {strategy.label} API key {key[1]} "
+                                f"(entrada ${position.entry_price:,.2f}, mark ${price:,.2f})")
+                    self._closing.add(key)
+                    self.stats['triggers'] += 1
+                    task = asyncio.create_task(self._close(key, price))
+                    self._close_tasks.add(task)
+                    task.add_done_callback(self._close_tasks.discard)
+                    break
+
+    async def _close(self, key: Tuple[str, int], price: float):
+        strategy_name, api_key_id = key
+        try:
+            await self._executors[strategy_name].check_position(api_key_id, price)
+        except Exception as e:
+            logger.error(f"❌ Error cerrando posición desde el position book ({strategy_name}, API key {api_key_id}): {e}")
+        finally:
+            self._closing.discard(key)
+            # Si la venta no cerró la posición (error en Binance), no reintentar en cada tick
+            if key in self._positions[self._executors[strategy_name].strategy.symbol]:
+                self._retry_at[key] = time.monotonic() + self.config['retry_after_seconds']
+            else:
+                self._retry_at.pop(key, None)
+
+    # ------------------------------------------------------------------
+    # WebSocket de mark price
+    # ------------------------------------------------------------------
+    def _stream_url(self) -> str:
+        streams = '/'.join(f"{symbol.lower()}@markPrice@1s" for symbol in sorted(self._positions))
+        return f"{self.config['stream_url']}?streams={streams}"
+
+    async def _run(self):
+        attempts = 0
+        while self.running:
+            try:
+                async with websockets.connect(self._stream_url(), ping_interval=20) as ws:
+                    logger.info(f"🔌 WebSocket de mark price conectado ({len(self._positions)} símbolos)")
+                    attempts = 0
+                    while self.running:
+                        message = await asyncio.wait_for(ws.recv(), timeout=self.config['stale_after_seconds'])
+                        data = json.loads(message).get('data') or {}
+                        if data.get('e') == 'markPriceUpdate':
+                            self.on_mark_price(data['s'], float(data['p']))
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                attempts += 1
+                self.stats['reconnects'] += 1
+                backoff = min(2 ** attempts, self.config['reconnect_backoff_max'])
+                logger.warning(f"⚠️ WebSocket de mark price caído ({e}), reconectando en {backoff}s...")
+                await asyncio.sleep(backoff)
+
+    async def start(self):
+        """Carga las posiciones y arranca el stream de mark price (startup de la app)"""
+        if self.running:
+            return
+        self.running = True
+        self.load()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Detiene el stream y las ventas en curso (shutdown de la app)"""
+        self.running = False
+        tasks = list(self._close_tasks)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._close_tasks.clear()
+
+    def get_status(self) -> Dict:
+        return {
+            'running': self.running,
+            'positions': {symbol: sum(len(positions) for positions in book.values())
+                          for symbol, book in self._positions.items()},
+            'mark_prices': dict(self._mark_prices),
+            **self.stats,
+        }
+
+
+# Instancia global del libro de posiciones
+position_book = PositionBook()
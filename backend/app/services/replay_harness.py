@@ -0,0 +1,598 @@
+# backend/app/services/replay_harness.py
+
+"""
+Replay de los scanners de producción sobre velas históricas con reloj virtual.
+
+Los backtests (trading_core.backtest_engine) replican la detección, pero no
+ejecutan el código que corre en el servidor: estados SEARCHING_BUY /
+MONITORING_SELL, readiness, cooldowns, executors, órdenes en la DB. Aquí se
+ejecutan los objetos reales (`bitcoin_scanner`, `bitcoin_30m_mainnet_scanner`
+y sus executors, con su propio loop `start_*`) cambiando solo sus fuentes
+externas:
+
+  - reloj: VirtualClock. Durante el replay `datetime.datetime` (módulo y
+    nombres `datetime` de los módulos app.*) devuelve la hora virtual en
+    `now()`; las filas nuevas de la DB toman created_at de ese reloj
+  - market_data_service -> ReplayMarketData: buffers CandleRingBuffer con las
+    velas cerradas hasta la hora virtual más la vela en formación (agregada
+    desde la serie más fina cargada del símbolo, o solo su apertura)
+  - kline_event_source -> ReplayKlineEvents: `wait_for_close` no espera, se
+    agenda; cuando todos los scanners están esperando, el reloj salta al
+    próximo cierre de vela (o al timeout del scanner, p. ej. scan_interval
+    en MONITORING_SELL) y se despierta a ese scanner
+  - `requests` de los executors -> PaperExchange (app.services.paper_exchange)
+  - DB: SQLite temporal con un usuario y una API key habilitada por scanner
+    (prepare_database debe llamarse antes de importar app.db)
+
+Se mide por ciclo: estado al terminar, latencia real del ciclo (desde que se
+despierta al scanner hasta su siguiente wait_for_close) y señales devueltas por
+el detector. El reporte (ReplayReport) incluye además las transiciones de
+estado, los fills del paper exchange y las órdenes que quedaron en la DB.
+
+Las esperas con `asyncio.sleep` (backoff tras errores) siguen siendo reales.
+"""
+
+import asyncio
+import datetime as datetime_module
+import heapq
+import importlib
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.candle_buffer import CandleRingBuffer, CandleWindow
+from app.services.paper_exchange import PaperExchange
+from trading_core.ohlcv_store import INTERVAL_MS
+
+logger = logging.getLogger(__name__)
+
+_REAL_DATETIME = datetime_module.datetime
+_EPOCH = _REAL_DATETIME(1970, 1, 1)
+
+# Capacidad de los buffers (market_data_service siembra como máximo 1000 velas)
+BUFFER_CAPACITY = 1000
+
+
+class ReplayTarget(NamedTuple):
+    """Cómo arrancar, parar y observar un scanner de producción"""
+    module: str
+    attr: str              # instancia global del scanner
+    symbol: str
+    interval: str
+    start: str             # método async que lanza el loop
+    stop: str
+    detect: str            # método de detección (se registran sus señales)
+    enabled_field: str     # columna de TradingApiKey que habilita su executor
+    allocated_field: str
+
+
+REPLAY_TARGETS = {
+    'btc_4h': ReplayTarget('app.services.bitcoin_scanner_service', 'bitcoin_scanner', 'BTCUSDT', '4h',
+                           'start_scanning', 'stop_scanning', '_detect_u_patterns_2023',
+                           'btc_4h_mainnet_enabled', 'btc_4h_mainnet_allocated_usdt'),
+    'btc_30m': ReplayTarget('app.services.bitcoin30m_mainnet', 'bitcoin_30m_mainnet_scanner', 'BTCUSDT', '30m',
+                            'start_scanner', 'stop_scanner', '_detect_u_patterns_30min',
+                            'btc_30m_mainnet_enabled', 'btc_30m_mainnet_allocated_usdt'),
+}
+
+
+class ReplayReport(NamedTuple):
+    cycles: pd.DataFrame       # scanner, time, woke_by ('close' | 'timeout' | 'start'), state, latency_ms
+    transitions: pd.DataFrame  # scanner, time, from_state, to_state
+    signals: pd.DataFrame      # scanner, time, entry_price, depth, signal_strength
+    fills: pd.DataFrame        # fills del paper exchange
+    orders: pd.DataFrame       # trading_orders de la DB al terminar
+    candles: int               # velas cerradas entregadas a los scanners
+    wall_seconds: float
+    initial_balance: float
+    final_wallet: float
+    final_equity: float
+
+
+# ----------------------------------------------------------------------
+# Reloj
+
+class VirtualClock:
+    """Hora del replay en ms UTC (naive, como los timestamps de las velas)"""
+
+    def __init__(self, start_ms: int):
+        self.now_ms = int(start_ms)
+
+    def now(self) -> datetime_module.datetime:
+        return _EPOCH + datetime_module.timedelta(milliseconds=self.now_ms)
+
+    def time(self) -> float:
+        return self.now_ms / 1000
+
+    def advance_to(self, ms: int):
+        if ms < self.now_ms:
+            raise ValueError("El reloj virtual no puede retroceder")
+        self.now_ms = int(ms)
+
+
+class _VirtualDatetimeMeta(type(_REAL_DATETIME)):
+    def __instancecheck__(cls, instance):
+        return isinstance(instance, _REAL_DATETIME)
+
+    def __subclasscheck__(cls, subclass):
+        return issubclass(subclass, _REAL_DATETIME)
+
+
+class _VirtualDatetime(_REAL_DATETIME, metaclass=_VirtualDatetimeMeta):
+    """datetime cuyo now()/utcnow()/today() leen el reloj virtual activo"""
+    clock: Optional[VirtualClock] = None
+
+    @classmethod
+    def now(cls, tz=None):
+        moment = cls.clock.now()
+        if tz is None:
+            return moment
+        return moment.replace(tzinfo=datetime_module.timezone.utc).astimezone(tz)
+
+    @classmethod
+    def utcnow(cls):
+        return cls.clock.now()
+
+    @classmethod
+    def today(cls):
+        return cls.clock.now()
+
+
+@contextmanager
+def _patched_globals(replacements: List[Tuple[Any, Any]], prefix: str = 'app.') -> Iterator[None]:
+    """Sustituye (por identidad) los nombres globales de los módulos `prefix*` ya importados"""
+    swapped = []
+    for name, module in list(sys.modules.items()):
+        if module is None or not name.startswith(prefix) or name == __name__:
+            continue
+        namespace = vars(module)
+        for key, value in list(namespace.items()):
+            for old, new in replacements:
+                if value is old:
+                    namespace[key] = new
+                    swapped.append((namespace, key, old))
+                    break
+    try:
+        yield
+    finally:
+        for namespace, key, old in swapped:
+            namespace[key] = old
+
+
+@contextmanager
+def virtual_time(clock: VirtualClock) -> Iterator[None]:
+    """datetime.now() virtual para los módulos app.* (también en `from datetime import` locales)"""
+    _VirtualDatetime.clock = clock
+    datetime_module.datetime = _VirtualDatetime
+    try:
+        with _patched_globals([(_REAL_DATETIME, _VirtualDatetime)]):
+            yield
+    finally:
+        datetime_module.datetime = _REAL_DATETIME
+        _VirtualDatetime.clock = None
+
+
+# ----------------------------------------------------------------------
+# Mercado
+
+class _Series:
+    def __init__(self, symbol: str, interval: str, df: pd.DataFrame):
+        self.symbol = symbol
+        self.interval = interval
+        self.interval_ms = INTERVAL_MS[interval]
+        self.open_time = df.index.as_unit('ms').asi8.astype(np.int64)
+        self.close_time = self.open_time + self.interval_ms
+        self.values = df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=np.float64)
+        self.buffer = CandleRingBuffer(symbol, interval, BUFFER_CAPACITY)
+        self.closed = 0  # velas cerradas ya entregadas al buffer
+
+
+class ReplayMarketData:
+    """Sustituto de market_data_service: las series avanzan con el reloj virtual"""
+
+    def __init__(self, clock: VirtualClock, frames: Dict[Tuple[str, str], pd.DataFrame]):
+        self.clock = clock
+        self._series = {key: _Series(key[0], key[1], df) for key, df in frames.items() if len(df)}
+        self.stats = {'requests': 0, 'cache_hits': 0, 'errors': 0, 'candles': 0}
+        self.advance()
+        self.warmup = {key: series.closed for key, series in self._series.items()}
+
+    def has_series(self, symbol: str, interval: str) -> bool:
+        return (symbol, interval) in self._series
+
+    def replayed(self, symbol: str, interval: str) -> int:
+        """Velas cerradas entregadas desde el inicio del replay (sin las de calentamiento)"""
+        return self._series[(symbol, interval)].closed - self.warmup[(symbol, interval)]
+
+    def next_close_ms(self, symbol: str, interval: str) -> Optional[int]:
+        """Cierre de la próxima vela de la serie posterior a la hora virtual"""
+        series = self._series[(symbol, interval)]
+        idx = int(np.searchsorted(series.close_time, self.clock.now_ms, side='right'))
+        return int(series.close_time[idx]) if idx < len(series.close_time) else None
+
+    def advance(self):
+        """Entrega a cada buffer las velas cerradas hasta ahora y reescribe la vela en formación"""
+        now = self.clock.now_ms
+        for series in self._series.values():
+            closed = int(np.searchsorted(series.close_time, now, side='right'))
+            if closed > series.closed:
+                start = max(series.closed, closed - BUFFER_CAPACITY)
+                rows = np.column_stack([series.open_time[start:closed], series.values[start:closed]])
+                series.buffer.extend(rows.tolist())
+                self.stats['candles'] += closed - series.closed
+                series.closed = closed
+            forming = self._forming_row(series, now)
+            if forming is not None:
+                series.buffer.extend([forming])
+
+    def _forming_row(self, series: _Series, now: int) -> Optional[list]:
+        """Vela en formación a la hora virtual (la apertura de la vela siguiente si acaba de abrir)"""
+        idx = series.closed
+        if idx >= len(series.open_time) or series.open_time[idx] > now:
+            return None
+        open_time = int(series.open_time[idx])
+        open_price = float(series.values[idx, 0])
+        high = low = close = open_price
+        volume = 0.0
+        finer = self._finest(series.symbol, below=series.interval_ms)
+        if finer is not None:
+            lo = int(np.searchsorted(finer.open_time, open_time, side='left'))
+            hi = int(np.searchsorted(finer.close_time, now, side='right'))
+            if hi > lo:
+                chunk = finer.values[lo:hi]
+                high = max(high, float(chunk[:, 1].max()))
+                low = min(low, float(chunk[:, 2].min()))
+                close = float(chunk[-1, 3])
+                volume = float(chunk[:, 4].sum())
+        return [open_time, open_price, high, low, close, volume]
+
+    def _finest(self, symbol: str, below: Optional[int] = None) -> Optional[_Series]:
+        candidates = [series for (s, _), series in self._series.items()
+                      if s == symbol and (below is None or series.interval_ms < below)]
+        return min(candidates, key=lambda series: series.interval_ms) if candidates else None
+
+    def price(self, symbol: str) -> Optional[float]:
+        """Último precio a la hora virtual (cierre de la vela en formación de la serie más fina)"""
+        series = self._finest(symbol)
+        if series is None or len(series.buffer) == 0:
+            return None
+        return float(series.buffer.window(1).close[-1])
+
+    # --- interfaz de MarketDataService ---
+
+    async def get_window(self, symbol: str, interval: str, limit: int = 120) -> Optional[CandleWindow]:
+        self.stats['requests'] += 1
+        series = self._series.get((symbol, interval))
+        return series.buffer.window(limit) if series is not None and len(series.buffer) else None
+
+    async def get_klines(self, symbol: str, interval: str, limit: int = 120) -> Optional[pd.DataFrame]:
+        self.stats['requests'] += 1
+        series = self._series.get((symbol, interval))
+        if series is None or len(series.buffer) == 0:
+            self.stats['errors'] += 1
+            return None
+        return series.buffer.to_dataframe(limit)
+
+    async def get_price(self, symbol: str, market: str = 'spot') -> Optional[float]:
+        self.stats['requests'] += 1
+        return self.price(symbol)
+
+    def apply_closed_kline(self, symbol: str, interval: str, kline: Dict) -> bool:
+        return False
+
+    def invalidate(self, symbol: str, interval: str):
+        pass
+
+    async def close(self):
+        pass
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'series_cached': {f"{s} {i}": len(series.buffer)
+                                                for (s, i), series in self._series.items()}}
+
+
+# ----------------------------------------------------------------------
+# Eventos de cierre de vela (planificador de eventos discretos)
+
+class ReplayKlineEvents:
+    """Sustituto de kline_event_source: cada wait_for_close agenda un despertar en tiempo virtual"""
+
+    def __init__(self, clock: VirtualClock, market: ReplayMarketData, end_ms: int):
+        self.clock = clock
+        self.market = market
+        self.end_ms = end_ms
+        self.participants = 0
+        self.finished = asyncio.Event()
+        self.stats = {'closes': 0, 'timeouts': 0, 'reconnects': 0, 'backfills': 0}
+        self._waiting: List[Tuple[int, int, bool, Tuple[str, str], asyncio.Future]] = []
+        self._seq = 0
+        self._on_wait = None   # callback(key) antes de agendar (métricas del ciclo)
+        self._on_wake = None   # callback(key, closed) al despertar
+
+    async def wait_for_close(self, symbol: str, interval: str, timeout: Optional[float] = None,
+                             stop_event: Optional[asyncio.Event] = None) -> bool:
+        key = (symbol, interval)
+        if self._on_wait is not None:
+            self._on_wait(key)
+        if self.finished.is_set() or (stop_event is not None and stop_event.is_set()):
+            return False
+        next_close = self.market.next_close_ms(symbol, interval) if self.market.has_series(symbol, interval) else None
+        wake, closed = next_close, True
+        if timeout is not None and (wake is None or self.clock.now_ms + timeout * 1000 < wake):
+            wake, closed = self.clock.now_ms + int(timeout * 1000), False
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._waiting, (wake if wake is not None else sys.maxsize, self._seq, closed, key, future))
+        asyncio.get_running_loop().call_soon(self._advance)
+        return await future
+
+    def _advance(self):
+        """Si todos los scanners esperan, salta al despertar más próximo"""
+        if self.finished.is_set() or len(self._waiting) < self.participants or not self._waiting:
+            return
+        wake, _, closed, key, future = heapq.heappop(self._waiting)
+        if wake > self.end_ms:
+            heapq.heappush(self._waiting, (wake, 0, closed, key, future))
+            self.finished.set()
+            return
+        self.clock.advance_to(wake)
+        self.market.advance()
+        self.stats['closes' if closed else 'timeouts'] += 1
+        if self._on_wake is not None:
+            self._on_wake(key, closed)
+        future.set_result(closed)
+
+    def release(self):
+        """Libera a los scanners que quedaron esperando (fin del replay)"""
+        self.finished.set()
+        while self._waiting:
+            future = heapq.heappop(self._waiting)[-1]
+            if not future.done():
+                future.set_result(False)
+
+    async def stop(self):
+        self.release()
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
+
+
+# ----------------------------------------------------------------------
+# Base de datos del replay
+
+def prepare_database(path: str) -> str:
+    """
+    Apunta DATABASE_URL a un SQLite del replay. Debe llamarse antes de importar
+    app.db: si ya se importó con otra URL se aborta (nunca se toca la DB real).
+    """
+    url = f"sqlite:///{os.path.abspath(path)}"
+    database = sys.modules.get('app.db.database')
+    if database is not None and database.DATABASE_URL != url:
+        raise RuntimeError("app.db ya está conectado a otra base de datos; el replay necesita su propio SQLite")
+    os.environ['DATABASE_URL'] = url
+    return url
+
+
+@contextmanager
+def _virtual_timestamps(clock: VirtualClock) -> Iterator[None]:
+    """Columnas DateTime con default/onupdate (func.now()) toman la hora virtual"""
+    from sqlalchemy import DateTime, event
+    from app.db.database import Base
+
+    def stamp(columns_attr):
+        def listener(mapper, connection, target):
+            for prop in mapper.column_attrs:
+                column = prop.columns[0]
+                if not isinstance(column.type, DateTime) or getattr(column, columns_attr) is None:
+                    continue
+                if columns_attr == 'onupdate' or getattr(target, prop.key) is None:
+                    setattr(target, prop.key, clock.now())
+        return listener
+
+    on_insert, on_update = stamp('default'), stamp('onupdate')
+    event.listen(Base, 'before_insert', on_insert, propagate=True)
+    event.listen(Base, 'before_update', on_update, propagate=True)
+    try:
+        yield
+    finally:
+        event.remove(Base, 'before_insert', on_insert)
+        event.remove(Base, 'before_update', on_update)
+
+
+def seed_database(targets: List[ReplayTarget], allocated_usdt: float, leverage: int):
+    """Tablas vacías + un usuario con una API key mainnet habilitada para cada scanner"""
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.pool import NullPool
+    from app.db import models
+    from app.db.crud_trading import encrypt_api_key
+    from app.db.database import Base, SessionLocal, engine
+
+    if not engine.url.drivername.startswith('sqlite'):
+        raise RuntimeError("El replay solo escribe en su SQLite (prepare_database)")
+    # Los servicios hacen `db = next(get_db())`: la sesión vuelve a abrir conexión y
+    # no la devuelve hasta el GC. A ritmo de replay eso agota el QueuePool; con
+    # NullPool + WAL las conexiones huérfanas no bloquean a nadie.
+    engine = create_engine(engine.url, poolclass=NullPool)
+    event.listen(engine, 'connect', lambda connection, _: connection.execute('PRAGMA journal_mode=WAL'))
+    SessionLocal.configure(bind=engine)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        user = models.User(username='replay', password_hash='-', is_active=True)
+        db.add(user)
+        db.flush()
+        fields = {}
+        for target in targets:
+            fields[target.enabled_field] = True
+            fields[target.allocated_field] = allocated_usdt
+        db.add(models.TradingApiKey(user_id=user.id, api_key=encrypt_api_key('paper'),
+                                    secret_key=encrypt_api_key('paper'), is_testnet=False, is_active=True,
+                                    futures_enabled=True, default_leverage=leverage, **fields))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _orders_frame() -> pd.DataFrame:
+    from app.db import models
+    from app.db.database import SessionLocal
+
+    columns = ['id', 'symbol', 'side', 'status', 'created_at', 'executed_price', 'executed_quantity',
+               'pnl_usdt', 'reason']
+    db = SessionLocal()
+    try:
+        rows = db.query(models.TradingOrder).order_by(models.TradingOrder.id).all()
+        return pd.DataFrame([[getattr(row, column) for column in columns] for row in rows], columns=columns)
+    finally:
+        db.close()
+
+
+# ----------------------------------------------------------------------
+# Harness
+
+class ReplayHarness:
+    """Ejecuta los scanners indicados entre start_ms y end_ms contra velas históricas"""
+
+    def __init__(self, targets: List[str], frames: Dict[Tuple[str, str], pd.DataFrame], start_ms: int,
+                 end_ms: int, balance: float = 1000.0, allocated_usdt: float = 300.0, leverage: int = 3,
+                 fee_rate: float = 0.0004):
+        unknown = set(targets) - set(REPLAY_TARGETS)
+        if unknown:
+            raise ValueError(f"Scanners desconocidos: {', '.join(sorted(unknown))}")
+        self.names = list(targets)
+        self.targets = [REPLAY_TARGETS[name] for name in self.names]
+        for target in self.targets:
+            if (target.symbol, target.interval) not in frames:
+                raise ValueError(f"Faltan velas {target.symbol} {target.interval} para {target.attr}")
+        self.clock = VirtualClock(start_ms)
+        self.market = ReplayMarketData(self.clock, frames)
+        self.events = ReplayKlineEvents(self.clock, self.market, end_ms)
+        self.exchange = PaperExchange(self.market.price, lambda: self.clock.now_ms, balance, fee_rate)
+        self.balance = balance
+        self.allocated_usdt = allocated_usdt
+        self.leverage = leverage
+
+        self._by_key = {(target.symbol, target.interval): name for name, target in zip(self.names, self.targets)}
+        self._scanners: Dict[str, Any] = {}
+        self._resumed_at: Dict[str, Tuple[float, int, str]] = {}
+        self._state: Dict[str, str] = {}
+        self.cycles: List[Dict] = []
+        self.transitions: List[Dict] = []
+        self.signals: List[Dict] = []
+
+    # --- métricas ---
+
+    def _on_wake(self, key: Tuple[str, str], closed: bool):
+        name = self._by_key[key]
+        self._resumed_at[name] = (time.perf_counter(), self.clock.now_ms, 'close' if closed else 'timeout')
+
+    def _on_wait(self, key: Tuple[str, str]):
+        name = self._by_key[key]
+        resumed = self._resumed_at.pop(name, None)
+        if resumed is None:
+            return
+        started, at_ms, woke_by = resumed
+        state = getattr(self._scanners[name], 'current_state', None)
+        moment = _EPOCH + datetime_module.timedelta(milliseconds=at_ms)
+        self.cycles.append({'scanner': name, 'time': moment, 'woke_by': woke_by, 'state': state,
+                            'latency_ms': (time.perf_counter() - started) * 1000})
+        previous = self._state.get(name)
+        if previous is not None and state != previous:
+            self.transitions.append({'scanner': name, 'time': moment, 'from_state': previous, 'to_state': state})
+        self._state[name] = state
+
+    def _record_signals(self, name: str, scanner: Any, method: str):
+        detect = getattr(scanner, method)
+
+        def recorded(*args, **kwargs):
+            signals = detect(*args, **kwargs)
+            for signal in signals or ():
+                self.signals.append({
+                    'scanner': name,
+                    'time': self.clock.now(),
+                    'entry_price': signal.get('entry_price'),
+                    'depth': signal.get('depth'),
+                    'signal_strength': signal.get('signal_strength'),
+                })
+            return signals
+
+        setattr(scanner, method, recorded)
+
+    # --- ejecución ---
+
+    def _scanner_tasks(self) -> List[asyncio.Task]:
+        return [getattr(scanner, attr) for scanner in self._scanners.values()
+                for attr in ('_task', 'scan_task') if isinstance(getattr(scanner, attr, None), asyncio.Task)]
+
+    async def _wait_until_finished(self):
+        """Hasta el final del rango; un scanner cuyo loop termina deja de contar como participante"""
+        finished = asyncio.ensure_future(self.events.finished.wait())
+        running = set(self._scanner_tasks())
+        while not finished.done():
+            done, running = await asyncio.wait({finished, *running}, return_when=asyncio.FIRST_COMPLETED)
+            running.discard(finished)
+            for task in done - {finished}:
+                logger.warning(f"⚠️ Un loop de scanner terminó antes del final del replay: {task}")
+                self.events.participants -= 1
+                if self.events.participants == 0:
+                    self.events.finished.set()
+                asyncio.get_running_loop().call_soon(self.events._advance)
+
+    async def run(self) -> ReplayReport:
+        import requests
+        from app.services.kline_event_source import kline_event_source
+        from app.services.market_data_service import market_data_service
+
+        modules = [importlib.import_module(target.module) for target in self.targets]
+        seed_database(self.targets, self.allocated_usdt, self.leverage)
+        self.events.participants = len(self.targets)
+        self.events._on_wait = self._on_wait
+        self.events._on_wake = self._on_wake
+
+        wall_start = time.perf_counter()
+        replacements = [(market_data_service, self.market), (kline_event_source, self.events),
+                        (requests, self.exchange)]
+        with virtual_time(self.clock), _virtual_timestamps(self.clock), _patched_globals(replacements):
+            for name, target, module in zip(self.names, self.targets, modules):
+                scanner = getattr(module, target.attr)
+                self._scanners[name] = scanner
+                self._state[name] = getattr(scanner, 'current_state', None)
+                self._record_signals(name, scanner, target.detect)
+                self._resumed_at[name] = (time.perf_counter(), self.clock.now_ms, 'start')
+                await getattr(scanner, target.start)()
+            await self._wait_until_finished()
+
+            for name, target in zip(self.names, self.targets):
+                scanner = self._scanners[name]
+                scanner.is_running = False
+                stop_event = getattr(scanner, '_stop_event', None)
+                if stop_event is not None:
+                    stop_event.set()
+            self.events.release()
+            await asyncio.gather(*self._scanner_tasks(), return_exceptions=True)
+            orders = _orders_frame()
+        wall_seconds = time.perf_counter() - wall_start
+
+        for name, target in zip(self.names, self.targets):
+            vars(self._scanners[name]).pop(target.detect, None)
+        candles = sum(self.market.replayed(target.symbol, target.interval) for target in self.targets)
+        return ReplayReport(
+            cycles=pd.DataFrame(self.cycles, columns=['scanner', 'time', 'woke_by', 'state', 'latency_ms']),
+            transitions=pd.DataFrame(self.transitions, columns=['scanner', 'time', 'from_state', 'to_state']),
+            signals=pd.DataFrame(self.signals, columns=['scanner', 'time', 'entry_price', 'depth',
+                                                        'signal_strength']),
+            fills=pd.DataFrame(self.exchange.fills),
+            orders=orders,
+            candles=candles,
+            wall_seconds=wall_seconds,
+            initial_balance=self.balance,
+            final_wallet=self.exchange.wallet,
+            final_equity=self.exchange.equity(),
+        )
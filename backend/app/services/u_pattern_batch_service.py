@@ -0,0 +1,132 @@
+# backend/app/services/u_pattern_batch_service.py
+
+"""
+Escaneo del patrón U de todas las series en una sola pasada.
+
+Este servicio pide las velas de todas las series registradas en paralelo
+a market_data_service y las evalúa juntas con
+trading_core.u_pattern_batch.UPatternBatch. Si ninguna serie tiene velas
+nuevas (misma última vela y mismo cierre en formación) devuelve el
+resultado anterior sin recalcular. Hoy solo lo consume GET /signals/scan.
+
+Los scanners (BTC/ETH/BNB 4h, BTC 30m) NO usan este servicio: cada uno
+sigue descargando su serie y detectando con su propio UPatternStream. Sus
+parámetros salen de su config (p. ej. min_pattern_depth de BTC 4h, que se
+puede cambiar en caliente con update_config) y DEFAULT_SERIES solo copia
+los valores por defecto. Pasar los scanners a un único scan() por cierre
+de vela requiere que registren aquí su SeriesSpec al cambiar la config.
+
+PAXG no se incluye: su detector (`_detect_u_patterns` por idxmin de tramos)
+es otro algoritmo, no una variante de parámetros del patrón 2023/30min.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from app.services.market_data_service import market_data_service
+from trading_core.u_pattern_batch import SeriesSpec, UPatternBatch
+
+logger = logging.getLogger(__name__)
+
+
+class BatchSeries(NamedTuple):
+    """Serie registrada: de dónde salen las velas y cómo se evalúa"""
+    symbol: str
+    interval: str
+    data_limit: int
+    spec: SeriesSpec
+
+
+# Mismos parámetros que los `_get_u_stream` de cada scanner
+DEFAULT_SERIES = [
+    BatchSeries('BTCUSDT', '4h', 120, SeriesSpec(
+        'BTCUSDT_4h', '2023', 120, extra_fields={'symbol': 'BTCUSDT'})),
+    # ETH/BNB: ventana min(120, len(df) - 20) = 100 con data_limit 120
+    BatchSeries('ETHUSDT', '4h', 120, SeriesSpec(
+        'ETHUSDT_4h', '2023', 100, min_candles=50, overrides={'n_lows': 3},
+        extra_fields={'symbol': 'ETHUSDT'})),
+    BatchSeries('BNBUSDT', '4h', 120, SeriesSpec(
+        'BNBUSDT_4h', '2023', 100, min_candles=50, overrides={'n_lows': 3},
+        extra_fields={'symbol': 'BNBUSDT'})),
+    BatchSeries('BTCUSDT', '30m', 300, SeriesSpec(
+        'BTCUSDT_30m', '30min', 300, min_candles=0,
+        extra_fields={'symbol': 'BTCUSDT', 'environment': 'mainnet'})),
+]
+
+
+class UPatternBatchService:
+    """Registro de series y escaneo conjunto del patrón U"""
+
+    def __init__(self):
+        self._series: Dict[str, BatchSeries] = {}
+        self._engine: Optional[UPatternBatch] = None
+        self._last_key: Optional[Tuple] = None
+        self._last_result: Dict[str, List[Dict]] = {}
+        self.last_scan_time: Optional[datetime] = None
+        self.stats = {'scans': 0, 'cache_hits': 0}
+        for series in DEFAULT_SERIES:
+            self.register(series)
+
+    def register(self, series: BatchSeries):
+        """Agrega (o reemplaza) una serie; el motor se reconstruye en el próximo escaneo"""
+        self._series[series.spec.key] = series
+        self._engine = None
+        self._last_key = None
+
+    def unregister(self, key: str):
+        if self._series.pop(key, None) is not None:
+            self._engine = None
+            self._last_key = None
+
+    def _get_engine(self) -> UPatternBatch:
+        if self._engine is None:
+            self._engine = UPatternBatch([series.spec for series in self._series.values()])
+        return self._engine
+
+    async def scan(self) -> Dict[str, List[Dict]]:
+        """
+        Descarga todas las series en paralelo y las evalúa en una pasada.
+
+        Returns:
+            key de la serie -> señales (lista vacía si no hay patrón o datos)
+        """
+        series_list = list(self._series.values())
+        frames = await asyncio.gather(*[
+            market_data_service.get_klines(s.symbol, s.interval, s.data_limit) for s in series_list
+        ], return_exceptions=True)
+
+        data: Dict[str, Any] = {}
+        for series, df in zip(series_list, frames):
+            if isinstance(df, Exception):
+                logger.error(f"❌ Error obteniendo velas {series.symbol} {series.interval}: {df}")
+                df = None
+            data[series.spec.key] = df
+
+        # La vela en formación cambia con cada tick: la clave incluye su cierre
+        cache_key = tuple(
+            (key, df.index[-1], float(df['close'].iloc[-1])) if df is not None and len(df) else (key, None, None)
+            for key, df in data.items()
+        )
+        if cache_key == self._last_key:
+            self.stats['cache_hits'] += 1
+            return self._last_result
+
+        result = self._get_engine().detect(data)
+        self.stats['scans'] += 1
+        self._last_key = cache_key
+        self._last_result = result
+        self.last_scan_time = datetime.now()
+        return result
+
+    def get_status(self) -> Dict:
+        return {
+            'series': {key: f"{s.symbol} {s.interval} ({s.spec.profile})" for key, s in self._series.items()},
+            'last_scan_time': self.last_scan_time.isoformat() if self.last_scan_time else None,
+            **self.stats,
+        }
+
+
+# Instancia global del servicio
+u_pattern_batch_service = UPatternBatchService()
@@ -0,0 +1,44 @@
+# backend/tests/test_candle_buffer.py
+
+import unittest
+
+from app.services.candle_buffer import CandleRingBuffer
+
+HOUR_MS = 3_600_000
+
+
+def kline(i: int, close: float) -> list:
+    return [i * HOUR_MS, close, close + 1, close - 1, close, 10.0]
+
+
+class CandleRingBufferTest(unittest.TestCase):
+    def setUp(self):
+        self.buffer = CandleRingBuffer('BTCUSDT', '1h', capacity=5)
+        self.buffer.extend([kline(i, 100.0 + i) for i in range(4)])
+
+    def test_forming_candle_does_not_change_handed_out_window(self):
+        window = self.buffer.window()
+        self.buffer.extend([kline(3, 999.0)])
+        self.assertEqual(window.close[-1], 103.0)
+        self.assertEqual(self.buffer.window().close[-1], 999.0)
+
+    def test_forming_candle_does_not_change_handed_out_dataframe(self):
+        df = self.buffer.to_dataframe()
+        self.buffer.extend([kline(3, 999.0)])
+        self.assertEqual(df['close'].iloc[-1], 103.0)
+        self.assertEqual(self.buffer.to_dataframe()['close'].iloc[-1], 999.0)
+
+    def test_new_candles_keep_handed_out_window(self):
+        window = self.buffer.window(3)
+        self.assertEqual(self.buffer.extend([kline(i, 100.0 + i) for i in range(4, 12)]), 8)
+        self.assertEqual(list(window.close), [101.0, 102.0, 103.0])
+        self.assertEqual(len(self.buffer), 5)
+        self.assertEqual(list(self.buffer.window().close), [107.0, 108.0, 109.0, 110.0, 111.0])
+
+    def test_windows_are_read_only(self):
+        with self.assertRaises(ValueError):
+            self.buffer.window().close[0] = 0.0
+
+
+if __name__ == '__main__':
+    unittest.main()
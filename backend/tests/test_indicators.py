@@ -0,0 +1,66 @@
+# backend/tests/test_indicators.py
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from trading_core.indicators import WindowIndicators, rolling_slope, slope
+
+
+def legacy_slope(values):
+    """`_calculate_slope` de los backtests y scanners originales"""
+    if len(values) < 2:
+        return 0
+    x = np.arange(len(values))
+    return np.polyfit(x, values, 1)[0]
+
+
+def tie_heavy_closes(n: int = 3000, seed: int = 7) -> np.ndarray:
+    """Paseo aleatorio redondeado a 0.1: muchas pendientes caen justo en -0.12, -0.08..."""
+    rng = np.random.default_rng(seed)
+    return np.round(300 + np.cumsum(rng.choice([-0.2, -0.1, 0.0, 0.1, 0.2], size=n)), 1)
+
+
+class SlopeTest(unittest.TestCase):
+    def test_matches_legacy_on_tie_heavy_series(self):
+        close = tie_heavy_closes()
+        for length in (2, 3, 6, 8, 10, 12, 20):
+            for end in range(length, len(close) + 1):
+                values = close[end - length:end]
+                self.assertEqual(slope(values), legacy_slope(values), (length, end))
+
+    def test_threshold_ties_resolve_like_legacy(self):
+        close = tie_heavy_closes()
+        for threshold in (-0.12, -0.08, -0.03):
+            for length in (3, 6):
+                for end in range(length, len(close) + 1):
+                    values = close[end - length:end]
+                    self.assertEqual(slope(values) < threshold, legacy_slope(values) < threshold)
+
+    def test_degenerate_windows(self):
+        self.assertEqual(slope(np.array([])), 0)
+        self.assertEqual(slope(np.array([101.3])), 0)
+        self.assertEqual(slope(np.full(6, 101.3)), legacy_slope(np.full(6, 101.3)))
+
+    def test_rolling_slope_matches_scalar(self):
+        close = tie_heavy_closes(500)
+        slopes = rolling_slope(close, 6)
+        self.assertTrue(np.isnan(slopes[:5]).all())
+        for end in range(6, len(close) + 1):
+            self.assertEqual(slopes[end - 1], legacy_slope(close[end - 6:end]))
+        self.assertTrue(np.isnan(rolling_slope(close[:3], 6)).all())
+
+
+class WindowIndicatorsTest(unittest.TestCase):
+    def test_slopes_match_legacy_slices(self):
+        close = tie_heavy_closes(120)
+        indicators = WindowIndicators(pd.DataFrame({'high': close + 0.5, 'low': close - 0.5, 'close': close}))
+        self.assertEqual(indicators.slope_last(6), legacy_slope(close[-6:]))
+        self.assertEqual(indicators.slope_before(50, 6), legacy_slope(close[44:50]))
+        self.assertEqual(indicators.slope_before(1, 6), legacy_slope(close[0:1]))
+        self.assertEqual(indicators.slope_since(100), legacy_slope(close[100:]))
+
+
+if __name__ == '__main__':
+    unittest.main()
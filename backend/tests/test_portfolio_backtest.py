@@ -0,0 +1,41 @@
+# backend/tests/test_portfolio_backtest.py
+
+import unittest
+
+import pandas as pd
+
+from trading_core.backtest_engine import STRATEGY_PRESETS
+from trading_core.portfolio_backtest import DEFAULT_STRATEGIES, simulate_portfolio
+
+START = pd.Timestamp('2023-01-01')
+
+
+def candidate(strategy: str, opened_h: int, closed_h: int, return_pct: float) -> dict:
+    return {'strategy': strategy, 'entry_time': START, 'exit_time': START, 'entry_price': 100.0,
+            'exit_price': 100.0 * (1 + return_pct), 'return_pct': return_pct, 'exit_reason': 'TAKE_PROFIT',
+            'opened_at': START + pd.Timedelta(hours=opened_h), 'closed_at': START + pd.Timedelta(hours=closed_h)}
+
+
+class SimulatePortfolioTest(unittest.TestCase):
+    def setUp(self):
+        self.strategies = {strategy.name: strategy for strategy in DEFAULT_STRATEGIES}
+
+    def test_btc_books_share_the_symbol(self):
+        candidates = [
+            pd.DataFrame([candidate('btc_4h', 0, 10, 0.08), candidate('btc_4h', 5, 12, 0.01)]),
+            pd.DataFrame([candidate('btc_30m', 1, 3, 0.04)]),
+        ]
+        result = simulate_portfolio(candidates, [self.strategies['btc_4h'], self.strategies['btc_30m']])
+        self.assertEqual(list(result.trades['strategy']), ['btc_4h', 'btc_30m'])
+        self.assertEqual(list(result.skipped['strategy']), ['btc_4h'])
+        self.assertEqual(list(result.skipped['reason']), ['position_open'])
+        self.assertAlmostEqual(result.final_capital, 1000.0 + 300.0 * 0.08 + 300.0 * 0.04)
+
+    def test_paxg_has_its_own_preset(self):
+        preset = STRATEGY_PRESETS['paxg_4h']
+        self.assertEqual((preset.symbol, preset.interval), ('PAXGUSDT', '4h'))
+        self.assertIs(self.strategies['paxg_4h'].params, preset.params)
+
+
+if __name__ == '__main__':
+    unittest.main()
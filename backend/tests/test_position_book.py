@@ -0,0 +1,99 @@
+# backend/tests/test_position_book.py
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import unittest
+from datetime import timedelta
+
+import requests
+
+from app.services.paper_exchange import PaperExchange
+from app.services.replay_harness import REPLAY_TARGETS, _patched_globals, prepare_database, seed_database
+
+PRICES = {'BTCUSDT': 20000.0}
+
+
+class FakeMarketData:
+    async def get_price(self, symbol, market='futures'):
+        return PRICES[symbol]
+
+
+def setUpModule():
+    # SQLite propio; si app.db ya se importó (DATABASE_URL de la suite) seed_database
+    # se niega a tocar algo que no sea SQLite
+    if 'app.db.database' not in sys.modules:
+        prepare_database(os.path.join(tempfile.mkdtemp(prefix='position_book_'), 'test.db'))
+
+
+class SharedSymbolTest(unittest.IsolatedAsyncioTestCase):
+    """BTC 4h y BTC 30m con posiciones en BTCUSDT en la misma cuenta"""
+
+    def setUp(self):
+        from app.services import futures_strategy_executor
+        from app.services.futures_strategy_executor import FUTURES_STRATEGIES, FuturesStrategyExecutor
+        from app.services.market_data_service import market_data_service
+
+        seed_database([REPLAY_TARGETS['btc_4h'], REPLAY_TARGETS['btc_30m']], 300, 3)
+        futures_strategy_executor._position_locks.clear()
+        PRICES['BTCUSDT'] = 20000.0
+        self.exchange = PaperExchange(PRICES.get, lambda: int(time.time() * 1000), balance=10000)
+        self.patches = _patched_globals([(requests, self.exchange), (market_data_service, FakeMarketData())])
+        self.patches.__enter__()
+        self.executors = {name: FuturesStrategyExecutor(FUTURES_STRATEGIES[name]) for name in ('btc_4h', 'btc_30m')}
+
+    def tearDown(self):
+        self.patches.__exit__(None, None, None)
+
+    def test_books_share_the_lock(self):
+        self.assertIs(self.executors['btc_4h']._position_lock(1), self.executors['btc_30m']._position_lock(1))
+
+    async def test_same_tick_sells_each_position_once(self):
+        from app.db.database import SessionLocal
+        from app.db.models import TradingOrder
+        from app.services.position_book import PositionBook
+
+        for executor in self.executors.values():
+            result = await executor.execute_buy_order({'entry_price': PRICES['BTCUSDT']})
+            self.assertTrue(result['success'], result)
+        db = SessionLocal()
+        try:
+            buys = db.query(TradingOrder).filter(TradingOrder.side == 'BUY').order_by(TradingOrder.id).all()
+            self.assertEqual([buy.reason for buy in buys], ['U_PATTERN_4H', 'U_PATTERN_30M'])
+            # La compra de 30m como las anteriores a U_PATTERN_30M; fuera del cooldown
+            buys[1].reason = 'U_PATTERN'
+            for buy in buys:
+                buy.created_at -= timedelta(minutes=10)
+            db.commit()
+        finally:
+            db.close()
+
+        book = PositionBook()
+        book.running = True
+        book.load()
+        self.assertEqual(set(book._positions['BTCUSDT']), {('btc_4h', 1), ('btc_30m', 1)})
+
+        # -5%: por debajo del SL de las dos estrategias en el mismo tick
+        PRICES['BTCUSDT'] = 19000.0
+        book.on_mark_price('BTCUSDT', 19000.0)
+        self.assertEqual(book.stats['triggers'], 2)
+        await asyncio.gather(*book._close_tasks)
+
+        sells = [fill for fill in self.exchange.fills if fill['side'] == 'SELL']
+        self.assertEqual(len(sells), 2)
+        self.assertEqual(self.exchange.positions, {})
+        db = SessionLocal()
+        try:
+            self.assertEqual(db.query(TradingOrder).filter(TradingOrder.side == 'SELL').count(), 2)
+            self.assertEqual(db.query(TradingOrder).filter(TradingOrder.side == 'BUY',
+                                                           TradingOrder.status == 'FILLED').count(), 0)
+        finally:
+            db.close()
+        book.load()
+        self.assertEqual(book._positions['BTCUSDT'], {})
+
+
+if __name__ == '__main__':
+    unittest.main()
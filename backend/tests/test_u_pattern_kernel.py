@@ -0,0 +1,127 @@
+# backend/tests/test_u_pattern_kernel.py
+
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from trading_core.u_pattern_kernel import LOW_FILTERS, detect_lows_df
+from trading_core.u_pattern_stream import UPatternStream
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'candles_4h.csv')
+
+# (variante, window, min_depth_pct) tal como las llaman los scanners y backtests
+LOW_CASES = [
+    ('2023', 6, 0.025),
+    ('30min', 3, 0.015),
+    ('1h', 3, 0.015),
+    ('15min', 3, 0.010),
+    ('basic', 8, 0.03),
+]
+
+
+def load_candles() -> pd.DataFrame:
+    return pd.read_csv(FIXTURE, parse_dates=['timestamp'], index_col='timestamp')
+
+
+def legacy_detect_lows(df, window, min_depth_pct, recent_margin=None, volume_ratio=None, strong_depth=None):
+    """Bucle df.iloc original de los `_detect_lows_*` (parametrizado por variante)"""
+    lows = []
+    for i in range(window, len(df) - window):
+        current_low = df.iloc[i]['low']
+        window_slice = df.iloc[i-window:i+window+1]
+        if current_low == window_slice['low'].min():
+            local_high = window_slice['high'].max()
+            depth = (local_high - current_low) / local_high
+            if depth >= min_depth_pct and (recent_margin is None or i < len(df) - recent_margin):
+                if volume_ratio is not None:
+                    volume_avg = df.iloc[i-window:i+window+1]['volume'].mean()
+                    if not (df.iloc[i]['volume'] > volume_avg * volume_ratio or depth >= strong_depth):
+                        continue
+                lows.append({'index': i, 'timestamp': df.index[i], 'low': current_low,
+                             'high': df.iloc[i]['high'], 'depth': depth})
+    return lows
+
+
+def legacy_slope(values):
+    if len(values) < 2:
+        return 0
+    return np.polyfit(np.arange(len(values)), values, 1)[0]
+
+
+def legacy_atr(df, period=14):
+    tr_values = []
+    for i in range(1, len(df)):
+        high, low, prev_close = df.iloc[i]['high'], df.iloc[i]['low'], df.iloc[i-1]['close']
+        tr_values.append(max(high - low, abs(high - prev_close), abs(low - prev_close)))
+    return np.mean(tr_values[-period:]) if tr_values else df.iloc[-1]['high'] - df.iloc[-1]['low']
+
+
+def legacy_detect_u_patterns_2023(df):
+    """`_detect_u_patterns_2023` original del scanner BTC 4h sobre una ventana ya recortada"""
+    significant_lows = legacy_detect_lows(df, 6, 0.025, **LOW_FILTERS['2023'])
+    atr = legacy_atr(df)  # el original la recalculaba por mínimo (mismo valor)
+    for low in significant_lows[-4:]:
+        min_idx = low['index']
+        current_price = df.iloc[-1]['close']
+        atr_pct = atr / current_price
+        if atr_pct < 0.015:
+            factor = 1.015
+        elif atr_pct < 0.03:
+            factor = 1.015 + (atr_pct * 0.3)
+        else:
+            factor = min(1.015 + (atr_pct * 0.5), 1.05)
+        factor = max(factor, 1.015)
+        nivel_ruptura = low['high'] * factor
+        if 4 < len(df) - min_idx < 45:
+            recent_slope = legacy_slope(df.iloc[-6:]['close'].values)
+            pre_slope = legacy_slope(df.iloc[max(0, min_idx-6):min_idx]['close'].values)
+            momentum_ok = min_idx < 20 or legacy_slope(df.iloc[-20:]['close'].values) > -0.1
+            if all([pre_slope < -0.12, current_price > nivel_ruptura * 0.97, recent_slope > -0.03,
+                    low['depth'] >= 0.025, momentum_ok]):
+                return [{'timestamp': df.index[-1], 'entry_price': nivel_ruptura, 'signal_strength': abs(pre_slope),
+                         'min_price': low['low'], 'pattern_width': len(df) - min_idx, 'atr': atr,
+                         'dynamic_factor': factor, 'depth': low['depth']}]
+    return []
+
+
+class UPatternKernelTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.df = load_candles()
+
+    def test_lows_match_legacy_loop(self):
+        for variant, window, min_depth in LOW_CASES:
+            for df in (self.df, self.df.iloc[-120:]):
+                expected = legacy_detect_lows(df, window, min_depth, **LOW_FILTERS[variant])
+                actual = detect_lows_df(df, window, min_depth, variant=variant)
+                with self.subTest(variant=variant, rows=len(df)):
+                    self.assertTrue(expected)
+                    self.assertEqual([(low['index'], low['timestamp'], low['low'], low['depth']) for low in expected],
+                                     [(low['index'], low['timestamp'], low['low'], low['depth']) for low in actual])
+
+    def test_stream_signals_match_legacy_detector(self):
+        window_size = 120
+        stream = UPatternStream('2023', window_size)
+        signals = 0
+        for end in range(1, len(self.df) + 1):
+            row = self.df.iloc[end - 1]
+            actual = stream.update(self.df.index[end - 1], row['high'], row['low'], row['close'], row['volume'])
+            if end < window_size:
+                continue
+            expected = legacy_detect_u_patterns_2023(self.df.iloc[end - window_size:end])
+            with self.subTest(end=end):
+                self.assertEqual(len(actual), len(expected))
+                for e, a in zip(expected, actual):
+                    for key, value in e.items():
+                        if isinstance(value, float):
+                            self.assertTrue(np.isclose(value, a[key], rtol=1e-9, atol=1e-12), key)
+                        else:
+                            self.assertEqual(value, a[key], key)
+            signals += len(expected)
+        self.assertGreater(signals, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
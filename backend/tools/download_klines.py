@@ -0,0 +1,78 @@
+# tools/download_klines.py
+
+"""
+Descarga (o completa) el histórico de velas de Binance en el almacén local.
+
+Uso:
+    python tools/download_klines.py                          # todas las series del proyecto
+    python tools/download_klines.py BTCUSDT:15m ETHUSDT:4h   # series concretas
+    python tools/download_klines.py --start 2023-01-01 --end 2023-12-31 BTCUSDT:5m
+
+Volver a ejecutarlo solo descarga lo que falta (reanuda desde lo guardado).
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+
+# Añadimos el path de backend para poder importar trading_core.*
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trading_core.kline_downloader import DownloadJob, KlineDownloader  # noqa: E402
+from trading_core.ohlcv_store import OHLCVStore  # noqa: E402
+
+# Series que usan los backtests de src/ y los scanners
+PROJECT_SERIES = [
+    ('BTCUSDT', '4h'), ('BTCUSDT', '1h'), ('BTCUSDT', '30m'), ('BTCUSDT', '15m'), ('BTCUSDT', '5m'),
+    ('ETHUSDT', '4h'), ('BNBUSDT', '4h'), ('PAXGUSDT', '4h'),
+]
+DEFAULT_START = '2022-01-01'
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Descarga paralela y reanudable de velas de Binance")
+    parser.add_argument('series', nargs='*', help="SYMBOL:interval (por defecto, todas las del proyecto)")
+    parser.add_argument('--start', default=DEFAULT_START, help=f"Fecha inicial YYYY-MM-DD (defecto {DEFAULT_START})")
+    parser.add_argument('--end', default=None, help="Fecha final YYYY-MM-DD (defecto: última vela cerrada)")
+    parser.add_argument('--store', default=None, help="Directorio del almacén (defecto OHLCV_STORE_DIR o data/ohlcv)")
+    parser.add_argument('--concurrency', type=int, default=8, help="Requests simultáneos (defecto 8)")
+    parser.add_argument('--weight', type=int, default=1200, help="Peso máximo por minuto (defecto 1200 de 6000)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    series = PROJECT_SERIES
+    if args.series:
+        series = [tuple(item.split(':', 1)) for item in args.series]
+    start = datetime.strptime(args.start, '%Y-%m-%d')
+    end = datetime.strptime(args.end, '%Y-%m-%d').replace(hour=23, minute=59, second=59) if args.end else None
+
+    downloader = KlineDownloader(OHLCVStore(args.store), concurrency=args.concurrency, weight_per_minute=args.weight)
+    jobs = [DownloadJob(symbol.upper(), interval, start, end) for symbol, interval in series]
+    print(f"📥 Descargando {len(jobs)} series en {downloader.store.root}")
+    reports = asyncio.run(downloader.download_all(jobs))
+
+    ok = True
+    for report in reports:
+        total = downloader.store.count(report.symbol, report.interval)
+        status = "✅" if not report.gaps else "⚠️"
+        print(f"{status} {report.symbol} {report.interval}: +{report.candles} velas "
+              f"({report.pages} páginas, {report.seconds:.1f}s) | total {total}")
+        if report.failed_pages:
+            print(f"   ❌ {report.failed_pages} páginas fallidas (volver a ejecutar para reintentar)")
+        for begin, gap_end in report.gaps[:5]:
+            begin_utc = datetime.fromtimestamp(begin / 1000, tz=timezone.utc)
+            end_utc = datetime.fromtimestamp(gap_end / 1000, tz=timezone.utc)
+            print(f"   🕳️ Hueco {begin_utc:%Y-%m-%d %H:%M} → {end_utc:%Y-%m-%d %H:%M} UTC")
+        ok &= not report.gaps
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
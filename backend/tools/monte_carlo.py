@@ -0,0 +1,95 @@
+# tools/monte_carlo.py
+
+"""
+Riesgo de cola de una estrategia de producción (trading_core.monte_carlo).
+
+Uso:
+    python tools/monte_carlo.py btc_4h                                    # últimos 365 días, 100k caminos
+    python tools/monte_carlo.py btc_30m --alloc 100 --alloc 300 --alloc 600 --fee 0.0004
+    python tools/monte_carlo.py eth_4h --start 2023-01-01 --end 2023-12-31 --method shuffle
+
+Los trades salen del backtest de la estrategia (misma definición que
+tools/portfolio_backtest.py); --alloc es el valor candidato para su
+*_allocated_usdt (repetible: una fila por valor).
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Añadimos el path de backend para poder importar trading_core.*
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trading_core.backtest_cache import BacktestCache  # noqa: E402
+from trading_core.backtest_engine import run_backtest  # noqa: E402
+from trading_core.monte_carlo import (  # noqa: E402
+    DEFAULT_LEVERAGE, DEFAULT_PATHS, METHODS, allocation_table, trade_returns, trades_per_year,
+)
+from trading_core.ohlcv_store import OHLCVStore  # noqa: E402
+from trading_core.portfolio_backtest import DEFAULT_STRATEGIES  # noqa: E402
+
+
+def parse_args(argv):
+    names = [strategy.name for strategy in DEFAULT_STRATEGIES]
+    parser = argparse.ArgumentParser(description="Monte Carlo de los trades de una estrategia")
+    parser.add_argument('strategy', choices=names, help="Estrategia de producción")
+    parser.add_argument('--start', default=None, help="Fecha inicial YYYY-MM-DD (defecto: hace 365 días)")
+    parser.add_argument('--end', default=None, help="Fecha final YYYY-MM-DD (defecto: ahora)")
+    parser.add_argument('--capital', type=float, default=1000, help="Balance inicial USDT (defecto 1000)")
+    parser.add_argument('--alloc', action='append', type=float, default=[],
+                        help="Exposición USDT por trade a evaluar (repetible, defecto la de la estrategia)")
+    parser.add_argument('--leverage', type=int, default=DEFAULT_LEVERAGE, help="Leverage (defecto 3)")
+    parser.add_argument('--fee', type=float, default=0.0, help="Comisión por lado (p. ej. 0.0004)")
+    parser.add_argument('--paths', type=int, default=DEFAULT_PATHS, help="Caminos simulados (defecto 100000)")
+    parser.add_argument('--method', default='bootstrap', choices=METHODS, help="Remuestreo de los trades")
+    parser.add_argument('--years', type=float, default=1.0, help="Años por camino en bootstrap (defecto 1)")
+    parser.add_argument('--ruin', type=float, default=0.5,
+                        help="Fracción del capital que cuenta como ruina (defecto 0.5)")
+    parser.add_argument('--seed', type=int, default=None, help="Semilla (resultados reproducibles)")
+    parser.add_argument('--store', default=None, help="Directorio del almacén (defecto OHLCV_STORE_DIR o data/ohlcv)")
+    parser.add_argument('--intrabar', default=None, choices=['1m', '5m'],
+                        help="Resuelve las velas que tocan TP y SL con sub-velas de este intervalo")
+    parser.add_argument('--csv', default=None, help="Guarda la tabla por asignación en este CSV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    strategy = next(strategy for strategy in DEFAULT_STRATEGIES if strategy.name == args.strategy)
+    end = datetime.strptime(args.end, '%Y-%m-%d').replace(hour=23, minute=59, second=59) if args.end else datetime.now()
+    start = datetime.strptime(args.start, '%Y-%m-%d') if args.start else end - timedelta(days=365)
+    allocations = args.alloc or [strategy.allocated_usdt]
+
+    store = OHLCVStore(args.store) if args.store else None
+    result, df = run_backtest(strategy.symbol, strategy.interval, start, end, strategy.params, args.capital,
+                              store=store, cache=BacktestCache(), intrabar_interval=args.intrabar)
+    returns = trade_returns(result.trades)
+    if len(returns) == 0:
+        print(f"⚠️ {strategy.name}: sin trades en {start:%Y-%m-%d} → {end:%Y-%m-%d}")
+        return 1
+    per_year = trades_per_year(len(returns), df.index[0], df.index[-1])
+
+    print(f"🎲 Monte Carlo {strategy.name} ({strategy.series_key}) {df.index[0]:%Y-%m-%d} → {df.index[-1]:%Y-%m-%d}")
+    print(f"   {len(returns)} trades ({per_year:.1f}/año) | win rate {(returns > 0).mean() * 100:.1f}% | "
+          f"retorno medio {returns.mean() * 100:+.2f}%")
+    print(f"   {args.paths:,} caminos {args.method} | capital ${args.capital:,.2f} | {args.leverage}x | "
+          f"ruina: equity ≤ {args.ruin * 100:.0f}% del capital o sin margen")
+
+    started = datetime.now()
+    table = allocation_table(returns, allocations, args.capital, args.leverage, args.fee, args.paths,
+                             args.method, trades_per_year=per_year, years=args.years,
+                             ruin_level=args.ruin, seed=args.seed)
+    print(f"⚡ Tiempo de cálculo: {(datetime.now() - started).total_seconds():.2f}s")
+    print()
+    print("📊 RIESGO POR ASIGNACIÓN (drawdown y retorno anual en %):")
+    print(table.to_string(index=False, float_format=lambda value: f"{value:,.2f}"))
+
+    if args.csv:
+        table.to_csv(args.csv, index=False)
+        print(f"💾 Tabla: {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
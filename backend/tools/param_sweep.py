@@ -0,0 +1,124 @@
+# tools/param_sweep.py
+
+"""
+Barrido paralelo de parámetros de la estrategia U (trading_core.param_sweep).
+
+Uso:
+    python tools/param_sweep.py                                   # rejilla por defecto, BTC/ETH/BNB/PAXG 4h 2023
+    python tools/param_sweep.py --grid profit_target=0.04:0.12:0.01 --grid stop_loss=0.02,0.03
+    python tools/param_sweep.py BTCUSDT:30m --preset bitcoin_30m --start 2024-01-01 --end 2024-12-31
+
+Rejilla: CAMPO=v1,v2,... o CAMPO=inicio:fin:paso (fin inclusive). La tabla
+completa se guarda en CSV (por defecto data/sweeps/) y se muestran las mejores.
+"""
+
+import argparse
+import ast
+import logging
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Añadimos el path de backend para poder importar trading_core.*
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trading_core.backtest_engine import STRATEGY_PRESETS, StrategyParams  # noqa: E402
+from trading_core.ohlcv_store import OHLCVStore, load_klines  # noqa: E402
+from trading_core.param_sweep import expand_grid, run_sweep  # noqa: E402
+
+DEFAULT_SERIES = ['BTCUSDT:4h', 'ETHUSDT:4h', 'BNBUSDT:4h', 'PAXGUSDT:4h']
+# Constantes ajustadas a mano en scanners, executors y backtests
+DEFAULT_GRID = {
+    'profit_target': [0.04, 0.06, 0.08, 0.10, 0.12],
+    'stop_loss': [0.02, 0.03, 0.04, 0.05],
+    'min_depth_pct': [0.015, 0.02, 0.025, 0.03],
+    'window_low': [4, 6, 8],
+    'pre_slope_max': [-0.08, -0.10, -0.12, -0.15],
+    'rupture_tolerance': [0.95, 0.97, 0.99],
+    'max_hold': [40, 60, 80, 100],
+}
+SWEEPS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                          'data', 'sweeps')
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Barrido paralelo de parámetros de la estrategia U")
+    parser.add_argument('series', nargs='*', help="SYMBOL:interval (defecto BTC/ETH/BNB/PAXG 4h)")
+    parser.add_argument('--preset', default='bitcoin_2023', help="Parámetros base (defecto bitcoin_2023)")
+    parser.add_argument('--start', default=None, help="Fecha inicial YYYY-MM-DD (defecto: la del preset)")
+    parser.add_argument('--end', default=None, help="Fecha final YYYY-MM-DD (defecto: la del preset)")
+    parser.add_argument('--grid', action='append', default=[], metavar='CAMPO=VALORES',
+                        help="Valores de un parámetro (repetible); sin --grid se usa la rejilla por defecto")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos (defecto: CPUs)")
+    parser.add_argument('--sort', default='total_return', help="Columna de ranking (defecto total_return)")
+    parser.add_argument('--top', type=int, default=20, help="Filas a mostrar (defecto 20)")
+    parser.add_argument('--out', default=None, help="CSV de salida (defecto data/sweeps/sweep_<fecha>.csv)")
+    parser.add_argument('--store', default=None, help="Directorio del almacén (defecto OHLCV_STORE_DIR o data/ohlcv)")
+    return parser.parse_args(argv)
+
+
+def parse_grid(items):
+    """CAMPO=v1,v2 | CAMPO=inicio:fin:paso -> {campo: [valores]} con el tipo de StrategyParams"""
+    grid = {}
+    for item in items:
+        field, _, raw = item.partition('=')
+        if field not in StrategyParams._fields:
+            raise SystemExit(f"❌ Parámetro desconocido: {field}")
+        cast = type(StrategyParams._field_defaults[field])
+        if raw.count(':') == 2:
+            start, stop, step = (float(part) for part in raw.split(':'))
+            values = np.arange(start, stop + step / 2, step).round(10).tolist()
+        else:
+            values = [ast.literal_eval(part) for part in raw.split(',')]
+        grid[field] = [cast(value) if cast in (int, float) else value for value in values]
+    return grid
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if args.preset not in STRATEGY_PRESETS:
+        print(f"❌ Preset desconocido: {args.preset}")
+        return 1
+    preset = STRATEGY_PRESETS[args.preset]
+    start = datetime.strptime(args.start, '%Y-%m-%d') if args.start else preset.start
+    end = datetime.strptime(args.end, '%Y-%m-%d').replace(hour=23, minute=59, second=59) if args.end else preset.end
+    grid = parse_grid(args.grid) if args.grid else DEFAULT_GRID
+    combos = expand_grid(preset.params, grid)
+
+    # Velas una sola vez (almacén local); el barrido las publica en memoria compartida
+    store = OHLCVStore(args.store) if args.store else None
+    frames = {}
+    for item in args.series or DEFAULT_SERIES:
+        symbol, interval = item.split(':', 1)
+        df = load_klines(symbol.upper(), interval, start, end, store=store)
+        if df.empty:
+            print(f"⚠️ Sin velas para {symbol} {interval}, se omite")
+            continue
+        frames[f"{symbol.upper()} {interval}"] = df
+    if not frames:
+        print("❌ No hay velas para ninguna serie")
+        return 1
+
+    print(f"🔬 {len(combos)} combinaciones x {len(frames)} series ({start:%Y-%m-%d} → {end:%Y-%m-%d})")
+    started = datetime.now()
+    table = run_sweep(frames, combos, workers=args.workers, sort_by=args.sort)
+    seconds = (datetime.now() - started).total_seconds()
+    print(f"⚡ {len(table)} backtests en {seconds:.1f}s")
+
+    out = args.out or os.path.join(SWEEPS_DIR, f"sweep_{args.preset}_{datetime.now():%Y%m%d_%H%M%S}.csv")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    table.to_csv(out, index=False)
+    print(f"💾 Tabla completa: {out}")
+
+    columns = ['series', 'total_return', 'max_drawdown', 'win_rate', 'trades'] + list(grid)
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.float_format', '{:.3f}'.format):
+        print(table[columns].head(args.top).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+# tools/portfolio_backtest.py
+
+"""
+Backtest de cartera con capital compartido (trading_core.portfolio_backtest).
+
+Uso:
+    python tools/portfolio_backtest.py                                # últimos 365 días, 5 estrategias
+    python tools/portfolio_backtest.py --capital 2000 --alloc btc_4h=600 --alloc paxg_4h=0
+    python tools/portfolio_backtest.py --start 2024-01-01 --end 2024-12-31 --fee 0.0004
+
+Con --alloc NOMBRE=0 la estrategia queda fuera (como un *_allocated_usdt a 0).
+"""
+
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Añadimos el path de backend para poder importar trading_core.*
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trading_core.ohlcv_store import OHLCVStore, load_klines  # noqa: E402
+from trading_core.portfolio_backtest import DEFAULT_STRATEGIES, portfolio_summary, run_portfolio  # noqa: E402
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Backtest de cartera sobre una cuenta de futuros compartida")
+    parser.add_argument('--start', default=None, help="Fecha inicial YYYY-MM-DD (defecto: hace 365 días)")
+    parser.add_argument('--end', default=None, help="Fecha final YYYY-MM-DD (defecto: ahora)")
+    parser.add_argument('--capital', type=float, default=1000, help="Balance inicial USDT (defecto 1000)")
+    parser.add_argument('--alloc', action='append', default=[], metavar='NOMBRE=USDT',
+                        help="Exposición por trade de una estrategia (repetible)")
+    parser.add_argument('--leverage', type=int, default=None, help="Leverage de todas las estrategias (defecto 3)")
+    parser.add_argument('--fee', type=float, default=0.0, help="Comisión por lado (p. ej. 0.0004)")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos para las señales (defecto: CPUs)")
+    parser.add_argument('--store', default=None, help="Directorio del almacén (defecto OHLCV_STORE_DIR o data/ohlcv)")
+    parser.add_argument('--equity-csv', default=None, help="Guarda la curva de equity en este CSV")
+    return parser.parse_args(argv)
+
+
+def build_strategies(args):
+    allocations = {}
+    for item in args.alloc:
+        name, _, value = item.partition('=')
+        allocations[name] = float(value)
+    unknown = set(allocations) - {strategy.name for strategy in DEFAULT_STRATEGIES}
+    if unknown:
+        raise SystemExit(f"❌ Estrategias desconocidas: {', '.join(sorted(unknown))}")
+    strategies = []
+    for strategy in DEFAULT_STRATEGIES:
+        strategy = strategy._replace(allocated_usdt=allocations.get(strategy.name, strategy.allocated_usdt))
+        if args.leverage:
+            strategy = strategy._replace(leverage=args.leverage)
+        if strategy.allocated_usdt > 0:
+            strategies.append(strategy)
+    return strategies
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    end = datetime.strptime(args.end, '%Y-%m-%d').replace(hour=23, minute=59, second=59) if args.end else datetime.now()
+    start = datetime.strptime(args.start, '%Y-%m-%d') if args.start else end - timedelta(days=365)
+    strategies = build_strategies(args)
+
+    store = OHLCVStore(args.store) if args.store else None
+    frames = {}
+    for strategy in strategies:
+        if strategy.series_key not in frames:
+            frames[strategy.series_key] = load_klines(strategy.symbol, strategy.interval, start, end, store=store)
+            if frames[strategy.series_key].empty:
+                print(f"⚠️ Sin velas para {strategy.series_key}, se omiten sus estrategias")
+
+    print(f"💼 Cartera {start:%Y-%m-%d} → {end:%Y-%m-%d} | capital ${args.capital:,.2f}")
+    for strategy in strategies:
+        print(f"   • {strategy.name:8s} {strategy.series_key:14s} exposición ${strategy.allocated_usdt:,.2f} "
+              f"({strategy.leverage}x, margen ${strategy.allocated_usdt / strategy.leverage:,.2f})")
+
+    started = datetime.now()
+    result = run_portfolio(frames, strategies, args.capital, args.fee, args.workers)
+    summary = portfolio_summary(result)
+    print()
+    print(f"⚡ Tiempo de cálculo: {(datetime.now() - started).total_seconds():.2f}s")
+    print(f"💰 Capital final: ${result.final_capital:,.2f} ({summary['total_return']:+.2f}%)")
+    print(f"📉 Máximo drawdown: {summary['max_drawdown']:.2f}%")
+    print(f"🔢 Trades: {summary['total_trades']} | ✅ Win rate: {summary['win_rate']:.1f}% | "
+          f"⏭️ Descartadas: {summary['skipped']} | Margen máximo: ${summary['max_margin_used']:,.2f}")
+    print()
+    print("📊 POR ESTRATEGIA:")
+    for name, stats in summary['per_strategy'].items():
+        print(f"   {name:8s} {stats['trades']:4d} trades | PnL ${stats['pnl']:+,.2f} | "
+              f"win {stats['win_rate']:.1f}% | descartadas {stats.get('skipped', 0)}")
+
+    if args.equity_csv:
+        result.equity.to_csv(args.equity_csv, index=False)
+        print(f"💾 Curva de equity: {args.equity_csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
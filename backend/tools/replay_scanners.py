@@ -0,0 +1,111 @@
+# tools/replay_scanners.py
+
+"""
+Replay de los scanners de producción sobre velas históricas (app.services.replay_harness).
+
+Uso:
+    python tools/replay_scanners.py --start 2023-01-01 --end 2023-06-30                 # BTC 4h + BTC 30m
+    python tools/replay_scanners.py --scanner btc_30m --price-interval 1m --out data/replay
+    python tools/replay_scanners.py --scanner btc_4h --alloc 500 --leverage 5 --balance 2000
+
+Las velas salen del almacén local (o de Binance si faltan). Las órdenes van a
+un paper exchange y a un SQLite temporal (--db para conservarlo); nunca se
+usa la DATABASE_URL del servidor.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Añadimos el path de backend para poder importar app.* y trading_core.*
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trading_core.ohlcv_store import INTERVAL_MS, OHLCVStore, load_klines, to_ms  # noqa: E402
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Replay de los scanners reales con reloj virtual y paper exchange")
+    parser.add_argument('--scanner', action='append', default=[], help="btc_4h | btc_30m (repetible, defecto ambos)")
+    parser.add_argument('--start', default=None, help="Fecha inicial YYYY-MM-DD (defecto: hace 90 días)")
+    parser.add_argument('--end', default=None, help="Fecha final YYYY-MM-DD (defecto: ahora)")
+    parser.add_argument('--price-interval', default=None,
+                        help="Serie fina para precios y velas en formación (p. ej. 1m o 5m)")
+    parser.add_argument('--balance', type=float, default=1000, help="Balance inicial USDT del paper exchange")
+    parser.add_argument('--alloc', type=float, default=300, help="Exposición USDT por trade de cada scanner")
+    parser.add_argument('--leverage', type=int, default=3, help="default_leverage de la API key (defecto 3)")
+    parser.add_argument('--fee', type=float, default=0.0004, help="Comisión por lado (defecto 0.0004)")
+    parser.add_argument('--store', default=None, help="Directorio del almacén (defecto OHLCV_STORE_DIR o data/ohlcv)")
+    parser.add_argument('--db', default=None, help="SQLite del replay (defecto: temporal)")
+    parser.add_argument('--out', default=None, help="Directorio donde guardar ciclos, señales, fills y órdenes (CSV)")
+    parser.add_argument('--verbose', action='store_true', help="Muestra los logs de scanners y executors")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='replay_'), 'replay.db')
+
+    from app.services.replay_harness import REPLAY_TARGETS, ReplayHarness, prepare_database
+    prepare_database(db_path)
+    names = args.scanner or list(REPLAY_TARGETS)
+    unknown = set(names) - set(REPLAY_TARGETS)
+    if unknown:
+        raise SystemExit(f"❌ Scanners desconocidos: {', '.join(sorted(unknown))}")
+
+    end = datetime.strptime(args.end, '%Y-%m-%d').replace(hour=23, minute=59, second=59) if args.end else datetime.now()
+    start = datetime.strptime(args.start, '%Y-%m-%d') if args.start else end - timedelta(days=90)
+
+    # Velas de cada scanner con calentamiento (el buffer de producción guarda hasta 1000)
+    store = OHLCVStore(args.store) if args.store else None
+    scanned = {(REPLAY_TARGETS[name].symbol, REPLAY_TARGETS[name].interval) for name in names}
+    series = set(scanned)
+    if args.price_interval:
+        series |= {(symbol, args.price_interval) for symbol, _ in scanned}
+    frames = {}
+    for symbol, interval in sorted(series):
+        warmup = 1000 if (symbol, interval) in scanned else 1
+        since = to_ms(start) - warmup * INTERVAL_MS[interval]
+        frames[(symbol, interval)] = load_klines(symbol, interval, since, to_ms(end), store=store)
+        print(f"📥 {symbol} {interval}: {len(frames[(symbol, interval)])} velas")
+
+    # Tras cargar las velas: los logs de scanners/executors solo con --verbose
+    if not args.verbose:
+        logging.getLogger('app').setLevel(logging.WARNING)
+        logging.getLogger().setLevel(logging.WARNING)
+
+    harness = ReplayHarness(names, frames, to_ms(start), to_ms(end), args.balance, args.alloc, args.leverage, args.fee)
+    report = asyncio.run(harness.run())
+
+    print(f"\n🎬 Replay {start:%Y-%m-%d} → {end:%Y-%m-%d} | scanners: {', '.join(names)} | DB: {db_path}")
+    print(f"⚡ {report.candles} velas en {report.wall_seconds:.2f}s "
+          f"({report.candles / max(report.wall_seconds, 1e-9):,.0f} velas/s)")
+    for name, cycles in report.cycles.groupby('scanner', sort=False):
+        latency = cycles['latency_ms']
+        states = cycles['state'].value_counts().to_dict()
+        print(f"   • {name:8s} {len(cycles):6d} ciclos | latencia media {latency.mean():.2f} ms "
+              f"p99 {latency.quantile(0.99):.2f} ms máx {latency.max():.2f} ms | estados {states}")
+    print(f"🎯 Señales: {len(report.signals)} | 🔁 Transiciones de estado: {len(report.transitions)}")
+    for row in report.transitions.itertuples(index=False):
+        print(f"   {row.time:%Y-%m-%d %H:%M} {row.scanner:8s} {row.from_state} → {row.to_state}")
+    print(f"📒 Órdenes en DB: {len(report.orders)} | Fills paper: {len(report.fills)}")
+    print(f"💰 Wallet ${report.final_wallet:,.2f} | Equity ${report.final_equity:,.2f} "
+          f"(inicial ${report.initial_balance:,.2f})")
+    unsupported = harness.exchange.unsupported
+    if unsupported:
+        print(f"⚠️ Endpoints no soportados por el paper exchange: {dict(unsupported)}")
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        for name in ('cycles', 'transitions', 'signals', 'fills', 'orders'):
+            getattr(report, name).to_csv(os.path.join(args.out, f"{name}.csv"), index=False)
+        print(f"💾 CSV guardados en {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+# tools/run_backtest.py
+
+"""
+Backtest del patrón U con el motor único (trading_core.backtest_engine).
+
+Uso:
+    python tools/run_backtest.py                                  # lista de presets
+    python tools/run_backtest.py bitcoin_2023                     # mismo backtest que src/bitcoin_2023_backtest.py
+    python tools/run_backtest.py bitcoin_5m_strategy --start 2023-01-01 --end 2023-12-31
+    python tools/run_backtest.py eth_2024 --symbol BNBUSDT --set profit_target=0.1 --set n_lows=4
+"""
+
+import argparse
+import ast
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Añadimos el path de backend para poder importar trading_core.*
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trading_core.backtest_cache import BacktestCache  # noqa: E402
+from trading_core.backtest_engine import STRATEGY_PRESETS, StrategyParams, run_backtest, summarize  # noqa: E402
+from trading_core.ohlcv_store import OHLCVStore  # noqa: E402
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Backtest parametrizado del patrón U")
+    parser.add_argument('preset', nargs='?', help="Preset de STRATEGY_PRESETS (script de src/ equivalente)")
+    parser.add_argument('--symbol', default=None, help="Símbolo (defecto: el del preset)")
+    parser.add_argument('--interval', default=None, help="Intervalo (defecto: el del preset)")
+    parser.add_argument('--start', default=None, help="Fecha inicial YYYY-MM-DD")
+    parser.add_argument('--end', default=None, help="Fecha final YYYY-MM-DD (inclusive)")
+    parser.add_argument('--set', action='append', default=[], metavar='CAMPO=VALOR',
+                        help="Sobrescribe un parámetro de StrategyParams (repetible)")
+    parser.add_argument('--capital', type=float, default=1000, help="Capital inicial (defecto 1000)")
+    parser.add_argument('--store', default=None, help="Directorio del almacén (defecto OHLCV_STORE_DIR o data/ohlcv)")
+    parser.add_argument('--trades', type=int, default=15, help="Trades detallados a mostrar (defecto 15)")
+    parser.add_argument('--no-cache', action='store_true', help="Recalcula sin usar la caché de resultados")
+    parser.add_argument('--intrabar', default=None, choices=['1m', '5m'],
+                        help="Resuelve las velas que tocan TP y SL con sub-velas de este intervalo")
+    return parser.parse_args(argv)
+
+
+def parse_overrides(items):
+    """CAMPO=VALOR -> dict, validando el campo contra StrategyParams"""
+    overrides = {}
+    for item in items:
+        field, _, raw = item.partition('=')
+        if field not in StrategyParams._fields:
+            raise SystemExit(f"❌ Parámetro desconocido: {field} (válidos: {', '.join(StrategyParams._fields)})")
+        try:
+            overrides[field] = ast.literal_eval(raw)
+        except (ValueError, SyntaxError):
+            overrides[field] = raw
+    return overrides
+
+
+def print_report(name, symbol, interval, result, df, max_trades):
+    summary = summarize(result, df)
+    print()
+    print(f"📊 REPORTE BACKTEST U - {name} ({symbol} {interval})")
+    print("=" * 80)
+    print(f"   📅 Período: {df.index[0]} a {df.index[-1]} ({len(df)} velas, {result.windows} ventanas)")
+    print(f"   ⚡ Tiempo de cálculo: {result.seconds:.3f}s")
+    print(f"   💵 Capital inicial: ${result.initial_capital:,.2f}")
+    print(f"   💰 Capital final: ${result.final_capital:,.2f}")
+    print(f"   📈 Sistema U: {summary['total_return']:+.2f}%")
+    print(f"   📈 Buy & Hold: {summary['buy_hold_return']:+.2f}%")
+    print(f"   📉 Máximo drawdown: {summary['max_drawdown']:.2f}%")
+    print()
+    if not result.trades:
+        print("⚠️ No se generaron trades en el período")
+        return
+
+    print("📊 ESTADÍSTICAS DE TRADING:")
+    print(f"   🔢 Total trades: {summary['total_trades']}")
+    print(f"   ✅ Win rate: {summary['win_rate']:.1f}%")
+    print(f"   📈 Retorno promedio: {summary['avg_return']:.2f}%")
+    print(f"   🚀 Mejor trade: {summary['best_trade']:.2f}%")
+    print(f"   💥 Peor trade: {summary['worst_trade']:.2f}%")
+    print(f"   🚪 Salidas: {', '.join(f'{k} {v}' for k, v in sorted(summary['exit_reasons'].items()))}")
+    ambiguous = sum(1 for trade in result.trades if trade.get('ambiguous_bar'))
+    if ambiguous:
+        print(f"   🔍 Velas de salida con TP y SL: {ambiguous}")
+    print()
+
+    print("📅 PERFORMANCE MENSUAL:")
+    print("-" * 50)
+    for month, returns in sorted(summary['monthly'].items()):
+        total_monthly = sum(returns)
+        status = "🟢" if total_monthly > 0 else "🔴" if total_monthly < 0 else "🟡"
+        print(f"   {status} {month}: {len(returns)} trades | Avg: {np.mean(returns):+.2f}% | Total: {total_monthly:+.2f}%")
+    print()
+
+    print(f"💰 PRIMEROS {max_trades} TRADES DETALLADOS:")
+    print("-" * 80)
+    for trade in result.trades[:max_trades]:
+        status = "✅" if trade['return_pct'] > 0 else "❌"
+        print(f"{status} #{trade['trade_number']} | {trade['entry_time']:%Y-%m-%d %H:%M} | "
+              f"${trade['entry_price']:,.2f} → ${trade['exit_price']:,.2f} | "
+              f"{trade['return_pct'] * 100:+.2f}% | {trade['hold_hours']}h | {trade['exit_reason']}")
+    if len(result.trades) > max_trades:
+        print(f"   ... y {len(result.trades) - max_trades} trades más")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.preset is None:
+        print("Presets disponibles:")
+        for name, preset in STRATEGY_PRESETS.items():
+            print(f"   {name:22s} {preset.symbol} {preset.interval}")
+        return 0
+    if args.preset not in STRATEGY_PRESETS:
+        print(f"❌ Preset desconocido: {args.preset}")
+        return 1
+
+    preset = STRATEGY_PRESETS[args.preset]
+    params = preset.params._replace(**parse_overrides(args.set))
+    symbol = (args.symbol or preset.symbol).upper()
+    interval = args.interval or preset.interval
+    start, end = preset.start, preset.end
+    if preset.lookback_days:
+        end = datetime.now()
+        start = end - timedelta(days=preset.lookback_days)
+    if args.start:
+        start = datetime.strptime(args.start, '%Y-%m-%d')
+    if args.end:
+        end = datetime.strptime(args.end, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
+
+    print(f"🚀 Backtest {args.preset}: {symbol} {interval} {start:%Y-%m-%d} → {end:%Y-%m-%d}")
+    store = OHLCVStore(args.store) if args.store else None
+    cache = None if args.no_cache else BacktestCache()
+    result, df = run_backtest(symbol, interval, start, end, params, args.capital, store=store, cache=cache,
+                              intrabar_interval=args.intrabar)
+    if cache is not None and cache.hits:
+        print("♻️ Resultado desde la caché (mismas velas y parámetros)")
+    if df.empty:
+        print("❌ No se pudieron obtener velas para el período")
+        return 1
+    print_report(args.preset, symbol, interval, result, df, args.trades)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+# backend/trading_core/backtest_cache.py
+
+"""
+Caché en disco de resultados de backtest direccionada por contenido.
+
+Un backtest es una función pura de las velas y de los parámetros, así que su
+resultado (trades, estadísticas, curva de equity) se guarda bajo la clave
+
+    blake2b(namespace, CACHE_VERSION, huella de las velas, hash de los parámetros)
+
+  - huella de las velas: hash de open_time (ms) y de las columnas OHLCV en
+    float64; si el rango cambia (vela nueva, relleno de un hueco) cambia la clave
+  - hash de parámetros: JSON canónico (claves ordenadas) del NamedTuple /
+    dict de configuración, incluido el capital inicial
+  - namespace: el motor que produjo el resultado ('engine', 'generator'...),
+    para que dos lógicas distintas no compartan entradas
+
+Cada entrada es un pickle en <root>/<2 hex>/<clave>.pkl escrito de forma
+atómica (archivo temporal + os.replace). Los aciertos actualizan el mtime y
+al superar `max_bytes` se borran las entradas menos usadas (LRU por mtime).
+Subir CACHE_VERSION invalida todo si cambia la lógica de los backtests.
+
+El directorio por defecto es `data/backtest_cache` en la raíz del repositorio
+(variables de entorno BACKTEST_CACHE_DIR y BACKTEST_CACHE_MAX_MB).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'backtest_cache'))
+DEFAULT_MAX_MB = 256
+
+# Subir al cambiar la lógica de los backtests (invalida todas las entradas)
+CACHE_VERSION = 2
+
+_MISSING = object()
+
+
+def candles_fingerprint(df: pd.DataFrame) -> str:
+    """Hash del rango de velas: aperturas en ms + columnas OHLCV en float64"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(df.index.as_unit('ms').asi8).tobytes())
+    for column in ('open', 'high', 'low', 'close', 'volume'):
+        if column in df:
+            digest.update(column.encode())
+            digest.update(np.ascontiguousarray(df[column].to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+
+def _canonical(value: Any) -> Any:
+    """NamedTuple / dict / tuple -> estructura JSON estable"""
+    if hasattr(value, '_asdict'):
+        return {key: _canonical(item) for key, item in value._asdict().items()}
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def params_hash(params: Any) -> str:
+    """Hash del JSON canónico de los parámetros"""
+    payload = json.dumps(_canonical(params), sort_keys=True, default=repr)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+class BacktestCache:
+    """Resultados de backtest en disco con expulsión LRU por tamaño"""
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.root = root or os.environ.get('BACKTEST_CACHE_DIR') or DEFAULT_ROOT
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get('BACKTEST_CACHE_MAX_MB', DEFAULT_MAX_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, df: pd.DataFrame, params: Any, namespace: str = 'engine') -> str:
+        digest = hashlib.blake2b(digest_size=20)
+        for part in (namespace, str(CACHE_VERSION), candles_fingerprint(df), params_hash(params)):
+            digest.update(part.encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.pkl")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return default
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            logger.warning(f"⚠️ Entrada de caché ilegible {key}: {e}")
+            self._remove(path)
+            self.misses += 1
+            return default
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        self.evict()
+
+    def get_or_compute(self, df: pd.DataFrame, params: Any, compute: Callable[[], Any],
+                       namespace: str = 'engine') -> Any:
+        """Resultado guardado para (velas, parámetros) o compute() y se guarda"""
+        key = self.key(df, params, namespace)
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def evict(self):
+        """Borra las entradas con mtime más antiguo hasta quedar por debajo de max_bytes"""
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if not filename.endswith('.pkl'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+        logger.info(f"🧹 Caché de backtests reducida a {total / 1024 / 1024:.1f} MB")
+
+    def clear(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(('.pkl', '.tmp')):
+                    self._remove(os.path.join(dirpath, filename))
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,433 @@
+# backend/trading_core/backtest_engine.py
+
+"""
+Motor único de backtesting del patrón U.
+
+Los scripts de `src/` (bitcoin_2022..2024, eth/bnb por año, 30m, 1h, 15m,
+estrategias 1h/15m/5m) son la misma clase copiada con otros umbrales: cada
+uno pide sus velas, recorre ventanas con `df.iloc[start:end].copy()`,
+vuelve a detectar mínimos y a calcular ATR/pendientes en cada ventana y
+simula los trades con `iterrows`. Aquí la estrategia es un objeto de
+parámetros (StrategyParams) y el trabajo pesado se hace una sola vez sobre
+toda la serie:
+  - mínimos significativos (ventanas centradas) y su profundidad
+  - true range de cada vela y pendiente previa de cada mínimo
+Cada ventana solo busca con searchsorted qué mínimos caen dentro y evalúa
+las condiciones de señal con pendientes escalares (trading_core.indicators);
+los trades de todas las señales se simulan juntos con
+trading_core.trade_simulator. Sin `intrabar` los trades y el capital final
+son los mismos que los de los scripts originales (src/u_pattern_parity_check.py
+lo comprueba preset por preset).
+
+Un mínimo en el centro c tiene la misma ventana centrada en la serie
+completa que en la ventana [start, end) siempre que start + window_low <= c
+< end - window_low, que es justamente el rango en el que el detector por
+ventana lo puede encontrar.
+
+Con `intrabar` (load_intrabar) las velas de salida que tocan TP y SL a la
+vez se resuelven con las sub-velas de 1m/5m del almacén en lugar de dar
+siempre TAKE_PROFIT, así que esos resultados ya no coinciden con los
+originales: los trades de esas velas pueden pasar a STOP_LOSS (otro
+exit_price y return_pct) y el capital final cambia en consecuencia.
+"""
+
+import copy
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from trading_core.backtest_cache import BacktestCache, candles_fingerprint
+from trading_core.indicators import slope, true_range
+from trading_core.ohlcv_store import INTERVAL_MS, OHLCVStore, TimeLike, load_klines
+from trading_core.trade_simulator import EXIT_REASONS, Intrabar, simulate_trades
+from trading_core.u_pattern_kernel import LOW_FILTERS, find_significant_lows
+
+
+class StrategyParams(NamedTuple):
+    """
+    Parámetros de una estrategia U (detección + gestión del trade).
+
+    Los valores por defecto son los de bitcoin_2023_backtest.py; el resto de
+    scripts están en STRATEGY_PRESETS. Al ser una tupla, `params._replace(...)`
+    genera variantes para barridos de parámetros.
+    """
+    # Mínimos significativos (variante de LOW_FILTERS, semiancho y profundidad)
+    low_variant: str = '2023'
+    window_low: int = 6
+    min_depth_pct: float = 0.025
+    n_lows: int = 4                  # se evalúan los últimos n_lows mínimos de la ventana
+    min_width: int = 4               # min_width < len(ventana) - min_idx < max_width
+    max_width: int = 45
+    # Condiciones de señal
+    atr_period: int = 14
+    recent_slope_len: int = 6
+    pre_slope_len: int = 6
+    pre_slope_max: float = -0.12
+    rupture_tolerance: float = 0.97
+    recent_slope_min: float = -0.03
+    signal_min_depth: float = 0.025
+    # (base, umbral 1, umbral 2, pendiente 1, pendiente 2, máximo) del factor de ruptura
+    rupture: Tuple[float, ...] = (1.015, 0.015, 0.03, 0.3, 0.5, 1.05)
+    # Filtro de momentum: None, 'slope' (momentum_ok) o 'trend' (estrategias 1h/15m/5m)
+    momentum: Optional[str] = 'slope'
+    momentum_len: int = 20
+    momentum_slope_min: float = -0.1
+    momentum_since_min: float = -0.05  # solo 'trend': pendiente desde el mínimo
+    # Gestión del trade
+    profit_target: float = 0.08
+    stop_loss: float = 0.03
+    max_hold: int = 80               # velas
+    # Recorrido de ventanas
+    window_size: int = 120
+    step_size: int = 8
+    data_reserve: int = 50           # velas finales reservadas para simular trades
+    future_extra: int = 50           # velas extra tras max_hold en los datos futuros
+    min_future: int = 5              # sin al menos estas velas futuras no se simula
+
+
+class BacktestPreset(NamedTuple):
+    """Configuración de uno de los scripts de src/"""
+    symbol: str
+    interval: str
+    start: Optional[TimeLike]
+    end: Optional[TimeLike]
+    params: StrategyParams
+    lookback_days: Optional[int] = None  # rango relativo a hoy (start/end None)
+
+
+_BTC_4H = StrategyParams()
+_ALT_4H = StrategyParams(n_lows=3)
+_BTC_30M = StrategyParams(
+    low_variant='30min', window_low=3, min_depth_pct=0.015, n_lows=2, min_width=2, max_width=24,
+    atr_period=7, recent_slope_len=3, pre_slope_len=3, pre_slope_max=-0.08, rupture_tolerance=0.98,
+    recent_slope_min=-0.02, signal_min_depth=0.015, rupture=(1.008, 0.01, 0.02, 0.2, 0.3, 1.025),
+    momentum_len=10, momentum_slope_min=-0.05, profit_target=0.04, stop_loss=0.015, max_hold=48,
+    window_size=48, step_size=4, future_extra=20, min_future=3,
+)
+_BTC_1H = _BTC_30M._replace(
+    low_variant='1h', min_width=1, atr_period=6, recent_slope_min=-0.01,
+    rupture=(1.008, 0.010, 0.015, 0.10, 0.20, 1.020), momentum_len=4, momentum_slope_min=-0.03,
+    step_size=2,
+)
+# Estrategias 1h/15m/5m: detección 2023 con el filtro de tendencia de 12 velas
+_BTC_STRATEGY = StrategyParams(
+    rupture=(1.012, 0.015, 0.025, 0.15, 0.25, 1.035), momentum='trend', momentum_len=12,
+    momentum_slope_min=-0.08, momentum_since_min=-0.05, profit_target=0.04, stop_loss=0.015,
+    future_extra=20, min_future=3,
+)
+
+
+def _year(year: int) -> Tuple[datetime, datetime]:
+    return datetime(year, 1, 1), datetime(year, 12, 31, 23, 59, 59)
+
+
+# Un preset por script de src/ (mismo símbolo, intervalo, rango y umbrales)
+STRATEGY_PRESETS: Dict[str, BacktestPreset] = {
+    'bitcoin_2022': BacktestPreset('BTCUSDT', '4h', *_year(2022), _ALT_4H),
+    'bitcoin_2023': BacktestPreset('BTCUSDT', '4h', *_year(2023), _BTC_4H),
+    'bitcoin_2024': BacktestPreset('BTCUSDT', '4h', *_year(2024), StrategyParams(
+        low_variant='basic', window_low=8, min_depth_pct=0.03, n_lows=3, min_width=5, max_width=60,
+        recent_slope_len=8, pre_slope_len=8, pre_slope_max=-0.15, rupture_tolerance=0.95,
+        recent_slope_min=-0.05, signal_min_depth=0.03, rupture=(1.02, 0.02, 0.05, 0.5, 0.8, 1.08),
+        momentum=None, profit_target=0.12, stop_loss=0.05, max_hold=100, window_size=150, step_size=10,
+    )),
+    'eth_2022': BacktestPreset('ETHUSDT', '4h', *_year(2022), _ALT_4H),
+    'eth_2023': BacktestPreset('ETHUSDT', '4h', *_year(2023), _ALT_4H),
+    'eth_2024': BacktestPreset('ETHUSDT', '4h', *_year(2024), _ALT_4H),
+    'bnb_2022': BacktestPreset('BNBUSDT', '4h', *_year(2022), _ALT_4H),
+    'bnb_2023': BacktestPreset('BNBUSDT', '4h', *_year(2023), _ALT_4H),
+    'bnb_2024': BacktestPreset('BNBUSDT', '4h', *_year(2024), _ALT_4H),
+    'bitcoin_30m': BacktestPreset('BTCUSDT', '30m', *_year(2024), _BTC_30M),
+    'bitcoin_1h': BacktestPreset('BTCUSDT', '1h', datetime(2024, 1, 1), datetime(2025, 1, 1), _BTC_1H),
+    'bitcoin_15m': BacktestPreset('BTCUSDT', '15m', None, None, _BTC_30M._replace(
+        low_variant='15min', min_depth_pct=0.010, max_width=16, atr_period=6, pre_slope_max=-0.05,
+        rupture_tolerance=0.99, recent_slope_min=-0.01, signal_min_depth=0.010,
+        rupture=(1.006, 0.008, 0.015, 0.15, 0.25, 1.02), momentum_len=8, momentum_slope_min=-0.04,
+        max_hold=96, window_size=32,
+    ), lookback_days=180),
+    'bitcoin_15m_unified': BacktestPreset('BTCUSDT', '15m', datetime(2024, 1, 1), datetime(2025, 1, 1),
+                                          _BTC_1H._replace(
+        min_width=2, max_width=48, momentum_len=8, max_hold=96, window_size=96, step_size=8,
+    )),
+    'bitcoin_1h_strategy': BacktestPreset('BTCUSDT', '1h', *_year(2024), _BTC_STRATEGY._replace(
+        max_hold=48, window_size=24, step_size=2,
+    )),
+    'bitcoin_15m_strategy': BacktestPreset('BTCUSDT', '15m', *_year(2024), _BTC_STRATEGY._replace(
+        max_hold=96, window_size=48, step_size=4, data_reserve=100,
+    )),
+    'bitcoin_5m_strategy': BacktestPreset('BTCUSDT', '5m', *_year(2024), _BTC_STRATEGY._replace(
+        profit_target=0.02, stop_loss=0.01, max_hold=288, window_size=144, step_size=12, data_reserve=300,
+    )),
+    # PAXG 4h no tiene script en src/: umbrales de paxg_scanner_service (TP 8%, SL 3%,
+    # profundidad 2.5%, 80 velas, ventana 120), los mismos que bitcoin_2023. El scanner
+    # confirma el patrón con su propio criterio (recuperación desde el mínimo); aquí se
+    # aproxima con la detección U 2023.
+    'paxg_4h': BacktestPreset('PAXGUSDT', '4h', *_year(2023), _BTC_4H),
+}
+
+
+# Parámetros que cambian el precálculo sobre la serie / solo la simulación de los trades
+PRECOMPUTE_FIELDS = ('low_variant', 'window_low', 'min_depth_pct', 'pre_slope_len')
+TRADE_FIELDS = ('profit_target', 'stop_loss', 'max_hold', 'future_extra', 'min_future')
+
+
+class BacktestResult(NamedTuple):
+    params: StrategyParams
+    trades: List[Dict]
+    equity_curve: List[float]
+    initial_capital: float
+    final_capital: float
+    windows: int
+    seconds: float
+
+
+def _rupture_factor(rupture: Tuple[float, ...], atr_pct: float) -> float:
+    base, threshold_1, threshold_2, slope_1, slope_2, cap = rupture
+    if atr_pct < threshold_1:
+        factor = base
+    elif atr_pct < threshold_2:
+        factor = base + (atr_pct * slope_1)
+    else:
+        factor = min(base + (atr_pct * slope_2), cap)
+    return max(factor, base)
+
+
+class BacktestEngine:
+    """
+    Backtest de una estrategia U sobre una serie OHLCV completa.
+
+    Args:
+        df: Velas indexadas por timestamp (columnas open/high/low/close/volume)
+        params: Parámetros de la estrategia
+        intrabar: Sub-velas para las velas de salida ambiguas (load_intrabar)
+    """
+
+    def __init__(self, df: pd.DataFrame, params: StrategyParams = StrategyParams(),
+                 intrabar: Optional[Intrabar] = None):
+        self.df = df
+        self.params = params
+        self.intrabar = intrabar
+        self.index = df.index
+        self.high = df['high'].to_numpy(dtype=np.float64)
+        self.low = df['low'].to_numpy(dtype=np.float64)
+        self.close = df['close'].to_numpy(dtype=np.float64)
+        volume = df['volume'].to_numpy(dtype=np.float64) if 'volume' in df else None
+
+        # Precálculo sobre toda la serie (una vez por backtest)
+        filters = LOW_FILTERS[params.low_variant]
+        self._recent_margin = filters['recent_margin'] or 0
+        self._lows, self._depths = find_significant_lows(
+            self.low, self.high, volume, window=params.window_low, min_depth_pct=params.min_depth_pct,
+            recent_margin=None, volume_ratio=filters['volume_ratio'], strong_depth=filters['strong_depth'],
+        )
+        # true_range[j - 1] es el TR de la vela j
+        self._true_range = true_range(self.high, self.low, self.close)
+        # Pendiente previa de cada mínimo (no depende de la ventana mientras quepa en ella)
+        pre_len = params.pre_slope_len
+        self._pre_slopes = np.array([slope(self.close[max(c - pre_len, 0):c]) for c in self._lows.tolist()])
+
+    def with_params(self, params: StrategyParams) -> 'BacktestEngine':
+        """Motor con otros parámetros; reutiliza el precálculo si no cambian PRECOMPUTE_FIELDS"""
+        if any(getattr(params, field) != getattr(self.params, field) for field in PRECOMPUTE_FIELDS):
+            return BacktestEngine(self.df, params, self.intrabar)
+        engine = copy.copy(self)
+        engine.params = params
+        return engine
+
+    def window_ends(self) -> range:
+        """Fin (exclusivo) de cada ventana analizada, como el bucle de los scripts"""
+        p = self.params
+        n = len(self.close)
+        total = max((n - p.window_size) // p.step_size, 0)
+        last = min(total, max(-(-(n - p.data_reserve - p.window_size) // p.step_size), 0))
+        return range(p.window_size, p.window_size + last * p.step_size, p.step_size)
+
+    def detect(self, end: int, start: Optional[int] = None) -> Optional[Dict]:
+        """Señal de la ventana [start, end), por defecto [end - window_size, end) (None si no hay patrón)"""
+        p = self.params
+        if start is None:
+            start = end - p.window_size
+        close = self.close
+        lows = self._lows
+        first = np.searchsorted(lows, start + p.window_low)
+        last = np.searchsorted(lows, end - max(p.window_low, self._recent_margin))
+        first = max(first, last - p.n_lows)
+        if first >= last:
+            return None
+
+        atr = recent_slope = factor = None
+        price = close[end - 1]
+        for k in range(first, last):
+            c = int(lows[k])
+            width = end - c
+            if not p.min_width < width < p.max_width:
+                continue
+            if atr is None:
+                tr = self._true_range[max(start, end - p.atr_period - 1):end - 1]
+                atr = np.mean(tr) if len(tr) else self.high[end - 1] - self.low[end - 1]
+                factor = _rupture_factor(p.rupture, atr / price)
+                recent_slope = slope(close[max(start, end - p.recent_slope_len):end])
+            if c - p.pre_slope_len >= start:
+                pre_slope = self._pre_slopes[k]
+            else:
+                pre_slope = slope(close[start:c])
+            nivel_ruptura = self.high[c] * factor
+            conditions = (
+                pre_slope < p.pre_slope_max
+                and price > nivel_ruptura * p.rupture_tolerance
+                and recent_slope > p.recent_slope_min
+                and self._depths[k] >= p.signal_min_depth
+                and self._momentum_ok(start, end, c)
+            )
+            if conditions:
+                return {
+                    'timestamp': self.index[end - 1],
+                    'entry_price': nivel_ruptura,
+                    'signal_strength': abs(pre_slope),
+                    'min_price': self.low[c],
+                    'pattern_width': width,
+                    'atr': atr,
+                    'dynamic_factor': factor,
+                    'depth': self._depths[k],
+                }
+        return None
+
+    def _momentum_ok(self, start: int, end: int, c: int) -> bool:
+        p = self.params
+        if p.momentum is None or c - start < p.momentum_len:
+            return True
+        trend_slope = slope(self.close[max(start, end - p.momentum_len):end])
+        if p.momentum == 'slope':
+            return trend_slope > p.momentum_slope_min
+        since_slope = slope(self.close[c:end]) if end - c > 2 else 0
+        return trend_slope > p.momentum_slope_min and since_slope > p.momentum_since_min
+
+    def simulate(self, signals: List[Tuple[int, Dict]]) -> List[Dict]:
+        """
+        Simula todos los trades (vela de entrada, señal) en una pasada con
+        trade_simulator: TP antes que SL en la misma vela, cierre por max_hold
+        o fin de datos. Las señales sin velas futuras suficientes se descartan.
+        """
+        p = self.params
+        if not signals:
+            return []
+        entry_idx = np.array([start_idx for start_idx, _ in signals], dtype=np.int64)
+        entry_price = np.array([signal['entry_price'] for _, signal in signals], dtype=np.float64)
+        sim = simulate_trades(self.high, self.low, self.close, entry_idx, entry_price, p.profit_target,
+                              p.stop_loss, p.max_hold, p.future_extra, p.min_future, intrabar=self.intrabar)
+        trades = []
+        for k in np.flatnonzero(sim.valid).tolist():
+            start_idx, signal = signals[k]
+            entry_time = signal['timestamp']
+            exit_idx = int(sim.exit_idx[k])
+            exit_time = self.index[exit_idx]
+            trades.append({
+                'entry_time': entry_time,
+                'exit_time': exit_time,
+                'entry_price': signal['entry_price'],
+                'exit_price': sim.exit_price[k],
+                'return_pct': sim.return_pct[k],
+                'hold_hours': int((exit_time - entry_time).total_seconds() / 3600),
+                'hold_periods': exit_idx - start_idx + 1,
+                'exit_reason': EXIT_REASONS[sim.exit_reason[k]],
+                'ambiguous_bar': bool(sim.ambiguous[k]),
+                'max_profit': sim.max_profit[k],
+                'max_drawdown': sim.max_drawdown[k],
+                'signal_strength': signal['signal_strength'],
+                'depth': signal['depth'],
+            })
+        return trades
+
+    def signals(self) -> List[Tuple[int, Dict]]:
+        """(vela de entrada, señal) de todas las ventanas; no depende de TRADE_FIELDS"""
+        signals = []
+        for end in self.window_ends():
+            signal = self.detect(end)
+            if signal is not None:
+                signals.append((end, signal))
+        return signals
+
+    def run(self, initial_capital: float = 1000,
+            signals: Optional[List[Tuple[int, Dict]]] = None) -> BacktestResult:
+        """
+        Recorre todas las ventanas; el capital se compone trade a trade (pueden solaparse).
+        `signals` permite reutilizar las señales de otra corrida con los mismos
+        parámetros salvo TRADE_FIELDS.
+        """
+        started = datetime.now()
+        ends = self.window_ends()
+        if signals is None:
+            signals = self.signals()
+
+        trades = self.simulate(signals)
+        capital = initial_capital
+        equity_curve = [initial_capital]
+        for number, trade in enumerate(trades, 1):
+            trade['trade_number'] = number
+            capital *= (1 + trade['return_pct'])
+            equity_curve.append(capital)
+        return BacktestResult(self.params, trades, equity_curve, initial_capital, capital, len(ends),
+                              (datetime.now() - started).total_seconds())
+
+
+def load_intrabar(symbol: str, interval: str, df: pd.DataFrame, sub_interval: str = '1m',
+                  store: Optional[OHLCVStore] = None) -> Tuple[Intrabar, pd.DataFrame]:
+    """Sub-velas que cubren las velas de df (del almacén, descargando solo los huecos)"""
+    bar_ms = INTERVAL_MS[interval]
+    bar_open = df.index.as_unit('ms').asi8
+    sub = load_klines(symbol, sub_interval, int(bar_open[0]), int(bar_open[-1]) + bar_ms - 1, store=store)
+    intrabar = Intrabar(bar_open, bar_ms, sub.index.as_unit('ms').asi8,
+                        sub['high'].to_numpy(dtype=np.float64), sub['low'].to_numpy(dtype=np.float64))
+    return intrabar, sub
+
+
+def run_backtest(symbol: str, interval: str, start: TimeLike, end: TimeLike,
+                 params: StrategyParams = StrategyParams(), initial_capital: float = 1000,
+                 store: Optional[OHLCVStore] = None,
+                 cache: Optional[BacktestCache] = None,
+                 intrabar_interval: Optional[str] = None) -> Tuple[BacktestResult, pd.DataFrame]:
+    """
+    Velas del almacén local (descarga solo los huecos) + backtest; devuelve también las velas.
+    Con `cache` el resultado se reutiliza mientras no cambien las velas ni los parámetros.
+    Con `intrabar_interval` ('1m', '5m') las velas ambiguas se resuelven con sub-velas.
+    """
+    df = load_klines(symbol, interval, start, end, store=store)
+    if df.empty:
+        return BacktestResult(params, [], [initial_capital], initial_capital, initial_capital, 0, 0.0), df
+    intrabar = None
+    key = (params, initial_capital)
+    if intrabar_interval:
+        intrabar, sub = load_intrabar(symbol, interval, df, intrabar_interval, store=store)
+        key += (intrabar_interval, candles_fingerprint(sub))
+    if cache is None:
+        return BacktestEngine(df, params, intrabar).run(initial_capital), df
+    result = cache.get_or_compute(df, key, lambda: BacktestEngine(df, params, intrabar).run(initial_capital))
+    return result, df
+
+
+def summarize(result: BacktestResult, df: Optional[pd.DataFrame] = None) -> Dict:
+    """Estadísticas del reporte de los scripts: retorno, win rate, drawdown, meses, buy & hold"""
+    trades = result.trades
+    returns = np.array([t['return_pct'] for t in trades], dtype=np.float64)
+    equity = np.array(result.equity_curve, dtype=np.float64)
+    peak = np.maximum.accumulate(equity)
+    summary = {
+        'total_trades': len(trades),
+        'win_rate': float((returns > 0).mean() * 100) if len(returns) else 0.0,
+        'total_return': (result.final_capital / result.initial_capital - 1) * 100,
+        'avg_return': float(returns.mean() * 100) if len(returns) else 0.0,
+        'best_trade': float(returns.max() * 100) if len(returns) else 0.0,
+        'worst_trade': float(returns.min() * 100) if len(returns) else 0.0,
+        'max_drawdown': float(((peak - equity) / peak).max() * 100),
+        'exit_reasons': {},
+        'monthly': {},
+    }
+    for trade in trades:
+        summary['exit_reasons'][trade['exit_reason']] = summary['exit_reasons'].get(trade['exit_reason'], 0) + 1
+        month = summary['monthly'].setdefault(trade['entry_time'].strftime('%Y-%m'), [])
+        month.append(trade['return_pct'] * 100)
+    if df is not None and len(df):
+        summary['buy_hold_return'] = (df['close'].iloc[-1] / df['open'].iloc[0] - 1) * 100
+    return summary
@@ -0,0 +1,154 @@
+# backend/trading_core/backtest_job.py
+
+"""
+Trabajo de backtest que corre en un proceso del pool de backtest_job_service.
+
+Todo lo que el proceso comparte con la API va por archivos en el directorio
+de trabajos (así sobrevive a reinicios y no hace falta un Manager):
+
+    <jobs_dir>/<job_id>.progress.json   fase, % y mensaje (reemplazo atómico)
+    <jobs_dir>/<job_id>.result.json     resultado final (resumen, señales, equity)
+    <jobs_dir>/<job_id>.cancel          existe -> el trabajo se detiene
+
+El backtest es el de trading_core.backtest_engine: velas del almacén local,
+ventanas con `engine.detect` (avance reportado cada PROGRESS_EVERY ventanas)
+y simulación vectorizada de los trades.
+"""
+
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, NamedTuple, Optional
+
+import numpy as np
+
+from trading_core.backtest_engine import BacktestEngine, StrategyParams, summarize
+from trading_core.ohlcv_store import OHLCVStore, load_klines
+
+# Ventanas entre comprobaciones de avance / cancelación
+PROGRESS_EVERY = 50
+# Segundos mínimos entre escrituras del archivo de avance
+PROGRESS_INTERVAL = 0.5
+
+
+class JobSpec(NamedTuple):
+    symbol: str
+    interval: str
+    start_ms: int
+    end_ms: int
+    params: StrategyParams = StrategyParams()
+    initial_capital: float = 1000.0
+    years_back: Optional[int] = None
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def job_path(jobs_dir: str, job_id: str, kind: str) -> str:
+    """kind: 'progress' | 'result' | 'cancel' | 'meta'"""
+    suffix = {'progress': '.progress.json', 'result': '.result.json', 'cancel': '.cancel', 'meta': '.json'}[kind]
+    return os.path.join(jobs_dir, f"{job_id}{suffix}")
+
+
+def write_json(path: str, data: Any):
+    """Escritura atómica (archivo temporal + os.replace)"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, default=str)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class _Progress:
+    def __init__(self, jobs_dir: str, job_id: str):
+        self.path = job_path(jobs_dir, job_id, 'progress')
+        self.cancel_path = job_path(jobs_dir, job_id, 'cancel')
+        self._last = 0.0
+        self.started_at = datetime.now().isoformat()
+
+    def update(self, progress: float, phase: str, message: str, force: bool = False):
+        if os.path.exists(self.cancel_path):
+            raise JobCancelled()
+        now = time.monotonic()
+        if force or now - self._last >= PROGRESS_INTERVAL:
+            self._last = now
+            write_json(self.path, {'progress': round(progress, 1), 'phase': phase, 'message': message,
+                                   'started_at': self.started_at})
+
+    def done(self, message: str):
+        """Último avance: el resultado ya está escrito, una cancelación tardía no lo descarta"""
+        write_json(self.path, {'progress': 100, 'phase': 'done', 'message': message, 'started_at': self.started_at})
+
+
+def run_job(job_id: str, jobs_dir: str, spec: JobSpec, store_root: Optional[str] = None) -> Dict:
+    """Ejecuta el backtest y guarda el resultado; devuelve el resumen"""
+    progress = _Progress(jobs_dir, job_id)
+    progress.update(2, 'loading', f"📥 {spec.symbol} - Cargando velas {spec.interval}...", force=True)
+    store = OHLCVStore(store_root) if store_root else None
+    df = load_klines(spec.symbol, spec.interval, spec.start_ms, spec.end_ms, store=store)
+    if df.empty:
+        raise ValueError(f"No se pudieron obtener velas de {spec.symbol} {spec.interval}")
+
+    engine = BacktestEngine(df, spec.params)
+    ends = engine.window_ends()
+    signals = []
+    for number, end in enumerate(ends):
+        if number % PROGRESS_EVERY == 0:
+            pct = 10 + 80 * number / max(len(ends), 1)
+            progress.update(pct, 'scanning', f"🎯 {spec.symbol} - Buscando patrones U ({pct:.0f}%)")
+        signal = engine.detect(end)
+        if signal is not None:
+            signals.append((end, signal))
+
+    progress.update(92, 'simulating', f"📊 {spec.symbol} - Simulando {len(signals)} trades...", force=True)
+    result = engine.run(spec.initial_capital, signals=signals)
+    summary = summarize(result, df)
+    trades = result.trades
+    payload = {
+        'symbol': spec.symbol,
+        'interval': spec.interval,
+        'years_analyzed': spec.years_back,
+        'data_points': len(df),
+        'windows_analyzed': result.windows,
+        'period': {'start': df.index[0].isoformat(), 'end': df.index[-1].isoformat()},
+        'params': spec.params._asdict(),
+        'summary': {key: value for key, value in summary.items() if key != 'monthly'},
+        'monthly': {month: float(np.sum(returns)) for month, returns in summary['monthly'].items()},
+        'total_signals': len(trades),
+        'successful_signals': sum(1 for trade in trades if trade['return_pct'] > 0),
+        'success_rate': round(summary['win_rate'], 1),
+        'signals': [{
+            'date': trade['entry_time'].strftime('%Y-%m-%d'),
+            'timestamp': trade['entry_time'].isoformat(),
+            'rupture_level': float(trade['entry_price']),
+            'exit_time': trade['exit_time'].isoformat(),
+            'exit_price': float(trade['exit_price']),
+            'exit_reason': trade['exit_reason'],
+            'return_pct': round(float(trade['return_pct']) * 100, 2),
+            'profit_potential': round(float(trade['max_profit']) * 100, 2),
+            'success': bool(trade['return_pct'] > 0),
+        } for trade in trades],
+        'equity_curve': [float(value) for value in result.equity_curve],
+    }
+    write_json(job_path(jobs_dir, job_id, 'result'), payload)
+    progress.done(f"🎉 {spec.symbol} - Completado: {len(trades)} señales")
+    return payload['summary']
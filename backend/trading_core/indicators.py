@@ -0,0 +1,129 @@
+# backend/trading_core/indicators.py
+
+"""
+Indicadores vectorizados compartidos por scanners y backtests.
+
+Reemplaza los `_calculate_atr_simple` (bucle `df.iloc` por fila) y
+`_calculate_slope` (`np.polyfit` sobre arrays de 3-20 valores) que cada
+scanner y backtest tenía copiados:
+  - true range / ATR: array -> array, sin bucles Python
+  - pendiente OLS contra x = 0..n-1, escalar o móvil
+  - filtro de momentum (pendiente de las últimas velas)
+
+`WindowIndicators` envuelve una ventana de análisis y memoriza cada valor:
+dentro del bucle de `significant_lows[-N:]` el ATR y las pendientes se
+calculan una sola vez por escaneo.
+
+La pendiente se sigue calculando con `np.polyfit`: las reglas comparan contra
+umbrales como -0.12 y, con precios redondeados, la pendiente cae justo en el
+umbral. Una forma cerrada difiere de polyfit en unos ulps y cambia de lado
+esos empates (otras señales y otros trades que los backtests originales).
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """True range de las velas 1..n-1 (la vela 0 no tiene cierre previo)"""
+    prev_close = close[:-1]
+    high, low = high[1:], low[1:]
+    return np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def atr_series(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """
+    ATR simple (media de los últimos `period` true range) para cada vela.
+    NaN mientras no hay `period` true range completos.
+    """
+    out = np.full(len(close), np.nan)
+    tr = true_range(high, low, close)
+    if len(tr) >= period:
+        out[period:] = sliding_window_view(tr, period).mean(axis=1)
+    return out
+
+
+def atr_last(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> float:
+    """ATR de la última vela (igual que los `_calculate_atr_simple` originales)"""
+    tr = true_range(high, low, close)
+    if len(tr) == 0:
+        return high[-1] - low[-1]
+    return np.mean(tr[-period:])
+
+
+def slope(values: np.ndarray) -> float:
+    """Pendiente OLS de `values` contra 0..n-1 (igual que el `_calculate_slope` original)"""
+    if len(values) < 2:
+        return 0
+    return np.polyfit(np.arange(len(values)), values, 1)[0]
+
+
+def rolling_slope(values: np.ndarray, length: int) -> np.ndarray:
+    """
+    Pendiente OLS de las últimas `length` velas para cada índice (NaN al inicio).
+    Ventana a ventana con `slope`: polyfit con varias columnas a la vez no da
+    los mismos bits que una por una.
+    """
+    out = np.full(len(values), np.nan)
+    if length < 2 or len(values) < length:
+        return out
+    out[length - 1:] = [slope(window) for window in sliding_window_view(values, length)]
+    return out
+
+
+def momentum_filter(close: np.ndarray, min_idx: int, length: int = 20, min_slope: float = -0.1) -> bool:
+    """
+    Filtro de momentum de los backtests: sin datos suficientes antes del
+    mínimo (min_idx < length) se acepta; si no, la pendiente de las últimas
+    `length` velas debe superar `min_slope`.
+    """
+    if min_idx < length:
+        return True
+    return slope(close[-length:]) > min_slope
+
+
+class WindowIndicators:
+    """Indicadores de una ventana de análisis, memorizados por parámetros"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.high = df['high'].to_numpy(dtype=np.float64)
+        self.low = df['low'].to_numpy(dtype=np.float64)
+        self.close = df['close'].to_numpy(dtype=np.float64)
+        self._cache: Dict[Tuple, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def atr(self, period: int = 14) -> float:
+        key = ('atr', period)
+        if key not in self._cache:
+            self._cache[key] = atr_last(self.high, self.low, self.close, period)
+        return self._cache[key]
+
+    def slope_range(self, start: int, end: int) -> float:
+        """Pendiente de close[start:end]"""
+        key = ('slope', start, end)
+        if key not in self._cache:
+            self._cache[key] = slope(self.close[start:end])
+        return self._cache[key]
+
+    def slope_last(self, length: int) -> float:
+        """Pendiente de las últimas `length` velas"""
+        return self.slope_range(max(0, len(self.close) - length), len(self.close))
+
+    def slope_before(self, index: int, length: int) -> float:
+        """Pendiente de las `length` velas previas a `index` (pre_slope del mínimo)"""
+        return self.slope_range(max(0, index - length), index)
+
+    def slope_since(self, index: int) -> float:
+        """Pendiente desde `index` hasta la última vela"""
+        return self.slope_range(index, len(self.close))
+
+    def momentum_ok(self, min_idx: int, length: int = 20, min_slope: float = -0.1) -> bool:
+        """momentum_filter sobre la ventana, reutilizando la pendiente memorizada"""
+        if min_idx < length:
+            return True
+        return self.slope_last(length) > min_slope
@@ -0,0 +1,206 @@
+# backend/trading_core/kline_downloader.py
+
+"""
+Descarga paralela y reanudable de velas históricas hacia el almacén local.
+
+Los bucles de `get_historical_data_*` piden páginas de 1000 velas una tras
+otra y abandonan en el primer error. Aquí cada rango se parte en páginas
+independientes (startTime/endTime) que se piden en paralelo:
+  - solo se piden los huecos del almacén (OHLCVStore.gaps): volver a
+    ejecutar reanuda desde lo ya guardado
+  - presupuesto de peso por minuto compartido por todas las series
+    (ventana deslizante) y pausa global ante 429/418 con Retry-After
+  - reintentos con backoff por página; una página fallida no corta el resto
+  - escritura ordenada: el hueco final se escribe a medida que se completa
+    un prefijo contiguo de páginas, los huecos intermedios de una sola vez
+  - verificación de continuidad al terminar: los huecos que Binance
+    devolvió vacíos se anotan en el almacén y el resto se reporta
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+from trading_core.ohlcv_store import INTERVAL_MS, KLINES_URL, OHLCVStore, TimeLike, to_ms
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 1000
+# Peso de /api/v3/klines por request (límite de Binance: 6000 por minuto e IP)
+KLINES_WEIGHT = 2
+
+
+class DownloadJob(NamedTuple):
+    symbol: str
+    interval: str
+    start: TimeLike
+    end: TimeLike = None  # por defecto, hasta la última vela cerrada
+
+
+class DownloadReport(NamedTuple):
+    symbol: str
+    interval: str
+    pages: int
+    candles: int
+    failed_pages: int
+    gaps: List[Tuple[int, int]]  # huecos que siguen sin datos (ms, inclusivos)
+    seconds: float
+
+
+class WeightLimiter:
+    """Presupuesto de peso por minuto compartido por todas las descargas"""
+
+    def __init__(self, weight_per_minute: int = 1200):
+        self.weight_per_minute = weight_per_minute
+        self._events: Deque[Tuple[float, int]] = deque()
+        self._used = 0
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, weight: int):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                while self._events and self._events[0][0] <= now - 60:
+                    self._used -= self._events.popleft()[1]
+                if self._used + weight <= self.weight_per_minute:
+                    self._events.append((now, weight))
+                    self._used += weight
+                    return
+                await asyncio.sleep(self._events[0][0] + 60 - now)
+
+    def pause(self, seconds: float):
+        """Detiene todas las descargas (rate limit de Binance)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def plan_pages(start_ms: int, end_ms: int, interval: str) -> List[Tuple[int, int]]:
+    """Parte [start_ms, end_ms] en páginas de PAGE_SIZE velas (aperturas inclusivas)"""
+    interval_ms = INTERVAL_MS[interval]
+    step = PAGE_SIZE * interval_ms
+    return [(begin, min(begin + step - interval_ms, end_ms)) for begin in range(start_ms, end_ms + 1, step)]
+
+
+def _covered(begin: int, end: int, pages: List[Tuple[int, int]], interval_ms: int) -> bool:
+    """¿[begin, end] queda cubierto por páginas descargadas con éxito?"""
+    cursor = begin
+    for page_begin, page_end in sorted(pages):
+        if page_begin <= cursor <= page_end:
+            cursor = page_end + interval_ms
+    return cursor > end
+
+
+class KlineDownloader:
+    """
+    Descargador de velas históricas hacia OHLCVStore.
+
+    Args:
+        store: Almacén destino (por defecto el de OHLCV_STORE_DIR / data/ohlcv)
+        concurrency: Requests simultáneos como máximo
+        weight_per_minute: Presupuesto de peso (Binance permite 6000; se deja margen a los bots)
+        max_retries: Intentos por página
+    """
+
+    def __init__(self, store: Optional[OHLCVStore] = None, concurrency: int = 8,
+                 weight_per_minute: int = 1200, max_retries: int = 5):
+        self.store = OHLCVStore() if store is None else store
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.limiter = WeightLimiter(weight_per_minute)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def _fetch_page(self, client: httpx.AsyncClient, symbol: str, interval: str,
+                          begin: int, end: int) -> Optional[list]:
+        params = {'symbol': symbol, 'interval': interval, 'startTime': begin, 'endTime': end, 'limit': PAGE_SIZE}
+        for retry in range(self.max_retries):
+            await self.limiter.acquire(KLINES_WEIGHT)
+            async with self._semaphore:
+                try:
+                    response = await client.get(KLINES_URL, params=params)
+                    if response.status_code in (418, 429):
+                        wait = float(response.headers.get('Retry-After', 2 ** retry))
+                        logger.warning(f"⏸️ Rate limit de Binance ({response.status_code}): pausa de {wait:.0f}s")
+                        self.limiter.pause(wait)
+                        continue
+                    response.raise_for_status()
+                    return response.json()
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    logger.warning(f"🌐 Error de red en {symbol} {interval} (intento {retry + 1}/{self.max_retries}): {e}")
+                except httpx.HTTPStatusError as e:
+                    logger.error(f"❌ Binance respondió {e.response.status_code} para {symbol} {interval}: "
+                                 f"{e.response.text[:200]}")
+                    if e.response.status_code < 500:
+                        return None
+            await asyncio.sleep(min(2 ** retry, 30))
+        return None
+
+    async def download(self, job: DownloadJob, client: httpx.AsyncClient) -> DownloadReport:
+        """Completa una serie en [start, end]: pide los huecos en páginas paralelas y verifica"""
+        started = time.monotonic()
+        symbol, interval = job.symbol.upper(), job.interval
+        interval_ms = INTERVAL_MS[interval]
+        now_ms = int(time.time() * 1000)
+        end_ms = now_ms - interval_ms if job.end is None else min(to_ms(job.end), now_ms - interval_ms)
+        store = self.store
+
+        last = store.last_open_time(symbol, interval)
+        gaps = store.gaps(symbol, interval, job.start, end_ms)
+        # (páginas del hueco, ¿es el hueco final?)
+        plans = [(plan_pages(begin, end, interval), last is None or begin > last) for begin, end in gaps]
+        fetched: List[Tuple[int, int]] = []
+        failed = 0
+        candles = 0
+
+        async def fetch_gap(pages: List[Tuple[int, int]], is_tail: bool):
+            nonlocal failed, candles
+            results: Dict[int, Optional[list]] = {}
+            pending = 0  # siguiente página a escribir en el hueco final
+
+            async def fetch(i: int, page: Tuple[int, int]):
+                nonlocal pending, failed, candles
+                klines = await self._fetch_page(client, symbol, interval, *page)
+                if klines is None:
+                    failed += 1
+                else:
+                    fetched.append(page)
+                results[i] = klines or []
+                # Hueco final: se escribe el prefijo contiguo ya descargado (reanudable)
+                while is_tail and pending in results:
+                    candles += store.append(symbol, interval, results.pop(pending), now_ms)
+                    pending += 1
+
+            await asyncio.gather(*[fetch(i, page) for i, page in enumerate(pages)])
+            if not is_tail:
+                # Hueco intermedio: una sola reescritura con todas sus páginas
+                merged = [k for i in range(len(pages)) for k in results.get(i, [])]
+                candles += store.append(symbol, interval, merged, now_ms)
+
+        await asyncio.gather(*[fetch_gap(pages, is_tail) for pages, is_tail in plans])
+
+        # Verificación: lo que siga faltando dentro de páginas descargadas está vacío en Binance
+        remaining = []
+        for begin, end in store.gaps(symbol, interval, job.start, end_ms):
+            if _covered(begin, end, fetched, interval_ms):
+                store.mark_empty(symbol, interval, begin, end)
+            else:
+                remaining.append((begin, end))
+
+        return DownloadReport(symbol, interval, sum(len(pages) for pages, _ in plans), candles, failed,
+                              remaining, time.monotonic() - started)
+
+    async def download_all(self, jobs: List[DownloadJob],
+                           client: Optional[httpx.AsyncClient] = None) -> List[DownloadReport]:
+        """Descarga todas las series a la vez con un solo cliente y presupuesto compartido"""
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        if client is not None:
+            return await asyncio.gather(*[self.download(job, client) for job in jobs])
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(timeout=15, limits=limits) as client:
+            return await asyncio.gather(*[self.download(job, client) for job in jobs])
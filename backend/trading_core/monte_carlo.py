@@ -0,0 +1,242 @@
+# backend/trading_core/monte_carlo.py
+
+"""
+Riesgo de cola de una estrategia por Monte Carlo sobre sus trades.
+
+Un backtest da una sola curva de equity: el orden en que llegaron los trades
+de ese período. Aquí se generan decenas de miles de secuencias alternativas
+con los mismos retornos por trade:
+  - 'bootstrap': trades sorteados con reemplazo (horizonte configurable)
+  - 'shuffle': los mismos trades en otro orden (mismo resultado final,
+    cambian el drawdown y la ruina)
+Cada bloque de caminos es una matriz (caminos x trades) de índices; el PnL,
+la equity acumulada, el drawdown y la ruina salen de operaciones NumPy
+sobre la matriz entera, sin bucles de Python por camino o trade.
+
+Mismas reglas de cuenta que trading_core.portfolio_backtest: exposición =
+allocated_usdt fija por trade, margen = exposición / leverage, margen
+aislado (la pérdida de un trade no pasa de su margen) y comisión por lado
+sobre la exposición. La cuenta está arruinada cuando su equity cae a
+`ruin_level` del capital inicial o ya no alcanza para el margen del
+siguiente trade; desde ese momento el camino deja de operar.
+
+`allocation_table` evalúa varias asignaciones con los mismos sorteos para
+elegir `*_allocated_usdt` a partir del riesgo y no solo del retorno medio.
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PATHS = 100_000
+DEFAULT_LEVERAGE = 3
+# Celdas (caminos x trades) por bloque: acota la memoria a unos cientos de MB
+BLOCK_CELLS = 4_000_000
+METHODS = ('bootstrap', 'shuffle')
+
+
+class MonteCarloResult(NamedTuple):
+    method: str
+    paths: int
+    horizon: int                # trades por camino
+    allocated_usdt: float
+    leverage: int
+    initial_capital: float
+    final_equity: np.ndarray    # (caminos,) USDT
+    max_drawdown: np.ndarray    # (caminos,) % sobre el pico de equity
+    ruined: np.ndarray          # (caminos,) bool
+    annual_return: np.ndarray   # (caminos,) % anualizado (NaN sin trades_per_year)
+
+
+def trade_returns(trades) -> np.ndarray:
+    """Retornos por trade (fracción) de BacktestResult.trades, PortfolioResult.trades o un array"""
+    if isinstance(trades, pd.DataFrame):
+        return trades['return_pct'].to_numpy(dtype=np.float64)
+    trades = list(trades)
+    if trades and isinstance(trades[0], dict):
+        return np.array([trade['return_pct'] for trade in trades], dtype=np.float64)
+    return np.asarray(trades, dtype=np.float64)
+
+
+def trades_per_year(count: int, start, end) -> float:
+    """Frecuencia de trades del período del backtest"""
+    years = (pd.Timestamp(end) - pd.Timestamp(start)).total_seconds() / (365.25 * 86400)
+    return count / years if years > 0 else float('nan')
+
+
+def _trade_pnl(returns: np.ndarray, notional: float, leverage: int, fee_rate: float) -> np.ndarray:
+    """PnL en USDT de cada trade con la exposición y el margen aislado del executor"""
+    return np.maximum(notional * returns, -notional / leverage) - 2 * fee_rate * notional
+
+
+def _path_indices(rng: np.random.Generator, method: str, count: int, horizon: int, paths: int) -> np.ndarray:
+    if method == 'bootstrap':
+        return rng.integers(0, count, size=(paths, horizon), dtype=np.int32)
+    return rng.permuted(np.broadcast_to(np.arange(count, dtype=np.int32), (paths, count)), axis=1)
+
+
+def _simulate_block(pnl: np.ndarray, initial_capital: float, floor: float):
+    """
+    Equity de cada camino (filas) con parada en la ruina.
+
+    Returns:
+        (equity final, máximo drawdown %, arruinado)
+    """
+    equity = np.cumsum(pnl, axis=1)
+    equity += initial_capital
+    below = equity <= floor
+    ruined = below.any(axis=1)
+    if ruined.any():
+        # Desde la primera vela bajo el suelo el camino queda congelado en ese valor
+        first = np.where(ruined, below.argmax(axis=1), equity.shape[1] - 1)
+        frozen = np.logical_or.accumulate(below, axis=1)
+        equity = np.where(frozen, equity[np.arange(len(equity)), first][:, None], equity)
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peak, initial_capital, out=peak)
+    drawdown = ((peak - equity) / peak).max(axis=1) * 100
+    return equity[:, -1], drawdown, ruined
+
+
+def _ruin_floor(initial_capital: float, notional: float, leverage: int, ruin_level: float) -> float:
+    return max(initial_capital * ruin_level, notional / leverage)
+
+
+def _annualize(final_equity: np.ndarray, initial_capital: float, horizon: int,
+               per_year: Optional[float]) -> np.ndarray:
+    if not per_year or not np.isfinite(per_year) or horizon == 0:
+        return np.full(len(final_equity), np.nan)
+    growth = np.maximum(final_equity / initial_capital, 0.0)
+    return (growth ** (per_year / horizon) - 1) * 100
+
+
+def _horizon(method: str, count: int, horizon: Optional[int], per_year: Optional[float], years: float) -> int:
+    if method == 'shuffle':
+        return count
+    if horizon:
+        return horizon
+    if per_year and np.isfinite(per_year):
+        return max(int(round(per_year * years)), 1)
+    return count
+
+
+def _run_allocations(returns, allocations: Sequence[float], initial_capital: float, leverage: int,
+                     fee_rate: float, paths: int, method: str, horizon: Optional[int],
+                     per_year: Optional[float], years: float, ruin_level: float,
+                     seed: Optional[int]) -> List[MonteCarloResult]:
+    if method not in METHODS:
+        raise ValueError(f"Método desconocido: {method} (válidos: {', '.join(METHODS)})")
+    returns = trade_returns(returns)
+    if len(returns) == 0:
+        raise ValueError("Sin trades: no hay retornos que remuestrear")
+    steps = _horizon(method, len(returns), horizon, per_year, years)
+    rng = np.random.default_rng(seed)
+    block = max(BLOCK_CELLS // steps, 1)
+    pnls = [_trade_pnl(returns, notional, leverage, fee_rate) for notional in allocations]
+    floors = [_ruin_floor(initial_capital, notional, leverage, ruin_level) for notional in allocations]
+    outputs = [([], [], []) for _ in allocations]
+
+    for offset in range(0, paths, block):
+        # Mismos caminos para todas las asignaciones (números aleatorios comunes)
+        indices = _path_indices(rng, method, len(returns), steps, min(block, paths - offset))
+        for pnl, floor, output in zip(pnls, floors, outputs):
+            for values, part in zip(output, _simulate_block(pnl[indices], initial_capital, floor)):
+                values.append(part)
+
+    results = []
+    for notional, (finals, drawdowns, ruined) in zip(allocations, outputs):
+        final_equity = np.concatenate(finals)
+        results.append(MonteCarloResult(
+            method=method,
+            paths=paths,
+            horizon=steps,
+            allocated_usdt=float(notional),
+            leverage=leverage,
+            initial_capital=initial_capital,
+            final_equity=final_equity,
+            max_drawdown=np.concatenate(drawdowns),
+            ruined=np.concatenate(ruined),
+            annual_return=_annualize(final_equity, initial_capital, steps, per_year),
+        ))
+    return results
+
+
+def monte_carlo(returns, allocated_usdt: float = 300.0, initial_capital: float = 1000.0,
+                leverage: int = DEFAULT_LEVERAGE, fee_rate: float = 0.0, paths: int = DEFAULT_PATHS,
+                method: str = 'bootstrap', horizon: Optional[int] = None,
+                trades_per_year: Optional[float] = None, years: float = 1.0,
+                ruin_level: float = 0.5, seed: Optional[int] = None) -> MonteCarloResult:
+    """
+    Simula `paths` secuencias de trades de una estrategia.
+
+    Args:
+        returns: Retornos por trade (fracción) o trades de un backtest (trade_returns)
+        allocated_usdt: Exposición por trade (campo *_allocated_usdt del executor)
+        initial_capital: Balance inicial de la cuenta en USDT
+        leverage: Leverage de la posición (solo fija el margen y la pérdida máxima)
+        fee_rate: Comisión por lado sobre la exposición (0.0004 = taker de futuros)
+        paths: Número de caminos
+        method: 'bootstrap' | 'shuffle'
+        horizon: Trades por camino (bootstrap; defecto: un año con trades_per_year
+            o tantos como trades tiene el backtest)
+        trades_per_year: Frecuencia de la estrategia (trades_per_year()); necesaria
+            para anualizar el retorno
+        years: Años simulados cuando el horizonte sale de trades_per_year
+        ruin_level: Fracción del capital inicial que cuenta como ruina (0.5 = perder la mitad)
+        seed: Semilla del generador (reproducible)
+    """
+    return _run_allocations(returns, [allocated_usdt], initial_capital, leverage, fee_rate, paths, method,
+                            horizon, trades_per_year, years, ruin_level, seed)[0]
+
+
+def risk_summary(result: MonteCarloResult, quantiles: Iterable[float] = (0.05, 0.5, 0.95, 0.99)) -> Dict:
+    """Probabilidad de ruina, distribución del drawdown y bandas de retorno"""
+    quantiles = list(quantiles)
+    drawdown = np.quantile(result.max_drawdown, quantiles)
+    final = np.quantile(result.final_equity, quantiles)
+    summary = {
+        'method': result.method,
+        'paths': result.paths,
+        'horizon': result.horizon,
+        'allocated_usdt': result.allocated_usdt,
+        'leverage': result.leverage,
+        'ruin_probability': float(result.ruined.mean() * 100),
+        'loss_probability': float((result.final_equity < result.initial_capital).mean() * 100),
+        'max_drawdown': {f"p{q * 100:g}": float(value) for q, value in zip(quantiles, drawdown)},
+        'final_equity': {f"p{q * 100:g}": float(value) for q, value in zip(quantiles, final)},
+        'mean_max_drawdown': float(result.max_drawdown.mean()),
+    }
+    if not np.isnan(result.annual_return).all():
+        annual = np.quantile(result.annual_return, quantiles)
+        summary['annual_return'] = {f"p{q * 100:g}": float(value) for q, value in zip(quantiles, annual)}
+    return summary
+
+
+def allocation_table(returns, allocations: Sequence[float], initial_capital: float = 1000.0,
+                     leverage: int = DEFAULT_LEVERAGE, fee_rate: float = 0.0, paths: int = DEFAULT_PATHS,
+                     method: str = 'bootstrap', horizon: Optional[int] = None,
+                     trades_per_year: Optional[float] = None, years: float = 1.0,
+                     ruin_level: float = 0.5, seed: Optional[int] = None) -> pd.DataFrame:
+    """
+    Riesgo y retorno por asignación, con los mismos caminos para todas (mismos
+    argumentos que monte_carlo). Una fila por allocated_usdt.
+    """
+    results = _run_allocations(returns, list(allocations), initial_capital, leverage, fee_rate, paths, method,
+                               horizon, trades_per_year, years, ruin_level, seed)
+    rows = []
+    for result in results:
+        annual = result.annual_return
+        has_annual = not np.isnan(annual).all()
+        rows.append({
+            'allocated_usdt': result.allocated_usdt,
+            'margin_usdt': result.allocated_usdt / result.leverage,
+            'ruin_pct': result.ruined.mean() * 100,
+            'loss_pct': (result.final_equity < result.initial_capital).mean() * 100,
+            'dd_p50': np.quantile(result.max_drawdown, 0.5),
+            'dd_p95': np.quantile(result.max_drawdown, 0.95),
+            'dd_p99': np.quantile(result.max_drawdown, 0.99),
+            'annual_p5': np.quantile(annual, 0.05) if has_annual else np.nan,
+            'annual_p50': np.quantile(annual, 0.5) if has_annual else np.nan,
+            'annual_p95': np.quantile(annual, 0.95) if has_annual else np.nan,
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,316 @@
+# backend/trading_core/ohlcv_store.py
+
+"""
+Almacén local de velas OHLCV en archivos columnares mapeados en memoria.
+
+Los backtests de `src/` descargan un año completo de klines página a página
+(con `time.sleep(0.1)`) en cada ejecución. Aquí cada serie (symbol, interval)
+se guarda una sola vez en disco y se lee con np.memmap:
+
+    <root>/<SYMBOL>/<interval>/open_time.i8   int64, ms (índice, creciente)
+                               open.f8 ... volume.f8   float64
+
+  - append incremental: las velas posteriores a la última se agregan al final
+    de cada archivo; si llegan velas anteriores (relleno hacia atrás) la serie
+    se reescribe ordenada
+  - lecturas por rango sin copia: searchsorted sobre open_time y vistas del memmap
+  - detección de huecos: velas faltantes según el intervalo (los rangos que
+    Binance confirmó vacíos, p. ej. mantenimientos, se anotan en empty.i8 y
+    no se vuelven a pedir)
+  - solo velas cerradas: la vela en formación nunca se persiste
+
+`load_klines` es el reemplazo de los `get_historical_data_*`: descarga solo
+los huecos del rango pedido y devuelve el DataFrame desde el almacén, así
+que sin red sigue funcionando con lo ya guardado.
+
+El directorio por defecto es `data/ohlcv` en la raíz del repositorio
+(variable de entorno OHLCV_STORE_DIR para cambiarlo).
+"""
+
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import requests
+
+logger = logging.getLogger(__name__)
+
+INTERVAL_MS = {
+    '1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1h': 3_600_000, '2h': 7_200_000, '4h': 14_400_000, '6h': 21_600_000,
+    '8h': 28_800_000, '12h': 43_200_000, '1d': 86_400_000,
+}
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+DEFAULT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'ohlcv'))
+
+KLINES_URL = "https://api.binance.com/api/v3/klines"
+
+TimeLike = Union[int, datetime, pd.Timestamp, None]
+
+
+class StoredCandles(NamedTuple):
+    """Vistas de solo lectura sobre un rango de velas del almacén (mismos campos que CandleWindow)"""
+    open_time: np.ndarray  # int64, ms
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.open_time)
+
+
+def to_ms(value: TimeLike) -> Optional[int]:
+    """datetime / Timestamp / ms -> ms (None se mantiene)"""
+    if value is None:
+        return None
+    if isinstance(value, (datetime, pd.Timestamp)):
+        return int(value.timestamp() * 1000)
+    return int(value)
+
+
+class OHLCVStore:
+    """Velas cerradas por (symbol, interval) en archivos columnares + memmap"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.getenv('OHLCV_STORE_DIR', DEFAULT_ROOT)
+        # (symbol, interval) -> (tamaño de open_time.i8, columnas memmap)
+        self._maps: Dict[Tuple[str, str], Tuple[int, Dict[str, np.ndarray]]] = {}
+
+    # ------------------------------------------------------------------
+    # Archivos
+    # ------------------------------------------------------------------
+    def _series_dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, symbol.upper(), interval)
+
+    def _path(self, symbol: str, interval: str, column: str) -> str:
+        suffix = 'i8' if column in ('open_time', 'empty') else 'f8'
+        return os.path.join(self._series_dir(symbol, interval), f"{column}.{suffix}")
+
+    def _columns(self, symbol: str, interval: str) -> Dict[str, np.ndarray]:
+        """Columnas mapeadas en memoria (se vuelven a mapear si el archivo cambió)"""
+        key = (symbol.upper(), interval)
+        index_path = self._path(symbol, interval, 'open_time')
+        size = os.path.getsize(index_path) if os.path.exists(index_path) else 0
+        cached = self._maps.get(key)
+        if cached and cached[0] == size:
+            return cached[1]
+
+        columns = {'open_time': np.empty(0, dtype=np.int64)}
+        columns.update({name: np.empty(0, dtype=np.float64) for name in OHLCV_COLUMNS})
+        if size:
+            # Un append interrumpido puede dejar columnas de distinto largo: se usa el mínimo
+            count = min(os.path.getsize(self._path(symbol, interval, name)) // 8
+                        for name in ['open_time'] + OHLCV_COLUMNS)
+            if count:
+                columns = {
+                    name: np.memmap(self._path(symbol, interval, name), mode='r',
+                                    dtype=np.int64 if name == 'open_time' else np.float64, shape=(count,))
+                    for name in ['open_time'] + OHLCV_COLUMNS
+                }
+        self._maps[key] = (size, columns)
+        return columns
+
+    def series(self) -> List[Tuple[str, str]]:
+        """Series guardadas como (symbol, interval)"""
+        found = []
+        if not os.path.isdir(self.root):
+            return found
+        for symbol in sorted(os.listdir(self.root)):
+            symbol_dir = os.path.join(self.root, symbol)
+            if os.path.isdir(symbol_dir):
+                found.extend((symbol, interval) for interval in sorted(os.listdir(symbol_dir))
+                             if os.path.exists(self._path(symbol, interval, 'open_time')))
+        return found
+
+    def _empty_ranges(self, symbol: str, interval: str) -> np.ndarray:
+        """Rangos (desde, hasta) que Binance devolvió sin velas"""
+        path = self._path(symbol, interval, 'empty')
+        if not os.path.exists(path):
+            return np.empty((0, 2), dtype=np.int64)
+        return np.fromfile(path, dtype=np.int64).reshape(-1, 2)
+
+    def mark_empty(self, symbol: str, interval: str, start_ms: int, end_ms: int):
+        """Anota un rango sin velas en el exchange para que gaps() no lo reporte"""
+        os.makedirs(self._series_dir(symbol, interval), exist_ok=True)
+        path = self._path(symbol, interval, 'empty')
+        with open(path, 'ab') as f:
+            f.write(np.array([start_ms, end_ms], dtype=np.int64).tobytes())
+
+    def count(self, symbol: str, interval: str) -> int:
+        return len(self._columns(symbol, interval)['open_time'])
+
+    def first_open_time(self, symbol: str, interval: str) -> Optional[int]:
+        times = self._columns(symbol, interval)['open_time']
+        return int(times[0]) if len(times) else None
+
+    def last_open_time(self, symbol: str, interval: str) -> Optional[int]:
+        times = self._columns(symbol, interval)['open_time']
+        return int(times[-1]) if len(times) else None
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+    def append(self, symbol: str, interval: str, klines: List[list], now_ms: Optional[int] = None) -> int:
+        """
+        Guarda velas crudas de /klines ([open_time, open, high, low, close, volume, ...]).
+        Se descartan las que aún no cerraron (open_time + intervalo > now_ms) y las
+        que ya están guardadas. Devuelve cuántas velas nuevas se escribieron.
+        """
+        interval_ms = INTERVAL_MS[interval]
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        if not klines:
+            return 0
+        rows = np.array([[float(value) for value in k[1:6]] for k in klines], dtype=np.float64)
+        times = np.array([int(k[0]) for k in klines], dtype=np.int64)
+        closed = times + interval_ms <= now_ms
+        times, rows = times[closed], rows[closed]
+        if len(times) == 0:
+            return 0
+        times, unique = np.unique(times, return_index=True)
+        rows = rows[unique]
+
+        current = self._columns(symbol, interval)
+        stored = current['open_time']
+        if len(stored) and times[0] <= stored[-1]:
+            new = ~np.isin(times, stored)
+            if not new.any():
+                return 0
+            times, rows = times[new], rows[new]
+            if times[0] < stored[-1]:
+                return self._merge(symbol, interval, current, times, rows)
+
+        os.makedirs(self._series_dir(symbol, interval), exist_ok=True)
+        # El índice se escribe al final: si algo falla antes, la vela no cuenta como guardada
+        for j, name in enumerate(OHLCV_COLUMNS):
+            with open(self._path(symbol, interval, name), 'ab') as f:
+                f.write(np.ascontiguousarray(rows[:, j]).tobytes())
+        with open(self._path(symbol, interval, 'open_time'), 'ab') as f:
+            f.write(times.tobytes())
+        return len(times)
+
+    def _merge(self, symbol: str, interval: str, current: Dict[str, np.ndarray],
+               times: np.ndarray, rows: np.ndarray) -> int:
+        """Reescribe la serie con velas intercaladas (relleno de huecos o historia anterior)"""
+        merged_times = np.concatenate([np.asarray(current['open_time']), times])
+        order = np.argsort(merged_times, kind='stable')
+        count = len(current['open_time'])
+        merged = {'open_time': merged_times[order]}
+        for j, name in enumerate(OHLCV_COLUMNS):
+            merged[name] = np.concatenate([np.asarray(current[name])[:count], rows[:, j]])[order]
+        # Se sueltan los memmap antes de reemplazar los archivos
+        self._maps.pop((symbol.upper(), interval), None)
+        del current
+        for name in OHLCV_COLUMNS + ['open_time']:
+            path = self._path(symbol, interval, name)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(merged[name].tobytes())
+            os.replace(path + '.tmp', path)
+        return len(times)
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+    def read(self, symbol: str, interval: str, start: TimeLike = None, end: TimeLike = None) -> StoredCandles:
+        """Velas con start <= open_time <= end como vistas del memmap (sin copia)"""
+        columns = self._columns(symbol, interval)
+        times = columns['open_time']
+        first = 0 if start is None else int(np.searchsorted(times, to_ms(start), side='left'))
+        last = len(times) if end is None else int(np.searchsorted(times, to_ms(end), side='right'))
+        return StoredCandles(*(columns[name][first:last] for name in ['open_time'] + OHLCV_COLUMNS))
+
+    def to_dataframe(self, symbol: str, interval: str, start: TimeLike = None, end: TimeLike = None) -> pd.DataFrame:
+        """Mismo formato que los `get_historical_data_*`: OHLCV indexado por timestamp"""
+        candles = self.read(symbol, interval, start, end)
+        df = pd.DataFrame({name: np.asarray(getattr(candles, name)) for name in OHLCV_COLUMNS},
+                          index=pd.to_datetime(np.asarray(candles.open_time), unit='ms'))
+        df.index.name = 'timestamp'
+        return df
+
+    def gaps(self, symbol: str, interval: str, start: TimeLike = None, end: TimeLike = None) -> List[Tuple[int, int]]:
+        """
+        Rangos [desde, hasta] de open_time (ms, inclusivos) sin velas dentro de
+        [start, end]. Sin start/end solo se revisan los huecos internos.
+        """
+        interval_ms = INTERVAL_MS[interval]
+        times = np.asarray(self.read(symbol, interval, start, end).open_time)
+        start_ms, end_ms = to_ms(start), to_ms(end)
+        if start_ms is not None:
+            start_ms = -(-start_ms // interval_ms) * interval_ms  # primera apertura >= start
+        if end_ms is not None:
+            end_ms = end_ms // interval_ms * interval_ms          # última apertura <= end
+        if len(times) == 0:
+            if start_ms is None or end_ms is None or start_ms > end_ms:
+                return []
+            return self._without_empty(symbol, interval, [(start_ms, end_ms)])
+
+        found = []
+        if start_ms is not None and times[0] > start_ms:
+            found.append((start_ms, int(times[0]) - interval_ms))
+        jumps = np.flatnonzero(np.diff(times) > interval_ms)
+        found.extend((int(times[i]) + interval_ms, int(times[i + 1]) - interval_ms) for i in jumps)
+        if end_ms is not None and times[-1] < end_ms:
+            found.append((int(times[-1]) + interval_ms, end_ms))
+        return self._without_empty(symbol, interval, found)
+
+    def _without_empty(self, symbol: str, interval: str, found: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        empty = self._empty_ranges(symbol, interval)
+        if len(empty) == 0:
+            return found
+        return [(a, b) for a, b in found if not ((empty[:, 0] <= a) & (empty[:, 1] >= b)).any()]
+
+
+def fetch_klines_range(symbol: str, interval: str, start_ms: int, end_ms: int,
+                       session: Optional[requests.Session] = None) -> List[list]:
+    """Descarga /klines de [start_ms, end_ms] página a página (1000 velas por request)"""
+    http = session or requests
+    klines: List[list] = []
+    current = start_ms
+    while current <= end_ms:
+        response = http.get(KLINES_URL, params={
+            'symbol': symbol, 'interval': interval,
+            'startTime': current, 'endTime': end_ms, 'limit': 1000,
+        }, timeout=10)
+        response.raise_for_status()
+        page = response.json()
+        if not page:
+            break
+        klines.extend(page)
+        current = int(page[-1][0]) + 1
+        if len(page) < 1000:
+            break
+    return klines
+
+
+def load_klines(symbol: str, interval: str, start: TimeLike, end: TimeLike,
+                store: Optional[OHLCVStore] = None) -> pd.DataFrame:
+    """
+    Velas cerradas de [start, end] desde el almacén local. Solo se descargan
+    los huecos del rango; si no hay red se devuelve lo que haya guardado.
+    """
+    if store is None:
+        store = OHLCVStore()
+    now_ms = int(time.time() * 1000)
+    end_ms = min(to_ms(end), now_ms - INTERVAL_MS[interval])
+    missing = store.gaps(symbol, interval, start, end_ms)
+    if missing:
+        with requests.Session() as session:
+            for gap_start, gap_end in missing:
+                try:
+                    klines = fetch_klines_range(symbol, interval, gap_start, gap_end, session)
+                except requests.RequestException as e:
+                    logger.warning(f"⚠️ Sin datos de Binance para {symbol} {interval} ({e}); se usa el almacén local")
+                    break
+                added = store.append(symbol, interval, klines, now_ms)
+                if not any(gap_start <= int(k[0]) <= gap_end for k in klines):
+                    store.mark_empty(symbol, interval, gap_start, gap_end)
+                    continue
+                logger.info(f"💾 {symbol} {interval}: {added} velas guardadas en {store.root}")
+    return store.to_dataframe(symbol, interval, start, end)
@@ -0,0 +1,183 @@
+# backend/trading_core/param_sweep.py
+
+"""
+Barrido de parámetros (grid search) de la estrategia U en paralelo.
+
+Los umbrales (profit_target 0.08, stop_loss 0.03, profundidad 0.025,
+pre_slope < -0.12, ruptura 0.97, max_hold 80...) están ajustados a mano y
+copiados entre servicios, executors y backtests. Aquí se evalúan todas las
+combinaciones de una rejilla sobre varias series con el motor de
+trading_core.backtest_engine:
+  - las velas se cargan una vez y se publican en memoria compartida
+    (multiprocessing.shared_memory); los procesos del pool solo las mapean
+  - las combinaciones se agrupan por parámetros de señal: las que solo
+    difieren en TRADE_FIELDS (TP, SL, max_hold...) reutilizan las señales y
+    solo repiten la simulación vectorizada de trades
+  - cada proceso guarda el precálculo de la serie (mínimos, TR) por
+    PRECOMPUTE_FIELDS entre tareas
+El resultado es una tabla ordenada (retorno, drawdown, win rate, trades).
+"""
+
+import itertools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from trading_core.backtest_engine import PRECOMPUTE_FIELDS, TRADE_FIELDS, BacktestEngine, StrategyParams
+from trading_core.shared_series import SharedSeries, attach, publish, release
+from trading_core.trade_simulator import simulate_trades
+
+logger = logging.getLogger(__name__)
+
+# Combinaciones de trade por tarea (mismas señales)
+TASK_SIZE = 256
+# Motores precalculados que guarda cada proceso
+ENGINE_CACHE_SIZE = 32
+
+RESULT_COLUMNS = ['series', 'total_return', 'max_drawdown', 'win_rate', 'trades', 'avg_return', 'final_capital']
+
+
+def expand_grid(base: StrategyParams, grid: Dict[str, Sequence[Any]]) -> List[StrategyParams]:
+    """Producto cartesiano de la rejilla sobre los parámetros base"""
+    for field in grid:
+        if field not in StrategyParams._fields:
+            raise ValueError(f"Parámetro desconocido en la rejilla: {field}")
+    fields = list(grid)
+    return [base._replace(**dict(zip(fields, values))) for values in itertools.product(*grid.values())]
+
+
+def _signal_key(params: StrategyParams) -> StrategyParams:
+    """Parámetros que determinan las señales (TRADE_FIELDS neutralizados)"""
+    return params._replace(**{field: None for field in TRADE_FIELDS})
+
+
+def _precompute_key(params: StrategyParams) -> Tuple:
+    return tuple(getattr(params, field) for field in PRECOMPUTE_FIELDS)
+
+
+# ----------------------------------------------------------------------
+# Trabajo de cada proceso
+
+_frames: Dict[str, pd.DataFrame] = {}
+_blocks: List[shared_memory.SharedMemory] = []
+_engines: Dict[Tuple, BacktestEngine] = {}
+
+
+def _init_worker(series: List[SharedSeries], untrack: bool):
+    for item in series:
+        df, blocks = attach(item, untrack)
+        _frames[item.key] = df
+        _blocks.extend(blocks)
+
+
+def _get_engine(key: str, params: StrategyParams) -> BacktestEngine:
+    cache_key = (key,) + _precompute_key(params)
+    engine = _engines.get(cache_key)
+    if engine is None:
+        if len(_engines) >= ENGINE_CACHE_SIZE:
+            _engines.pop(next(iter(_engines)))
+        engine = _engines[cache_key] = BacktestEngine(_frames[key], params)
+    return engine.with_params(params)
+
+
+def _metrics(returns: np.ndarray, initial_capital: float) -> Dict[str, float]:
+    """Mismas cifras que summarize() a partir de los retornos en orden"""
+    equity = initial_capital * np.cumprod(np.r_[1.0, 1 + returns])
+    peak = np.maximum.accumulate(equity)
+    return {
+        'total_return': (equity[-1] / initial_capital - 1) * 100,
+        'max_drawdown': float(((peak - equity) / peak).max() * 100),
+        'win_rate': float((returns > 0).mean() * 100) if len(returns) else 0.0,
+        'trades': len(returns),
+        'avg_return': float(returns.mean() * 100) if len(returns) else 0.0,
+        'final_capital': equity[-1],
+    }
+
+
+def _evaluate(task: Tuple[str, List[StrategyParams], float]) -> List[Dict[str, Any]]:
+    """Un grupo de combinaciones con las mismas señales sobre una serie"""
+    key, combos, initial_capital = task
+    engine = _get_engine(key, combos[0])
+    signals = engine.signals()
+    entry_idx = np.array([start for start, _ in signals], dtype=np.int64)
+    entry_price = np.array([signal['entry_price'] for _, signal in signals], dtype=np.float64)
+    rows = []
+    for params in combos:
+        if len(signals):
+            sim = simulate_trades(engine.high, engine.low, engine.close, entry_idx, entry_price,
+                                  params.profit_target, params.stop_loss, params.max_hold,
+                                  params.future_extra, params.min_future)
+            returns = sim.return_pct[sim.valid]
+        else:
+            returns = np.empty(0)
+        rows.append({'series': key, **params._asdict(), **_metrics(returns, initial_capital)})
+    return rows
+
+
+# ----------------------------------------------------------------------
+
+def _tasks(keys: Iterable[str], combos: List[StrategyParams], initial_capital: float):
+    """Tareas agrupadas por señales y ordenadas por precálculo (aprovechan la caché del proceso)"""
+    groups: Dict[StrategyParams, List[StrategyParams]] = {}
+    for params in combos:
+        groups.setdefault(_signal_key(params), []).append(params)
+    ordered = sorted(groups.items(), key=lambda item: repr(_precompute_key(item[0])))
+    for key in keys:
+        for _, members in ordered:
+            for begin in range(0, len(members), TASK_SIZE):
+                yield key, members[begin:begin + TASK_SIZE], initial_capital
+
+
+def run_sweep(frames: Dict[str, pd.DataFrame], combos: List[StrategyParams], workers: Optional[int] = None,
+              initial_capital: float = 1000, sort_by: str = 'total_return') -> pd.DataFrame:
+    """
+    Evalúa todas las combinaciones sobre todas las series.
+
+    Args:
+        frames: key de la serie -> velas OHLCV (p. ej. 'BTCUSDT 4h')
+        combos: Parámetros a evaluar (expand_grid)
+        workers: Procesos (por defecto os.cpu_count(); 1 = en este proceso)
+        sort_by: Columna de ordenación descendente (empates: menor drawdown)
+
+    Returns:
+        DataFrame ordenado: serie, parámetros y métricas (retornos en %)
+    """
+    workers = workers or os.cpu_count() or 1
+    frames = {key: df for key, df in frames.items() if len(df)}
+    tasks = list(_tasks(frames, combos, initial_capital))
+    logger.info(f"🔬 Barrido: {len(combos)} combinaciones x {len(frames)} series en {len(tasks)} tareas, "
+                f"{workers} procesos")
+
+    rows: List[Dict[str, Any]] = []
+    if workers == 1:
+        _frames.update(frames)
+        try:
+            for task in tasks:
+                rows.extend(_evaluate(task))
+        finally:
+            _frames.clear()
+            _engines.clear()
+    else:
+        published, blocks = publish(frames)
+        context = multiprocessing.get_context()
+        try:
+            with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(published, context.get_start_method() != 'fork')) as pool:
+                for result in pool.map(_evaluate, tasks, chunksize=max(1, len(tasks) // (workers * 8))):
+                    rows.extend(result)
+        finally:
+            release(blocks)
+
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    table = table.sort_values([sort_by, 'max_drawdown'], ascending=[False, True], kind='stable')
+    metric_columns = [column for column in RESULT_COLUMNS if column != 'series']
+    param_columns = [column for column in StrategyParams._fields if column in table]
+    return table[['series'] + metric_columns + param_columns].reset_index(drop=True)
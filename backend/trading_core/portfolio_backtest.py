@@ -0,0 +1,249 @@
+# backend/trading_core/portfolio_backtest.py
+
+"""
+Backtest de cartera: todas las estrategias contra una misma cuenta de futuros.
+
+`run_portfolio_backtest` (backtest_robust) y `generate_all_backtests` tratan
+cada símbolo por separado con sus propios $1000 ficticios. En producción BTC
+4h, BTC 30m, ETH, BNB y PAXG operan sobre la misma cuenta, cada estrategia
+con su `*_allocated_usdt`. Aquí:
+  - las señales y trades candidatos de cada estrategia salen de
+    BacktestEngine en procesos paralelos (velas en memoria compartida,
+    trading_core.shared_series)
+  - todas las entradas y salidas se fusionan en un único reloj (cierre de la
+    vela de señal / cierre de la vela de salida; a igual hora, primero las salidas)
+  - reglas de los executors: exposición = allocated_usdt, margen =
+    exposición / leverage (3x por defecto), una sola posición abierta por
+    estrategia y cuenta, y sin margen disponible la señal se descarta. Cada
+    executor solo ve sus propias compras (reason de la estrategia), así que
+    BTC 4h y BTC 30m pueden tener a la vez una posición en BTCUSDT
+  - margen aislado: la pérdida de un trade no supera su margen
+La curva de equity es el balance realizado tras cada evento.
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, NamedTuple, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from trading_core.backtest_engine import STRATEGY_PRESETS, BacktestEngine, StrategyParams
+from trading_core.ohlcv_store import INTERVAL_MS
+from trading_core.shared_series import SharedSeries, attach, publish, release
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEVERAGE = 3
+
+
+class PortfolioStrategy(NamedTuple):
+    """Una estrategia de la cuenta (equivale a un executor con su asignación)"""
+    name: str
+    symbol: str
+    interval: str
+    params: StrategyParams
+    allocated_usdt: float = 300.0  # exposición por trade (campo *_allocated_usdt)
+    leverage: int = DEFAULT_LEVERAGE
+
+    @property
+    def series_key(self) -> str:
+        return f"{self.symbol} {self.interval}"
+
+
+# Estrategias de producción
+DEFAULT_STRATEGIES = [
+    PortfolioStrategy('btc_4h', 'BTCUSDT', '4h', STRATEGY_PRESETS['bitcoin_2023'].params),
+    PortfolioStrategy('btc_30m', 'BTCUSDT', '30m', STRATEGY_PRESETS['bitcoin_30m'].params),
+    PortfolioStrategy('eth_4h', 'ETHUSDT', '4h', STRATEGY_PRESETS['eth_2023'].params),
+    PortfolioStrategy('bnb_4h', 'BNBUSDT', '4h', STRATEGY_PRESETS['bnb_2023'].params),
+    PortfolioStrategy('paxg_4h', 'PAXGUSDT', '4h', STRATEGY_PRESETS['paxg_4h'].params),
+]
+
+
+class PortfolioResult(NamedTuple):
+    trades: pd.DataFrame       # trades ejecutados (estrategia, horas, exposición, pnl)
+    skipped: pd.DataFrame      # señales descartadas y motivo ('position_open' / 'margin')
+    equity: pd.DataFrame       # balance, margen usado y posiciones tras cada evento
+    initial_capital: float
+    final_capital: float
+    max_drawdown: float        # % sobre el balance realizado
+
+
+# ----------------------------------------------------------------------
+# Señales por estrategia (un proceso por tarea)
+
+_frames: Dict[str, pd.DataFrame] = {}
+_blocks: List[shared_memory.SharedMemory] = []
+
+
+def _init_worker(series: List[SharedSeries], untrack: bool):
+    for item in series:
+        df, blocks = attach(item, untrack)
+        _frames[item.key] = df
+        _blocks.extend(blocks)
+
+
+def strategy_trades(strategy: PortfolioStrategy, df: pd.DataFrame) -> pd.DataFrame:
+    """Trades candidatos de una estrategia con su hora de apertura y cierre en el reloj común"""
+    trades = BacktestEngine(df, strategy.params).run().trades
+    interval = pd.Timedelta(milliseconds=INTERVAL_MS[strategy.interval])
+    frame = pd.DataFrame(trades, columns=['entry_time', 'exit_time', 'entry_price', 'exit_price',
+                                          'return_pct', 'exit_reason'])
+    # La entrada se decide al cierre de la vela de señal y la salida ocurre dentro de la vela de salida
+    frame['opened_at'] = frame['entry_time'] + interval
+    frame['closed_at'] = frame['exit_time'] + interval
+    frame.insert(0, 'strategy', strategy.name)
+    return frame
+
+
+def _strategy_task(strategy: PortfolioStrategy) -> pd.DataFrame:
+    return strategy_trades(strategy, _frames[strategy.series_key])
+
+
+def generate_candidates(frames: Dict[str, pd.DataFrame], strategies: List[PortfolioStrategy],
+                        workers: Optional[int] = None) -> List[pd.DataFrame]:
+    """Trades candidatos de cada estrategia (en paralelo si workers != 1)"""
+    workers = min(workers or os.cpu_count() or 1, len(strategies))
+    if workers <= 1:
+        return [strategy_trades(strategy, frames[strategy.series_key]) for strategy in strategies]
+    used = {strategy.series_key: frames[strategy.series_key] for strategy in strategies}
+    published, blocks = publish(used)
+    context = multiprocessing.get_context()
+    try:
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(published, context.get_start_method() != 'fork')) as pool:
+            return list(pool.map(_strategy_task, strategies))
+    finally:
+        release(blocks)
+
+
+# ----------------------------------------------------------------------
+# Cuenta compartida
+
+def simulate_portfolio(candidates: List[pd.DataFrame], strategies: List[PortfolioStrategy],
+                       initial_capital: float = 1000.0, fee_rate: float = 0.0) -> PortfolioResult:
+    """
+    Recorre las aperturas y cierres de todas las estrategias en orden temporal.
+
+    Args:
+        candidates: Trades candidatos por estrategia (generate_candidates)
+        strategies: Estrategias en el mismo orden (prioridad ante empates)
+        initial_capital: Balance inicial de la cuenta en USDT
+        fee_rate: Comisión por lado sobre la exposición (0.0004 = taker de futuros)
+    """
+    by_name = {strategy.name: strategy for strategy in strategies}
+    frames = [frame.assign(priority=k) for k, frame in enumerate(candidates) if len(frame)]
+    if frames:
+        pending = pd.concat(frames, ignore_index=True).sort_values(['opened_at', 'priority'], kind='stable')
+    else:
+        pending = pd.DataFrame(columns=['strategy', 'opened_at', 'closed_at', 'return_pct', 'priority'])
+
+    balance = initial_capital
+    margin_used = 0.0
+    open_positions: List[Dict] = []  # ordenadas por cierre
+    busy_strategies: Set[str] = set()
+    executed, skipped, equity = [], [], [{'time': None, 'balance': balance, 'margin_used': 0.0, 'positions': 0}]
+
+    def close_until(limit):
+        nonlocal balance, margin_used
+        while open_positions and (limit is None or open_positions[0]['closed_at'] <= limit):
+            position = open_positions.pop(0)
+            balance += position['pnl']
+            margin_used -= position['margin']
+            busy_strategies.discard(position['strategy'])
+            executed.append(position)
+            equity.append({'time': position['closed_at'], 'balance': balance, 'margin_used': margin_used,
+                           'positions': len(open_positions)})
+
+    for row in pending.itertuples(index=False):
+        # Salidas antes que entradas a la misma hora: liberan margen y estrategia
+        close_until(row.opened_at)
+        strategy = by_name[row.strategy]
+        notional = strategy.allocated_usdt
+        margin = notional / strategy.leverage
+        if row.strategy in busy_strategies:
+            skipped.append({'strategy': row.strategy, 'opened_at': row.opened_at, 'reason': 'position_open'})
+            continue
+        if balance - margin_used < margin:
+            skipped.append({'strategy': row.strategy, 'opened_at': row.opened_at, 'reason': 'margin'})
+            continue
+        # Margen aislado: la pérdida del trade no pasa de su margen
+        pnl = max(notional * row.return_pct, -margin) - 2 * fee_rate * notional
+        position = {
+            'strategy': row.strategy,
+            'symbol': strategy.symbol,
+            'opened_at': row.opened_at,
+            'closed_at': row.closed_at,
+            'entry_price': row.entry_price,
+            'exit_price': row.exit_price,
+            'return_pct': row.return_pct,
+            'exit_reason': row.exit_reason,
+            'notional': notional,
+            'margin': margin,
+            'pnl': pnl,
+        }
+        margin_used += margin
+        busy_strategies.add(row.strategy)
+        open_positions.append(position)
+        open_positions.sort(key=lambda item: item['closed_at'])
+        equity.append({'time': row.opened_at, 'balance': balance, 'margin_used': margin_used,
+                       'positions': len(open_positions)})
+    close_until(None)
+
+    trades = pd.DataFrame(executed, columns=['strategy', 'symbol', 'opened_at', 'closed_at', 'entry_price',
+                                             'exit_price', 'return_pct', 'exit_reason', 'notional',
+                                             'margin', 'pnl'])
+    equity = pd.DataFrame(equity)
+    curve = equity['balance'].to_numpy(dtype=np.float64)
+    peak = np.maximum.accumulate(curve)
+    return PortfolioResult(
+        trades=trades.sort_values('opened_at', kind='stable').reset_index(drop=True),
+        skipped=pd.DataFrame(skipped, columns=['strategy', 'opened_at', 'reason']),
+        equity=equity,
+        initial_capital=initial_capital,
+        final_capital=balance,
+        max_drawdown=float(((peak - curve) / peak).max() * 100),
+    )
+
+
+def run_portfolio(frames: Dict[str, pd.DataFrame], strategies: List[PortfolioStrategy] = DEFAULT_STRATEGIES,
+                  initial_capital: float = 1000.0, fee_rate: float = 0.0,
+                  workers: Optional[int] = None) -> PortfolioResult:
+    """
+    Señales en paralelo + cuenta compartida.
+
+    Args:
+        frames: 'SYMBOL interval' -> velas OHLCV (las estrategias sin velas se omiten)
+    """
+    strategies = [strategy for strategy in strategies if len(frames.get(strategy.series_key, ()))]
+    candidates = generate_candidates(frames, strategies, workers)
+    logger.info(f"💼 Cartera: {len(strategies)} estrategias, "
+                f"{sum(len(frame) for frame in candidates)} trades candidatos")
+    return simulate_portfolio(candidates, strategies, initial_capital, fee_rate)
+
+
+def portfolio_summary(result: PortfolioResult) -> Dict:
+    """Retorno, drawdown y desglose por estrategia"""
+    trades = result.trades
+    per_strategy = {}
+    for name, group in trades.groupby('strategy', sort=False):
+        per_strategy[name] = {
+            'trades': len(group),
+            'pnl': float(group['pnl'].sum()),
+            'win_rate': float((group['pnl'] > 0).mean() * 100),
+        }
+    for name, group in result.skipped.groupby('strategy', sort=False):
+        per_strategy.setdefault(name, {'trades': 0, 'pnl': 0.0, 'win_rate': 0.0})['skipped'] = len(group)
+    return {
+        'total_return': (result.final_capital / result.initial_capital - 1) * 100,
+        'max_drawdown': result.max_drawdown,
+        'total_trades': len(trades),
+        'win_rate': float((trades['pnl'] > 0).mean() * 100) if len(trades) else 0.0,
+        'skipped': len(result.skipped),
+        'max_margin_used': float(result.equity['margin_used'].max()),
+        'per_strategy': per_strategy,
+    }
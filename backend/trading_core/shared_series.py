@@ -0,0 +1,68 @@
+# backend/trading_core/shared_series.py
+
+"""
+Series OHLCV en memoria compartida para los pools de procesos.
+
+El proceso principal copia cada serie una vez a bloques de
+multiprocessing.shared_memory (matriz (columnas, velas) + aperturas en ms) y
+los procesos del pool construyen un DataFrame sobre esos bloques sin copiar
+las columnas. Lo usan el barrido de parámetros (param_sweep) y el
+walk-forward (walk_forward).
+"""
+
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+SHARED_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class SharedSeries(NamedTuple):
+    """Serie publicada en memoria compartida: matriz (columnas, velas) + aperturas en ms"""
+    key: str
+    values_name: str
+    index_name: str
+    length: int
+
+
+def publish(frames: Dict[str, pd.DataFrame]) -> Tuple[List[SharedSeries], List[shared_memory.SharedMemory]]:
+    """Copia cada serie una vez a memoria compartida (el llamador hace release)"""
+    published, blocks = [], []
+    for key, df in frames.items():
+        values = df[list(SHARED_COLUMNS)].to_numpy(dtype=np.float64).T
+        index = df.index.as_unit('ms').asi8
+        values_block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        index_block = shared_memory.SharedMemory(create=True, size=max(index.nbytes, 1))
+        np.ndarray(values.shape, np.float64, buffer=values_block.buf)[:] = values
+        np.ndarray(index.shape, np.int64, buffer=index_block.buf)[:] = index
+        blocks += [values_block, index_block]
+        published.append(SharedSeries(key, values_block.name, index_block.name, len(df)))
+    return published, blocks
+
+
+def attach(series: SharedSeries, untrack: bool) -> Tuple[pd.DataFrame, List[shared_memory.SharedMemory]]:
+    """
+    DataFrame sobre la memoria compartida (sin copiar las columnas OHLCV).
+    `untrack` con spawn/forkserver: cada proceso tiene su resource_tracker,
+    que borraría el segmento al salir.
+    """
+    values_block = shared_memory.SharedMemory(name=series.values_name)
+    index_block = shared_memory.SharedMemory(name=series.index_name)
+    if untrack:
+        resource_tracker.unregister(values_block._name, 'shared_memory')
+        resource_tracker.unregister(index_block._name, 'shared_memory')
+    values = np.ndarray((len(SHARED_COLUMNS), series.length), np.float64, buffer=values_block.buf)
+    index = np.ndarray((series.length,), np.int64, buffer=index_block.buf)
+    df = pd.DataFrame({column: values[i] for i, column in enumerate(SHARED_COLUMNS)},
+                      index=pd.to_datetime(index, unit='ms'), copy=False)
+    df.index.name = 'timestamp'
+    return df, [values_block, index_block]
+
+
+def release(blocks: List[shared_memory.SharedMemory]):
+    """Cierra y borra los bloques creados por publish"""
+    for block in blocks:
+        block.close()
+        block.unlink()
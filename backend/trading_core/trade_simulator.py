@@ -0,0 +1,214 @@
+# backend/trading_core/trade_simulator.py
+
+"""
+Simulador vectorizado de salidas por TP / SL / max_hold.
+
+Los `_simulate_trade_*` de los backtests recorren las velas futuras con
+`iterrows()` hasta que una toca el take profit o el stop loss. Aquí cada
+trade es una fila de una matriz (trades, velas futuras) construida con
+índices sobre los arrays de la serie, y la primera vela que toca TP o SL
+sale de un `argmax` sobre la máscara de comparaciones. Las reglas son las
+del bucle original:
+  - velas futuras: [entrada, min(entrada + max_hold + future_extra, fin))
+    y sin al menos `min_future` velas no hay trade
+  - en cada vela hasta max_hold (incluida) se mira primero el TP
+    (high >= objetivo, sale al objetivo) y después el SL (low <= stop)
+  - si ninguna toca: MAX_HOLD al cierre de la vela max_hold + 1 si existe,
+    si no END_OF_DATA al cierre de la última vela futura
+  - max_profit / max_drawdown (excursión favorable / adversa máxima) se
+    acumulan hasta la vela de salida incluida, partiendo de 0
+
+Los resultados son idénticos a los del bucle (mismas operaciones en float64).
+
+Velas ambiguas: si la vela de salida toca TP y SL a la vez, el bucle da
+TAKE_PROFIT (el `if` del TP va primero). Con `intrabar` (sub-velas de 1m/5m
+del almacén) solo esas velas se resuelven: `searchsorted` localiza sus
+sub-velas y la primera que toca TP o SL decide la salida (si una sub-vela
+también toca los dos, se mantiene la regla del TP). Sin sub-velas para esa
+vela se aplica la regla del bucle.
+"""
+
+from typing import NamedTuple, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+EXIT_REASONS = ('TAKE_PROFIT', 'STOP_LOSS', 'MAX_HOLD', 'END_OF_DATA')
+TAKE_PROFIT, STOP_LOSS, MAX_HOLD, END_OF_DATA = range(len(EXIT_REASONS))
+
+# Trades por bloque: acota la memoria de las matrices (trades, velas)
+CHUNK_SIZE = 4096
+
+ArrayLike = Union[np.ndarray, float, int]
+
+
+class SimulatedTrades(NamedTuple):
+    """Resultado por trade (arrays alineados con las entradas)"""
+    valid: np.ndarray        # False si no había min_future velas futuras (el bucle devolvía None)
+    exit_idx: np.ndarray     # índice de la vela de salida en la serie
+    exit_price: np.ndarray
+    exit_reason: np.ndarray  # índice en EXIT_REASONS
+    return_pct: np.ndarray
+    max_profit: np.ndarray   # excursión favorable máxima (MFE)
+    max_drawdown: np.ndarray  # excursión adversa máxima (MAE)
+    ambiguous: np.ndarray    # la vela de salida tocó TP y SL (resuelta con intrabar si se pasó)
+
+
+class Intrabar(NamedTuple):
+    """Sub-velas (1m/5m) para resolver las velas ambiguas de la serie principal"""
+    bar_open: np.ndarray   # apertura (ms) de cada vela de la serie principal
+    bar_ms: int            # duración de la vela principal
+    open_time: np.ndarray  # apertura (ms) de cada sub-vela, creciente
+    high: np.ndarray
+    low: np.ndarray
+
+
+class TradeExit(NamedTuple):
+    """Salida de un trade individual (simulate_trade_df)"""
+    exit_idx: int
+    exit_time: pd.Timestamp
+    exit_price: float
+    exit_reason: str
+    return_pct: float
+    max_profit: float
+    max_drawdown: float
+
+
+def simulate_trades(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                    entry_idx: ArrayLike, entry_price: ArrayLike,
+                    profit_target: ArrayLike, stop_loss: ArrayLike, max_hold: int,
+                    future_extra: int = 50, min_future: int = 5,
+                    end_idx: Optional[ArrayLike] = None, intrabar: Optional[Intrabar] = None) -> SimulatedTrades:
+    """
+    Simula todos los trades a la vez: cada uno sale en la primera vela que
+    toca TP o SL hasta max_hold, si no por MAX_HOLD o END_OF_DATA.
+
+    Args:
+        high, low, close: Arrays de la serie completa
+        entry_idx: Primera vela futura de cada trade (la siguiente a la señal)
+        entry_price: Precio de entrada de cada trade
+        profit_target, stop_loss: Fracciones (escalar o una por trade)
+        max_hold: Velas máximas de holding
+        future_extra / min_future: Ventana futura y mínimo de velas, como en los scripts
+        end_idx: Fin (exclusivo) de los datos futuros por trade; por defecto
+                 entry_idx + max_hold + future_extra
+        intrabar: Sub-velas para decidir TP / SL en las velas que tocan ambos
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    entry_idx = np.atleast_1d(np.asarray(entry_idx, dtype=np.int64))
+    count = len(entry_idx)
+    entry_price = np.broadcast_to(np.asarray(entry_price, dtype=np.float64), (count,))
+    target_price = entry_price * (1 + np.broadcast_to(np.asarray(profit_target, dtype=np.float64), (count,)))
+    stop_price = entry_price * (1 - np.broadcast_to(np.asarray(stop_loss, dtype=np.float64), (count,)))
+    if end_idx is None:
+        end_idx = entry_idx + max_hold + future_extra
+    stop = np.minimum(np.broadcast_to(np.asarray(end_idx, dtype=np.int64), (count,)), len(close))
+    future_len = stop - entry_idx
+
+    result = SimulatedTrades(
+        valid=future_len >= min_future,
+        exit_idx=np.zeros(count, dtype=np.int64),
+        exit_price=np.full(count, np.nan),
+        exit_reason=np.full(count, END_OF_DATA, dtype=np.int64),
+        return_pct=np.full(count, np.nan),
+        max_profit=np.zeros(count),
+        max_drawdown=np.zeros(count),
+        ambiguous=np.zeros(count, dtype=bool),
+    )
+    rows = np.flatnonzero(result.valid & (future_len > 0))
+    for begin in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[begin:begin + CHUNK_SIZE]
+        _simulate_chunk(high, low, close, chunk, entry_idx[chunk], entry_price[chunk], target_price[chunk],
+                        stop_price[chunk], future_len[chunk], max_hold, result, intrabar)
+    return result
+
+
+def _simulate_chunk(high, low, close, rows, entry_idx, entry_price, target_price, stop_price,
+                    future_len, max_hold, result, intrabar=None):
+    # Velas que se comprueban: hasta max_hold incluida y dentro de los datos futuros
+    checked = np.minimum(future_len, max_hold + 1)
+    width = int(checked.max())
+    offsets = np.arange(width)
+    in_range = offsets[None, :] < checked[:, None]
+    bars = np.minimum(entry_idx[:, None] + offsets[None, :], len(close) - 1)
+    bar_high = high[bars]
+    bar_low = low[bars]
+
+    hit_tp = (bar_high >= target_price[:, None]) & in_range
+    hit = hit_tp | ((bar_low <= stop_price[:, None]) & in_range)
+    has_hit = hit.any(axis=1)
+    first = hit.argmax(axis=1)
+    last_checked = np.where(has_hit, first, checked - 1)
+
+    # Excursiones acumuladas hasta la vela de salida (incluida), partiendo de 0
+    entry = entry_price[:, None]
+    profit = np.where(in_range, (bar_high - entry) / entry, -np.inf)
+    loss = np.where(in_range, (entry - bar_low) / entry, -np.inf)
+    cum_profit = np.maximum.accumulate(profit, axis=1)
+    cum_loss = np.maximum.accumulate(loss, axis=1)
+    line = np.arange(len(rows))
+    max_profit = np.maximum(cum_profit[line, last_checked], 0)
+    max_drawdown = np.maximum(cum_loss[line, last_checked], 0)
+
+    is_tp = has_hit & hit_tp[line, first]
+    ambiguous = is_tp & (bar_low[line, first] <= stop_price)
+    if intrabar is not None and ambiguous.any():
+        _resolve_intrabar(intrabar, np.flatnonzero(ambiguous), entry_idx, first, entry_price, target_price,
+                          stop_price, cum_profit, cum_loss, is_tp, max_profit, max_drawdown)
+    max_hold_exit = ~has_hit & (future_len > max_hold + 1)
+    exit_idx = np.where(has_hit, entry_idx + first,
+                        np.where(max_hold_exit, entry_idx + max_hold + 1, entry_idx + future_len - 1))
+    exit_reason = np.where(has_hit, np.where(is_tp, TAKE_PROFIT, STOP_LOSS),
+                           np.where(max_hold_exit, MAX_HOLD, END_OF_DATA))
+    exit_price = np.where(is_tp, target_price,
+                          np.where(has_hit, stop_price, close[exit_idx]))
+
+    result.exit_idx[rows] = exit_idx
+    result.exit_reason[rows] = exit_reason
+    result.exit_price[rows] = exit_price
+    result.return_pct[rows] = (exit_price - entry_price) / entry_price
+    result.max_profit[rows] = max_profit
+    result.max_drawdown[rows] = max_drawdown
+    result.ambiguous[rows] = ambiguous
+
+
+def _resolve_intrabar(intrabar, ambiguous, entry_idx, first, entry_price, target_price, stop_price,
+                      cum_profit, cum_loss, is_tp, max_profit, max_drawdown):
+    """Repite solo las sub-velas de las velas ambiguas (modifica is_tp y las excursiones)"""
+    begin = intrabar.bar_open[entry_idx[ambiguous] + first[ambiguous]]
+    lo = np.searchsorted(intrabar.open_time, begin)
+    hi = np.searchsorted(intrabar.open_time, begin + intrabar.bar_ms)
+    for k, sub_lo, sub_hi in zip(ambiguous.tolist(), lo.tolist(), hi.tolist()):
+        sub_high = intrabar.high[sub_lo:sub_hi]
+        sub_low = intrabar.low[sub_lo:sub_hi]
+        hit = (sub_high >= target_price[k]) | (sub_low <= stop_price[k])
+        if not hit.any():
+            continue  # sin sub-velas (o no cuadran con la vela): regla del bucle
+        j = int(hit.argmax())
+        is_tp[k] = sub_high[j] >= target_price[k]
+        # Excursiones hasta la sub-vela de salida, sin el resto de la vela
+        entry = entry_price[k]
+        before = first[k] - 1
+        profit = (sub_high[:j + 1].max() - entry) / entry
+        loss = (entry - sub_low[:j + 1].min()) / entry
+        if before >= 0:
+            profit = max(profit, cum_profit[k, before])
+            loss = max(loss, cum_loss[k, before])
+        max_profit[k] = max(profit, 0)
+        max_drawdown[k] = max(loss, 0)
+
+
+def simulate_trade_df(df: pd.DataFrame, start_idx: int, entry_price: float, profit_target: float,
+                      stop_loss: float, max_hold: int, future_extra: int = 50, min_future: int = 5,
+                      end_idx: Optional[int] = None, intrabar: Optional[Intrabar] = None) -> Optional[TradeExit]:
+    """Un trade sobre un DataFrame OHLCV (reemplazo directo del bucle iterrows); None si no hay datos"""
+    result = simulate_trades(df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy(),
+                             start_idx, entry_price, profit_target, stop_loss, max_hold,
+                             future_extra, min_future, end_idx, intrabar)
+    if not result.valid[0] or start_idx >= len(df):
+        return None
+    exit_idx = int(result.exit_idx[0])
+    return TradeExit(exit_idx, df.index[exit_idx], result.exit_price[0], EXIT_REASONS[result.exit_reason[0]],
+                     result.return_pct[0], result.max_profit[0], result.max_drawdown[0])
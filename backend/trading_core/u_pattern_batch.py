@@ -0,0 +1,230 @@
+# backend/trading_core/u_pattern_batch.py
+
+"""
+Detección del patrón U para varias series en una sola pasada NumPy.
+
+Las ventanas de todas las series se apilan en matrices (series, velas),
+alineadas a la derecha y rellenadas con NaN a la izquierda, y las
+condiciones de `_detect_u_patterns_2023/_30min` se evalúan con vectores de
+parámetros por serie: dentro de detect() una serie más es una fila más, no
+otro bucle.
+
+Solo lo usa UPatternBatchService (GET /signals/scan). Los scanners
+(BTC/ETH/BNB 4h, BTC 30m) siguen con su propio sondeo, sus descargas y su
+UPatternStream, así que en el ciclo de producción cada serie sigue
+costando su bucle. PAXG no tiene equivalente aquí: su detector es otro
+algoritmo.
+
+Las series se agrupan por (window_low, pre_slope_len): window_low fija la
+forma de las ventanas centradas y pre_slope_len el tramo previo a cada
+mínimo. Los parámetros son los de U_PATTERN_PROFILES y las señales, los
+mismos dicts que UPatternStream.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from trading_core.indicators import slope
+from trading_core.u_pattern_kernel import LOW_FILTERS
+from trading_core.u_pattern_stream import U_PATTERN_PROFILES
+
+
+class SeriesSpec(NamedTuple):
+    """Estrategia U sobre una serie: perfil, ventana de análisis y overrides"""
+    key: str
+    profile: str = '2023'
+    window_size: int = 120
+    min_candles: Optional[int] = None  # por defecto window_size
+    overrides: Dict[str, Any] = {}
+    extra_fields: Dict[str, Any] = {}
+
+    def params(self) -> Dict[str, Any]:
+        params = dict(U_PATTERN_PROFILES[self.profile])
+        params.update(self.overrides)
+        return params
+
+
+def _weighted_slopes(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Pendiente OLS de las últimas lengths[s] columnas de cada fila (forma cerrada)"""
+    max_len = int(lengths.max())
+    tail = values[:, -max_len:]
+    cols = np.arange(max_len)
+    # x - x̄ sobre las últimas `length` columnas de cada fila, 0 fuera de ellas
+    offset = max_len - lengths[:, None]
+    x = cols[None, :] - offset
+    weights = np.where(x >= 0, x - (lengths[:, None] - 1) / 2, 0.0)
+    denominator = lengths * (lengths * lengths - 1) / 12
+    return np.nansum(weights * tail, axis=1) / denominator
+
+
+class UPatternBatch:
+    """Motor batch: vectores de parámetros precalculados para un conjunto de series"""
+
+    def __init__(self, specs: List[SeriesSpec]):
+        self.specs = list(specs)
+        groups: Dict[tuple, List[int]] = {}
+        for i, spec in enumerate(self.specs):
+            params = spec.params()
+            if params['pre_slope_len'] > params['window_low']:
+                # La pendiente previa se tomaría del relleno NaN en el borde de la ventana
+                raise ValueError(f"{spec.key}: pre_slope_len > window_low no soportado en batch")
+            groups.setdefault((params['window_low'], params['pre_slope_len']), []).append(i)
+        self._groups = [(key, members, self._param_vectors(members)) for key, members in groups.items()]
+
+    def _param_vectors(self, members: List[int]) -> Dict[str, np.ndarray]:
+        """Un array por parámetro con un valor por serie del grupo"""
+        params = [self.specs[i].params() for i in members]
+        filters = [LOW_FILTERS[p['low_variant']] for p in params]
+
+        def vector(name, source=params, default=np.nan, dtype=np.float64):
+            return np.array([default if item[name] is None else item[name] for item in source], dtype=dtype)
+
+        vectors = {name: vector(name) for name in (
+            'min_depth_pct', 'pre_slope_max', 'rupture_tolerance', 'recent_slope_min',
+            'signal_min_depth', 'momentum_slope_min')}
+        for name in ('n_lows', 'min_width', 'max_width', 'atr_period', 'recent_slope_len', 'momentum_len'):
+            vectors[name] = vector(name, dtype=np.int64)
+        vectors['rupture'] = np.array([p['rupture'] for p in params], dtype=np.float64)
+        vectors['recent_margin'] = vector('recent_margin', filters, default=0, dtype=np.int64)
+        vectors['volume_filter'] = np.array([f['volume_ratio'] is not None for f in filters])
+        vectors['volume_ratio'] = vector('volume_ratio', filters, default=0.0)
+        vectors['strong_depth'] = vector('strong_depth', filters, default=0.0)
+        return vectors
+
+    # ------------------------------------------------------------------
+
+    def detect(self, frames: Dict[str, pd.DataFrame]) -> Dict[str, List[Dict]]:
+        """
+        Evalúa todas las series en una llamada.
+
+        Args:
+            frames: key -> DataFrame OHLCV (última fila = vela actual). Las
+                    series sin datos se omiten.
+
+        Returns:
+            key -> lista de señales (0 o 1, como los `_detect_u_patterns_*`)
+        """
+        results: Dict[str, List[Dict]] = {spec.key: [] for spec in self.specs}
+        for (window_low, pre_len), members, vectors in self._groups:
+            rows = [i for i in members if frames.get(self.specs[i].key) is not None]
+            if rows:
+                take = np.array([members.index(i) for i in rows])
+                group_vectors = {name: value[take] for name, value in vectors.items()}
+                self._detect_group(rows, frames, window_low, pre_len, group_vectors, results)
+        return results
+
+    def _stack(self, rows: List[int], frames: Dict[str, pd.DataFrame]):
+        """Matrices (series, ancho) alineadas a la derecha con relleno NaN"""
+        windows = []
+        for i in rows:
+            spec = self.specs[i]
+            df = frames[spec.key]
+            min_candles = spec.window_size if spec.min_candles is None else spec.min_candles
+            windows.append(df.iloc[-spec.window_size:] if len(df) >= min_candles else df.iloc[:0])
+        lengths = np.array([len(w) for w in windows], dtype=np.int64)
+        width = int(lengths.max()) if len(lengths) else 0
+        stacked = {}
+        for column in ('high', 'low', 'close', 'volume'):
+            matrix = np.full((len(rows), width), np.nan)
+            for r, window in enumerate(windows):
+                if len(window):
+                    matrix[r, width - len(window):] = window[column].to_numpy(dtype=np.float64)
+            stacked[column] = matrix
+        return windows, width, lengths, stacked
+
+    def _detect_group(self, rows, frames, window_low, pre_len, v, results):
+        windows, width, lengths, m = self._stack(rows, frames)
+        size = 2 * window_low + 1
+        if width < size:
+            return
+        high, low, close, volume = m['high'], m['low'], m['close'], m['volume']
+        n_series = len(rows)
+        series = np.arange(n_series)
+
+        # 1. Mínimos significativos (mismas reglas que find_significant_lows)
+        centers = np.arange(window_low, width - window_low)
+        center_low = low[:, window_low:width - window_low]
+        with np.errstate(invalid='ignore'):
+            local_min = sliding_window_view(low, size, axis=1).min(axis=2)
+            local_high = sliding_window_view(high, size, axis=1).max(axis=2)
+            depth = (local_high - center_low) / local_high
+            is_low = (center_low == local_min) & (depth >= v['min_depth_pct'][:, None])
+            is_low &= centers[None, :] < width - v['recent_margin'][:, None]
+            volume_avg = sliding_window_view(volume, size, axis=1).mean(axis=2)
+            volume_ok = ((volume[:, window_low:width - window_low] > volume_avg * v['volume_ratio'][:, None])
+                         | (depth >= v['strong_depth'][:, None]))
+        is_low &= volume_ok | ~v['volume_filter'][:, None]
+
+        # 2. Últimos n_lows mínimos por serie (rango contado desde la derecha)
+        rank = np.cumsum(is_low[:, ::-1], axis=1)[:, ::-1]
+        candidates = is_low & (rank <= v['n_lows'][:, None])
+        pattern_width = width - centers[None, :]
+        candidates &= (pattern_width > v['min_width'][:, None]) & (pattern_width < v['max_width'][:, None])
+        if not candidates.any():
+            return
+
+        # 3. Indicadores por serie: ATR, factor de ruptura, pendientes recientes
+        prev_close = close[:, :-1]
+        true_range = np.fmax(high[:, 1:] - low[:, 1:],
+                             np.fmax(np.abs(high[:, 1:] - prev_close), np.abs(low[:, 1:] - prev_close)))
+        max_period = int(v['atr_period'].max())
+        tail = true_range[:, -max_period:]
+        in_period = np.arange(tail.shape[1])[None, :] >= tail.shape[1] - v['atr_period'][:, None]
+        atr = np.nansum(np.where(in_period, tail, 0.0), axis=1) / np.minimum(v['atr_period'], lengths - 1)
+        price = close[:, -1]
+
+        base, threshold_1, threshold_2, slope_1, slope_2, cap = v['rupture'].T
+        atr_pct = atr / price
+        factor = np.where(atr_pct < threshold_1, base,
+                          np.where(atr_pct < threshold_2, base + (atr_pct * slope_1),
+                                   np.minimum(base + (atr_pct * slope_2), cap)))
+        factor = np.maximum(factor, base)
+
+        recent_slope = _weighted_slopes(close, v['recent_slope_len'])
+        momentum_slope = _weighted_slopes(close, v['momentum_len'])
+
+        # 4. Pendiente previa close[c - pre_len : c], solo para los candidatos (<= n_lows por
+        #    serie) y con indicators.slope como los detectores por serie: los empates exactos
+        #    con pre_slope_max (precios redondeados) se resuelven igual
+        pre_slope = np.full(candidates.shape, np.nan)
+        for r, c in zip(*np.nonzero(candidates)):
+            pre_slope[r, c] = slope(close[r, centers[c] - pre_len:centers[c]])
+
+        # 5. Condiciones de señal
+        rupture_level = high[:, window_low:width - window_low] * factor[:, None]
+        relative_idx = centers[None, :] - (width - lengths)[:, None]
+        with np.errstate(invalid='ignore'):
+            passed = candidates & np.stack([
+                pre_slope < v['pre_slope_max'][:, None],
+                price[:, None] > rupture_level * v['rupture_tolerance'][:, None],
+                (recent_slope > v['recent_slope_min'])[:, None] & np.ones_like(candidates),
+                depth >= v['signal_min_depth'][:, None],
+                (relative_idx < v['momentum_len'][:, None]) | (momentum_slope > v['momentum_slope_min'])[:, None],
+            ]).all(axis=0)
+
+        # 6. Primer candidato que cumple (el bucle original va del más antiguo al más reciente)
+        has_signal = passed.any(axis=1)
+        first = passed.argmax(axis=1)
+        for r in series[has_signal]:
+            spec = self.specs[rows[r]]
+            params = spec.params()
+            c = first[r]
+            signal = {
+                'timestamp': windows[r].index[-1],
+                'entry_price': rupture_level[r, c],
+                'signal_strength': abs(pre_slope[r, c]),
+                'min_price': center_low[r, c],
+                'pattern_width': int(pattern_width[0, c]),
+                'atr': atr[r],
+                'dynamic_factor': factor[r],
+                'depth': depth[r, c],
+            }
+            if 'rupture_level' in params['signal_fields']:
+                signal['rupture_level'] = rupture_level[r, c]
+            if 'current_price' in params['signal_fields']:
+                signal['current_price'] = price[r]
+            signal.update(spec.extra_fields)
+            results[spec.key] = [signal]
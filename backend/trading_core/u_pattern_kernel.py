@@ -0,0 +1,135 @@
+# backend/trading_core/u_pattern_kernel.py
+
+"""
+Kernel NumPy para la detección de mínimos significativos del patrón U.
+
+Reemplaza los bucles `df.iloc[i]` / `df.iloc[i-window:i+window+1]` de los
+`_detect_lows_*` de los scanners y de los backtests de `src/`: el mínimo,
+el máximo y el volumen medio centrados se calculan de una vez con ventanas
+deslizantes (vistas, sin copiar datos) y las condiciones se evalúan como
+máscaras sobre todo el array.
+
+Las reglas son exactamente las del bucle original:
+  - low[i] es el mínimo de low[i-w : i+w+1]
+  - depth = (max(high[i-w : i+w+1]) - low[i]) / max(high[...]) >= min_depth_pct
+  - opcional: i < n - recent_margin (el mínimo no puede estar en las últimas velas)
+  - opcional: volume[i] > mean(volume[i-w : i+w+1]) * volume_ratio  o  depth >= strong_depth
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Parámetros de cada variante de `_detect_lows_*` (ventana y profundidad los pasa el llamador)
+LOW_FILTERS = {
+    # Scanners 4h BTC/ETH/BNB y backtests 2022/2023 (+ estrategias 1h/15m/5m basadas en 2023)
+    '2023': {'recent_margin': 5, 'volume_ratio': 0.8, 'strong_depth': 0.04},
+    # Scanners y backtest de 30 minutos
+    '30min': {'recent_margin': 2, 'volume_ratio': 0.7, 'strong_depth': 0.025},
+    # Backtests 1h y 15m unificado
+    '1h': {'recent_margin': 2, 'volume_ratio': 0.70, 'strong_depth': 0.020},
+    # Backtest 15m original
+    '15min': {'recent_margin': 2, 'volume_ratio': 0.60, 'strong_depth': 0.015},
+    # Sin filtros de recencia ni volumen (backtest 2024 BTC, demo, generador)
+    'basic': {'recent_margin': None, 'volume_ratio': None, 'strong_depth': None},
+}
+
+
+def centered_rolling(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Vista (n - 2*window, 2*window + 1) con la ventana centrada de cada índice
+    i en [window, n - window). No copia datos.
+    """
+    return sliding_window_view(values, 2 * window + 1)
+
+
+def find_significant_lows(
+    low: np.ndarray,
+    high: np.ndarray,
+    volume: Optional[np.ndarray] = None,
+    window: int = 6,
+    min_depth_pct: float = 0.025,
+    recent_margin: Optional[int] = None,
+    volume_ratio: Optional[float] = None,
+    strong_depth: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Detecta los mínimos significativos de una serie.
+
+    Args:
+        low, high, volume: Arrays float de la serie (volume solo si hay filtro de volumen)
+        window: Semiancho de la ventana centrada
+        min_depth_pct: Profundidad mínima del mínimo respecto al máximo local
+        recent_margin: Si se indica, descarta mínimos con i >= n - recent_margin
+        volume_ratio / strong_depth: Filtro de volumen (se omite si volume_ratio es None)
+
+    Returns:
+        (indices, depths) de los mínimos en orden creciente de índice
+    """
+    low = np.asarray(low, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    n = len(low)
+    if n < 2 * window + 1:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    centers = np.arange(window, n - window)
+    center_low = low[window:n - window]
+
+    local_min = centered_rolling(low, window).min(axis=1)
+    local_high = centered_rolling(high, window).max(axis=1)
+    depth = (local_high - center_low) / local_high
+
+    mask = (center_low == local_min) & (depth >= min_depth_pct)
+    if recent_margin is not None:
+        mask &= centers < n - recent_margin
+    if volume_ratio is not None:
+        volume = np.asarray(volume, dtype=np.float64)
+        volume_avg = centered_rolling(volume, window).mean(axis=1)
+        mask &= (volume[window:n - window] > volume_avg * volume_ratio) | (depth >= strong_depth)
+
+    return centers[mask], depth[mask]
+
+
+def detect_lows_df(df: pd.DataFrame, window: int, min_depth_pct: float, variant: str = '2023',
+                   full: bool = True) -> List[Dict]:
+    """
+    Versión DataFrame -> lista de dicts compatible con los `_detect_lows_*` existentes.
+
+    Args:
+        variant: Clave de LOW_FILTERS con los filtros de la variante original
+        full: Incluir close/volume en cada dict (el generador de backtests no los usa)
+    """
+    low = df['low'].to_numpy(dtype=np.float64)
+    high = df['high'].to_numpy(dtype=np.float64)
+    volume = df['volume'].to_numpy(dtype=np.float64) if 'volume' in df else None
+    indices, depths = find_significant_lows(
+        low, high, volume, window=window, min_depth_pct=min_depth_pct, **LOW_FILTERS[variant]
+    )
+    return lows_to_dicts(df, indices, depths, full=full)
+
+
+def lows_to_dicts(df: pd.DataFrame, indices: np.ndarray, depths: np.ndarray, full: bool = True) -> List[Dict]:
+    """Construye los dicts de mínimos (solo para los índices detectados)"""
+    if len(indices) == 0:
+        return []
+    low = df['low'].to_numpy()
+    high = df['high'].to_numpy()
+    lows = []
+    if full:
+        close = df['close'].to_numpy()
+        volume = df['volume'].to_numpy()
+    for i, depth in zip(indices.tolist(), depths):
+        item = {
+            'index': i,
+            'timestamp': df.index[i],
+            'low': low[i],
+            'high': high[i],
+        }
+        if full:
+            item['close'] = close[i]
+            item['volume'] = volume[i]
+        item['depth'] = depth
+        lows.append(item)
+    return lows
@@ -0,0 +1,473 @@
+# backend/trading_core/u_pattern_stream.py
+
+"""
+Detector incremental del patrón U para una serie (symbol, timeframe).
+
+Los `_detect_u_patterns_*` recalculan en cada escaneo mínimos, ATR y
+pendientes sobre toda la ventana de análisis. Este detector mantiene ese
+estado y lo actualiza en tiempo constante por vela:
+  - mínimo de low / máximo de high centrados con deques monótonas
+  - suma móvil de volumen (filtro de volumen) y de true range (ATR)
+  - sumas móviles de regresión (Σy, Σj·y) para las pendientes recientes
+  - mínimos significativos confirmados cuando su ventana centrada se completa
+
+`update(..., closed=False)` evalúa una vela en formación sin modificar el
+estado, así que se puede evaluar por tick. Las señales son los mismos dicts
+que devuelven `_detect_u_patterns_2023` / `_detect_u_patterns_30min` sobre
+la ventana que termina en la vela evaluada (las pendientes móviles usan
+sumas acumuladas: iguales a trading_core.indicators salvo redondeo).
+"""
+
+import math
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from trading_core.indicators import slope
+from trading_core.u_pattern_kernel import LOW_FILTERS
+
+# Parámetros de cada `_detect_u_patterns_*` (los scanners pueden sobrescribirlos)
+U_PATTERN_PROFILES = {
+    # Scanners 4h BTC (últimos 4 mínimos) y ETH/BNB (n_lows=3)
+    '2023': {
+        'low_variant': '2023',
+        'window_low': 6,
+        'min_depth_pct': 0.025,
+        'n_lows': 4,
+        'min_width': 4,
+        'max_width': 45,
+        'atr_period': 14,
+        'recent_slope_len': 6,
+        'pre_slope_len': 6,
+        'momentum_len': 20,
+        'pre_slope_max': -0.12,
+        'rupture_tolerance': 0.97,
+        'recent_slope_min': -0.03,
+        'signal_min_depth': 0.025,
+        'momentum_slope_min': -0.1,
+        # (base, umbral 1, umbral 2, pendiente 1, pendiente 2, máximo)
+        'rupture': (1.015, 0.015, 0.03, 0.3, 0.5, 1.05),
+        'signal_fields': ('rupture_level',),
+    },
+    # Scanner 30m mainnet
+    '30min': {
+        'low_variant': '30min',
+        'window_low': 3,
+        'min_depth_pct': 0.015,
+        'n_lows': 2,
+        'min_width': 2,
+        'max_width': 24,
+        'atr_period': 7,
+        'recent_slope_len': 3,
+        'pre_slope_len': 3,
+        'momentum_len': 10,
+        'pre_slope_max': -0.08,
+        'rupture_tolerance': 0.98,
+        'recent_slope_min': -0.02,
+        'signal_min_depth': 0.015,
+        'momentum_slope_min': -0.05,
+        'rupture': (1.008, 0.01, 0.02, 0.2, 0.3, 1.025),
+        'signal_fields': ('current_price',),
+    },
+}
+
+CONDITION_NAMES = ['pre_slope', 'rupture', 'recent_slope', 'depth', 'momentum_filter']
+
+
+def ols_slope(n: int, sum_y: float, sum_xy: float) -> float:
+    """Pendiente por mínimos cuadrados de y_0..y_{n-1} contra x = 0..n-1"""
+    if n < 2:
+        return 0
+    sum_x = n * (n - 1) / 2
+    return (n * sum_xy - sum_x * sum_y) / (n * n * (n * n - 1) / 12)
+
+
+class _RollingExtreme:
+    """Mínimo (o máximo) de los últimos `size` valores con una deque monótona"""
+
+    def __init__(self, size: int, is_max: bool = False):
+        self.size = size
+        self.is_max = is_max
+        self._items: Deque[Tuple[int, float]] = deque()
+
+    def _dominates(self, a: float, b: float) -> bool:
+        return a >= b if self.is_max else a <= b
+
+    def push(self, index: int, value: float):
+        items = self._items
+        while items and not self._dominates(items[-1][1], value):
+            items.pop()
+        items.append((index, value))
+        while items[0][0] <= index - self.size:
+            items.popleft()
+
+    @property
+    def value(self) -> float:
+        return self._items[0][1]
+
+    def peek(self, index: int, value: float) -> float:
+        """Extremo de la ventana que terminaría en `index` con `value`, sin modificar el estado"""
+        items = self._items
+        # Cada elemento de la deque es el extremo del tramo posterior al anterior
+        if items and items[0][0] > index - self.size:
+            best = items[0][1]
+        elif len(items) > 1:
+            best = items[1][1]
+        else:
+            return value
+        return best if self._dominates(best, value) else value
+
+
+class _RollingSum:
+    """Suma de los últimos `size` valores (re-sumada cada `size` altas para no acumular error)"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._values: Deque[float] = deque(maxlen=size)
+        self.total = 0.0
+        self._pushes = 0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def push(self, value: float):
+        if len(self._values) == self.size:
+            self.total -= self._values[0]
+        self._values.append(value)
+        self.total += value
+        self._pushes += 1
+        if self._pushes % self.size == 0:
+            self.total = math.fsum(self._values)
+
+    def peek(self, value: float) -> Tuple[int, float]:
+        """(cantidad, suma) tras agregar `value`, sin modificar el estado"""
+        if len(self._values) == self.size:
+            return self.size, self.total - self._values[0] + value
+        return len(self._values) + 1, self.total + value
+
+
+class _RollingSlope:
+    """Pendiente de regresión de los últimos `size` valores con sumas móviles Σy y Σj·y"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._values: Deque[float] = deque(maxlen=size)
+        self._sum_y = 0.0
+        self._sum_xy = 0.0
+        self._pushes = 0
+
+    def _sums_after(self, value: float) -> Tuple[int, float, float]:
+        n = len(self._values)
+        if n < self.size:
+            return n + 1, self._sum_y + value, self._sum_xy + n * value
+        # Al salir y_0 todos los x bajan en 1: Σj·y pierde (Σy - y_0)
+        oldest = self._values[0]
+        return (n, self._sum_y - oldest + value,
+                self._sum_xy - (self._sum_y - oldest) + (n - 1) * value)
+
+    def push(self, value: float):
+        _, self._sum_y, self._sum_xy = self._sums_after(value)
+        self._values.append(value)
+        self._pushes += 1
+        if self._pushes % self.size == 0:
+            self._sum_y = math.fsum(self._values)
+            self._sum_xy = math.fsum(j * v for j, v in enumerate(self._values))
+
+    @property
+    def slope(self) -> float:
+        return ols_slope(len(self._values), self._sum_y, self._sum_xy)
+
+    def peek(self, value: float) -> float:
+        """Pendiente tras agregar `value`, sin modificar el estado"""
+        return ols_slope(*self._sums_after(value))
+
+
+class UPatternStream:
+    """
+    Detector incremental del patrón U de una serie.
+
+    Args:
+        profile: Clave de U_PATTERN_PROFILES
+        window_size: Velas de la ventana de análisis (analysis_df del scanner)
+        min_candles: Velas mínimas para emitir señales (por defecto window_size)
+        extra_fields: Campos constantes agregados a cada señal (symbol, environment...)
+        **overrides: Reemplazan parámetros del perfil (p. ej. min_depth_pct de la config)
+    """
+
+    def __init__(self, profile: str = '2023', window_size: int = 120, min_candles: Optional[int] = None,
+                 extra_fields: Optional[Dict[str, Any]] = None, **overrides):
+        params = dict(U_PATTERN_PROFILES[profile])
+        params.update(overrides)
+        self.params = params
+        self.filters = LOW_FILTERS[params['low_variant']]
+        self.window_size = window_size
+        self.min_candles = window_size if min_candles is None else min_candles
+        self.extra_fields = dict(extra_fields or {})
+        # Historia mínima para ventana de análisis, ventana centrada y pendiente previa
+        w = params['window_low']
+        self._capacity = max(window_size, 2 * w + 1 + params['pre_slope_len']) + 1
+        # Evaluaciones de la última llamada (diagnóstico de los scanners)
+        self.last_evaluations: List[Dict] = []
+        self.lows_in_window = 0
+        self.reset()
+
+    def reset(self):
+        """Descarta todo el estado (p. ej. tras un hueco en la serie)"""
+        p = self.params
+        size = 2 * p['window_low'] + 1
+        cap = self._capacity
+        self._count = 0
+        self._times: List[Any] = [None] * cap
+        self._high = [0.0] * cap
+        self._low = [0.0] * cap
+        self._close = [0.0] * cap
+        self._volume = [0.0] * cap
+        self._low_min = _RollingExtreme(size)
+        self._high_max = _RollingExtreme(size, is_max=True)
+        self._volume_sum = _RollingSum(size)
+        self._true_range = _RollingSum(p['atr_period'])
+        self._recent = _RollingSlope(p['recent_slope_len'])
+        self._momentum = _RollingSlope(p['momentum_len'])
+        self._lows: Deque[Dict] = deque()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def last_timestamp(self) -> Optional[Any]:
+        if self._count == 0:
+            return None
+        return self._times[(self._count - 1) % self._capacity]
+
+    # ------------------------------------------------------------------ velas
+
+    def update(self, timestamp: Any, high: float, low: float, close: float, volume: float = 0.0,
+               closed: bool = True) -> List[Dict]:
+        """
+        Evalúa la ventana que termina en esta vela y devuelve las señales.
+        Con closed=True la vela se incorpora al estado; con closed=False
+        (vela en formación / tick) solo se evalúa.
+        """
+        high, low, close, volume = float(high), float(low), float(close), float(volume)
+        if closed:
+            self._push(timestamp, high, low, close, volume)
+            atr = self._atr()
+            return self._evaluate(self._count, timestamp, close, atr, self._recent.slope,
+                                  self._momentum.slope, None)
+
+        t = self._count
+        if t:
+            count, total = self._true_range.peek(self._tr(high, low, self._close[(t - 1) % self._capacity]))
+            atr = total / count
+        else:
+            atr = high - low
+        center = t - self.params['window_low']
+        pending = None
+        if center >= 0:
+            _, volume_total = self._volume_sum.peek(volume)
+            pending = self._confirm_low(center, self._low_min.peek(t, low),
+                                        self._high_max.peek(t, high), volume_total)
+        return self._evaluate(t + 1, timestamp, close, atr, self._recent.peek(close),
+                              self._momentum.peek(close), pending)
+
+    def sync(self, df: pd.DataFrame) -> List[Dict]:
+        """
+        Alinea el detector con el DataFrame de velas de un scanner y evalúa su
+        última fila (vela en formación). Solo incorpora las velas cerradas que
+        aún no tiene; si la serie no encaja (hueco, resiembra) la reconstruye.
+        """
+        if df is None or len(df) == 0:
+            return []
+        index = df.index
+        last_closed = len(df) - 1
+        begin = 0
+        last = self.last_timestamp
+        if last is not None:
+            pos = int(index.searchsorted(last))
+            if pos < last_closed and index[pos] == last:
+                begin = pos + 1
+            else:
+                self.reset()
+
+        high = df['high'].to_numpy()
+        low = df['low'].to_numpy()
+        close = df['close'].to_numpy()
+        volume = df['volume'].to_numpy()
+        for i in range(begin, last_closed):
+            self._push(index[i], float(high[i]), float(low[i]), float(close[i]), float(volume[i]))
+        return self.update(index[last_closed], high[last_closed], low[last_closed], close[last_closed],
+                           volume[last_closed], closed=False)
+
+    # ------------------------------------------------------------------ estado
+
+    @staticmethod
+    def _tr(high: float, low: float, prev_close: float) -> float:
+        return max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+    def _atr(self) -> float:
+        if len(self._true_range) == 0:
+            slot = (self._count - 1) % self._capacity
+            return self._high[slot] - self._low[slot]
+        return self._true_range.total / len(self._true_range)
+
+    def _push(self, timestamp: Any, high: float, low: float, close: float, volume: float):
+        t = self._count
+        cap = self._capacity
+        if t:
+            self._true_range.push(self._tr(high, low, self._close[(t - 1) % cap]))
+        slot = t % cap
+        self._times[slot] = timestamp
+        self._high[slot] = high
+        self._low[slot] = low
+        self._close[slot] = close
+        self._volume[slot] = volume
+        self._low_min.push(t, low)
+        self._high_max.push(t, high)
+        self._volume_sum.push(volume)
+        self._recent.push(close)
+        self._momentum.push(close)
+        self._count = t + 1
+
+        w = self.params['window_low']
+        center = t - w
+        if center >= 0:
+            confirmed = self._confirm_low(center, self._low_min.value, self._high_max.value,
+                                          self._volume_sum.total)
+            if confirmed:
+                self._lows.append(confirmed)
+        first_center = self._count - self.window_size + w
+        while self._lows and self._lows[0]['index'] < first_center:
+            self._lows.popleft()
+
+    def _slope_range(self, begin: int, end: int) -> float:
+        """
+        Pendiente de close[begin:end] (índices absolutos en la historia).
+        Se calcula una vez por mínimo con indicators.slope, igual que el batch:
+        los umbrales de pre_slope se comparan sin diferencias de redondeo.
+        """
+        cap = self._capacity
+        return slope(np.array([self._close[j % cap] for j in range(begin, end)]))
+
+    def _confirm_low(self, center: int, local_min: float, local_high: float, volume_total: float) -> Optional[Dict]:
+        """Reglas de u_pattern_kernel.find_significant_lows para una ventana centrada completa"""
+        p = self.params
+        slot = center % self._capacity
+        low = self._low[slot]
+        if low != local_min:
+            return None
+        depth = (local_high - low) / local_high
+        if depth < p['min_depth_pct']:
+            return None
+        if self.filters['volume_ratio'] is not None:
+            volume_avg = volume_total / (2 * p['window_low'] + 1)
+            if not (self._volume[slot] > volume_avg * self.filters['volume_ratio']
+                    or depth >= self.filters['strong_depth']):
+                return None
+        return {
+            'index': center,
+            'timestamp': self._times[slot],
+            'low': low,
+            'high': self._high[slot],
+            'depth': depth,
+            'pre_slope': self._slope_range(max(0, center - p['pre_slope_len']), center),
+        }
+
+    # ------------------------------------------------------------------ señales
+
+    def _rupture_factor(self, atr: float, price: float) -> float:
+        base, threshold_1, threshold_2, slope_1, slope_2, cap = self.params['rupture']
+        atr_pct = atr / price
+        if atr_pct < threshold_1:
+            factor = base
+        elif atr_pct < threshold_2:
+            factor = base + (atr_pct * slope_1)
+        else:
+            factor = min(base + (atr_pct * slope_2), cap)
+        return max(factor, base)
+
+    def _window_lows(self, total: int, pending: Optional[Dict]) -> List[Dict]:
+        """Últimos n_lows mínimos de la ventana de análisis que termina en la vela `total - 1`"""
+        p = self.params
+        first_center = max(0, total - self.window_size) + p['window_low']
+        margin = self.filters['recent_margin']
+        newest = total - margin if margin is not None else total
+
+        count = len(self._lows) + (pending is not None)
+
+        def item(k: int) -> Dict:
+            return pending if k == len(self._lows) else self._lows[k]
+
+        # Solo se recorren los extremos: la deque ya está recortada a la ventana
+        head = 0
+        while head < count and item(head)['index'] < first_center:
+            head += 1
+        tail = count
+        while tail > head and item(tail - 1)['index'] >= newest:
+            tail -= 1
+        self.lows_in_window = tail - head
+        return [item(k) for k in range(max(head, tail - p['n_lows']), tail)]
+
+    def _evaluate(self, total: int, timestamp: Any, price: float, atr: float, recent_slope: float,
+                  momentum_slope: float, pending: Optional[Dict]) -> List[Dict]:
+        p = self.params
+        self.last_evaluations = []
+        self.lows_in_window = 0
+        if total < self.min_candles:
+            return []
+        start = max(0, total - self.window_size)
+        lows = self._window_lows(total, pending)
+        if not lows:
+            return []
+
+        dynamic_factor = self._rupture_factor(atr, price)
+        for low in lows:
+            min_idx = low['index'] - start
+            width = total - low['index']
+            if not (p['min_width'] < width < p['max_width']):
+                continue
+            nivel_ruptura = low['high'] * dynamic_factor
+            pre_slope = low['pre_slope']
+            if low['index'] - p['pre_slope_len'] < start:
+                # La ventana de análisis recorta las velas previas al mínimo
+                pre_slope = self._slope_range(start, low['index'])
+            conditions = [
+                pre_slope < p['pre_slope_max'],
+                price > nivel_ruptura * p['rupture_tolerance'],
+                recent_slope > p['recent_slope_min'],
+                low['depth'] >= p['signal_min_depth'],
+                min_idx < p['momentum_len'] or momentum_slope > p['momentum_slope_min'],
+            ]
+            self.last_evaluations.append({
+                'min_idx': min_idx,
+                'min_timestamp': low['timestamp'],
+                'pre_slope': pre_slope,
+                'recent_slope': recent_slope,
+                'low_depth': low['depth'],
+                'atr': atr,
+                'dynamic_factor': dynamic_factor,
+                'nivel_ruptura': nivel_ruptura,
+                'current_price': price,
+                'pattern_width': width,
+                'conditions_passed': all(conditions),
+                'failed_conditions': [name for ok, name in zip(conditions, CONDITION_NAMES) if not ok],
+            })
+            if all(conditions):
+                signal = {
+                    'timestamp': timestamp,
+                    'entry_price': nivel_ruptura,
+                    'signal_strength': abs(pre_slope),
+                    'min_price': low['low'],
+                    'pattern_width': width,
+                    'atr': atr,
+                    'dynamic_factor': dynamic_factor,
+                    'depth': low['depth'],
+                }
+                if 'rupture_level' in p['signal_fields']:
+                    signal['rupture_level'] = nivel_ruptura
+                if 'current_price' in p['signal_fields']:
+                    signal['current_price'] = price
+                signal.update(self.extra_fields)
+                return [signal]  # Solo una señal por ventana
+        return []
@@ -0,0 +1,172 @@
+# backend/trading_core/walk_forward.py
+
+"""
+Walk-forward del patrón U sin copias de ventanas.
+
+`RobustBacktester._detect_signals_in_window` cortaba `df.iloc[:i].copy()`
+cada 5 velas, lo convertía a klines con `iterrows()` y parcheaba
+`scanner_crypto.fetch_klines` para llamar al scanner: coste cuadrático en la
+longitud del histórico y estado global que impide paralelizar. Aquí:
+  - la serie se precalcula una vez con BacktestEngine (mínimos, TR,
+    pendientes previas) y cada escaneo es `engine.detect(end, start)` sobre
+    índices de los arrays, sin copiar velas ni tocar módulos
+  - los folds (train de `train_window` velas, test de `test_window`) son
+    independientes y se reparten entre procesos; las velas van por memoria
+    compartida (trading_core.shared_series) y cada proceso precalcula una vez
+  - los trades de todos los folds se simulan juntos con trade_simulator
+
+Reglas del bucle original: dentro del train se escanea el prefijo
+[inicio, inicio + i) para i en range(scan_min, train - scan_tail, scan_step);
+la señal lleva la fecha de la vela inicio + i y todas las señales de un fold
+entran al final del train con su nivel de ruptura, con salida por TP/SL,
+max_hold o fin del test.
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from trading_core.backtest_engine import BacktestEngine, StrategyParams
+from trading_core.shared_series import SharedSeries, attach, publish, release
+from trading_core.trade_simulator import EXIT_REASONS, simulate_trades
+
+logger = logging.getLogger(__name__)
+
+
+class WalkForwardConfig(NamedTuple):
+    """Ventanas del walk-forward (valores de RobustBacktester para crypto)"""
+    train_window: int = 200
+    test_window: int = 50
+    scan_min: int = 50     # primer prefijo escaneado (la mitad del train si es corto)
+    scan_step: int = 5
+    scan_tail: int = 10    # velas finales del train sin escanear
+    test_margin: int = 10  # velas que deben quedar después del test
+
+
+class Fold(NamedTuple):
+    start: int       # primera vela del train
+    train_end: int   # fin del train (exclusivo) = vela de entrada
+    test_end: int    # fin del test (exclusivo)
+
+
+def make_folds(length: int, config: WalkForwardConfig = WalkForwardConfig()) -> List[Fold]:
+    """Folds del bucle original: el train avanza test_window velas por fold"""
+    folds = []
+    total = (length - config.train_window) // config.test_window
+    for k in range(max(total, 0)):
+        start = k * config.test_window
+        train_end = start + config.train_window
+        test_end = min(train_end + config.test_window, length)
+        if test_end >= length - config.test_margin:
+            break
+        folds.append(Fold(start, train_end, test_end))
+    return folds
+
+
+def fold_signals(engine: BacktestEngine, fold: Fold, config: WalkForwardConfig) -> List[Dict]:
+    """Señales de los prefijos del train de un fold (función pura sobre el motor)"""
+    length = fold.train_end - fold.start
+    scan_min = config.scan_min if length > 2 * config.scan_min else length // 2
+    signals = []
+    for i in range(scan_min, length - config.scan_tail, config.scan_step):
+        end = fold.start + i
+        signal = engine.detect(end, fold.start)
+        if signal is not None:
+            signals.append({
+                'date': engine.index[end],
+                'entry_price': signal['entry_price'],
+                'signal_strength': signal['signal_strength'],
+                'pattern_type': 'RUPTURA',
+                'depth': signal['depth'],
+            })
+    return signals
+
+
+# ----------------------------------------------------------------------
+# Trabajo de cada proceso
+
+_engine: Optional[BacktestEngine] = None
+_blocks: List[shared_memory.SharedMemory] = []
+
+
+def _init_worker(series: SharedSeries, params: StrategyParams, untrack: bool):
+    global _engine
+    df, blocks = attach(series, untrack)
+    _blocks.extend(blocks)
+    _engine = BacktestEngine(df, params)
+
+
+def _evaluate(task: Tuple[List[Fold], WalkForwardConfig]) -> List[List[Dict]]:
+    folds, config = task
+    return [fold_signals(_engine, fold, config) for fold in folds]
+
+
+# ----------------------------------------------------------------------
+
+def run_walk_forward(df: pd.DataFrame, params: StrategyParams = StrategyParams(),
+                     config: WalkForwardConfig = WalkForwardConfig(),
+                     workers: Optional[int] = None) -> List[Dict]:
+    """
+    Walk-forward completo sobre una serie.
+
+    Args:
+        df: Velas OHLCV indexadas por timestamp
+        params: Umbrales de detección y de salida (profit_target, stop_loss, max_hold)
+        config: Ventanas de train / test y escaneo
+        workers: Procesos para los folds (por defecto os.cpu_count(); 1 = en este proceso)
+
+    Returns:
+        Trades en orden de fold y señal (los que no tienen velas de test se descartan)
+    """
+    folds = make_folds(len(df), config)
+    workers = min(workers or os.cpu_count() or 1, len(folds))
+    logger.info(f"🔁 Walk-forward: {len(folds)} folds, {workers} procesos")
+
+    if workers <= 1:
+        engine = BacktestEngine(df, params)
+        per_fold = [fold_signals(engine, fold, config) for fold in folds]
+    else:
+        published, blocks = publish({'walk_forward': df})
+        context = multiprocessing.get_context()
+        chunk = -(-len(folds) // (workers * 4))
+        tasks = [(folds[begin:begin + chunk], config) for begin in range(0, len(folds), chunk)]
+        per_fold = []
+        try:
+            with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(published[0], params, context.get_start_method() != 'fork')) as pool:
+                for result in pool.map(_evaluate, tasks):
+                    per_fold.extend(result)
+        finally:
+            release(blocks)
+
+    entries = [(fold, signal) for fold, signals in zip(folds, per_fold) for signal in signals]
+    if not entries:
+        return []
+    sim = simulate_trades(
+        df['high'].to_numpy(dtype=np.float64), df['low'].to_numpy(dtype=np.float64),
+        df['close'].to_numpy(dtype=np.float64),
+        [fold.train_end for fold, _ in entries], [signal['entry_price'] for _, signal in entries],
+        params.profit_target, params.stop_loss, params.max_hold,
+        min_future=1, end_idx=[fold.test_end for fold, _ in entries],
+    )
+    trades = []
+    for k in np.flatnonzero(sim.valid).tolist():
+        fold, signal = entries[k]
+        trades.append({
+            **signal,
+            'fold': fold,
+            'entry_time': df.index[fold.train_end],
+            'exit_time': df.index[int(sim.exit_idx[k])],
+            'exit_price': sim.exit_price[k],
+            'return_pct': sim.return_pct[k],
+            'exit_reason': EXIT_REASONS[sim.exit_reason[k]],
+            'max_profit': sim.max_profit[k],
+            'max_drawdown': sim.max_drawdown[k],
+        })
+    return trades
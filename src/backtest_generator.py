@@ -1,15 +1,22 @@
 # src/backtest_generator.py
 # Generador automático de backtests para todas las criptomonedas y años
 
-import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import requests
-import time
 import json
 import os
+import sys
 from utils import log
 
+# Kernel compartido de detección de patrones U (backend/trading_core)
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, backend_path)
+from trading_core.u_pattern_kernel import detect_lows_df
+from trading_core.indicators import WindowIndicators
+from trading_core.ohlcv_store import load_klines
+from trading_core.backtest_cache import BacktestCache
+from trading_core.trade_simulator import EXIT_REASONS, simulate_trades
+
 class BacktestGenerator:
     def __init__(self):
         self.crypto_configs = {
@@ -66,6 +73,9 @@ class BacktestGenerator:
             }
         }
         
+        # Resultados por (velas, configuración): solo se recalculan las celdas que cambian
+        self.cache = BacktestCache()
+        
     def generate_all_backtests(self):
         """Genera todos los backtests necesarios"""
         results = {}
@@ -89,9 +99,8 @@ class BacktestGenerator:
                 except Exception as e:
                     print(f"❌ Error en backtest {crypto} {year}: {e}")
                     results[year][crypto] = None
-                
-                # Pausa entre backtests para no saturar la API
-                time.sleep(2)
+        
+        print(f"\n♻️ Caché: {self.cache.hits} reutilizados, {self.cache.misses} recalculados")
         
         # Guardar todos los resultados
         self.save_all_results(results)
@@ -107,6 +116,17 @@ class BacktestGenerator:
         if df.empty:
             raise Exception(f"No se pudieron obtener datos para {crypto} {year}")
         
+        # Mismas velas y misma configuración -> mismo resultado
+        cache_params = {'crypto_config': crypto_config, 'year_config': year_config}
+        return self.cache.get_or_compute(
+            df, cache_params, lambda: self._run_backtest(crypto, year, df), namespace='generator'
+        )
+    
+    def _run_backtest(self, crypto, year, df):
+        """Backtest sobre las velas ya cargadas"""
+        crypto_config = self.crypto_configs[crypto]
+        year_config = self.year_configs[year]
+        
         # Configurar parámetros
         profit_target = crypto_config['base_profit_target'] + year_config['profit_adjustment']
         stop_loss = crypto_config['base_stop_loss']
@@ -121,6 +141,7 @@ class BacktestGenerator:
         step_size = year_config['step_size']
         
         total_windows = (len(df) - window_size) // step_size
+        window_signals = []
         
         for window_idx in range(total_windows):
             start_idx = window_idx * step_size
@@ -131,15 +152,12 @@ class BacktestGenerator:
             
             analysis_df = df.iloc[start_idx:end_idx].copy()
             signals = self.detect_u_patterns(analysis_df, crypto_config, year_config)
-            
-            for signal in signals:
-                trade_result = self.simulate_trade(
-                    df, signal, end_idx, profit_target, stop_loss, max_hold_periods
-                )
-                
-                if trade_result:
-                    trades.append(trade_result)
-                    current_capital *= (1 + trade_result['return_pct'])
+            window_signals.extend((end_idx, signal) for signal in signals)
+        
+        # Todos los trades de una vez (trading_core.trade_simulator), en orden de señal
+        for trade_result in self.simulate_trades(df, window_signals, profit_target, stop_loss, max_hold_periods):
+            trades.append(trade_result)
+            current_capital *= (1 + trade_result['return_pct'])
         
         # Calcular estadísticas
         if not trades:
@@ -154,53 +172,8 @@ class BacktestGenerator:
         start_time = int(datetime(year, 1, 1).timestamp() * 1000)
         end_time = int(datetime(year, 12, 31, 23, 59, 59).timestamp() * 1000)
         
-        all_klines = []
-        current_start = start_time
-        interval = "4h"
-        limit = 1000
-        
-        while current_start < end_time:
-            try:
-                url = "https://api.binance.com/api/v3/klines"
-                params = {
-                    'symbol': symbol,
-                    'interval': interval,
-                    'startTime': current_start,
-                    'endTime': end_time,
-                    'limit': limit
-                }
-                
-                response = requests.get(url, params=params)
-                response.raise_for_status()
-                
-                klines = response.json()
-                if not klines:
-                    break
-                    
-                all_klines.extend(klines)
-                last_timestamp = klines[-1][0]
-                current_start = last_timestamp + 1
-                
-                time.sleep(0.1)  # Rate limit
-                
-            except Exception as e:
-                print(f"Error obteniendo datos: {e}")
-                break
-        
-        if not all_klines:
-            return pd.DataFrame()
-        
-        # Convertir a DataFrame
-        df = pd.DataFrame(all_klines, columns=[
-            'timestamp', 'open', 'high', 'low', 'close', 'volume',
-            'close_time', 'quote_volume', 'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'
-        ])
-        
-        for col in ['open', 'high', 'low', 'close', 'volume']:
-            df[col] = pd.to_numeric(df[col])
-        
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df.set_index('timestamp', inplace=True)
+        # Velas desde el almacén local (solo se descargan los huecos del rango)
+        df = load_klines(symbol, "4h", start_time, end_time)
         
         return df
     
@@ -215,9 +188,12 @@ class BacktestGenerator:
         if not significant_lows:
             return signals
         
+        # Indicadores de la ventana (ATR y pendientes se calculan una vez por escaneo)
+        indicators = WindowIndicators(df)
+        
         for low in significant_lows[-3:]:
             min_idx = low['index']
-            atr = self.calculate_atr_simple(df)
+            atr = indicators.atr(14)
             current_price = df.iloc[-1]['close']
             
             # Factor de ruptura adaptativo
@@ -226,8 +202,8 @@ class BacktestGenerator:
             nivel_ruptura = low['high'] * dynamic_factor
             
             if len(df) - min_idx > 3 and len(df) - min_idx < 60:
-                recent_slope = self.calculate_slope(df.iloc[-8:]['close'].values)
-                pre_slope = self.calculate_slope(df.iloc[max(0, min_idx-8):min_idx]['close'].values)
+                recent_slope = indicators.slope_last(8)
+                pre_slope = indicators.slope_before(min_idx, 8)
                 
                 # Condiciones adaptativas por mercado
                 slope_threshold = -0.2 if year_config['market_type'] == 'bear' else -0.15
@@ -255,26 +231,8 @@ class BacktestGenerator:
     
     def detect_lows(self, df, window, min_depth_pct):
         """Detecta mínimos locales"""
-        lows = []
-        
-        for i in range(window, len(df) - window):
-            current_low = df.iloc[i]['low']
-            window_slice = df.iloc[i-window:i+window+1]
-            
-            if current_low == window_slice['low'].min():
-                local_high = window_slice['high'].max()
-                depth = (local_high - current_low) / local_high
-                
-                if depth >= min_depth_pct:
-                    lows.append({
-                        'index': i,
-                        'timestamp': df.index[i],
-                        'low': current_low,
-                        'high': df.iloc[i]['high'],
-                        'depth': depth
-                    })
-        
-        return lows
+        # Kernel NumPy compartido (ventanas centradas vectorizadas)
+        return detect_lows_df(df, window, min_depth_pct, variant='basic', full=False)
     
     def calculate_rupture_factor(self, atr, price, base_factor):
         """Calcula factor de ruptura dinámico"""
@@ -289,78 +247,37 @@ class BacktestGenerator:
         
         return max(factor, base_factor)
     
-    def calculate_atr_simple(self, df, period=14):
-        """Calcula ATR simplificado"""
-        tr_values = []
-        for i in range(1, len(df)):
-            high = df.iloc[i]['high']
-            low = df.iloc[i]['low']
-            prev_close = df.iloc[i-1]['close']
-            
-            tr = max(
-                high - low,
-                abs(high - prev_close),
-                abs(low - prev_close)
-            )
-            tr_values.append(tr)
-        
-        return np.mean(tr_values[-period:]) if tr_values else df.iloc[-1]['high'] - df.iloc[-1]['low']
-    
-    def calculate_slope(self, values):
-        """Calcula pendiente"""
-        if len(values) < 2:
-            return 0
-        x = np.arange(len(values))
-        return np.polyfit(x, values, 1)[0]
-    
     def simulate_trade(self, df, signal, start_idx, profit_target, stop_loss, max_hold):
         """Simula ejecución de trade"""
-        entry_price = signal['entry_price']
-        entry_time = signal['timestamp']
-        
-        future_data = df.iloc[start_idx:start_idx + max_hold + 50]
-        if len(future_data) < 5:
-            return None
-            
-        target_price = entry_price * (1 + profit_target)
-        stop_price = entry_price * (1 - stop_loss)
-        
-        for i, (timestamp, row) in enumerate(future_data.iterrows()):
-            if i > max_hold:
-                exit_price = row['close']
-                exit_reason = "MAX_HOLD"
-                exit_time = timestamp
-                break
-                
-            if row['high'] >= target_price:
-                exit_price = target_price
-                exit_reason = "TAKE_PROFIT"
-                exit_time = timestamp
-                break
-                
-            if row['low'] <= stop_price:
-                exit_price = stop_price
-                exit_reason = "STOP_LOSS"
-                exit_time = timestamp
-                break
-        else:
-            exit_price = future_data.iloc[-1]['close']
-            exit_reason = "END_OF_DATA"
-            exit_time = future_data.index[-1]
-        
-        return_pct = (exit_price - entry_price) / entry_price
-        hold_hours = int((exit_time - entry_time).total_seconds() / 3600)
+        trades = self.simulate_trades(df, [(start_idx, signal)], profit_target, stop_loss, max_hold)
+        return trades[0] if trades else None
+    
+    def simulate_trades(self, df, signals, profit_target, stop_loss, max_hold):
+        """Simula todos los trades (start_idx, señal) en una pasada vectorizada"""
+        if not signals:
+            return []
+        sim = simulate_trades(
+            df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy(),
+            [start_idx for start_idx, _ in signals], [signal['entry_price'] for _, signal in signals],
+            profit_target, stop_loss, max_hold, future_extra=50, min_future=5
+        )
         
-        return {
-            'entry_time': entry_time,
-            'exit_time': exit_time,
-            'entry_price': entry_price,
-            'exit_price': exit_price,
-            'return_pct': return_pct,
-            'hold_hours': hold_hours,
-            'exit_reason': exit_reason,
-            'signal_strength': signal['signal_strength']
-        }
+        trades = []
+        for k in np.flatnonzero(sim.valid):
+            signal = signals[k][1]
+            entry_time = signal['timestamp']
+            exit_time = df.index[sim.exit_idx[k]]
+            trades.append({
+                'entry_time': entry_time,
+                'exit_time': exit_time,
+                'entry_price': signal['entry_price'],
+                'exit_price': sim.exit_price[k],
+                'return_pct': sim.return_pct[k],
+                'hold_hours': int((exit_time - entry_time).total_seconds() / 3600),
+                'exit_reason': EXIT_REASONS[sim.exit_reason[k]],
+                'signal_strength': signal['signal_strength']
+            })
+        return trades
     
     def calculate_backtest_stats(self, crypto, year, df, trades, initial_capital, final_capital):
         """Calcula estadísticas del backtest"""
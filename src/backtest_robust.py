@@ -5,14 +5,24 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
-from typing import Dict, List, Tuple
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
-from scanner_crypto import scan_crypto_for_u, CRYPTO_CONFIG
-from scanner_stocks import scan_stocks_for_u
 from binance_client import fetch_klines
 import yfinance as yf
 from utils import log
 
+# Walk-forward compartido (backend/trading_core): detección pura sobre arrays, folds en paralelo
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, backend_path)
+from trading_core.backtest_engine import StrategyParams
+from trading_core.walk_forward import WalkForwardConfig, run_walk_forward
+
+# Umbrales del scanner crypto 4h (TP 8%, SL 3%) con max_hold del walk-forward
+CRYPTO_PARAMS = StrategyParams(max_hold=100)
+CRYPTO_WALK_FORWARD = WalkForwardConfig(train_window=200, test_window=50)
+
 @dataclass
 class BacktestResult:
     """Resultado de backtesting para un símbolo"""
@@ -45,8 +55,9 @@ class Trade:
     exit_reason: str
 
 class RobustBacktester:
-    def __init__(self):
+    def __init__(self, workers: Optional[int] = None):
         self.results = {}
+        self.workers = workers  # procesos para los folds (None = todos los CPUs)
         
     def backtest_crypto_symbol(self, symbol: str, timeframe: str = '4h', 
                              lookback_days: int = 365, verbose: bool = False) -> BacktestResult:
@@ -69,7 +80,7 @@ class RobustBacktester:
             
             log(f"[{symbol}] Datos obtenidos: {len(df)} velas desde {df.index[0]} hasta {df.index[-1]}")
             
-            return self._run_walkforward_analysis(df, symbol, "CRYPTO", scan_crypto_for_u, verbose)
+            return self._run_walkforward_analysis(df, symbol, "CRYPTO", verbose)
             
         except Exception as e:
             log(f"❌ Error en backtesting de {symbol}: {e}")
@@ -91,14 +102,14 @@ class RobustBacktester:
             df.dropna(inplace=True)
             log(f"[{symbol}] Datos obtenidos: {len(df)} velas mensuales desde {df.index[0]} hasta {df.index[-1]}")
             
-            return self._run_walkforward_analysis(df, symbol, "STOCK", scan_stocks_for_u, verbose)
+            return self._run_walkforward_analysis(df, symbol, "STOCK", verbose)
             
         except Exception as e:
             log(f"❌ Error en backtesting de {symbol}: {e}")
             return self._create_empty_result(symbol, "STOCK", f"Error: {str(e)}")
     
-    def _run_walkforward_analysis(self, df: pd.DataFrame, symbol: str, scanner_type: str, 
-                                scanner_func, verbose: bool = False) -> BacktestResult:
+    def _run_walkforward_analysis(self, df: pd.DataFrame, symbol: str, scanner_type: str,
+                                verbose: bool = False) -> BacktestResult:
         """
         Análisis walk-forward: entrenar en ventana móvil, testear hacia adelante
         """
@@ -107,196 +118,47 @@ class RobustBacktester:
         equity_curve = [1000.0]  # Capital inicial
         current_capital = 1000.0
         
-        # Configurar ventanas
-        if scanner_type == "CRYPTO":
-            train_window = 200  # 200 períodos para entrenamiento
-            test_window = 50   # 50 períodos para testing
-            profit_target = CRYPTO_CONFIG['PROFIT_TARGET']
-            stop_loss = CRYPTO_CONFIG['STOP_LOSS']
-            max_hold_periods = 100
-        else:  # STOCK
-            train_window = 60   # 60 meses para entrenamiento
-            test_window = 12    # 12 meses para testing  
-            profit_target = 0.10  # 10% para acciones
-            stop_loss = 0.08     # 8% stop loss
-            max_hold_periods = 24
+        if scanner_type == "STOCK":
+            # Acciones no soportadas en el backtest: sin señales
+            return self._compile_results(symbol, scanner_type, signals, trades, equity_curve)
         
-        total_windows = (len(df) - train_window) // test_window
-        log(f"[{symbol}] Ejecutando {total_windows} ventanas de walk-forward analysis")
+        # Folds de 200 períodos de train y 50 de test sobre arrays precalculados (trading_core.walk_forward)
+        wf_trades = run_walk_forward(df, CRYPTO_PARAMS, CRYPTO_WALK_FORWARD, workers=self.workers)
+        log(f"[{symbol}] Walk-forward completado: {len(wf_trades)} trades out-of-sample")
         
-        for window_idx in range(total_windows):
-            start_idx = window_idx * test_window
-            train_end_idx = start_idx + train_window
-            test_end_idx = min(train_end_idx + test_window, len(df))
-            
-            if test_end_idx >= len(df) - 10:  # Necesitamos datos para forward testing
-                break
-            
-            # Datos de entrenamiento (para detectar el patrón)
-            train_df = df.iloc[start_idx:train_end_idx].copy()
+        for wf_trade in wf_trades:
+            trade = Trade(
+                symbol=symbol,
+                entry_date=wf_trade['date'],
+                exit_date=wf_trade['exit_time'],
+                entry_price=wf_trade['entry_price'],
+                exit_price=wf_trade['exit_price'],
+                return_pct=wf_trade['return_pct'],
+                hold_days=(wf_trade['exit_time'] - wf_trade['date']).days,
+                max_profit=wf_trade['max_profit'],
+                max_loss=wf_trade['max_drawdown'],
+                exit_reason=wf_trade['exit_reason']
+            )
+            trades.append(trade)
+            current_capital *= (1 + trade.return_pct)
+            equity_curve.append(current_capital)
             
-            # Simular detección de patrón al final del período de entrenamiento
-            window_signals = self._detect_signals_in_window(train_df, symbol, scanner_func, verbose)
-            
-            # Para cada señal, simular el trade en datos futuros (out-of-sample)
-            for signal in window_signals:
-                trade = self._simulate_trade(
-                    df, signal, train_end_idx, test_end_idx, 
-                    profit_target, stop_loss, max_hold_periods, scanner_type
-                )
-                
-                if trade:
-                    trades.append(trade)
-                    current_capital *= (1 + trade.return_pct)
-                    equity_curve.append(current_capital)
-                    
-                    signals.append({
-                        'date': signal['date'].strftime('%Y-%m-%d'),
-                        'entry_price': signal['entry_price'],
-                        'exit_price': trade.exit_price,
-                        'return_pct': trade.return_pct * 100,
-                        'hold_days': trade.hold_days,
-                        'exit_reason': trade.exit_reason,
-                        'success': trade.return_pct > 0,
-                        'max_profit': trade.max_profit * 100,
-                        'max_drawdown': trade.max_loss * 100
-                    })
+            signals.append({
+                'date': trade.entry_date.strftime('%Y-%m-%d'),
+                'entry_price': trade.entry_price,
+                'exit_price': trade.exit_price,
+                'return_pct': trade.return_pct * 100,
+                'hold_days': trade.hold_days,
+                'exit_reason': trade.exit_reason,
+                'success': trade.return_pct > 0,
+                'max_profit': trade.max_profit * 100,
+                'max_drawdown': trade.max_loss * 100
+            })
+            if verbose:
+                log(f"[{symbol}] {signals[-1]['date']} {trade.exit_reason} {trade.return_pct * 100:+.2f}%")
         
         return self._compile_results(symbol, scanner_type, signals, trades, equity_curve)
     
-    def _detect_signals_in_window(self, df: pd.DataFrame, symbol: str, scanner_func, verbose: bool) -> List[Dict]:
-        """
-        Detecta señales en una ventana de datos usando el scanner
-        """
-        signals = []
-        
-        # Crear ventanas deslizantes dentro del período de entrenamiento
-        min_window_size = 50 if len(df) > 100 else len(df) // 2
-        
-        for i in range(min_window_size, len(df) - 10, 5):  # Cada 5 períodos
-            window_df = df.iloc[:i].copy()
-            
-            try:
-                # Para crypto, necesitamos simular el input que espera el scanner
-                if 'CRYPTO' in scanner_func.__name__:
-                    # Convertir DataFrame a formato que espera scanner_crypto
-                    klines_format = []
-                    for _, row in window_df.iterrows():
-                        klines_format.append({
-                            'timestamp': int(row.name.timestamp() * 1000),
-                            'open': row['open'],
-                            'high': row['high'], 
-                            'low': row['low'],
-                            'close': row['close'],
-                            'volume': row['volume']
-                        })
-                    
-                    # Monkey patch temporal para evitar API calls en backtesting
-                    original_fetch = None
-                    import scanner_crypto
-                    if hasattr(scanner_crypto, 'fetch_klines'):
-                        original_fetch = scanner_crypto.fetch_klines
-                        scanner_crypto.fetch_klines = lambda *args: klines_format
-                    
-                    result = scanner_func(symbol, verbose=False)
-                    
-                    # Restaurar función original
-                    if original_fetch:
-                        scanner_crypto.fetch_klines = original_fetch
-                else:
-                    # Para stocks, usar el scanner directamente con datos históricos
-                    # TODO: Implementar monkey patch para yfinance también
-                    continue
-                
-                if result.get('alert') or result.get('estado_sugerido') in ['RUPTURA', 'U_DETECTADO']:
-                    signals.append({
-                        'date': df.index[i],
-                        'entry_price': result.get('nivel_ruptura', df.iloc[i]['close']),
-                        'signal_strength': abs(result.get('slope_left', 0)),
-                        'pattern_type': result.get('estado_sugerido', 'UNKNOWN')
-                    })
-                    
-            except Exception as e:
-                if verbose:
-                    log(f"Error en ventana {i}: {e}")
-                continue
-        
-        return signals
-    
-    def _simulate_trade(self, df: pd.DataFrame, signal: Dict, start_idx: int, end_idx: int,
-                       profit_target: float, stop_loss: float, max_hold: int, scanner_type: str) -> Trade:
-        """
-        Simula un trade basado en una señal
-        """
-        entry_price = signal['entry_price']
-        entry_date = signal['date']
-        
-        # Buscar datos futuros para simular el trade
-        future_data = df.iloc[start_idx:end_idx]
-        if future_data.empty:
-            return None
-        
-        target_price = entry_price * (1 + profit_target)
-        stop_price = entry_price * (1 - stop_loss)
-        
-        max_profit = 0
-        max_loss = 0
-        
-        for i, (date, row) in enumerate(future_data.iterrows()):
-            if i > max_hold:  # Máximo tiempo de holding
-                exit_price = row['close']
-                exit_reason = "MAX_HOLD"
-                break
-            
-            high_price = row['high']
-            low_price = row['low']
-            close_price = row['close']
-            
-            # Tracking de máximos y mínimos
-            current_profit = (high_price - entry_price) / entry_price
-            current_loss = (entry_price - low_price) / entry_price
-            max_profit = max(max_profit, current_profit)
-            max_loss = max(max_loss, current_loss)
-            
-            # Verificar take profit
-            if high_price >= target_price:
-                exit_price = target_price
-                exit_reason = "TAKE_PROFIT"
-                exit_date = date
-                break
-            
-            # Verificar stop loss
-            if low_price <= stop_price:
-                exit_price = stop_price
-                exit_reason = "STOP_LOSS" 
-                exit_date = date
-                break
-                
-            # Si es el último día, cerrar al precio de cierre
-            if i == len(future_data) - 1:
-                exit_price = close_price
-                exit_reason = "END_OF_DATA"
-                exit_date = date
-                break
-        else:
-            return None  # No se pudo simular el trade
-        
-        return_pct = (exit_price - entry_price) / entry_price
-        hold_days = (exit_date - entry_date).days
-        
-        return Trade(
-            symbol=signal.get('symbol', ''),
-            entry_date=entry_date,
-            exit_date=exit_date,
-            entry_price=entry_price,
-            exit_price=exit_price,
-            return_pct=return_pct,
-            hold_days=hold_days,
-            max_profit=max_profit,
-            max_loss=max_loss,
-            exit_reason=exit_reason
-        )
-    
     def _compile_results(self, symbol: str, scanner_type: str, signals: List[Dict], 
                         trades: List[Trade], equity_curve: List[float]) -> BacktestResult:
         """
@@ -1,12 +1,12 @@
 # src/backtest_u.py
 
 import yfinance as yf
-import pandas as pd
 import numpy as np
 import time
 import os
 import sys
 import random
+from concurrent.futures import ProcessPoolExecutor
 import requests  # <== NECESARIO PARA SESIONES
 
 # Importar para DB
@@ -20,7 +20,7 @@ except ImportError as e:
     print(f"Error importing backend modules: {e}")
     raise
 
-from utils import calc_slope, log
+from utils import log
 
 # === CONFIGURACION PRO ANTI-BAN ===
 
@@ -37,9 +37,9 @@ USER_AGENTS = [
 
 RUPTURE_FACTOR = 1.02
 MIN_SLOPE_LEFT = -0.5
-TICKER_SLEEP = 5    # segundos base entre tickers
-BATCH_SLEEP = 15    # segundos base entre batches
+BATCH_SLEEP = 15    # segundos base entre descargas de batches (solo red: el cálculo no espera)
 BATCH_SIZE = 10     # tamaño de los batches de descarga
+SCAN_WORKERS = os.cpu_count() or 1  # procesos para el backtest de los tickers descargados
 
 # === FUNCIONES ===
 
@@ -67,55 +67,88 @@ def load_tickers_from_db(tipo_filter=None, sub_tipo_filter=None, activo_only=Tru
     finally:
         session.close()
 
+# Pendiente de la recta de mínimos cuadrados sobre N puntos equiespaciados (= np.polyfit(x, y, 1)[0])
+def _slope_weights(n):
+    x = np.arange(n) - (n - 1) / 2
+    return x / (x * x).sum()
+
 # BACKTEST SCANNER
-def backtest_scan_for_u(ticker, df):
-    log(f"[{ticker}] Procesando datos para backtest...")
+def backtest_scan_for_u(ticker, df, verbose=True):
+    """Señales U del ticker; con verbose=False no escribe nada (lo usa el pool de procesos)"""
+    if verbose:
+        log(f"[{ticker}] Procesando datos para backtest...")
     try:
         df_ticker = df[df['Ticker'] == ticker].copy()
         df_ticker.dropna(inplace=True)
-        log(f"[{ticker}] Datos recibidos. Total de velas: {len(df_ticker)}.")
+        if verbose:
+            log(f"[{ticker}] Datos recibidos. Total de velas: {len(df_ticker)}.")
     except Exception as e:
         log(f"[{ticker}] ❌ Error procesando datos: {e}")
         return []
 
-    df_ticker['min_local'] = (df_ticker['Low'].shift(2) > df_ticker['Low'].shift(1)) & (df_ticker['Low'].shift(1) < df_ticker['Low'])
+    low = df_ticker['Low'].to_numpy(dtype=np.float64)
+    high = df_ticker['High'].to_numpy(dtype=np.float64)
+    close = df_ticker['Close'].to_numpy(dtype=np.float64)
+    n = len(close)
+    if n < 7:
+        return []
 
-    u_signals = []
+    # Mínimo local: Low[i-2] > Low[i-1] < Low[i] (marcado en la vela i)
+    min_local = np.zeros(n, dtype=bool)
+    min_local[2:] = (low[:-2] > low[1:-1]) & (low[1:-1] < low[2:])
+    # Hacen falta 5 velas antes (palo izquierdo) y al menos una después
+    min_local[:5] = False
+    min_local[-1] = False
+    positions = np.flatnonzero(min_local)
+
+    # Palo izquierdo: pendiente de los 5 cierres anteriores de cada mínimo, todos a la vez
+    left_windows = np.lib.stride_tricks.sliding_window_view(close, 5)[positions - 5]
+    slopes_left = left_windows @ _slope_weights(5)
+    # Sin pendiente suficiente no hay señal, se rompa o no el nivel
+    candidates = slopes_left < MIN_SLOPE_LEFT
+    positions, slopes_left = positions[candidates], slopes_left[candidates]
 
-    # Recorremos cada mínimo local
-    for idx_min in df_ticker[df_ticker['min_local']].index:
-        idx_min_pos = df_ticker.index.get_loc(idx_min)
-
-        if idx_min_pos < 5 or idx_min_pos >= len(df_ticker) - 1:
-            continue  # no hay suficientes velas antes o después
-
-        # Palo izquierdo
-        left_window = df_ticker.iloc[idx_min_pos - 5:idx_min_pos]['Close']
-        slope_left = float(calc_slope(left_window))
-
-        # Nivel de ruptura
-        min_row = df_ticker.loc[idx_min]
-        nivel_ruptura = min_row['High'] * RUPTURE_FACTOR
-
-        # Ver si en las velas posteriores se rompe el nivel
-        df_future = df_ticker.iloc[idx_min_pos + 1:]
-
-        for idx_future, row_future in df_future.iterrows():
-            close_actual = row_future['Close']
-            if slope_left < MIN_SLOPE_LEFT and close_actual > nivel_ruptura:
-                # Se detecta U
-                signal = {
-                    "fecha": idx_future.date(),
-                    "nivel_ruptura": nivel_ruptura,
-                    "slope_left": slope_left,
-                    "precio_cierre": close_actual
-                }
-                u_signals.append(signal)
-                log(f"[{ticker}] U detectada en {signal['fecha']} - Nivel ruptura: {nivel_ruptura:.2f}, Slope: {slope_left:.2f}, Close: {close_actual:.2f}")
-                break  # solo consideramos la primera ruptura tras ese mínimo
+    u_signals = []
+    dates = df_ticker.index
+    for idx_min_pos, slope_left in zip(positions, slopes_left):
+        nivel_ruptura = high[idx_min_pos] * RUPTURE_FACTOR
+
+        # Primera vela posterior que cierra sobre el nivel: máximo acumulado de los
+        # cierres futuros (no decreciente) + búsqueda binaria del primer valor > nivel
+        future_max = np.maximum.accumulate(close[idx_min_pos + 1:])
+        offset = int(np.searchsorted(future_max, nivel_ruptura, side='right'))
+        if offset == len(future_max):
+            continue
+        idx_future_pos = idx_min_pos + 1 + offset
+        signal = {
+            "fecha": dates[idx_future_pos].date(),
+            "nivel_ruptura": nivel_ruptura,
+            "slope_left": float(slope_left),
+            "precio_cierre": close[idx_future_pos]
+        }
+        u_signals.append(signal)
+        if verbose:
+            log(f"[{ticker}] U detectada en {signal['fecha']} - Nivel ruptura: {nivel_ruptura:.2f}, Slope: {slope_left:.2f}, Close: {signal['precio_cierre']:.2f}")
 
     return u_signals
 
+def _print_signals(ticker, signals):
+    if signals:
+        log(f"[{ticker}] Total señales de U detectadas: {len(signals)}")
+        for signal in signals:
+            print(f"    📅 {signal['fecha']} - Nivel ruptura: {signal['nivel_ruptura']:.2f}, Slope: {signal['slope_left']:.2f}, Close: {signal['precio_cierre']:.2f}")
+    else:
+        log(f"[{ticker}] No se detectaron señales de U en el histórico.")
+
+def _report_finished(pending, wait=False):
+    """Muestra, en orden, los tickers ya procesados por el pool; con wait espera a todos"""
+    while pending and (wait or pending[0][1].done()):
+        ticker, future = pending.pop(0)
+        try:
+            _print_signals(ticker, future.result())
+        except Exception as e:
+            log(f"[{ticker}] ❌ Error en el backtest: {e}")
+
 # MAIN BACKTEST
 if __name__ == "__main__":
     start_time = time.time()
@@ -127,9 +160,24 @@ if __name__ == "__main__":
 
     tickers = load_tickers_from_db(tipo_filter, sub_tipo_filter)
 
+    # Descargas en serie (con los sleeps anti-ban); el cálculo va a un pool de procesos
+    # y se solapa con la descarga y la espera del batch siguiente
+    pool = ProcessPoolExecutor(SCAN_WORKERS)
+    pending = []
+    last_download = None
+
     # Procesamos en batches
     for batch_start in range(0, len(tickers), BATCH_SIZE):
         batch_tickers = tickers[batch_start:batch_start + BATCH_SIZE]
+
+        # Sleep entre descargas (con jitter aleatorio): solo el tiempo que falte desde la anterior
+        if last_download is not None:
+            sleep_time = BATCH_SLEEP + random.uniform(0, 5) - (time.time() - last_download)
+            if sleep_time > 0:
+                log(f"⏳ Esperando {sleep_time:.2f} segundos para no sobrecargar Yahoo Finance...")
+                time.sleep(sleep_time)
+        _report_finished(pending)
+
         log(f"📦 Descargando batch de {len(batch_tickers)} tickers: {batch_tickers}...")
 
         # Elegir User-Agent aleatorio para este batch
@@ -149,6 +197,7 @@ if __name__ == "__main__":
                 progress=False,
                 group_by='ticker'
             )
+            last_download = time.time()
         except Exception as e:
             error_msg = str(e).lower()
             log(f"❌ Error descargando batch {batch_tickers}: {e}")
@@ -162,45 +211,23 @@ if __name__ == "__main__":
 
             log(f"⏳ Esperando {sleep_time:.2f} segundos por error en batch...")
             time.sleep(sleep_time)
+            last_download = None
             continue
 
-        # Normalizamos el DataFrame en formato "multi-index" → un DataFrame plano con 'Ticker' como columna
-        dfs = []
+        # Un DataFrame plano por ticker con 'Ticker' como columna (lo que viaja al proceso)
         for ticker in batch_tickers:
             try:
                 df_ticker = df_batch[ticker].copy()
                 df_ticker['Ticker'] = ticker
                 df_ticker['Date'] = df_ticker.index
-                dfs.append(df_ticker)
             except Exception as e:
                 log(f"[{ticker}] ⚠️ Error procesando DataFrame del batch: {e}")
-
-        if not dfs:
-            log(f"❌ No se pudo procesar ningún ticker del batch {batch_tickers}.")
-            continue
-
-        df_all = pd.concat(dfs)
-
-        # Procesamos cada ticker individual
-        for ticker in batch_tickers:
+                continue
             log(f"🔍 Backtesteando {ticker}...")
-            signals = backtest_scan_for_u(ticker, df_all)
-            if signals:
-                log(f"[{ticker}] Total señales de U detectadas: {len(signals)}")
-                for signal in signals:
-                    print(f"    📅 {signal['fecha']} - Nivel ruptura: {signal['nivel_ruptura']:.2f}, Slope: {signal['slope_left']:.2f}, Close: {signal['precio_cierre']:.2f}")
-            else:
-                log(f"[{ticker}] No se detectaron señales de U en el histórico.")
-
-            # Sleep entre tickers (con jitter aleatorio)
-            sleep_time = TICKER_SLEEP + random.uniform(0, 2)
-            log(f"⏳ Esperando {sleep_time:.2f} segundos antes del próximo ticker...")
-            time.sleep(sleep_time)
+            pending.append((ticker, pool.submit(backtest_scan_for_u, ticker, df_ticker, False)))
 
-        # Sleep extra entre batches (con jitter aleatorio)
-        sleep_time = BATCH_SLEEP + random.uniform(0, 5)
-        log(f"⏳ Batch completo. Esperando {sleep_time:.2f} segundos para no sobrecargar Yahoo Finance...")
-        time.sleep(sleep_time)
+    _report_finished(pending, wait=True)
+    pool.shutdown()
 
     elapsed_time = time.time() - start_time
     log(f"✅ BACKTEST finalizado. Tiempo total: {elapsed_time:.2f} segundos.")
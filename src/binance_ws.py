@@ -2,9 +2,11 @@
 
 import os
 import json
+import time
 import logging
+from typing import Callable, Dict, Optional
 from dotenv import load_dotenv
-from binance.websocket.spot.websocket_client import SpotWebsocketClient as WSClient
+from binance.websocket.spot.websocket_stream import SpotWebsocketStreamClient as WSClient
 
 # Cargar variables de entorno
 load_dotenv()
@@ -14,23 +16,85 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class BinanceWebSocket:
-    def __init__(self):
+    def __init__(self, use_testnet: Optional[bool] = None, on_disconnect: Optional[Callable] = None):
+        """
+        Args:
+            use_testnet: Forzar testnet/mainnet (por defecto según BINANCE_TESTNET)
+            on_disconnect: Función a llamar (sin argumentos) si se pierde la conexión
+        """
         self.ws_client = None
-        self.use_testnet = os.getenv("BINANCE_TESTNET", "true").lower() == "true"
-        self.stream_url = "wss://testnet.binance.vision/ws" if self.use_testnet else None
+        if use_testnet is None:
+            use_testnet = os.getenv("BINANCE_TESTNET", "true").lower() == "true"
+        self.use_testnet = use_testnet
+        self.stream_url = "wss://stream.testnet.binance.vision" if self.use_testnet else "wss://stream.binance.com:9443"
+        self.on_disconnect = on_disconnect
+        self.is_connected = False
+        self.last_message_time: Optional[float] = None
+        # Nombre del stream (ej: "btcusdt@kline_4h") -> callback con el mensaje ya parseado
+        self._handlers: Dict[str, Callable] = {}
+        self._next_id = 1
         
     def start(self):
         """Inicia el cliente WebSocket"""
-        self.ws_client = WSClient(stream_url=self.stream_url)
-        self.ws_client.start()
+        self.ws_client = WSClient(
+            stream_url=self.stream_url,
+            on_message=self._on_message,
+            on_close=self._on_close,
+            on_error=self._on_error
+        )
+        self.is_connected = True
+        self.last_message_time = time.time()
         logger.info(f"WebSocket iniciado - Testnet: {self.use_testnet}")
     
     def stop(self):
         """Detiene el cliente WebSocket"""
         if self.ws_client:
-            self.ws_client.stop()
+            try:
+                self.ws_client.stop()
+            except Exception as e:
+                logger.warning(f"Error cerrando WebSocket: {e}")
+            self.is_connected = False
             logger.info("WebSocket detenido")
     
+    def _on_message(self, _, message):
+        self.last_message_time = time.time()
+        try:
+            msg = json.loads(message)
+        except (TypeError, ValueError):
+            return
+        # Las respuestas a SUBSCRIBE ({"result": null, "id": 1}) no traen evento
+        event = msg.get("e") if isinstance(msg, dict) else None
+        if event == "kline":
+            stream = f"{msg['s'].lower()}@kline_{msg['k']['i']}"
+        elif event == "24hrTicker":
+            stream = f"{msg['s'].lower()}@ticker"
+        else:
+            return
+        handler = self._handlers.get(stream)
+        if handler:
+            handler(msg)
+    
+    def _on_close(self, _):
+        self._mark_disconnected("conexión cerrada por el servidor")
+    
+    def _on_error(self, _, error):
+        self._mark_disconnected(f"error: {error}")
+    
+    def _mark_disconnected(self, reason: str):
+        if not self.is_connected:
+            return
+        self.is_connected = False
+        logger.warning(f"WebSocket desconectado ({reason})")
+        if self.on_disconnect:
+            self.on_disconnect()
+    
+    def _subscribe(self, stream: str, handler: Callable, method: str, **kwargs):
+        if not self.ws_client:
+            raise RuntimeError("WebSocket no iniciado. Llama a start() primero.")
+        self._handlers[stream] = handler
+        getattr(self.ws_client, method)(id=self._next_id, **kwargs)
+        self._next_id += 1
+    
     def subscribe_klines(self, symbol: str, interval: str = "1h", callback=None):
         """
         Suscribe a velas en tiempo real
@@ -38,40 +102,39 @@ class BinanceWebSocket:
         Args:
             symbol: Símbolo del par (ej: "BTCUSDT")
             interval: Intervalo de tiempo (1m, 5m, 15m, 1h, 4h, 1d)
-            callback: Función a llamar cuando llegue una vela
+            callback: Función a llamar con cada vela (dict con is_closed=True al cierre)
         """
-        if not self.ws_client:
-            raise RuntimeError("WebSocket no iniciado. Llama a start() primero.")
-        
         def default_callback(msg):
-            if msg.get("e") == "kline":
-                k = msg["k"]
-                symbol = msg["s"]
-                is_closed = k["x"]  # True si la vela está cerrada
-                
-                kline_data = {
-                    'symbol': symbol,
-                    'timestamp': int(k['t']),
-                    'open': float(k['o']),
-                    'high': float(k['h']),
-                    'low': float(k['l']),
-                    'close': float(k['c']),
-                    'volume': float(k['v']),
-                    'is_closed': is_closed,
-                    'close_time': int(k['T'])
-                }
-                
-                logger.info(f"Vela {symbol}: {kline_data['close']} - Cerrada: {is_closed}")
-                
-                # Llamar callback personalizado si existe
-                if callback:
-                    callback(kline_data)
+            k = msg["k"]
+            symbol = msg["s"]
+            is_closed = k["x"]  # True si la vela está cerrada
+            
+            kline_data = {
+                'symbol': symbol,
+                'interval': k['i'],
+                'timestamp': int(k['t']),
+                'open': float(k['o']),
+                'high': float(k['h']),
+                'low': float(k['l']),
+                'close': float(k['c']),
+                'volume': float(k['v']),
+                'is_closed': is_closed,
+                'close_time': int(k['T'])
+            }
+            
+            if is_closed:
+                logger.info(f"Vela {symbol} {k['i']} cerrada: {kline_data['close']}")
+            
+            # Llamar callback personalizado si existe
+            if callback:
+                callback(kline_data)
         
-        self.ws_client.kline(
+        self._subscribe(
+            f"{symbol.lower()}@kline_{interval}",
+            default_callback,
+            'kline',
             symbol=symbol.lower(),
-            id=1,
-            interval=interval,
-            callback=callback or default_callback
+            interval=interval
         )
         
         logger.info(f"Suscrito a velas de {symbol} con intervalo {interval}")
@@ -80,14 +143,11 @@ class BinanceWebSocket:
         """
         Suscribe a cambios de precio en tiempo real
         """
-        if not self.ws_client:
-            raise RuntimeError("WebSocket no iniciado. Llama a start() primero.")
-        
         def default_callback(msg):
             ticker_data = {
                 'symbol': msg['s'],
                 'price': float(msg['c']),
-                'change': float(msg['P']),
+                'change': float(msg['p']),
                 'change_percent': float(msg['P']),
                 'high': float(msg['h']),
                 'low': float(msg['l']),
@@ -99,10 +159,11 @@ class BinanceWebSocket:
             if callback:
                 callback(ticker_data)
         
-        self.ws_client.ticker(
-            symbol=symbol.lower(),
-            id=2,
-            callback=callback or default_callback
+        self._subscribe(
+            f"{symbol.lower()}@ticker",
+            default_callback,
+            'ticker',
+            symbol=symbol.lower()
         )
         
         logger.info(f"Suscrito a ticker de {symbol}")
@@ -2,13 +2,20 @@
 # Backtesting de Bitcoin para todo el año 2024 usando intervalos de 15 minutos
 # Usando EXACTAMENTE la estrategia de bitcoin_2023_backtest.py con parámetros de 30min
 
-import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import requests
-import time
+import os
+import sys
 from utils import log
 
+# Kernel compartido de detección de patrones U (backend/trading_core)
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, backend_path)
+from trading_core.u_pattern_kernel import detect_lows_df
+from trading_core.indicators import WindowIndicators
+from trading_core.trade_simulator import simulate_trade_df
+from trading_core.ohlcv_store import load_klines
+
 class Bitcoin15mStrategyBacktest:
     def __init__(self, initial_capital=1000):
         self.initial_capital = initial_capital
@@ -26,58 +33,8 @@ class Bitcoin15mStrategyBacktest:
         start_time = int(datetime(2024, 1, 1).timestamp() * 1000)
         end_time = int(datetime(2024, 12, 31, 23, 59, 59).timestamp() * 1000)
         
-        all_klines = []
-        current_start = start_time
-        
-        # Binance límite: 1000 velas por request
-        interval = "15m"
-        limit = 1000
-        
-        while current_start < end_time:
-            try:
-                url = "https://api.binance.com/api/v3/klines"
-                params = {
-                    'symbol': 'BTCUSDT',
-                    'interval': interval,
-                    'startTime': current_start,
-                    'endTime': end_time,
-                    'limit': limit
-                }
-                
-                response = requests.get(url, params=params)
-                response.raise_for_status()
-                
-                klines = response.json()
-                if not klines:
-                    break
-                    
-                all_klines.extend(klines)
-                
-                # Actualizar start_time para siguiente request
-                last_timestamp = klines[-1][0]
-                current_start = last_timestamp + 1
-                
-                print(f"✅ Obtenidas {len(klines)} velas hasta {datetime.fromtimestamp(last_timestamp/1000).strftime('%Y-%m-%d')}")
-                
-                # Rate limit: esperar un poco entre requests
-                time.sleep(0.1)
-                
-            except Exception as e:
-                print(f"❌ Error obteniendo datos: {e}")
-                break
-        
-        # Convertir a DataFrame
-        df = pd.DataFrame(all_klines, columns=[
-            'timestamp', 'open', 'high', 'low', 'close', 'volume',
-            'close_time', 'quote_volume', 'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'
-        ])
-        
-        # Convertir tipos
-        for col in ['open', 'high', 'low', 'close', 'volume']:
-            df[col] = pd.to_numeric(df[col])
-        
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df.set_index('timestamp', inplace=True)
+        # Velas desde el almacén local (solo se descargan los huecos del rango)
+        df = load_klines('BTCUSDT', "15m", start_time, end_time)
         
         print(f"🎯 DATOS BITCOIN 2024 COMPLETO (15m):")
         print(f"   📅 Período: {df.index[0]} a {df.index[-1]}")
@@ -179,12 +136,15 @@ class Bitcoin15mStrategyBacktest:
         if not significant_lows:
             return signals
             
+        # Indicadores de la ventana (ATR y pendientes se calculan una vez por escaneo)
+        indicators = WindowIndicators(df)
+        
         # Analizar múltiples mínimos para bull market
         for low in significant_lows[-4:]:  # Últimos 4 mínimos (más oportunidades)
             min_idx = low['index']
             
             # ATR y factor dinámico
-            atr = self._calculate_atr_simple(df)
+            atr = indicators.atr(14)
             current_price = df.iloc[-1]['close']
             
             # Factor más agresivo para bull market
@@ -193,8 +153,8 @@ class Bitcoin15mStrategyBacktest:
             
             # Condiciones optimizadas para BTC en bull market
             if len(df) - min_idx > 4 and len(df) - min_idx < 45:
-                recent_slope = self._calculate_slope(df.iloc[-6:]['close'].values)
-                pre_slope = self._calculate_slope(df.iloc[max(0, min_idx-6):min_idx]['close'].values)
+                recent_slope = indicators.slope_last(6)
+                pre_slope = indicators.slope_before(min_idx, 6)
                 
                 # Condiciones más estrictas para BTC (menos volátil)
                 conditions = [
@@ -203,7 +163,7 @@ class Bitcoin15mStrategyBacktest:
                     recent_slope > -0.03,  # Momentum más positivo requerido
                     low['depth'] >= 0.025,  # Al menos 2.5% de profundidad
                     # Filtro adicional: evitar trades en tendencias bajistas prolongadas
-                    self._check_momentum_filter(df, min_idx)
+                    self._check_momentum_filter(indicators, min_idx)
                 ]
                 
                 if all(conditions):
@@ -223,35 +183,8 @@ class Bitcoin15mStrategyBacktest:
     
     def _detect_lows_2023(self, df, window=6, min_depth_pct=0.025):
         """EXACTO DE bitcoin_2023_backtest.py - Detecta mínimos optimizados para BTC en bull market de 2023"""
-        lows = []
-        
-        for i in range(window, len(df) - window):
-            current_low = df.iloc[i]['low']
-            
-            window_slice = df.iloc[i-window:i+window+1]
-            if current_low == window_slice['low'].min():
-                local_high = window_slice['high'].max()
-                depth = (local_high - current_low) / local_high
-                
-                # Filtro adicional: verificar que no sea un mínimo muy reciente
-                if depth >= min_depth_pct and i < len(df) - 5:
-                    # Verificar volumen para confirmar el mínimo
-                    volume_avg = df.iloc[i-window:i+window+1]['volume'].mean()
-                    current_volume = df.iloc[i]['volume']
-                    
-                    # Solo incluir si hay volumen suficiente o es un mínimo significativo
-                    if current_volume > volume_avg * 0.8 or depth >= 0.04:
-                        lows.append({
-                            'index': i,
-                            'timestamp': df.index[i],
-                            'low': current_low,
-                            'high': df.iloc[i]['high'],
-                            'close': df.iloc[i]['close'],
-                            'volume': df.iloc[i]['volume'],
-                            'depth': depth
-                        })
-        
-        return lows
+        # Kernel NumPy compartido (ventanas centradas vectorizadas)
+        return detect_lows_df(df, window, min_depth_pct, variant='2023')
     
     def _calculate_rupture_factor_bull(self, atr, price, base_factor=1.012):
         """EXACTO DE bitcoin_2023_backtest.py - Factor de ruptura para bull market"""
@@ -267,95 +200,33 @@ class Bitcoin15mStrategyBacktest:
         
         return max(factor, 1.012)  # Mínimo 1.2% de ruptura
     
-    def _check_momentum_filter(self, df, min_idx):
+    def _check_momentum_filter(self, indicators, min_idx):
         """EXACTO DE bitcoin_2023_backtest.py - Filtro de momentum para evitar tendencias bajistas prolongadas"""
         if min_idx < 12:
             return True  # No hay suficientes datos para evaluar
         
         # Verificar tendencia de los últimos 12 períodos
-        recent_12 = df.iloc[-12:]['close'].values
-        trend_slope = self._calculate_slope(recent_12)
+        trend_slope = indicators.slope_last(12)
         
         # También verificar tendencia desde el mínimo
-        since_min = df.iloc[min_idx:]['close'].values
-        min_trend_slope = self._calculate_slope(since_min) if len(since_min) > 2 else 0
+        min_trend_slope = indicators.slope_since(min_idx) if len(indicators) - min_idx > 2 else 0
         
         # Permitir trades solo si no hay tendencia bajista fuerte
         return trend_slope > -0.08 and min_trend_slope > -0.05
     
-    def _calculate_atr_simple(self, df, period=14):
-        """EXACTO DE bitcoin_2023_backtest.py - Calcula ATR simplificado"""
-        tr_values = []
-        for i in range(1, len(df)):
-            high = df.iloc[i]['high']
-            low = df.iloc[i]['low']
-            prev_close = df.iloc[i-1]['close']
-            
-            tr = max(
-                high - low,
-                abs(high - prev_close),
-                abs(low - prev_close)
-            )
-            tr_values.append(tr)
-        
-        return np.mean(tr_values[-period:]) if tr_values else df.iloc[-1]['high'] - df.iloc[-1]['low']
-    
-    def _calculate_slope(self, values):
-        """EXACTO DE bitcoin_2023_backtest.py - Calcula pendiente"""
-        if len(values) < 2:
-            return 0
-        x = np.arange(len(values))
-        return np.polyfit(x, values, 1)[0]
-    
     def _simulate_trade_15m(self, df, signal, start_idx, profit_target, stop_loss, max_hold):
         """Simula trade para timeframe de 15m"""
         entry_price = signal['entry_price']
         entry_time = signal['timestamp']
         
-        future_data = df.iloc[start_idx:start_idx + max_hold + 20]
-        if len(future_data) < 3:
+        outcome = simulate_trade_df(df, start_idx, entry_price, profit_target, stop_loss, max_hold,
+                                    future_extra=20, min_future=3)
+        if outcome is None:
             return None
-            
-        target_price = entry_price * (1 + profit_target)
-        stop_price = entry_price * (1 - stop_loss)
-        
-        max_profit = 0
-        max_drawdown = 0
-        
-        for i, (timestamp, row) in enumerate(future_data.iterrows()):
-            if i > max_hold:
-                exit_price = row['close']
-                exit_reason = "MAX_HOLD"
-                exit_time = timestamp
-                break
-                
-            high = row['high']
-            low = row['low']
-            close = row['close']
-            
-            current_profit = (high - entry_price) / entry_price
-            current_loss = (entry_price - low) / entry_price
-            max_profit = max(max_profit, current_profit)
-            max_drawdown = max(max_drawdown, current_loss)
-            
-            if high >= target_price:
-                exit_price = target_price
-                exit_reason = "TAKE_PROFIT"
-                exit_time = timestamp
-                break
-                
-            if low <= stop_price:
-                exit_price = stop_price
-                exit_reason = "STOP_LOSS"
-                exit_time = timestamp
-                break
-                
-        else:
-            exit_price = future_data.iloc[-1]['close']
-            exit_reason = "END_OF_DATA"
-            exit_time = future_data.index[-1]
         
-        return_pct = (exit_price - entry_price) / entry_price
+        exit_time, exit_price, exit_reason = outcome.exit_time, outcome.exit_price, outcome.exit_reason
+        max_profit, max_drawdown = outcome.max_profit, outcome.max_drawdown
+        return_pct = outcome.return_pct
         hold_minutes = int((exit_time - entry_time).total_seconds() / 60)
         
         return {
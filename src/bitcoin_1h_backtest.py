@@ -2,13 +2,20 @@
 # Backtesting de Bitcoin para todo el año 2024 usando intervalos de 1 hora
 # Basado en el sistema de 15 minutos con ajustes para menor frecuencia y mayor estabilidad
 
-import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import requests
-import time
+import os
+import sys
 from utils import log
 
+# Kernel compartido de detección de patrones U (backend/trading_core)
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, backend_path)
+from trading_core.u_pattern_kernel import detect_lows_df
+from trading_core.indicators import WindowIndicators
+from trading_core.trade_simulator import simulate_trade_df
+from trading_core.ohlcv_store import load_klines
+
 class Bitcoin1hBacktest:
     def __init__(self, initial_capital=1000):
         self.initial_capital = initial_capital
@@ -29,59 +36,8 @@ class Bitcoin1hBacktest:
         start_timestamp = int(start_time.timestamp() * 1000)
         end_timestamp = int(end_time.timestamp() * 1000)
         
-        all_klines = []
-        current_start = start_timestamp
-        
-        # Binance límite: 1000 velas por request
-        # Para 1h en 365 días: ~8760 velas, necesitamos múltiples requests
-        interval = "1h"
-        limit = 1000
-        
-        while current_start < end_timestamp:
-            try:
-                url = "https://api.binance.com/api/v3/klines"
-                params = {
-                    'symbol': 'BTCUSDT',
-                    'interval': interval,
-                    'startTime': current_start,
-                    'endTime': end_timestamp,
-                    'limit': limit
-                }
-                
-                response = requests.get(url, params=params)
-                response.raise_for_status()
-                
-                klines = response.json()
-                if not klines:
-                    break
-                    
-                all_klines.extend(klines)
-                
-                # Actualizar start_time para siguiente request
-                last_timestamp = klines[-1][0]
-                current_start = last_timestamp + 1
-                
-                print(f"✅ Obtenidas {len(klines)} velas hasta {datetime.fromtimestamp(last_timestamp/1000).strftime('%Y-%m-%d')}")
-                
-                # Rate limit: esperar un poco entre requests
-                time.sleep(0.1)
-                
-            except Exception as e:
-                print(f"❌ Error obteniendo datos: {e}")
-                break
-        
-        # Convertir a DataFrame
-        df = pd.DataFrame(all_klines, columns=[
-            'timestamp', 'open', 'high', 'low', 'close', 'volume',
-            'close_time', 'quote_volume', 'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'
-        ])
-        
-        # Convertir tipos
-        for col in ['open', 'high', 'low', 'close', 'volume']:
-            df[col] = pd.to_numeric(df[col])
-        
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df.set_index('timestamp', inplace=True)
+        # Velas desde el almacén local (solo se descargan los huecos del rango)
+        df = load_klines('BTCUSDT', "1h", start_timestamp, end_timestamp)
         
         print(f"🎯 DATOS BITCOIN 2024 COMPLETO (1h):")
         print(f"   📅 Período: {df.index[0]} a {df.index[-1]}")
@@ -183,12 +139,15 @@ class Bitcoin1hBacktest:
         if not significant_lows:
             return signals
             
+        # Indicadores de la ventana (ATR y pendientes se calculan una vez por escaneo)
+        indicators = WindowIndicators(df)
+        
         # Analizar múltiples mínimos (igual que 30min exitoso)
         for low in significant_lows[-2:]:  # Últimos 2 mínimos (igual que 30min)
             min_idx = low['index']
             
             # ATR y factor dinámico
-            atr = self._calculate_atr_simple(df)
+            atr = indicators.atr(6)
             current_price = df.iloc[-1]['close']
             
             # Factor adaptado para 1h (más conservador)
@@ -197,8 +156,8 @@ class Bitcoin1hBacktest:
             
             # Condiciones adaptadas para 1h (equivalente a 30min)
             if len(df) - min_idx > 1 and len(df) - min_idx < 24:  # Entre 1h y 24h (proporcional a 30min)
-                recent_slope = self._calculate_slope(df.iloc[-3:]['close'].values)
-                pre_slope = self._calculate_slope(df.iloc[max(0, min_idx-3):min_idx]['close'].values)
+                recent_slope = indicators.slope_last(3)
+                pre_slope = indicators.slope_before(min_idx, 3)
                 
                 # Condiciones IGUALES a 30min exitoso
                 conditions = [
@@ -206,7 +165,7 @@ class Bitcoin1hBacktest:
                     current_price > nivel_ruptura * 0.98,  # Cerca del nivel de ruptura (igual que 30min)
                     recent_slope > -0.01,  # Momentum (igual que 30min)
                     low['depth'] >= 0.015,  # 1.5% de profundidad (igual que 30min)
-                    self._check_momentum_filter_1h(df, min_idx)
+                    self._check_momentum_filter_1h(indicators, min_idx)
                 ]
                 
                 if all(conditions):
@@ -226,33 +185,8 @@ class Bitcoin1hBacktest:
     
     def _detect_lows_1h(self, df, window=3, min_depth_pct=0.015):
         """Detecta mínimos OPTIMIZADOS para intervalos de 1h"""
-        lows = []
-        
-        for i in range(window, len(df) - window):
-            current_low = df.iloc[i]['low']
-            
-            window_slice = df.iloc[i-window:i+window+1]
-            if current_low == window_slice['low'].min():
-                local_high = window_slice['high'].max()
-                depth = (local_high - current_low) / local_high
-                
-                if depth >= min_depth_pct and i < len(df) - 2:
-                    # Verificar volumen para confirmar el mínimo (igual que 30min)
-                    volume_avg = df.iloc[i-window:i+window+1]['volume'].mean()
-                    current_volume = df.iloc[i]['volume']
-                    
-                    if current_volume > volume_avg * 0.70 or depth >= 0.020:  # Igual que 30min
-                        lows.append({
-                            'index': i,
-                            'timestamp': df.index[i],
-                            'low': current_low,
-                            'high': df.iloc[i]['high'],
-                            'close': df.iloc[i]['close'],
-                            'volume': df.iloc[i]['volume'],
-                            'depth': depth
-                        })
-        
-        return lows
+        # Kernel NumPy compartido (ventanas centradas vectorizadas)
+        return detect_lows_df(df, window, min_depth_pct, variant='1h')
     
     def _calculate_rupture_factor_1h(self, atr, price, base_factor=1.008):
         """Factor de ruptura igual que 30min exitoso"""
@@ -268,91 +202,24 @@ class Bitcoin1hBacktest:
         
         return max(factor, 1.008)  # Mínimo igual que 30min
     
-    def _check_momentum_filter_1h(self, df, min_idx):
+    def _check_momentum_filter_1h(self, indicators, min_idx):
         """Filtro de momentum para timeframe de 1h"""
-        if min_idx < 4:
-            return True  # No hay suficientes datos para evaluar
-        
-        # Verificar tendencia igual que 30min exitoso (adaptado a 1h)
-        recent_4 = df.iloc[-4:]['close'].values
-        trend_slope = self._calculate_slope(recent_4)
-        
-        # Permitir trades igual que 30min exitoso
-        return trend_slope > -0.03
-    
-    def _calculate_atr_simple(self, df, period=6):
-        """Calcula ATR simplificado para 1h"""
-        tr_values = []
-        for i in range(1, len(df)):
-            high = df.iloc[i]['high']
-            low = df.iloc[i]['low']
-            prev_close = df.iloc[i-1]['close']
-            
-            tr = max(
-                high - low,
-                abs(high - prev_close),
-                abs(low - prev_close)
-            )
-            tr_values.append(tr)
-        
-        return np.mean(tr_values[-period:]) if tr_values else df.iloc[-1]['high'] - df.iloc[-1]['low']
-    
-    def _calculate_slope(self, values):
-        """Calcula pendiente"""
-        if len(values) < 2:
-            return 0
-        x = np.arange(len(values))
-        return np.polyfit(x, values, 1)[0]
+        # Tendencia igual que 30min exitoso (adaptado a 1h); sin datos suficientes se acepta
+        return indicators.momentum_ok(min_idx, length=4, min_slope=-0.03)
     
     def _simulate_trade_1h(self, df, signal, start_idx, profit_target, stop_loss, max_hold):
         """Simula trade para timeframe de 1h"""
         entry_price = signal['entry_price']
         entry_time = signal['timestamp']
         
-        future_data = df.iloc[start_idx:start_idx + max_hold + 20]
-        if len(future_data) < 3:
+        outcome = simulate_trade_df(df, start_idx, entry_price, profit_target, stop_loss, max_hold,
+                                    future_extra=20, min_future=3)
+        if outcome is None:
             return None
-            
-        target_price = entry_price * (1 + profit_target)
-        stop_price = entry_price * (1 - stop_loss)
-        
-        max_profit = 0
-        max_drawdown = 0
-        
-        for i, (timestamp, row) in enumerate(future_data.iterrows()):
-            if i > max_hold:
-                exit_price = row['close']
-                exit_reason = "MAX_HOLD"
-                exit_time = timestamp
-                break
-                
-            high = row['high']
-            low = row['low']
-            close = row['close']
-            
-            current_profit = (high - entry_price) / entry_price
-            current_loss = (entry_price - low) / entry_price
-            max_profit = max(max_profit, current_profit)
-            max_drawdown = max(max_drawdown, current_loss)
-            
-            if high >= target_price:
-                exit_price = target_price
-                exit_reason = "TAKE_PROFIT"
-                exit_time = timestamp
-                break
-                
-            if low <= stop_price:
-                exit_price = stop_price
-                exit_reason = "STOP_LOSS"
-                exit_time = timestamp
-                break
-                
-        else:
-            exit_price = future_data.iloc[-1]['close']
-            exit_reason = "END_OF_DATA"
-            exit_time = future_data.index[-1]
         
-        return_pct = (exit_price - entry_price) / entry_price
+        exit_time, exit_price, exit_reason = outcome.exit_time, outcome.exit_price, outcome.exit_reason
+        max_profit, max_drawdown = outcome.max_profit, outcome.max_drawdown
+        return_pct = outcome.return_pct
         hold_hours = int((exit_time - entry_time).total_seconds() / 3600)
         
         return {
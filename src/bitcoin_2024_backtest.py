@@ -1,13 +1,20 @@
 # src/bitcoin_2024_backtest.py
 # Backtesting completo de Bitcoin para el año 2024 usando datos históricos reales
 
-import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import requests
-import time
+import os
+import sys
 from utils import log
 
+# Kernel compartido de detección de patrones U (backend/trading_core)
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, backend_path)
+from trading_core.u_pattern_kernel import detect_lows_df
+from trading_core.indicators import WindowIndicators
+from trading_core.trade_simulator import simulate_trade_df
+from trading_core.ohlcv_store import load_klines
+
 class Bitcoin2024Backtest:
     def __init__(self, initial_capital=1000):
         self.initial_capital = initial_capital
@@ -25,59 +32,8 @@ class Bitcoin2024Backtest:
         start_time = int(datetime(2024, 1, 1).timestamp() * 1000)
         end_time = int(datetime(2024, 12, 31, 23, 59, 59).timestamp() * 1000)
         
-        all_klines = []
-        current_start = start_time
-        
-        # Binance límite: 1000 velas por request
-        # Para 4h en un año: ~2190 velas, necesitamos múltiples requests
-        interval = "4h"
-        limit = 1000
-        
-        while current_start < end_time:
-            try:
-                url = "https://api.binance.com/api/v3/klines"
-                params = {
-                    'symbol': 'BTCUSDT',
-                    'interval': interval,
-                    'startTime': current_start,
-                    'endTime': end_time,
-                    'limit': limit
-                }
-                
-                response = requests.get(url, params=params)
-                response.raise_for_status()
-                
-                klines = response.json()
-                if not klines:
-                    break
-                    
-                all_klines.extend(klines)
-                
-                # Actualizar start_time para siguiente request
-                last_timestamp = klines[-1][0]
-                current_start = last_timestamp + 1
-                
-                print(f"✅ Obtenidas {len(klines)} velas hasta {datetime.fromtimestamp(last_timestamp/1000).strftime('%Y-%m-%d')}")
-                
-                # Rate limit: esperar un poco entre requests
-                time.sleep(0.1)
-                
-            except Exception as e:
-                print(f"❌ Error obteniendo datos: {e}")
-                break
-        
-        # Convertir a DataFrame
-        df = pd.DataFrame(all_klines, columns=[
-            'timestamp', 'open', 'high', 'low', 'close', 'volume',
-            'close_time', 'quote_volume', 'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'
-        ])
-        
-        # Convertir tipos
-        for col in ['open', 'high', 'low', 'close', 'volume']:
-            df[col] = pd.to_numeric(df[col])
-        
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df.set_index('timestamp', inplace=True)
+        # Velas desde el almacén local (solo se descargan los huecos del rango)
+        df = load_klines('BTCUSDT', "4h", start_time, end_time)
         
         print(f"🎯 DATOS 2024 COMPLETOS:")
         print(f"   📅 Período: {df.index[0]} a {df.index[-1]}")
@@ -176,12 +132,15 @@ class Bitcoin2024Backtest:
         if not significant_lows:
             return signals
             
+        # Indicadores de la ventana (ATR y pendientes se calculan una vez por escaneo)
+        indicators = WindowIndicators(df)
+        
         # Analizar múltiples mínimos (no solo el último)
         for low in significant_lows[-3:]:  # Últimos 3 mínimos
             min_idx = low['index']
             
             # ATR y factor dinámico
-            atr = self._calculate_atr_simple(df)
+            atr = indicators.atr(14)
             current_price = df.iloc[-1]['close']
             
             # Factor optimizado para bull market
@@ -190,8 +149,8 @@ class Bitcoin2024Backtest:
             
             # Condiciones adaptadas para bull market
             if len(df) - min_idx > 5 and len(df) - min_idx < 60:
-                recent_slope = self._calculate_slope(df.iloc[-8:]['close'].values)
-                pre_slope = self._calculate_slope(df.iloc[max(0, min_idx-8):min_idx]['close'].values)
+                recent_slope = indicators.slope_last(8)
+                pre_slope = indicators.slope_before(min_idx, 8)
                 
                 # Condiciones más permisivas para bull market
                 conditions = [
@@ -218,28 +177,8 @@ class Bitcoin2024Backtest:
     
     def _detect_lows_2024(self, df, window=8, min_depth_pct=0.03):
         """Detecta mínimos para bull market de 2024"""
-        lows = []
-        
-        for i in range(window, len(df) - window):
-            current_low = df.iloc[i]['low']
-            
-            window_slice = df.iloc[i-window:i+window+1]
-            if current_low == window_slice['low'].min():
-                local_high = window_slice['high'].max()
-                depth = (local_high - current_low) / local_high
-                
-                if depth >= min_depth_pct:
-                    lows.append({
-                        'index': i,
-                        'timestamp': df.index[i],
-                        'low': current_low,
-                        'high': df.iloc[i]['high'],
-                        'close': df.iloc[i]['close'],
-                        'volume': df.iloc[i]['volume'],
-                        'depth': depth
-                    })
-        
-        return lows
+        # Kernel NumPy compartido (ventanas centradas vectorizadas)
+        return detect_lows_df(df, window, min_depth_pct, variant='basic')
     
     def _calculate_rupture_factor_bull(self, atr, price, base_factor=1.02):
         """Factor de ruptura para bull market (más agresivo)"""
@@ -255,79 +194,19 @@ class Bitcoin2024Backtest:
         
         return max(factor, 1.02)  # Mínimo 2%
     
-    def _calculate_atr_simple(self, df, period=14):
-        """Calcula ATR simplificado"""
-        tr_values = []
-        for i in range(1, len(df)):
-            high = df.iloc[i]['high']
-            low = df.iloc[i]['low']
-            prev_close = df.iloc[i-1]['close']
-            
-            tr = max(
-                high - low,
-                abs(high - prev_close),
-                abs(low - prev_close)
-            )
-            tr_values.append(tr)
-        
-        return np.mean(tr_values[-period:]) if tr_values else df.iloc[-1]['high'] - df.iloc[-1]['low']
-    
-    def _calculate_slope(self, values):
-        """Calcula pendiente"""
-        if len(values) < 2:
-            return 0
-        x = np.arange(len(values))
-        return np.polyfit(x, values, 1)[0]
-    
     def _simulate_trade_2024(self, df, signal, start_idx, profit_target, stop_loss, max_hold):
         """Simula trade en 2024"""
         entry_price = signal['entry_price']
         entry_time = signal['timestamp']
         
-        future_data = df.iloc[start_idx:start_idx + max_hold + 50]
-        if len(future_data) < 5:
+        outcome = simulate_trade_df(df, start_idx, entry_price, profit_target, stop_loss, max_hold,
+                                    future_extra=50, min_future=5)
+        if outcome is None:
             return None
-            
-        target_price = entry_price * (1 + profit_target)
-        stop_price = entry_price * (1 - stop_loss)
-        
-        max_profit = 0
-        max_drawdown = 0
-        
-        for i, (timestamp, row) in enumerate(future_data.iterrows()):
-            if i > max_hold:
-                exit_price = row['close']
-                exit_reason = "MAX_HOLD"
-                exit_time = timestamp
-                break
-                
-            high = row['high']
-            low = row['low']
-            close = row['close']
-            
-            current_profit = (high - entry_price) / entry_price
-            current_loss = (entry_price - low) / entry_price
-            max_profit = max(max_profit, current_profit)
-            max_drawdown = max(max_drawdown, current_loss)
-            
-            if high >= target_price:
-                exit_price = target_price
-                exit_reason = "TAKE_PROFIT"
-                exit_time = timestamp
-                break
-                
-            if low <= stop_price:
-                exit_price = stop_price
-                exit_reason = "STOP_LOSS"
-                exit_time = timestamp
-                break
-                
-        else:
-            exit_price = future_data.iloc[-1]['close']
-            exit_reason = "END_OF_DATA"
-            exit_time = future_data.index[-1]
         
-        return_pct = (exit_price - entry_price) / entry_price
+        exit_time, exit_price, exit_reason = outcome.exit_time, outcome.exit_price, outcome.exit_reason
+        max_profit, max_drawdown = outcome.max_profit, outcome.max_drawdown
+        return_pct = outcome.return_pct
         hold_hours = int((exit_time - entry_time).total_seconds() / 3600)
         
         return {
@@ -6,8 +6,17 @@ import numpy as np
 from datetime import datetime, timedelta
 from binance_client import fetch_klines
 from scanner_crypto import scan_crypto_for_u, detect_significant_lows, calculate_atr, calculate_dynamic_rupture_factor
+import os
+import sys
 from utils import log
 
+# Kernel compartido de detección de patrones U (backend/trading_core)
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, backend_path)
+from trading_core.u_pattern_kernel import detect_lows_df
+from trading_core.indicators import WindowIndicators
+from trading_core.trade_simulator import simulate_trade_df
+
 class BitcoinBacktestDemo:
     def __init__(self, initial_capital=1000):
         self.initial_capital = initial_capital
@@ -90,12 +99,15 @@ class BitcoinBacktestDemo:
         if not significant_lows:
             return signals
             
+        # Indicadores de la ventana (ATR y pendientes se calculan una vez por escaneo)
+        indicators = WindowIndicators(df)
+        
         # Analizar el último mínimo
         last_low = significant_lows[-1]
         min_idx = last_low['index']
         
         # Calcular ATR para factor dinámico
-        atr = self._calculate_atr_simple(df)
+        atr = indicators.atr(14)
         current_price = df.iloc[-1]['close']
         
         # Factor de ruptura dinámico
@@ -104,8 +116,8 @@ class BitcoinBacktestDemo:
         
         # Verificar si hay momentum alcista
         if len(df) - min_idx > 10:
-            recent_slope = self._calculate_slope(df.iloc[-10:]['close'].values)
-            pre_slope = self._calculate_slope(df.iloc[max(0, min_idx-10):min_idx]['close'].values) 
+            recent_slope = indicators.slope_last(10)
+            pre_slope = indicators.slope_before(min_idx, 10) 
             
             # Condiciones para señal U
             conditions = [
@@ -130,51 +142,8 @@ class BitcoinBacktestDemo:
         return signals
     
     def _detect_lows_manual(self, df, window=10, min_depth_pct=0.03):
-        """
-        Detecta mínimos locales significativos manualmente
-        """
-        lows = []
-        
-        for i in range(window, len(df) - window):
-            current_low = df.iloc[i]['low']
-            
-            # Verificar que es mínimo en la ventana
-            window_slice = df.iloc[i-window:i+window+1]
-            if current_low == window_slice['low'].min():
-                
-                # Verificar profundidad: debe ser X% más bajo que máximo local
-                local_high = window_slice['high'].max()
-                depth = (local_high - current_low) / local_high
-                
-                if depth >= min_depth_pct:
-                    lows.append({
-                        'index': i,
-                        'timestamp': df.index[i],
-                        'low': current_low,
-                        'high': df.iloc[i]['high'],
-                        'close': df.iloc[i]['close'],
-                        'volume': df.iloc[i]['volume'],
-                        'depth': depth
-                    })
-        
-        return lows
-    
-    def _calculate_atr_simple(self, df, period=14):
-        """Calcula ATR simplificado"""
-        tr_values = []
-        for i in range(1, len(df)):
-            high = df.iloc[i]['high']
-            low = df.iloc[i]['low']
-            prev_close = df.iloc[i-1]['close']
-            
-            tr = max(
-                high - low,
-                abs(high - prev_close),
-                abs(low - prev_close)
-            )
-            tr_values.append(tr)
-        
-        return np.mean(tr_values[-period:]) if tr_values else df.iloc[-1]['high'] - df.iloc[-1]['low']
+        # Kernel NumPy compartido (ventanas centradas vectorizadas)
+        return detect_lows_df(df, window, min_depth_pct, variant='basic')
     
     def _calculate_rupture_factor(self, atr, price, base_factor=1.03):
         """Calcula factor de ruptura dinámico"""
@@ -189,13 +158,6 @@ class BitcoinBacktestDemo:
         
         return max(factor, 1.03)  # Mínimo 3%
     
-    def _calculate_slope(self, values):
-        """Calcula la pendiente de una serie de valores"""
-        if len(values) < 2:
-            return 0
-        x = np.arange(len(values))
-        return np.polyfit(x, values, 1)[0]
-    
     def _simulate_trade(self, df, signal, start_idx, profit_target, stop_loss, max_hold):
         """
         Simula un trade completo desde la señal hasta la salida
@@ -203,56 +165,14 @@ class BitcoinBacktestDemo:
         entry_price = signal['entry_price']
         entry_time = signal['timestamp']
         
-        # Datos futuros para simular el trade
-        future_data = df.iloc[start_idx:start_idx + max_hold + 50]
-        if len(future_data) < 10:
+        outcome = simulate_trade_df(df, start_idx, entry_price, profit_target, stop_loss, max_hold,
+                                    future_extra=50, min_future=10)
+        if outcome is None:
             return None
-            
-        target_price = entry_price * (1 + profit_target)
-        stop_price = entry_price * (1 - stop_loss)
-        
-        max_profit = 0
-        max_drawdown = 0
-        
-        for i, (timestamp, row) in enumerate(future_data.iterrows()):
-            if i > max_hold:
-                # Salida por tiempo máximo
-                exit_price = row['close']
-                exit_reason = "MAX_HOLD"
-                exit_time = timestamp
-                break
-                
-            high = row['high']
-            low = row['low']
-            close = row['close']
-            
-            # Tracking de performance
-            current_profit = (high - entry_price) / entry_price
-            current_loss = (entry_price - low) / entry_price
-            max_profit = max(max_profit, current_profit)
-            max_drawdown = max(max_drawdown, current_loss)
-            
-            # Take profit
-            if high >= target_price:
-                exit_price = target_price
-                exit_reason = "TAKE_PROFIT"
-                exit_time = timestamp
-                break
-                
-            # Stop loss
-            if low <= stop_price:
-                exit_price = stop_price
-                exit_reason = "STOP_LOSS"
-                exit_time = timestamp
-                break
-                
-        else:
-            # Final de datos
-            exit_price = future_data.iloc[-1]['close']
-            exit_reason = "END_OF_DATA"
-            exit_time = future_data.index[-1]
         
-        return_pct = (exit_price - entry_price) / entry_price
+        exit_time, exit_price, exit_reason = outcome.exit_time, outcome.exit_price, outcome.exit_reason
+        max_profit, max_drawdown = outcome.max_profit, outcome.max_drawdown
+        return_pct = outcome.return_pct
         hold_hours = int((exit_time - entry_time).total_seconds() / 3600)
         
         return {
@@ -0,0 +1,342 @@
+# src/u_pattern_parity_check.py
+
+"""
+Chequeo de paridad entre el kernel NumPy de mínimos (trading_core.u_pattern_kernel)
+y la implementación original con bucles df.iloc de los `_detect_lows_*`, y entre
+el detector incremental (trading_core.u_pattern_stream) y los `_detect_u_patterns_*`
+recalculados sobre cada ventana. También compara trading_core.indicators con los
+`_calculate_atr_simple` / `_calculate_slope` originales, y el motor multi-serie
+(trading_core.u_pattern_batch) con el detector de cada serie por separado.
+Por último corre el motor único de backtesting (trading_core.backtest_engine)
+con cada preset y compara sus trades con los del script original de src/.
+
+Uso:
+    python u_pattern_parity_check.py                 # datos sintéticos + Binance (si hay red)
+    python u_pattern_parity_check.py velas.csv ...   # CSV grabados (timestamp, open, high, low, close, volume)
+
+Sale con código 1 si alguna variante difiere.
+"""
+
+import contextlib
+import importlib
+import io
+import os
+import sys
+import numpy as np
+import pandas as pd
+import requests
+from utils import log
+
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, backend_path)
+
+from trading_core.backtest_engine import STRATEGY_PRESETS, BacktestEngine  # noqa: E402
+from trading_core.indicators import WindowIndicators, atr_series, rolling_slope  # noqa: E402
+from trading_core.u_pattern_batch import SeriesSpec, UPatternBatch  # noqa: E402
+from trading_core.u_pattern_kernel import LOW_FILTERS, detect_lows_df  # noqa: E402
+from trading_core.u_pattern_stream import U_PATTERN_PROFILES, UPatternStream  # noqa: E402
+
+# (variante, window, min_depth_pct) tal como las llaman los scanners y backtests
+CASES = [
+    ('2023', 6, 0.025),
+    ('30min', 3, 0.015),
+    ('1h', 3, 0.015),
+    ('15min', 3, 0.010),
+    ('basic', 8, 0.03),
+    ('basic', 10, 0.03),
+]
+
+# (perfil, window_size, min_candles, overrides) como los usan los scanners
+STREAM_CASES = [
+    ('2023', 120, None, {}),             # BTC 4h
+    ('2023', 100, None, {'n_lows': 3}),  # ETH/BNB 4h (data_limit 120 - 20)
+    ('30min', 300, 0, {}),               # BTC 30m mainnet
+]
+
+# preset del motor -> (módulo de src/, clase) del backtest original
+ENGINE_CASES = {
+    'bitcoin_2022': ('bitcoin_2022_backtest', 'Bitcoin2022Backtest'),
+    'bitcoin_2023': ('bitcoin_2023_backtest', 'Bitcoin2023Backtest'),
+    'bitcoin_2024': ('bitcoin_2024_backtest', 'Bitcoin2024Backtest'),
+    'eth_2022': ('eth_2022_backtest', 'Ethereum2022Backtest'),
+    'eth_2023': ('eth_2023_backtest', 'ETH2023Backtest'),
+    'eth_2024': ('eth_2024_backtest', 'ETH2024Backtest'),
+    'bnb_2022': ('bnb_2022_backtest', 'BNB2022Backtest'),
+    'bnb_2023': ('bnb_2023_backtest', 'BNB2023Backtest'),
+    'bnb_2024': ('bnb_2024_backtest', 'BNB2024Backtest'),
+    'bitcoin_30m': ('bitcoin_30m_backtest', 'Bitcoin1hBacktest'),
+    'bitcoin_1h': ('bitcoin_1h_backtest', 'Bitcoin1hBacktest'),
+    'bitcoin_15m': ('bitcoin_15m_backtest', 'Bitcoin15mBacktest'),
+    'bitcoin_15m_unified': ('bitcoin_15m_unified_backtest', 'Bitcoin15mUnifiedBacktest'),
+    'bitcoin_1h_strategy': ('bitcoin_1h_strategy_backtest', 'Bitcoin1hStrategyBacktest'),
+    'bitcoin_15m_strategy': ('bitcoin_15m_strategy_backtest', 'Bitcoin15mStrategyBacktest'),
+    'bitcoin_5m_strategy': ('bitcoin_5m_strategy_backtest', 'Bitcoin5mStrategyBacktest'),
+}
+TRADE_FIELDS = ['entry_time', 'exit_time', 'entry_price', 'exit_price', 'exit_reason', 'return_pct',
+                'max_profit', 'max_drawdown', 'signal_strength', 'depth']
+
+
+def legacy_detect_lows(df, window, min_depth_pct, recent_margin=None, volume_ratio=None, strong_depth=None):
+    """Copia de referencia del bucle original (parametrizado por variante)"""
+    lows = []
+    for i in range(window, len(df) - window):
+        current_low = df.iloc[i]['low']
+        window_slice = df.iloc[i-window:i+window+1]
+        if current_low == window_slice['low'].min():
+            local_high = window_slice['high'].max()
+            depth = (local_high - current_low) / local_high
+            if depth >= min_depth_pct and (recent_margin is None or i < len(df) - recent_margin):
+                if volume_ratio is not None:
+                    volume_avg = df.iloc[i-window:i+window+1]['volume'].mean()
+                    current_volume = df.iloc[i]['volume']
+                    if not (current_volume > volume_avg * volume_ratio or depth >= strong_depth):
+                        continue
+                lows.append({'index': i, 'timestamp': df.index[i], 'low': current_low, 'depth': depth})
+    return lows
+
+
+def legacy_atr_simple(df, period):
+    """Copia de referencia del `_calculate_atr_simple` original (bucle df.iloc)"""
+    tr_values = []
+    for i in range(1, len(df)):
+        high = df.iloc[i]['high']
+        low = df.iloc[i]['low']
+        prev_close = df.iloc[i-1]['close']
+        tr_values.append(max(high - low, abs(high - prev_close), abs(low - prev_close)))
+    return np.mean(tr_values[-period:]) if tr_values else df.iloc[-1]['high'] - df.iloc[-1]['low']
+
+
+def legacy_slope(values):
+    """Copia de referencia del `_calculate_slope` original (np.polyfit)"""
+    if len(values) < 2:
+        return 0
+    return np.polyfit(np.arange(len(values)), values, 1)[0]
+
+
+def batch_detect_u_patterns(df, params):
+    """Copia de referencia de `_detect_u_patterns_2023` / `_detect_u_patterns_30min` (por perfil)"""
+    indicators = WindowIndicators(df)
+    significant_lows = detect_lows_df(df, params['window_low'], params['min_depth_pct'], variant=params['low_variant'])
+    base, threshold_1, threshold_2, slope_1, slope_2, cap = params['rupture']
+    for low in significant_lows[-params['n_lows']:]:
+        min_idx = low['index']
+        atr = indicators.atr(params['atr_period'])
+        current_price = df.iloc[-1]['close']
+        atr_pct = atr / current_price
+        if atr_pct < threshold_1:
+            factor = base
+        elif atr_pct < threshold_2:
+            factor = base + (atr_pct * slope_1)
+        else:
+            factor = min(base + (atr_pct * slope_2), cap)
+        factor = max(factor, base)
+        nivel_ruptura = low['high'] * factor
+        width = len(df) - min_idx
+        if params['min_width'] < width < params['max_width']:
+            recent_slope = indicators.slope_last(params['recent_slope_len'])
+            pre_slope = indicators.slope_before(min_idx, params['pre_slope_len'])
+            momentum_ok = indicators.momentum_ok(min_idx, params['momentum_len'], params['momentum_slope_min'])
+            if all([pre_slope < params['pre_slope_max'],
+                    current_price > nivel_ruptura * params['rupture_tolerance'],
+                    recent_slope > params['recent_slope_min'],
+                    low['depth'] >= params['signal_min_depth'],
+                    momentum_ok]):
+                return [{'timestamp': df.index[-1], 'entry_price': nivel_ruptura, 'signal_strength': abs(pre_slope),
+                         'min_price': low['low'], 'pattern_width': width, 'atr': atr,
+                         'dynamic_factor': factor, 'depth': low['depth']}]
+    return []
+
+
+def same_signals(expected, actual) -> bool:
+    """Mismas señales; las pendientes/medias incrementales pueden diferir en el redondeo"""
+    if len(expected) != len(actual):
+        return False
+    for e, a in zip(expected, actual):
+        for key, value in e.items():
+            if isinstance(value, float):
+                if not np.isclose(value, a[key], rtol=1e-9, atol=1e-12):
+                    return False
+            elif value != a[key]:
+                return False
+    return True
+
+
+def synthetic_series(n=3000, seed=7, volatility=0.012) -> pd.DataFrame:
+    """Paseo aleatorio con precios redondeados (fuerza empates de mínimos)"""
+    rng = np.random.default_rng(seed)
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, volatility, n))), 1)
+    open_ = np.roll(close, 1)
+    open_[0] = close[0]
+    high = np.maximum(open_, close) + np.round(rng.uniform(0, 1.5, n), 1)
+    low = np.minimum(open_, close) - np.round(rng.uniform(0, 1.5, n), 1)
+    volume = rng.lognormal(3, 0.5, n)
+    index = pd.date_range('2023-01-01', periods=n, freq='4h', name='timestamp')
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}, index=index)
+
+
+def binance_series(symbol: str, interval: str, limit: int = 1000):
+    try:
+        response = requests.get(
+            "https://api.binance.com/api/v3/klines",
+            params={'symbol': symbol, 'interval': interval, 'limit': limit},
+            timeout=10
+        )
+        response.raise_for_status()
+        data = response.json()
+    except Exception as e:
+        log(f"⚠️ Sin datos de Binance para {symbol} {interval}: {e}")
+        return None
+    df = pd.DataFrame([row[:6] for row in data], columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        df[col] = pd.to_numeric(df[col])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df.set_index('timestamp')
+
+
+def load_csv(path: str) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return df.set_index('timestamp')
+
+
+def check(name: str, df: pd.DataFrame) -> bool:
+    ok = True
+    for variant, window, min_depth in CASES:
+        expected = legacy_detect_lows(df, window, min_depth, **LOW_FILTERS[variant])
+        actual = detect_lows_df(df, window, min_depth, variant=variant)
+        same = (
+            [low['index'] for low in expected] == [low['index'] for low in actual] and
+            all(e['depth'] == a['depth'] and e['low'] == a['low'] and e['timestamp'] == a['timestamp']
+                for e, a in zip(expected, actual))
+        )
+        status = "✅" if same else "❌"
+        log(f"{status} {name} | {variant} w={window} depth={min_depth}: legacy={len(expected)} kernel={len(actual)}")
+        ok &= same
+    return ok
+
+
+def check_indicators(name: str, df: pd.DataFrame, window_size: int = 120) -> bool:
+    """
+    ATR y pendientes idénticos a los originales (bucle df.iloc y np.polyfit),
+    también en las versiones array -> array.
+    """
+    atr_ok = slope_ok = True
+    close = df['close'].to_numpy()
+    atr_full = atr_series(df['high'].to_numpy(), df['low'].to_numpy(), close, 14)
+    slopes_full = rolling_slope(close, 6)
+    for end in range(window_size, len(df) + 1, 7):
+        window = df.iloc[end - window_size:end]
+        indicators = WindowIndicators(window)
+        for period in (6, 7, 14):
+            atr_ok &= bool(indicators.atr(period) == legacy_atr_simple(window, period))
+        atr_ok &= bool(np.isclose(atr_full[end - 1], indicators.atr(14), rtol=1e-12))
+        values = window['close'].values
+        for length in (3, 6, 8, 10, 12, 20):
+            slope_ok &= bool(indicators.slope_last(length) == legacy_slope(values[-length:]))
+        slope_ok &= bool(slopes_full[end - 1] == indicators.slope_last(6))
+    ok = atr_ok and slope_ok
+    log(f"{'✅' if ok else '❌'} {name} | indicadores: ATR={'ok' if atr_ok else 'difiere'} "
+        f"pendientes={'ok' if slope_ok else 'difieren'}")
+    return ok
+
+
+def check_stream(name: str, df: pd.DataFrame) -> bool:
+    """
+    Compara el detector incremental contra el batch en cada vela: con velas
+    cerradas (update) y con la última fila en formación (sync).
+    """
+    ok = True
+    for profile, window_size, min_candles, overrides in STREAM_CASES:
+        params = dict(U_PATTERN_PROFILES[profile], **overrides)
+        closed = UPatternStream(profile, window_size, min_candles, **overrides)
+        forming = UPatternStream(profile, window_size, min_candles, **overrides)
+        mismatches = signals = 0
+        for end in range(1, len(df) + 1):
+            window = df.iloc[max(0, end - window_size):end]
+            expected = batch_detect_u_patterns(window, params) if len(window) >= closed.min_candles else []
+            row = df.iloc[end - 1]
+            by_update = closed.update(df.index[end - 1], row['high'], row['low'], row['close'], row['volume'])
+            by_sync = forming.sync(df.iloc[max(0, end - window_size):end])
+            if not (same_signals(expected, by_update) and same_signals(expected, by_sync)):
+                mismatches += 1
+            signals += len(expected)
+        status = "✅" if mismatches == 0 else "❌"
+        log(f"{status} {name} | stream {profile} ventana={window_size}: señales={signals} diferencias={mismatches}")
+        ok &= mismatches == 0
+    return ok
+
+
+def check_batch(name: str, df: pd.DataFrame, lag: int = 7) -> bool:
+    """
+    Evalúa todos los STREAM_CASES juntos con UPatternBatch (cada serie
+    desfasada `lag` velas para que las longitudes difieran) y los compara con
+    el batch de una serie.
+    """
+    specs = [SeriesSpec(f"case{i}", profile, window_size, min_candles, overrides)
+             for i, (profile, window_size, min_candles, overrides) in enumerate(STREAM_CASES)]
+    engine = UPatternBatch(specs)
+    mismatches = signals = 0
+    for end in range(1, len(df) + 1):
+        frames = {spec.key: df.iloc[:max(0, end - i * lag)] for i, spec in enumerate(specs)}
+        result = engine.detect(frames)
+        for spec in specs:
+            frame = frames[spec.key]
+            min_candles = spec.window_size if spec.min_candles is None else spec.min_candles
+            window = frame.iloc[-spec.window_size:]
+            expected = batch_detect_u_patterns(window, spec.params()) if len(frame) >= min_candles else []
+            if not same_signals(expected, result[spec.key]):
+                mismatches += 1
+            signals += len(expected)
+    status = "✅" if mismatches == 0 else "❌"
+    log(f"{status} {name} | multi-serie ({len(specs)} series): señales={signals} diferencias={mismatches}")
+    return mismatches == 0
+
+
+def check_engine(name: str, df: pd.DataFrame) -> bool:
+    """
+    Corre cada script original sobre `df` (sin descargar: se reemplaza su
+    get_historical_data_*) y el motor con el preset equivalente; los trades
+    deben coincidir uno a uno.
+    """
+    ok = True
+    for preset, (module, class_name) in ENGINE_CASES.items():
+        legacy = getattr(importlib.import_module(module), class_name)(initial_capital=1000)
+        getter = next(attr for attr in dir(legacy) if attr.startswith('get_historical_data'))
+        runner = next(attr for attr in dir(legacy) if attr.startswith('backtest_'))
+        setattr(legacy, getter, lambda: df)
+        with contextlib.redirect_stdout(io.StringIO()):
+            getattr(legacy, runner)()
+        result = BacktestEngine(df, STRATEGY_PRESETS[preset].params).run(1000)
+        expected = [[trade[field] for field in TRADE_FIELDS] for trade in legacy.trades]
+        actual = [[trade[field] for field in TRADE_FIELDS] for trade in result.trades]
+        same = expected == actual and np.isclose(legacy.current_capital, result.final_capital)
+        status = "✅" if same else "❌"
+        log(f"{status} {name} | motor {preset}: trades={len(expected)} motor={len(actual)}")
+        ok &= bool(same)
+    return ok
+
+
+def main(paths):
+    datasets = []
+    if paths:
+        datasets = [(os.path.basename(p), load_csv(p)) for p in paths]
+    else:
+        datasets.append(('sintético', synthetic_series()))
+        # Volatilidad baja: la mayoría de los mínimos dependen del filtro de volumen
+        datasets.append(('sintético baja vol.', synthetic_series(seed=11, volatility=0.004)))
+        for symbol, interval in [('BTCUSDT', '4h'), ('ETHUSDT', '4h'), ('BNBUSDT', '4h'), ('BTCUSDT', '30m')]:
+            df = binance_series(symbol, interval)
+            if df is not None:
+                datasets.append((f"{symbol} {interval}", df))
+
+    all_ok = all([check(name, df) for name, df in datasets])
+    all_ok &= all([check_indicators(name, df.iloc[-1500:]) for name, df in datasets])
+    all_ok &= all([check_stream(name, df.iloc[-1500:]) for name, df in datasets])
+    all_ok &= all([check_batch(name, df.iloc[-1500:]) for name, df in datasets])
+    all_ok &= all([check_engine(name, df) for name, df in datasets])
+    log("🎉 Paridad OK" if all_ok else "❌ Diferencias entre kernel e implementación original")
+    return 0 if all_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))